@@ -75,8 +75,7 @@ class TimeCorrelatedRandomPseudoSpectralAnisotropic(
             )
 
         COND_NO_F = np.logical_or(COND_NO_F_KX, COND_NO_F_KY)
-        COND_NO_F[self.oper_coarse.shapeK_loc[0] // 2] = True
-        COND_NO_F[:, self.oper_coarse.shapeK_loc[1] - 1] = True
+        COND_NO_F[self._compute_cond_nyquist_coarse()] = True
         return COND_NO_F
 
     # def plot_forcing_1mode_time(self):
@@ -197,3 +197,60 @@ class ForcingBasePseudoSpectral(ForcingBase):
 
     def get_forcing(self):
         return self.forcing_maker.forcing_fft
+
+    def add_to_tendencies(self, tendencies_fft):
+        """Add the forcing to the tendencies (in place)
+
+        For the forcing makers storing only the forced modes, the forcing is
+        added with a scatter-add (no full array).
+
+        """
+        try:
+            add_to_tendencies = self.forcing_maker.add_to_tendencies
+        except AttributeError:
+            tendencies_fft += self.get_forcing()
+        else:
+            add_to_tendencies(tendencies_fft)
+
+    def compute_injection_rates(self, key, divisor=None):
+        """Sums over the wavenumbers of the injection terms of one variable
+
+        Returns ``P1 = sum(Re(var_fft.conj() * f_fft) / divisor)`` and
+        ``P2 = sum(abs(f_fft) ** 2 / divisor)``, so that the injection rate
+        over one time step is ``P1 + deltat / 2 * P2``.
+
+        For the forcing makers storing only the forced modes, the sums are
+        computed from the forced modes (no full array).
+
+        Parameters
+        ----------
+
+        key : str
+
+          Key of the variable in the spectral state.
+
+        divisor : array (optional)
+
+          Array in spectral space dividing the terms (for example ``K2`` to
+          get the kinetic energy injection from the vorticity).
+
+        """
+        try:
+            compute_injection_rates = self.forcing_maker.compute_injection_rates
+        except AttributeError:
+            pass
+        else:
+            return compute_injection_rates(key, divisor)
+
+        f_fft = self.get_forcing().get_var(key)
+        var_fft = self.sim.state.state_spect.get_var(key)
+        P1_fft = np.real(var_fft.conj() * f_fft)
+        P2_fft = abs(f_fft) ** 2
+        if divisor is not None:
+            P1_fft /= divisor
+            P2_fft /= divisor
+        sum_wavenumbers = self.sim.oper.sum_wavenumbers
+        return (
+            sum_wavenumbers(np.ascontiguousarray(P1_fft)),
+            sum_wavenumbers(P2_fft),
+        )
@@ -169,10 +169,6 @@ class SpecificForcingPseudoSpectralCoarse(SpecificForcing):
 
         params = sim.params
 
-        self.forcing_fft = SetOfVariables(
-            like=sim.state.state_spect, info="forcing_fft", value=0.0
-        )
-
         if params.forcing.nkmax_forcing < params.forcing.nkmin_forcing:
             raise ValueError(
                 "params.forcing.nkmax_forcing < \n" "params.forcing.nkmin_forcing"
@@ -283,30 +279,221 @@ class SpecificForcingPseudoSpectralCoarse(SpecificForcing):
                 self.shapeK_loc_coarse, root=0
             )
 
+        # the forcing is only stored for the local modes of the coarse array
+        maps = self.oper._get_coarse_index_maps(self.shapeK_loc_coarse)
+        self._init_forcing_sparse(maps["ind_loc"])
+
+    def _init_forcing_sparse(self, ind_loc, keys=None):
+        """Initialize the storage of the forcing for a set of local modes
+
+        The forcing is stored as flat indices in the spectral state array
+        and the corresponding values, and it is added to the tendencies
+        with a scatter-add (see :func:`add_to_tendencies`).
+
+        Parameters
+        ----------
+
+        ind_loc : array of int
+
+          Flat indices of the modes in the local spectral arrays.
+
+        keys : sequence of str (optional)
+
+          Keys of the forced variables (by default all the variables of the
+          state).
+
+        """
+        state_spect = self.sim.state.state_spect
+        if keys is None:
+            keys = state_spect.keys
+        ivars = [state_spect.keys.index(key) for key in keys]
+        size_var = state_spect[0].size
+        self._keys_forcing_sparse = list(keys)
+        self._ind_loc_forcing_sparse = ind_loc
+        self._ind_forcing_sparse = np.concatenate(
+            [ivar * size_var + ind_loc for ivar in ivars]
+        )
+        self._values_forcing_sparse = np.zeros(
+            (len(ivars), ind_loc.size), np.complex128
+        )
+        # the modes kx = 0 are counted only once in the sums over the
+        # wavenumbers (no forcing at the Nyquist wavenumber)
+        self._coef_sum_forcing_sparse = np.where(
+            np.take(self.oper._get_Kx(), ind_loc) == 0.0, 1.0, 2.0
+        )
+        self._forcing_fft_full = None
+
+    def _set_forcing_values(self, values):
+        """Set the values of the forcing for the stored modes"""
+        self._values_forcing_sparse[:] = values
+        self._is_forcing_fft_full_up_to_date = False
+
+    @property
+    def forcing_fft(self):
+        """Forcing in spectral space (full arrays)
+
+        Built from the values of the forced modes when needed (for example
+        for the outputs). The time stepping uses :func:`add_to_tendencies`.
+
+        """
+        if self._forcing_fft_full is None:
+            self._forcing_fft_full = SetOfVariables(
+                like=self.sim.state.state_spect, info="forcing_fft", value=0.0
+            )
+            self._is_forcing_fft_full_up_to_date = False
+        if not self._is_forcing_fft_full_up_to_date:
+            np.put(
+                self._forcing_fft_full,
+                self._ind_forcing_sparse,
+                self._values_forcing_sparse,
+            )
+            self._is_forcing_fft_full_up_to_date = True
+        return self._forcing_fft_full
+
+    def add_to_tendencies(self, tendencies_fft):
+        """Add the forcing to the tendencies (only the forced modes)"""
+        ind = self._ind_forcing_sparse
+        np.put(
+            tendencies_fft,
+            ind,
+            np.take(tendencies_fft, ind) + self._values_forcing_sparse.ravel(),
+        )
+
+    def compute_injection_rates(self, key, divisor=None):
+        """Injection rates for one variable (only the forced modes)
+
+        See :func:`ForcingBasePseudoSpectral.compute_injection_rates`.
+
+        """
+        state_spect = self.sim.state.state_spect
+        ind_loc = self._ind_loc_forcing_sparse
+        try:
+            f_forced = self._values_forcing_sparse[
+                self._keys_forcing_sparse.index(key)
+            ]
+        except ValueError:
+            # variable not forced
+            f_forced = np.zeros(ind_loc.size, np.complex128)
+        var_forced = np.take(state_spect.get_var(key), ind_loc)
+        coef = self._coef_sum_forcing_sparse
+        if divisor is not None:
+            coef = coef / np.take(divisor, ind_loc)
+        sums = np.array(
+            [
+                (coef * (var_forced.conj() * f_forced).real).sum(),
+                (coef * abs(f_forced) ** 2).sum(),
+            ]
+        )
+        if mpi.nb_proc > 1:
+            sums = mpi.comm.allreduce(sums, op=mpi.MPI.SUM)
+        return sums[0], sums[1]
+
     def _compute_cond_no_forcing(self):
         if hasattr(self.oper_coarse, "K"):
             K = self.oper_coarse.K
         else:
             K = np.sqrt(self.oper_coarse.K2)
         COND_NO_F = np.logical_or(K > self.kmax_forcing, K < self.kmin_forcing)
+        COND_NO_F[self._compute_cond_nyquist_coarse()] = True
+        return COND_NO_F
 
-        COND_NO_F[self.oper_coarse.shapeK_loc[0] // 2] = True
-        COND_NO_F[:, self.oper_coarse.shapeK_loc[1] - 1] = True
+    def _compute_cond_nyquist_coarse(self):
+        """Condition for the Nyquist wavenumbers of the coarse array
 
-        return COND_NO_F
+        The axes of the coarse arrays are ordered as in physical space and
+        the last axis corresponds to the wavenumbers kx >= 0 (2D and 3D).
+
+        """
+        shapeK_coarse = self.oper_coarse.shapeK_loc
+        cond = np.zeros(shapeK_coarse, dtype=bool)
+        for axis, nk in enumerate(shapeK_coarse[:-1]):
+            index = [slice(None)] * len(shapeK_coarse)
+            index[axis] = nk // 2
+            cond[tuple(index)] = True
+        cond[..., shapeK_coarse[-1] - 1] = True
+        return cond
+
+    def _init_distributed(self):
+        """Initialize the distributed computation of the forcing
+
+        Each process only computes the forced modes contained in its local
+        spectral arrays, so that no communication with the process 0 is
+        needed at each time step. The forced modes are still defined from
+        the coarse operator (only at initialization).
+
+        """
+        if mpi.rank == 0:
+            ind_forcing = self.ind_forcing
+        else:
+            ind_forcing = None
+        if mpi.nb_proc > 1:
+            ind_forcing = mpi.comm.bcast(ind_forcing, root=0)
+
+        maps = self.oper._get_coarse_index_maps(self.shapeK_loc_coarse)
+        ind_coarse = maps["indices"]
+        ind_loc = maps["ind_loc"]
+
+        shape_coarse = tuple(self.shapeK_loc_coarse)
+        iks_coarse = np.unravel_index(ind_coarse, shape_coarse)
+        # the modes kx = 0 are related to the modes -k (real field)
+        is_kx0 = iks_coarse[-1] == 0
+        iks_sym = tuple(
+            -ik % nk for ik, nk in zip(iks_coarse[:-1], shape_coarse[:-1])
+        )
+        ind_coarse_sym = np.ravel_multi_index(
+            iks_sym + (iks_coarse[-1],), shape_coarse
+        )
+        # modes kx = 0 not forced if the mode -k is not forced or is not
+        # represented in the coarse array (coarse Nyquist wavenumbers)
+        is_nyquist = np.zeros_like(is_kx0)
+        for ik, nk in zip(iks_coarse[:-1], shape_coarse[:-1]):
+            is_nyquist |= 2 * ik == nk
+        is_forced = np.isin(ind_coarse, ind_forcing) & (
+            ~is_kx0 | (np.isin(ind_coarse_sym, ind_forcing) & ~is_nyquist)
+        )
+
+        # flat indices of the local forced modes in the local array and in
+        # the (sequential) coarse array
+        self._ind_forcing_loc = ind_loc[is_forced]
+        self._ind_forcing_coarse = ind_coarse[is_forced]
+        self._ind_forcing_coarse_sym = ind_coarse_sym[is_forced]
+        self._is_forcing_kx0 = is_kx0[is_forced]
+
+        if self.key_forced in self.sim.state.keys_state_spect:
+            self._fstate = None
+            self._init_forcing_sparse(self._ind_forcing_loc, [self.key_forced])
+        else:
+            self._fstate = self.sim.state.__class__(self.sim, oper=self.oper)
+            self._forcing_key_fft = self.oper.create_arrayK(value=0)
+            self._init_forcing_sparse(self._ind_forcing_loc)
+
+    def _put_forcing_values(self, values):
+        """Set the forcing from the values of the local forced modes."""
+        if self._fstate is None:
+            self._set_forcing_values(values)
+            return
+        np.put(self._forcing_key_fft, self._ind_forcing_loc, values)
+        self._fstate.init_statespect_from(
+            **{self.key_forced: self._forcing_key_fft}
+        )
+        state_spect = self._fstate.state_spect
+        self._set_forcing_values(
+            state_spect.reshape(state_spect.nvar, -1)[:, self._ind_forcing_loc]
+        )
 
     def put_forcingc_in_forcing(self):
         """Copy data from self.fstate_coarse.state_spect into forcing_fft."""
         if mpi.rank == 0:
             state_spect = self.fstate_coarse.state_spect
-            oper_coarse = self.oper_coarse
         else:
             state_spect = None
-            oper_coarse = None
 
-        self.oper.put_coarse_array_in_array_fft(
-            state_spect, self.forcing_fft, oper_coarse, self.shapeK_loc_coarse
+        values = self.oper._scatter_coarse_values(
+            state_spect,
+            self.shapeK_loc_coarse,
+            self.sim.state.state_spect.nvar,
         )
+        self._set_forcing_values(values)
 
     def verify_injection_rate(self):
         """Verify injection rate."""
@@ -466,6 +653,7 @@ class NormalizedForcing(SpecificForcingPseudoSpectralCoarse):
     """
 
     tag = "normalized"
+    distributed = False
 
     @classmethod
     def _complete_params_with_default(cls, params):
@@ -511,6 +699,9 @@ class NormalizedForcing(SpecificForcingPseudoSpectralCoarse):
         except ValueError:
             a_fft = self.sim.state.get_var(self.key_forced)
 
+        if self.distributed:
+            return self._compute_distributed(a_fft)
+
         try:
             a_fft = self.oper.coarse_seq_from_fft_loc(
                 a_fft, self.shapeK_loc_coarse
@@ -546,6 +737,38 @@ class NormalizedForcing(SpecificForcingPseudoSpectralCoarse):
         if mpi.rank == 0:
             return fa_fft
 
+    def _compute_distributed(self, a_fft):
+        """Compute the forcing of the local forced modes (all processes)"""
+        a_forced = np.take(a_fft, self._ind_forcing_loc)
+        fa_forced = self.forcingc_raw_each_time(a_forced)
+        fa_forced = self._normalize_forcing_distributed(fa_forced, a_forced)
+        self._put_forcing_values(fa_forced)
+
+    def _normalize_forcing_distributed(self, fv_forced, v_forced):
+        """Normalize the forcing of the local forced modes (2nd degree eq.)
+
+        The sums over the wavenumbers of all processes are computed with
+        only one collective communication.
+
+        """
+        deltat = self.sim.time_stepping.deltat
+        coef = self._coef_sum_forcing_sparse
+        sums = np.array(
+            [
+                (coef * abs(fv_forced) ** 2).sum(),
+                (coef * (v_forced.conj() * fv_forced).real).sum(),
+            ]
+        )
+        if mpi.nb_proc > 1:
+            sums = mpi.comm.allreduce(sums, op=mpi.MPI.SUM)
+
+        a = deltat / 2 * sums[0]
+        b = sums[1]
+        c = -self.forcing_rate
+
+        alpha = self.coef_normalization_from_abc(a, b, c)
+        return alpha * fv_forced
+
     def normalize_forcingc(self, fvc_fft, vc_fft):
         """Normalize the coarse forcing"""
 
@@ -796,7 +1019,28 @@ class RandomSimplePseudoSpectral(NormalizedForcing):
         try:
             params.forcing.random
         except AttributeError:
-            params.forcing._set_child("random", {"only_positive": False})
+            params.forcing._set_child(
+                "random", {"only_positive": False, "distributed": False}
+            )
+
+            params.forcing.random._set_doc(
+                """
+only_positive : bool (default False)
+
+    If True, the real and imaginary parts of the random coarse forcing are
+    positive.
+
+distributed : bool (default False)
+
+    If True, each process computes the forcing of the modes contained in its
+    local arrays from a counter-based random stream (Philox), which does not
+    depend on the number of processes. The normalization then only needs one
+    collective communication per time step (no computation on the process 0
+    and no gather/scatter of coarse arrays). Only implemented for the
+    normalization "2nd_degree_eq" without ``constant_rate_of``.
+
+"""
+            )
 
     def __init__(self, sim):
 
@@ -807,15 +1051,84 @@ class RandomSimplePseudoSpectral(NormalizedForcing):
         else:
             self._min_val = -1
 
+        try:
+            self.distributed = self.params.forcing.random.distributed
+        except AttributeError:
+            # parameters of old simulations
+            self.distributed = False
+
+        if self.distributed:
+            params_norm = self.params.forcing.normalized
+            if (
+                params_norm.type != "2nd_degree_eq"
+                or params_norm.constant_rate_of is not None
+                or type(self).normalize_forcingc_2nd_degree_eq
+                is not NormalizedForcing.normalize_forcingc_2nd_degree_eq
+            ):
+                raise NotImplementedError(
+                    "params.forcing.random.distributed is only implemented "
+                    'for params.forcing.normalized.type == "2nd_degree_eq" '
+                    "and params.forcing.normalized.constant_rate_of is None"
+                )
+            self._init_distributed()
+            if mpi.rank == 0:
+                seed = np.random.randint(0, 2 ** 32)
+            else:
+                seed = None
+            if mpi.nb_proc > 1:
+                seed = mpi.comm.bcast(seed, root=0)
+            self._seed_distributed = seed
+            self._nb_draws_distributed = 0
+
+    def _compute_forcing_raw_distributed(self, key):
+        """Random forcing of the local forced modes.
+
+        The real and imaginary parts of the coarse mode with the flat index
+        ``i`` are the numbers ``2*i`` and ``2*i + 1`` of a counter-based
+        (Philox) random stream defined by ``key``. Each process only
+        generates the numbers needed for its modes (starting from the
+        smallest index) and the result does not depend on the decomposition.
+
+        """
+        ind = self._ind_forcing_coarse
+        ind_sym = self._ind_forcing_coarse_sym
+        if ind.size == 0:
+            return np.empty(0, np.complex128)
+
+        # Philox: 4 random numbers per increment of the counter
+        nb_increments = 2 * min(ind.min(), ind_sym.min()) // 4
+        offset = 2 * nb_increments
+        bit_generator = np.random.Philox(key=key)
+        bit_generator.advance(nb_increments)
+        numbers = np.random.Generator(bit_generator).random(
+            2 * (max(ind.max(), ind_sym.max()) + 1 - offset)
+        )
+        values = numbers[0::2] + 1j * numbers[1::2]
+        if self._min_val is not None:
+            values = (1 - self._min_val) * values + self._min_val * (1 + 1j)
+
+        f_forced = values[ind - offset]
+        # projection on real fields for the modes kx = 0
+        is_kx0 = self._is_forcing_kx0
+        f_forced[is_kx0] = (
+            f_forced[is_kx0] + values[ind_sym[is_kx0] - offset].conj()
+        ) / 2
+        return f_forced
+
     def compute_forcingc_raw(self):
         """Random coarse forcing.
 
-        To be called only with proc 0.
+        To be called only with proc 0 (except in distributed mode, for which
+        the forcing of the local forced modes is returned).
         """
+        if self.distributed:
+            self._nb_draws_distributed += 1
+            return self._compute_forcing_raw_distributed(
+                [self._seed_distributed, self._nb_draws_distributed]
+            )
         f_fft = self.oper_coarse.create_arrayK_random(min_val=self._min_val)
         # fftwpy/easypyfft returns f_fft
-        f_fft[self.oper_coarse.shapeK_loc[0] // 2] = 0.0
-        f_fft[:, self.oper_coarse.shapeK_loc[1] - 1] = 0.0
+        f_fft[self._compute_cond_nyquist_coarse()] = 0.0
         f_fft = self.oper_coarse.project_fft_on_realX(f_fft)
         f_fft[self.COND_NO_F] = 0.0
         return f_fft
@@ -868,11 +1181,23 @@ class TimeCorrelatedRandomPseudoSpectral(RandomSimplePseudoSpectral):
                 self._seed1 = np.random.randint(0, 2 ** 32)
                 self._save_state()
 
+        if self.distributed:
+            if mpi.rank == 0:
+                state = (self.t_last_change, self._seed0, self._seed1)
+            else:
+                state = None
+            if mpi.nb_proc > 1:
+                state = mpi.comm.bcast(state, root=0)
+            self.t_last_change, self._seed0, self._seed1 = state
+            self.forcing0 = self._compute_forcing_raw_distributed(self._seed0)
+            self.forcing1 = self._compute_forcing_raw_distributed(self._seed1)
+        elif mpi.rank == 0:
             np.random.seed(self._seed0)
             self.forcing0 = self.compute_forcingc_raw()
             np.random.seed(self._seed1)
             self.forcing1 = self.compute_forcingc_raw()
 
+        if mpi.rank == 0 or self.distributed:
             pforcing = self.params.forcing
             try:
                 time_correlation = pforcing[self.tag].time_correlation
@@ -895,9 +1220,17 @@ class TimeCorrelatedRandomPseudoSpectral(RandomSimplePseudoSpectral):
             self.t_last_change = tsim
             self._seed0 = self._seed1
             self.forcing0 = self.forcing1
-            self._seed1 = np.random.randint(0, 2 ** 32)
-            self.forcing1 = self.compute_forcingc_raw()
-            self._save_state()
+            if self.distributed:
+                # same new seed for all processes without communication
+                self._seed1 = (self._seed1 + 1) % 2 ** 32
+                self.forcing1 = self._compute_forcing_raw_distributed(
+                    self._seed1
+                )
+            else:
+                self._seed1 = np.random.randint(0, 2 ** 32)
+                self.forcing1 = self.compute_forcingc_raw()
+            if mpi.rank == 0:
+                self._save_state()
 
         f_fft = self.forcingc_from_f0f1()
         return f_fft
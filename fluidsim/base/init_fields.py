@@ -20,6 +20,13 @@ from fluiddyn.util import mpi
 from fluidsim_core.params import iter_complete_params
 
 from fluidsim.base.setofvariables import SetOfVariables
+from fluidsim.util.output import (
+    get_indices_kept_seq,
+    get_slices_loc,
+    get_where_kept,
+    gatherv_modes,
+    scatterv_modes,
+)
 
 
 class InitFieldsBase:
@@ -180,14 +187,18 @@ path: str
                     "The file " + path_file + " does not contain a params object"
                 )
 
-            try:
-                group_state_phys = h5file["/state_phys"]
-            except:
-                raise ValueError(
-                    "The file "
-                    + path_file
-                    + " does not contain a state_phys object"
-                )
+            is_state_spect = "state_spect" in h5file
+            if is_state_spect:
+                group_state_phys = None
+            else:
+                try:
+                    group_state_phys = h5file["/state_phys"]
+                except:
+                    raise ValueError(
+                        "The file "
+                        + path_file
+                        + " does not contain a state_phys object"
+                    )
 
             try:
                 axes = h5file.attrs["axes"]
@@ -252,15 +263,46 @@ path: str
                         "self.params.oper.Ly != params_file.Ly"
                     )
 
-            keys_state_phys_file = list(group_state_phys.keys())
+            if is_state_spect:
+                keys_state_phys_file = []
+                per_rank_files = False
+            else:
+                keys_state_phys_file = list(group_state_phys.keys())
+                per_rank_files = group_state_phys.attrs.get(
+                    "per_rank_files", False
+                )
         else:
+            h5file = None
+            is_state_spect = None
             keys_state_phys_file = {}
+            per_rank_files = None
+        if mpi.nb_proc > 1:
+            is_state_spect = mpi.comm.bcast(is_state_spect)
+        if is_state_spect:
+            self._init_from_state_spect_file(h5file)
+            return
+
         if mpi.nb_proc > 1:
             keys_state_phys_file = mpi.comm.bcast(keys_state_phys_file)
+            per_rank_files = mpi.comm.bcast(per_rank_files)
+
+        # with the per-rank layout, each process reads its part of the fields
+        read_loc = per_rank_files and mpi.nb_proc > 1
+        if read_loc:
+            slices_loc = get_slices_loc(self.sim.oper)
+            if mpi.rank > 0:
+                h5file = h5py.File(path_file, "r")
+                group_state_phys = h5file["/state_phys"]
+
         state_phys = self.sim.state.state_phys
         keys_phys_needed = self.sim.info.solver.classes.State.keys_phys_needed
         for k in keys_phys_needed:
             if k in keys_state_phys_file:
+                if read_loc:
+                    field_loc = group_state_phys[k][slices_loc]
+                    state_phys.set_var(k, field_loc)
+                    continue
+
                 if mpi.rank == 0:
                     field_seq = group_state_phys[k][...]
                 else:
@@ -282,6 +324,8 @@ path: str
                 it = 0
             h5file.close()
         else:
+            if read_loc:
+                h5file.close()
             time = 0.0
             it = 0
 
@@ -295,6 +339,103 @@ path: str
         self.sim.time_stepping.t = time
         self.sim.time_stepping.it = it
 
+    def _init_from_state_spect_file(self, h5file):
+        """Initialize the state from a file containing the kept modes
+
+        The modes are scattered with their global indices so that the file
+        can be loaded with a number of processes different from the one used
+        to save it.
+
+        """
+        oper = self.sim.oper
+        state_spect = self.sim.state.state_spect
+        where_kept = get_where_kept(oper)
+        indices_loc = get_indices_kept_seq(oper)
+
+        if mpi.nb_proc > 1:
+            counts = mpi.comm.gather(indices_loc.size, root=0)
+            indices_ranks = gatherv_modes(indices_loc, counts)
+        else:
+            counts = [indices_loc.size]
+            indices_ranks = indices_loc
+
+        message_error = None
+        if mpi.rank == 0:
+            group_state_spect = h5file["/state_spect"]
+            keys_file = list(group_state_spect.keys())
+            if "indices_kept" in group_state_spect:
+                indices_file = group_state_spect["indices_kept"][...]
+            else:
+                # compatibility with files saved without the global indices
+                # (modes concatenated over the processes)
+                nb_modes_ranks = list(group_state_spect["nb_modes_ranks"][...])
+                if nb_modes_ranks == list(counts):
+                    indices_file = indices_ranks
+                else:
+                    indices_file = None
+                    message_error = (
+                        "This state_spect file (saved without the global "
+                        "indices of the modes) has to be loaded with the same "
+                        "number of processes as when it was saved "
+                        f"({len(nb_modes_ranks)})"
+                    )
+            if indices_file is not None:
+                # positions in the file of the modes of all processes
+                positions = None
+                if indices_file.size == indices_ranks.size:
+                    sorter = np.argsort(indices_file, kind="stable")
+                    positions = np.searchsorted(
+                        indices_file, indices_ranks, sorter=sorter
+                    )
+                    positions = sorter[np.minimum(positions, sorter.size - 1)]
+                    if not np.array_equal(indices_file[positions], indices_ranks):
+                        positions = None
+                if positions is None:
+                    message_error = (
+                        "The modes of the state_spect file do not correspond "
+                        "to the truncation of the operator"
+                    )
+        else:
+            keys_file = None
+        if mpi.nb_proc > 1:
+            message_error = mpi.comm.bcast(message_error)
+            keys_file = mpi.comm.bcast(keys_file)
+        if message_error is not None:
+            raise ValueError(message_error)
+
+        modes_loc = np.empty(indices_loc.size, dtype=state_spect.dtype)
+        for k in state_spect.keys:
+            field_fft = state_spect.get_var(k)
+            if k not in keys_file:
+                field_fft.fill(0.0)
+                continue
+            if mpi.rank == 0:
+                modes = group_state_spect[k][...][positions]
+            else:
+                modes = None
+            if mpi.nb_proc > 1:
+                scatterv_modes(modes, counts, modes_loc)
+            else:
+                modes_loc[:] = modes
+            field_fft.fill(0.0)
+            field_fft[where_kept] = modes_loc
+
+        if mpi.rank == 0:
+            time = group_state_spect.attrs["time"]
+            it = group_state_spect.attrs["it"]
+            h5file.close()
+        else:
+            time = 0.0
+            it = 0
+        if mpi.nb_proc > 1:
+            time = mpi.comm.bcast(time)
+            it = mpi.comm.bcast(it)
+
+        # no forward FFT needed
+        self.sim.state.statephys_from_statespect()
+        self.sim.time_stepping.t = time
+        self.sim.time_stepping.it = it
+
 
 def fill_field_fft_2d(field_fft_in, field_fft_out):
 
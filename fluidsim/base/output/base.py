@@ -15,8 +15,13 @@ Provides:
    :members:
    :private-members:
 
+.. autoclass:: HDF5Appender
+   :members:
+   :private-members:
+
 """
 
+import atexit
 import datetime
 import os
 import shutil
@@ -37,6 +42,7 @@ from fluidsim_core.params import iter_complete_params
 
 import fluidsim
 from fluidsim.util.util import open_patient
+from fluidsim.base.time_stepping.timers import Timers
 
 
 class SimReprMaker(SimReprMakerCore):
@@ -128,6 +134,27 @@ called.
             """
 Periods (float, in equation time) to set when the plots of the specific outputs
 are called.
+"""
+        )
+        p_output._set_child(
+            "appender", attribs={"enable": False, "nb_saves_buffer": 10}
+        )
+        p_output.appender._set_doc(
+            """
+Parameters of the appender used by the specific outputs saving time series in
+hdf5 files (for example spectra).
+
+enable: bool (default: False)
+
+    If True, the hdf5 files are kept open during the simulation and the saved
+    data are buffered in memory. The data are written (with one resize of the
+    datasets) every `nb_saves_buffer` saves and at the end of the simulation.
+    Note that the files can not be opened by other processes during the
+    simulation.
+
+nb_saves_buffer: int (default: 10)
+
+    Number of saves buffered in memory before writing in the files.
 """
         )
 
@@ -150,6 +177,17 @@ are called.
             for k in self.params.periods_save._get_key_attribs():
                 self.params.periods_save[k] = 0.0
 
+        try:
+            params_appender = self.params.appender
+        except AttributeError:
+            # parameters of old simulations
+            self._appender = None
+        else:
+            if params_appender.enable and self._has_to_save and mpi.rank == 0:
+                self._appender = HDF5Appender(params_appender.nb_saves_buffer)
+            else:
+                self._appender = None
+
     def _init_sim_repr_maker(self):
         sim_repr_maker = super()._init_sim_repr_maker()
 
@@ -301,22 +339,30 @@ are called.
 
     def one_time_step(self):
 
+        try:
+            timers = self.sim.time_stepping.timers
+        except AttributeError:
+            timers = Timers(enable=False)
+
         for k in self.params.periods_print._get_key_attribs():
             period = self.params.periods_print.__dict__[k]
             if period != 0:
-                self.__dict__[k]._online_print()
+                with timers(f"output.{k}._online_print"):
+                    self.__dict__[k]._online_print()
 
         if self.params.ONLINE_PLOT_OK:
             for k in self.params.periods_plot._get_key_attribs():
                 period = self.params.periods_plot.__dict__[k]
                 if period != 0:
-                    self.__dict__[k]._online_plot()
+                    with timers(f"output.{k}._online_plot"):
+                        self.__dict__[k]._online_plot()
 
         if self._has_to_save:
             for k in self.params.periods_save._get_key_attribs():
                 period = self.params.periods_save.__dict__[k]
                 if period != 0:
-                    self.__dict__[k]._online_save()
+                    with timers(f"output.{k}._online_save"):
+                        self.__dict__[k]._online_save()
 
     def figure_axe(self, numfig=None, size_axe=None):
         if mpi.rank == 0:
@@ -336,6 +382,8 @@ are called.
 
     def close_files(self):
         if mpi.rank == 0 and self._has_to_save:
+            if self._appender is not None:
+                self._appender.close()
             self.print_stdout.close()
             for k in self.params.periods_save._get_key_attribs():
                 period = self.params.periods_save.__dict__[k]
@@ -356,6 +404,12 @@ are called.
             self.one_time_step()
             if self.sim.output.phys_fields.t_last_save < self.sim.time_stepping.t:
                 self.phys_fields.save()
+            self.phys_fields.wait_async_saves()
+
+        time_stepping = self.sim.time_stepping
+        if hasattr(time_stepping, "timers") and time_stepping.timers.enable:
+            time_stepping.save_timers()
+            self.print_stdout(time_stepping.timers.format_summary())
 
         self.close_files()
 
@@ -547,6 +601,10 @@ class SpecificOutput:
         if not os.path.exists(path_file):
             raise ValueError("can not add dict arrays in nonexisting file!")
 
+        appender = getattr(self.output, "_appender", None)
+        if appender is not None:
+            appender.append(path_file, self.sim.time_stepping.t, dict_matrix)
+
         elif mpi.rank == 0:
             with open_patient(path_file, "r+") as file:
                 dset_times = file["times"]
@@ -583,3 +641,83 @@ class SpecificOutput:
 
     def _online_plot_saving(self, dict_results):
         pass
+
+
+# appenders with buffered data or open files (only referenced until they
+# are closed)
+_appenders_open = set()
+
+
+@atexit.register
+def _close_appenders():
+    """Write the buffered data even if the simulation crashes"""
+    for appender in list(_appenders_open):
+        appender.close()
+
+
+class HDF5Appender:
+    """Append time series in hdf5 files kept open
+
+    The data are buffered in memory and written every ``nb_saves_buffer``
+    saves, so that the datasets are resized by blocks.
+
+    """
+
+    def __init__(self, nb_saves_buffer=10):
+        if nb_saves_buffer < 1:
+            raise ValueError("nb_saves_buffer has to be larger than 0")
+        self.nb_saves_buffer = nb_saves_buffer
+        self._files = {}
+        self._buffers = {}
+
+    def append(self, path_file, time, dict_arrays):
+        """Append the data of one time (written later)"""
+        _appenders_open.add(self)
+        dict_arrays = {
+            key: value if isinstance(value, numbers.Number) else np.array(value)
+            for key, value in dict_arrays.items()
+        }
+        buffer = self._buffers.setdefault(path_file, [])
+        buffer.append((time, dict_arrays))
+        if len(buffer) >= self.nb_saves_buffer:
+            self._write(path_file)
+
+    def _get_file(self, path_file):
+        try:
+            return self._files[path_file]
+        except KeyError:
+            file = self._files[path_file] = open_patient(path_file, "r+")
+            return file
+
+    def _write(self, path_file):
+        buffer = self._buffers.pop(path_file, None)
+        if not buffer:
+            return
+
+        file = self._get_file(path_file)
+        nb_saved_times = file["times"].shape[0]
+        nb_new_times = len(buffer)
+        nb_times = nb_saved_times + nb_new_times
+
+        dset_times = file["times"]
+        dset_times.resize((nb_times,))
+        dset_times[nb_saved_times:] = [time for time, _ in buffer]
+        for key in buffer[0][1].keys():
+            values = np.array([dict_arrays[key] for _, dict_arrays in buffer])
+            dset = file[key]
+            dset.resize((nb_times,) + values.shape[1:])
+            dset[nb_saved_times:] = values
+        file.flush()
+
+    def flush(self):
+        """Write the buffered data in the files"""
+        for path_file in list(self._buffers.keys()):
+            self._write(path_file)
+
+    def close(self):
+        """Write the buffered data and close the files"""
+        self.flush()
+        for file in self._files.values():
+            file.close()
+        self._files.clear()
+        _appenders_open.discard(self)
@@ -2,13 +2,18 @@ import h5py
 import os
 import numpy as np
 
-from transonic import boost, Array
+from transonic import boost, Array, Transonic
 from fluiddyn.util import mpi
 
+from fluidsim import _is_testing
+
 from .base import SpecificOutput
 
+ts = Transonic()
+
 Ai = Array[np.int32, "1d"]
 Af = Array[float, "2d"]
+A1f = Array[float, "1d"]
 
 
 @boost
@@ -29,9 +34,121 @@ def strfunc_from_pdf(
     return S_order
 
 
+@boost
+def compute_extrema_moments_inc(
+    var: Af, var_shifted: Af, shift: int, moments: A1f
+):
+    """Compute in one pass the extrema and the moments of the increments
+
+    The increments are ``var_shifted[i0, i1 + shift] - var[i0, i1]``
+    (periodic over the dim 1). The sums of the increments to the powers 2,
+    3, ... are added to the first half of ``moments`` and the sums of their
+    absolute values to the powers 2, 3, ... to the second half.
+
+    """
+    n0, n1 = var.shape
+    nb_orders = moments.size // 2
+    inc_min = np.inf
+    inc_max = -np.inf
+    for i0 in range(n0):
+        for i1 in range(n1):
+            i1_shifted = i1 + shift
+            if i1_shifted >= n1:
+                i1_shifted -= n1
+            inc = var_shifted[i0, i1_shifted] - var[i0, i1]
+            if inc < inc_min:
+                inc_min = inc
+            if inc > inc_max:
+                inc_max = inc
+            abs_inc = abs(inc)
+            power = inc * inc
+            abs_power = power
+            for iorder in range(nb_orders):
+                moments[iorder] += power
+                moments[nb_orders + iorder] += abs_power
+                power *= inc
+                abs_power *= abs_inc
+    return inc_min, inc_max
+
+
+@boost
+def compute_histogram_inc(
+    var: Af,
+    var_shifted: Af,
+    shift: int,
+    valmin: float,
+    valmax: float,
+    hist: A1f,
+):
+    """Add the histogram of the increments (see compute_extrema_moments_inc)
+    over the range [valmin, valmax] to ``hist``
+
+    """
+    n0, n1 = var.shape
+    nbins = hist.size
+    coef = nbins / (valmax - valmin)
+    for i0 in range(n0):
+        for i1 in range(n1):
+            i1_shifted = i1 + shift
+            if i1_shifted >= n1:
+                i1_shifted -= n1
+            inc = var_shifted[i0, i1_shifted] - var[i0, i1]
+            ibin = int((inc - valmin) * coef)
+            if ibin >= nbins:
+                ibin = nbins - 1
+            elif ibin < 0:
+                ibin = 0
+            hist[ibin] += 1.0
+
+
+def _compute_inc_numpy(var, var_shifted, shift):
+    n1 = var.shape[1]
+    inc = np.empty_like(var)
+    np.subtract(
+        var_shifted[:, shift:], var[:, : n1 - shift], out=inc[:, : n1 - shift]
+    )
+    np.subtract(
+        var_shifted[:, :shift], var[:, n1 - shift :], out=inc[:, n1 - shift :]
+    )
+    return inc
+
+
+def compute_extrema_moments_inc_numpy(var, var_shifted, shift, moments):
+    inc = _compute_inc_numpy(var, var_shifted, shift)
+    nb_orders = moments.size // 2
+    abs_inc = abs(inc)
+    power = inc * inc
+    abs_power = power.copy()
+    for iorder in range(nb_orders):
+        moments[iorder] += power.sum()
+        moments[nb_orders + iorder] += abs_power.sum()
+        power *= inc
+        abs_power *= abs_inc
+    if inc.size == 0:
+        return np.inf, -np.inf
+    return inc.min(), inc.max()
+
+
+def compute_histogram_inc_numpy(var, var_shifted, shift, valmin, valmax, hist):
+    inc = _compute_inc_numpy(var, var_shifted, shift)
+    hist += np.histogram(inc, bins=hist.size, range=(valmin, valmax))[0]
+
+
+if not ts.is_transpiling and not ts.is_compiled and not _is_testing:
+    # for example if Pythran is not available
+    compute_extrema_moments_inc = compute_extrema_moments_inc_numpy
+    compute_histogram_inc = compute_histogram_inc_numpy
+
+
 class Increments(SpecificOutput):
     """A :class:`Increments` object handles the saving of pdf of
     increments.
+
+    For each separation, the pdf and the structure functions (orders 2 to 6,
+    of the increments and of their absolute values) are computed by fused
+    kernels, without temporary arrays. The increments are periodic. The
+    reductions over the MPI processes are done with two collective
+    operations per call of :func:`compute`.
     """
 
     _tag = "increments"
@@ -42,25 +159,51 @@ class Increments(SpecificOutput):
         tag = "increments"
 
         params.output.periods_save._set_attrib(tag, 0)
-        params.output._set_child(tag, attribs={"HAS_TO_PLOT_SAVED": False})
+        params.output._set_child(
+            tag, attribs={"HAS_TO_PLOT_SAVED": False, "axes": ["x"]}
+        )
+
+        params.output.increments._set_doc(
+            """
+            axes: list of str (default: ["x"])
+
+                Directions of the separations ("x", "y" or "z"). The datasets
+                for the direction "x" are called "pdf_delta_{key}",
+                "struc_func_{key}", ... and the datasets for the other
+                directions "pdf_delta_{key}_y", "struc_func_{key}_y", ...
+
+            """
+        )
 
     def __init__(self, output):
         params = output.sim.params
+        oper = output.sim.oper
         self.nx = params.oper.nx
 
-        self.nrx = min(self.nx // 16, 128)
-        self.nrx = int(max(self.nrx, self.nx // 2))
-        rmin = 1
-        rmax = int(0.8 * self.nx)
-        delta_logr = np.log(rmax / rmin) / (self.nrx - 1)
-        logr = np.log(rmin) + delta_logr * np.arange(self.nrx)
-        self.rxs = np.array(np.round(np.exp(logr)), dtype=np.int32)
-
-        for ir in range(1, self.nrx):
-            if self.rxs[ir - 1] >= self.rxs[ir]:
-                self.rxs[ir] = self.rxs[ir - 1] + 1
+        try:
+            self.axes = list(params.output.increments.axes)
+        except AttributeError:
+            # parameters of old simulations
+            self.axes = ["x"]
+
+        shapeX_seq = oper.shapeX_seq
+        ndim = len(shapeX_seq)
+        self._indices_axes = {}
+        for axis in self.axes:
+            if axis not in tuple("xyz"[:ndim]):
+                raise ValueError(f"Unsupported axis {axis!r} for increments")
+            self._indices_axes[axis] = ndim - 1 - "xyz".index(axis)
+
+        self.rxs = self._compute_separations(self.nx)
+        self.separations = {"x": self.rxs}
+        for axis in self.axes:
+            if axis != "x":
+                self.separations[axis] = self._compute_separations(
+                    shapeX_seq[self._indices_axes[axis]]
+                )
 
         self.nbins = 400
+        self.orders = np.arange(2, 7)
 
         self.output = output
         self._init_path_files()
@@ -70,15 +213,51 @@ class Increments(SpecificOutput):
                 with h5py.File(self.path_file, "r") as h5file:
                     self.rxs = h5file["rxs"][...]
                     self.nbins = h5file["nbins"][...]
+                    for axis in self.axes:
+                        if axis != "x" and f"r{axis}s" in h5file:
+                            self.separations[axis] = h5file[f"r{axis}s"][...]
             if mpi.nb_proc > 1:
                 self.rxs = mpi.comm.bcast(self.rxs)
                 self.nbins = mpi.comm.bcast(self.nbins)
+                self.separations = mpi.comm.bcast(self.separations)
+            self.separations["x"] = self.rxs
 
         self.nrx = self.rxs.size
-        arrays_1st_time = {"rxs": self.rxs, "nbins": self.nbins}
+        arrays_1st_time = {
+            "rxs": self.rxs,
+            "nbins": self.nbins,
+            "orders": self.orders,
+        }
+        for axis in self.axes:
+            if axis != "x":
+                arrays_1st_time[f"r{axis}s"] = self.separations[axis]
         self._bins = np.arange(0.5, self.nbins, dtype=float) / self.nbins
         self.keys_vars_to_compute = list(output.sim.state.state_phys.keys)
 
+        self._index_axis_dist = None
+        self._buffer_halo = None
+        if mpi.nb_proc > 1:
+            indices_dist = [
+                index
+                for index, (n_loc, n_seq) in enumerate(
+                    zip(oper.shapeX_loc, shapeX_seq)
+                )
+                if n_loc != n_seq
+            ]
+            if set(indices_dist).intersection(self._indices_axes.values()):
+                n_loc = oper.shapeX_loc[0]
+                n_locs = mpi.comm.allgather(n_loc)
+                if (
+                    indices_dist != [0]
+                    or len(set(n_locs)) > 1
+                    or oper.seq_indices_first_X[0] != mpi.rank * n_loc
+                ):
+                    raise NotImplementedError(
+                        "Increments over a distributed axis are only "
+                        "implemented for slabs of same size over the axis 0."
+                    )
+                self._index_axis_dist = 0
+
         super().__init__(
             output,
             period_save=params.output.periods_save.increments,
@@ -86,6 +265,21 @@ class Increments(SpecificOutput):
             arrays_1st_time=arrays_1st_time,
         )
 
+    @staticmethod
+    def _compute_separations(nx):
+        nrx = min(nx // 16, 128)
+        nrx = int(max(nrx, nx // 2))
+        rmin = 1
+        rmax = int(0.8 * nx)
+        delta_logr = np.log(rmax / rmin) / (nrx - 1)
+        logr = np.log(rmin) + delta_logr * np.arange(nrx)
+        rxs = np.array(np.round(np.exp(logr)), dtype=np.int32)
+
+        for ir in range(1, nrx):
+            if rxs[ir - 1] >= rxs[ir]:
+                rxs[ir] = rxs[ir - 1] + 1
+        return rxs
+
     def _init_online_plot(self):
         if mpi.rank == 0:
             self.fig, axe = self.output.figure_axe(numfig=5_000_000)
@@ -107,27 +301,142 @@ class Increments(SpecificOutput):
             values_inc = self.compute_values_inc(valmin[irx], valmax[irx])
             self.axe.plot(values_inc + irx, pdf[irx])
 
-    def compute(self):
-        """compute the values at one time."""
-        dict_results = {}
-        for key in self.keys_vars_to_compute:
-            var = self.sim.state.get_var(key)
+    def _exchange_halo(self, var, r):
+        """Return the local part of ``var`` shifted by ``r`` over the axis 0
 
-            pdf_var = np.empty([self.nrx, self.nbins])
-            valmin = np.empty([self.nrx])
-            valmax = np.empty([self.nrx])
+        The first rows come from the process ``rank + r // n_loc`` and the
+        last ``r % n_loc`` rows from the next process (periodic).
 
-            for irx, rx in enumerate(self.rxs):
-                inc_var = self.oper.compute_increments_dim1(var, rx)
-                (pdf_var[irx], bin_edges_var) = self.oper.pdf_normalized(
-                    inc_var, self.nbins
+        """
+        n_loc = var.shape[0]
+        nb_proc = mpi.nb_proc
+        rank = mpi.rank
+        nb_slabs, nb_rows = divmod(r % (n_loc * nb_proc), n_loc)
+
+        if self._buffer_halo is None or self._buffer_halo.shape != var.shape:
+            self._buffer_halo = np.empty_like(var)
+        var_shifted = self._buffer_halo
+
+        if nb_slabs == 0:
+            var_shifted[: n_loc - nb_rows] = var[nb_rows:]
+        else:
+            mpi.comm.Sendrecv(
+                var[nb_rows:],
+                dest=(rank - nb_slabs) % nb_proc,
+                recvbuf=var_shifted[: n_loc - nb_rows],
+                source=(rank + nb_slabs) % nb_proc,
+            )
+        if nb_rows > 0:
+            mpi.comm.Sendrecv(
+                var[:nb_rows],
+                dest=(rank - nb_slabs - 1) % nb_proc,
+                recvbuf=var_shifted[n_loc - nb_rows :],
+                source=(rank + nb_slabs + 1) % nb_proc,
+            )
+        return var_shifted
+
+    def _get_args_kernels(self, var, axis, r):
+        """Return 2d views of var and of the shifted var and the shift"""
+        index_axis = self._indices_axes[axis]
+        if index_axis == self._index_axis_dist:
+            var_shifted = self._exchange_halo(var, r)
+            return var.reshape(1, var.size), var_shifted.reshape(1, var.size), 0
+
+        shape = var.shape
+        n_before = int(np.prod(shape[:index_axis]))
+        stride = int(np.prod(shape[index_axis + 1 :]))
+        var_2d = var.reshape(n_before, var.size // max(n_before, 1))
+        return var_2d, var_2d, (int(r) % shape[index_axis]) * stride
+
+    @staticmethod
+    def _allreduce(arrays, op):
+        """Reduce a list of arrays with one collective operation"""
+        if mpi.nb_proc == 1:
+            return arrays
+        flat = np.concatenate([arr.ravel() for arr in arrays])
+        result = np.empty_like(flat)
+        mpi.comm.Allreduce(flat, result, op=getattr(mpi.MPI, op))
+        indices = np.cumsum([arr.size for arr in arrays])[:-1]
+        return [
+            part.reshape(arr.shape)
+            for part, arr in zip(np.split(result, indices), arrays)
+        ]
+
+    def compute(self):
+        """compute the values at one time."""
+        nb_orders = self.orders.size
+        tasks = [
+            (key, axis)
+            for key in self.keys_vars_to_compute
+            for axis in self.axes
+        ]
+        variables = {
+            key: np.ascontiguousarray(self.sim.state.get_var(key), dtype=float)
+            for key in self.keys_vars_to_compute
+        }
+
+        # first pass: extrema and moments
+        list_extrema = []
+        list_moments = []
+        for key, axis in tasks:
+            var = variables[key]
+            separations = self.separations[axis]
+            # maximum and -minimum, to be reduced with MAX
+            extrema = np.empty([2, separations.size])
+            moments = np.zeros([separations.size, 2 * nb_orders])
+            for ir, r in enumerate(separations):
+                args = self._get_args_kernels(var, axis, r)
+                inc_min, inc_max = compute_extrema_moments_inc(
+                    *args, moments[ir]
                 )
-                valmin[irx] = bin_edges_var[0]
-                valmax[irx] = bin_edges_var[self.nbins]
+                extrema[0, ir] = inc_max
+                extrema[1, ir] = -inc_min
+            list_extrema.append(extrema)
+            list_moments.append(moments)
+
+        list_extrema = self._allreduce(list_extrema, "MAX")
+
+        # second pass: histograms
+        list_ranges = []
+        list_hists = []
+        for (key, axis), extrema in zip(tasks, list_extrema):
+            var = variables[key]
+            separations = self.separations[axis]
+            valmax = extrema[0].copy()
+            valmin = -extrema[1]
+            # same convention as np.histogram
+            cond = valmin == valmax
+            valmin[cond] -= 0.5
+            valmax[cond] += 0.5
+            hists = np.zeros([separations.size, self.nbins])
+            for ir, r in enumerate(separations):
+                args = self._get_args_kernels(var, axis, r)
+                compute_histogram_inc(*args, valmin[ir], valmax[ir], hists[ir])
+            list_ranges.append((valmin, valmax))
+            list_hists.append(hists)
+
+        nb_tasks = len(tasks)
+        results = self._allreduce(list_hists + list_moments, "SUM")
+        list_hists = results[:nb_tasks]
+        list_moments = results[nb_tasks:]
 
-            dict_results["pdf_delta_" + key] = pdf_var.flatten()
-            dict_results["valmin_" + key] = valmin
-            dict_results["valmax_" + key] = valmax
+        dict_results = {}
+        for (key, axis), (valmin, valmax), hists, moments in zip(
+            tasks, list_ranges, list_hists, list_moments
+        ):
+            nb_points = hists.sum(axis=1)
+            deltas = (valmax - valmin) / self.nbins
+            pdf = hists / (deltas * nb_points)[:, np.newaxis]
+            moments /= nb_points[:, np.newaxis]
+
+            key_dataset = key if axis == "x" else key + "_" + axis
+            dict_results["pdf_delta_" + key_dataset] = pdf.flatten()
+            dict_results["valmin_" + key_dataset] = valmin
+            dict_results["valmax_" + key_dataset] = valmax
+            dict_results["struc_func_" + key_dataset] = moments[:, :nb_orders]
+            dict_results["struc_func_abs_" + key_dataset] = moments[
+                :, nb_orders:
+            ]
 
         return dict_results
 
@@ -143,12 +452,16 @@ class Increments(SpecificOutput):
                 "pdf_delta_",
                 "valmin_",
                 "valmax_",
-                # 'struc_func_'
+                "struc_func_",
+                "struc_func_abs_",
             ]
 
             dict_results = {"times": times}
             for key in self.keys_vars_to_compute:
                 for base_key in list_base_keys:
+                    # no structure functions in the files of old simulations
+                    if base_key + key not in h5file:
+                        continue
                     result = h5file[base_key + key][...]
                     dict_results[base_key + key] = result
 
@@ -11,11 +11,14 @@ Provides:
    :members:
    :private-members:
 
+.. autoclass:: LazyField
+   :members:
+
 """
 
 import re
 import os
-from glob import glob
+from collections import OrderedDict
 from pathlib import Path
 from math import isclose
 
@@ -24,7 +27,22 @@ import h5py
 
 from fluiddyn.util import mpi
 
-from fluidsim.util.output import save_file, h5pack, ext
+from fluidsim.util.output import (
+    AsyncSaver,
+    IndexPhysFiles,
+    cfg_h5py,
+    ext,
+    gather_fields,
+    gather_slices_loc,
+    get_path_file_rank,
+    get_slices_loc,
+    save_file,
+    save_file_index,
+    save_file_per_rank,
+    save_file_rank,
+    save_file_seq,
+    save_state_spect_file,
+)
 
 from .base import SpecificOutput
 
@@ -38,7 +56,94 @@ class PhysFieldsBase(SpecificOutput):
     def _complete_params_with_default(params):
         tag = "phys_fields"
         params.output._set_child(
-            tag, attribs={"field_to_plot": "ux", "file_with_it": False}
+            tag,
+            attribs={
+                "field_to_plot": "ux",
+                "file_with_it": False,
+                "async_save": False,
+                "async_max_pending": 2,
+                "per_rank_files": False,
+                "file_type": "state_phys",
+                "state_spect_precision": "float64",
+                "compression": None,
+                "compression_opts": None,
+                "shuffle": True,
+                "chunks": None,
+                "keepbits": None,
+            },
+        )
+        params.output.phys_fields._set_doc(
+            """
+field_to_plot: str (default "ux")
+
+    Key of the field plotted by default.
+
+file_with_it: bool (default False)
+
+    If True, the index of the time step is included in the names of the files.
+
+async_save: bool (default False)
+
+    If True, the files are written by a background thread so that the time
+    stepping continues during the writing. The physical state is first copied
+    in a staging buffer (in sequential) or gathered in the process 0. Not
+    supported with parallel HDF5 (the files are then written synchronously).
+
+async_max_pending: int (default 2)
+
+    Maximum number of pending asynchronous saves (and of staging buffers).
+    When this limit is reached, the time stepping waits.
+
+per_rank_files: bool (default False)
+
+    If True, the fields are not gathered: each process writes its part of the
+    fields in a file of the directory ``per_rank_files`` and the process 0
+    writes an index file (hdf5 format) in which the global fields are virtual
+    datasets. The index files can be used as standard files (for example to
+    restart a simulation).
+
+file_type: str (default "state_phys")
+
+    "state_phys" or "state_spect" (only for pseudo-spectral solvers). The
+    "state_spect" files (``state_spect_t*.h5``) contain only the modes kept by
+    the truncation (``oper.where_dealiased == 0``). They can be used to
+    restart a simulation (without forward FFT, and exactly if saved in double
+    precision) but not to plot the fields from the files.
+
+state_spect_precision: str (default "float64")
+
+    "float64" or "float32" (smaller "analysis" files). Only used for the
+    "state_spect" files.
+
+compression: str or None (default None)
+
+    Compression filter of h5py (for example "gzip" or "lzf"). Lossless.
+
+compression_opts: object (default None)
+
+    Options of the compression filter (for example the level for "gzip").
+
+shuffle: bool (default True)
+
+    Use the shuffle filter (improves the compression ratio). Only used with
+    compression.
+
+chunks: None, "auto" or tuple (default None)
+
+    Chunk shape of the datasets of the physical fields. With None, the
+    datasets are contiguous, except with compression (then as "auto"). With
+    "auto", the chunks are approximately cubic and of the order of 1 MiB so
+    that a cross-section (for example with ``equation="ix=10"``) reads only
+    the chunks containing it.
+
+keepbits: int or None (default None)
+
+    If not None, number of bits of the mantissas kept in the physical fields
+    (lossy "bit-rounding", for example 10 for approximately 3 significant
+    digits). The rounded fields are much more compressible. Do not use it for
+    files used to restart simulations!
+
+"""
         )
 
         params.output.periods_save._set_attrib(tag, 0)
@@ -67,6 +172,62 @@ class PhysFieldsBase(SpecificOutput):
 
         self.set_of_phys_files = SetOfPhysFieldFiles(output=self.output)
         self._equation = None
+        # sidecar index of the state files (only used by the process 0)
+        self._index = None
+
+        try:
+            params_phys_fields = params.output.phys_fields
+            async_save = params_phys_fields.async_save
+            self._per_rank_files = params_phys_fields.per_rank_files
+            self._file_type = params_phys_fields.file_type
+        except AttributeError:
+            # parameters of old simulations
+            async_save = False
+            self._per_rank_files = False
+            self._file_type = "state_phys"
+
+        try:
+            self._storage = {
+                key: getattr(params_phys_fields, key)
+                for key in (
+                    "chunks",
+                    "compression",
+                    "compression_opts",
+                    "shuffle",
+                    "keepbits",
+                )
+            }
+        except AttributeError:
+            # parameters of old simulations
+            self._storage = None
+
+        if self._file_type not in ("state_phys", "state_spect"):
+            raise ValueError(
+                "params.output.phys_fields.file_type has to be in "
+                f'("state_phys", "state_spect") (not "{self._file_type}")'
+            )
+        if self._file_type == "state_spect" and (
+            params.output.phys_fields.state_spect_precision
+            not in ("float64", "float32")
+        ):
+            raise ValueError(
+                "params.output.phys_fields.state_spect_precision has to be "
+                'in ("float64", "float32")'
+            )
+        if self._file_type == "state_spect" and not hasattr(
+            self.oper, "where_dealiased"
+        ):
+            raise ValueError(
+                '"state_spect" files are only supported for pseudo-spectral '
+                "solvers"
+            )
+
+        if async_save and (
+            mpi.nb_proc == 1 or not cfg_h5py.mpi or self._per_rank_files
+        ):
+            self._async_saver = AsyncSaver(params_phys_fields.async_max_pending)
+        else:
+            self._async_saver = None
 
         if self.period_save == 0 and self.period_plot == 0:
             self.t_last_save = -np.inf
@@ -136,40 +297,63 @@ class PhysFieldsBase(SpecificOutput):
         time = self.sim.time_stepping.t
 
         path_run = Path(self.output.path_run)
+        # "state_phys" or "state_spect"
+        prefix = self._file_type
+
+        if mpi.rank == 0:
+            path_run.mkdir(exist_ok=True)
+            index = self._get_index(path_run)
 
         if params.time_stepping.USE_T_END:
-            # check if some state_phys files already exist
-            try:
-                path_test = next(path_run.glob("state_phys*"))
-            except StopIteration:
-                # file does not exist : get str_width from t_end
-                # max number of digits = int(log10(t_end)) + 1
-                # add .3f precision = 4 additional characters
-                # +2 by anticipation of potential restarts
-                str_width = int(np.log10(params.time_stepping.t_end)) + 7
-            else:
-                # file does exist : get str_width from file name
-                # file name is something like 'state_phys_tYYYY.YYY.nc'
-                str_width = len(path_test.name[12:-3])
+            str_width = None
+            if mpi.rank == 0:
+                # check if some state files already exist
+                names = [
+                    name
+                    for name in index.entries
+                    if name.startswith(prefix + "_t")
+                ]
+                if names:
+                    # file does exist : get str_width from file name
+                    # file name is something like 'state_phys_tYYYY.YYY.nc'
+                    str_width = len(names[0][len(prefix) + 2 : -3])
+                else:
+                    # file does not exist : get str_width from t_end
+                    # max number of digits = int(log10(t_end)) + 1
+                    # add .3f precision = 4 additional characters
+                    # +2 by anticipation of potential restarts
+                    str_width = int(np.log10(params.time_stepping.t_end)) + 7
+            if mpi.nb_proc > 1:
+                str_width = mpi.comm.bcast(str_width, root=0)
         else:
             # dynamic width not implemented if USE_T_END==False
             str_width = 7
 
-        if mpi.rank == 0:
-            path_run.mkdir(exist_ok=True)
-
         if 0 < self.period_save < 0.001 or params.output.phys_fields.file_with_it:
             str_it = f"_it={self.sim.time_stepping.it}"
         else:
             str_it = ""
 
-        name_save = f"state_phys_t{time:0{str_width}.3f}{str_it}.{ext}"
+        # the index files of the per-rank layout and the state_spect files
+        # are hdf5 files
+        if self._per_rank_files or prefix == "state_spect":
+            ext_file = "h5"
+        else:
+            ext_file = ext
+        name_save = f"{prefix}_t{time:0{str_width}.3f}{str_it}.{ext_file}"
 
         path_file = path_run / name_save
 
         does_path_exist = None
+        it_file_pending = None
         if mpi.rank == 0:
-            does_path_exist = path_file.exists()
+            if self._async_saver is not None:
+                # only one lookup because the worker thread removes the keys
+                # (and before checking the file, which is written before)
+                it_file_pending = self._async_saver.pending.get(path_file)
+            does_path_exist = (
+                it_file_pending is not None or path_file.exists()
+            )
         if mpi.nb_proc > 1:
             does_path_exist = mpi.comm.bcast(does_path_exist, root=0)
 
@@ -177,29 +361,179 @@ class PhysFieldsBase(SpecificOutput):
             # do not save if the file corresponds to the same it
             it_file = None
             if mpi.rank == 0:
-                with h5pack.File(str(path_file), "r") as file:
-                    it_file = file["state_phys"].attrs["it"]
+                if it_file_pending is not None:
+                    it_file = it_file_pending
+                elif path_file.name in index.entries:
+                    it_file = index.entries[path_file.name]["it"]
+                else:
+                    with h5py.File(str(path_file), "r") as file:
+                        it_file = file[prefix].attrs["it"]
             if mpi.nb_proc > 1:
                 it_file = mpi.comm.bcast(it_file, root=0)
             if it_file == self.sim.time_stepping.it:
                 return
             name_save = (
-                f"state_phys_t{time:07.3f}_it={self.sim.time_stepping.it}.{ext}"
+                f"{prefix}_t{time:07.3f}_it={self.sim.time_stepping.it}"
+                f".{ext_file}"
             )
             path_file = path_run / name_save
-        self.output.print_stdout("save state_phys in file " + name_save)
+        self.output.print_stdout(f"save {prefix} in file " + name_save)
+
+        if prefix == "state_spect":
+            params_phys_fields = params.output.phys_fields
+            if params_phys_fields.state_spect_precision == "float32":
+                dtype = np.complex64
+            else:
+                dtype = None
+            state_spect = self.sim.state.state_spect
+            nb_modes = save_state_spect_file(
+                path_file,
+                state_spect,
+                self.sim.info,
+                self.output.name_run,
+                self.sim.oper,
+                time,
+                self.sim.time_stepping.it,
+                dtype=dtype,
+                compression=params_phys_fields.compression,
+                particular_attr=particular_attr,
+            )
+            if mpi.rank == 0:
+                index.add(
+                    path_file,
+                    time,
+                    self.sim.time_stepping.it,
+                    (nb_modes,),
+                    state_spect.keys,
+                )
+            return
+
+        if self._async_saver is not None:
+            self._save_async(path_file, state_phys, time, particular_attr)
+            return
+
+        if self._per_rank_files:
+            save_file_per_rank(
+                path_file,
+                state_phys,
+                self.sim.info,
+                self.output.name_run,
+                self.sim.oper,
+                time,
+                self.sim.time_stepping.it,
+                particular_attr,
+                storage=self._storage,
+            )
+        else:
+            save_file(
+                path_file,
+                state_phys,
+                self.sim.info,
+                self.output.name_run,
+                self.sim.oper,
+                time,
+                self.sim.time_stepping.it,
+                particular_attr,
+                storage=self._storage,
+            )
+        if mpi.rank == 0:
+            index.add(path_file, **self._get_entry_index(state_phys, time))
+
+    def _get_index(self, path_run):
+        """Return the index of the state files of the directory (process 0)"""
+        if self._index is None or self._index.path_dir != path_run:
+            self._index = IndexPhysFiles(path_run)
+            self._index.load_for_writing()
+        return self._index
+
+    def _get_entry_index(self, state_phys, time):
+        if mpi.nb_proc == 1:
+            shape = state_phys.shape[1:]
+        else:
+            shape = self.oper.shapeX_seq
+        return {
+            "time": time,
+            "it": self.sim.time_stepping.it,
+            "shape": shape,
+            "keys": state_phys.keys,
+        }
+
+    def _save_async(self, path_file, state_phys, time, particular_attr):
+        saver = self._async_saver
+        it = self.sim.time_stepping.it
+
+        if self._per_rank_files:
+            oper = self.sim.oper
+            slices_loc = get_slices_loc(oper)
+            slices_ranks = gather_slices_loc(oper)
+            buffer = saver.copy_to_buffer(state_phys)
+            saver.submit(
+                save_file_rank,
+                get_path_file_rank(path_file, mpi.rank),
+                dict(zip(state_phys.keys, buffer)),
+                slices_loc,
+                self._storage,
+                buffer=buffer,
+            )
+            if mpi.rank == 0:
+                saver.submit(
+                    self._index.call_and_add,
+                    save_file_index,
+                    path_file,
+                    slices_ranks,
+                    oper.shapeX_seq,
+                    {k: state_phys.dtype for k in state_phys.keys},
+                    state_phys.info,
+                    self.sim.info,
+                    self.output.name_run,
+                    oper.axes,
+                    time,
+                    it,
+                    particular_attr,
+                    entry=self._get_entry_index(state_phys, time),
+                    key=path_file,
+                    value=it,
+                )
+            return
+
+        if mpi.nb_proc == 1:
+            buffer = saver.copy_to_buffer(state_phys)
+            fields = dict(zip(state_phys.keys, buffer))
+        else:
+            # the gathered arrays are new arrays (no need for a buffer)
+            buffer = None
+            fields = gather_fields(state_phys, self.sim.oper)
+
+        if mpi.rank > 0:
+            return
 
-        save_file(
+        saver.submit(
+            self._index.call_and_add,
+            save_file_seq,
             path_file,
-            state_phys,
+            fields,
+            state_phys.info,
             self.sim.info,
             self.output.name_run,
-            self.sim.oper,
+            self.sim.oper.axes,
             time,
-            self.sim.time_stepping.it,
+            it,
             particular_attr,
+            slab_nbytes=2 ** 24,
+            storage=self._storage,
+            entry=self._get_entry_index(state_phys, time),
+            buffer=buffer,
+            key=path_file,
+            value=it,
         )
 
+    def wait_async_saves(self):
+        """Wait for the end of the asynchronous saves (if any)"""
+        if self._async_saver is not None:
+            self._async_saver.wait()
+            if self._per_rank_files and mpi.nb_proc > 1:
+                mpi.comm.barrier()
+
     def get_field_to_plot(
         self,
         key=None,
@@ -295,17 +629,89 @@ def time_from_path(path):
     return time
 
 
+class LazyField:
+    """Lazy handle on a field saved in a state_phys file
+
+    Only the data of the selected slices are read (``lazy_field[iz, ...]``).
+    For contiguous datasets (not chunked, not compressed and not virtual),
+    the data are read through a memory map of the file.
+
+    Parameters
+    ----------
+
+    path_file : str or Path
+
+      Path of the state_phys file.
+
+    key : str
+
+      Key of the field.
+
+    """
+
+    def __init__(self, path_file, key):
+        self.path_file = str(path_file)
+        self.key = key
+        with h5py.File(self.path_file, "r") as file:
+            group = file["state_phys"]
+            self.time = group.attrs["time"]
+            dset = group[key]
+            self.shape = dset.shape
+            self.dtype = dset.dtype
+            offset = None
+            if (
+                dset.chunks is None
+                and dset.compression is None
+                and not dset.is_virtual
+                and not dset.external
+            ):
+                # None if the data are not allocated
+                offset = dset.id.get_offset()
+
+        if offset is None:
+            self._memmap = None
+        else:
+            self._memmap = np.memmap(
+                self.path_file,
+                dtype=self.dtype,
+                mode="r",
+                offset=offset,
+                shape=self.shape,
+            )
+
+    def __getitem__(self, index):
+        if self._memmap is not None:
+            return np.array(self._memmap[index])
+        with h5py.File(self.path_file, "r") as file:
+            return file["state_phys"][self.key][index]
+
+
 class SetOfPhysFieldFiles:
-    """A set of physical field files."""
+    """A set of physical field files.
+
+    The fields (or cross-sections) read from the files are kept in a small
+    LRU cache (at most ``cache_max_nbytes`` bytes) so that the consecutive
+    frames of the animations (and the time interpolations) do not read the
+    same data several times.
+
+    """
+
+    cache_max_nbytes = 2 ** 28
 
     def __init__(self, path_dir=os.curdir, output=None):
         self.output = output
         self.path_dir = path_dir if output is None else output.path_run
+        self._cache_frames = OrderedDict()
+        self._cache_nbytes = 0
         self.update_times()
 
     def update_times(self):
-        """Initialize the times by globing and analyzing the file names."""
-        path_files = glob(os.path.join(self.path_dir, "state_phys*.[hn]*"))
+        """Initialize the times from the index of the files (or by listing the
+        directory if the index is not up to date) and the file names."""
+        path_files = [
+            os.path.join(self.path_dir, name)
+            for name in IndexPhysFiles(self.path_dir).get_names(("state_phys",))
+        ]
 
         if hasattr(self, "path_files") and len(self.path_files) == len(
             path_files
@@ -378,44 +784,65 @@ class SetOfPhysFieldFiles:
 
             return field0 * weight0 + field1 * weight1, time
 
-        # print(idx_time, 'Using file', self.path_files[idx_time])
-
-        with h5py.File(self.path_files[idx_time], "r") as file:
-            time = file["state_phys"].attrs["time"]
-            dset = file["state_phys"][key]
-
-            if equation is None:
-                return dset[...], time
+        key_cache = (self.path_files[idx_time], key, equation)
+        try:
+            field, time = self._cache_frames[key_cache]
+        except KeyError:
+            pass
+        else:
+            self._cache_frames.move_to_end(key_cache)
+            return field.copy(), time
+
+        lazy_field = self.get_lazy_field(idx_time, key)
+        field = lazy_field[self._get_index_from_equation(equation)]
+        time = lazy_field.time
+
+        if field.nbytes <= self.cache_max_nbytes:
+            self._cache_frames[key_cache] = field.copy(), time
+            self._cache_nbytes += field.nbytes
+            while self._cache_nbytes > self.cache_max_nbytes:
+                field_old, _ = self._cache_frames.popitem(last=False)[1]
+                self._cache_nbytes -= field_old.nbytes
+        return field, time
+
+    def get_lazy_field(self, idx_time, key):
+        """Return a lazy handle (:class:`LazyField`) on a saved field"""
+        return LazyField(self.path_files[idx_time], key)
+
+    def _get_index_from_equation(self, equation):
+        """Return the index selecting the cross-section defined by equation"""
+        if equation is None:
+            return Ellipsis
 
-            if equation.startswith("iz="):
-                iz = eval(equation[len("iz=") :])
-                return dset[iz, ...], time
+        if equation.startswith("iz="):
+            iz = eval(equation[len("iz=") :])
+            return iz, Ellipsis
 
-            elif equation.startswith("z="):
-                z = eval(equation[len("z=") :])
-                iz = abs(self.output.sim.oper.get_grid1d_seq("z") - z).argmin()
-                return dset[iz, ...], time
+        elif equation.startswith("z="):
+            z = eval(equation[len("z=") :])
+            iz = abs(self.output.sim.oper.get_grid1d_seq("z") - z).argmin()
+            return iz, Ellipsis
 
-            elif equation.startswith("iy="):
-                iy = eval(equation[len("iy=") :])
-                return dset[:, iy, :], time
+        elif equation.startswith("iy="):
+            iy = eval(equation[len("iy=") :])
+            return slice(None), iy, slice(None)
 
-            elif equation.startswith("y="):
-                y = eval(equation[len("y=") :])
-                iy = abs(self.output.sim.oper.get_grid1d_seq("y") - y).argmin()
-                return dset[:, iy, :], time
+        elif equation.startswith("y="):
+            y = eval(equation[len("y=") :])
+            iy = abs(self.output.sim.oper.get_grid1d_seq("y") - y).argmin()
+            return slice(None), iy, slice(None)
 
-            elif equation.startswith("ix="):
-                ix = eval(equation[len("ix=") :])
-                return dset[..., ix], time
+        elif equation.startswith("ix="):
+            ix = eval(equation[len("ix=") :])
+            return Ellipsis, ix
 
-            elif equation.startswith("x="):
-                x = eval(equation[len("x=") :])
-                ix = abs(self.output.sim.oper.get_grid1d_seq("x") - x).argmin()
-                return dset[..., ix], time
+        elif equation.startswith("x="):
+            x = eval(equation[len("x=") :])
+            ix = abs(self.output.sim.oper.get_grid1d_seq("x") - x).argmin()
+            return Ellipsis, ix
 
-            else:
-                raise NotImplementedError
+        else:
+            raise NotImplementedError
 
     def get_closest_time_file(self, time):
         """Find the index and value of the closest actual time of the field."""
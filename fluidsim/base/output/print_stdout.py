@@ -83,9 +83,15 @@ class PrintStdOutBase:
 
     def _make_str_info(self):
         ts = self.sim.time_stepping
-        return (
+        to_print = (
             f"it = {ts.it:6d} ; t = {ts.t:12.6g} ; deltat  = {ts.deltat:10.5g}\n"
         )
+        if getattr(ts, "nb_steps_rejected", None) is not None:
+            to_print += (
+                f"              nb_steps_rejected = {ts.nb_steps_rejected:6d} ; "
+                f"error_ratio = {ts.error_ratio:9.3e}\n"
+            )
+        return to_print
 
     def _evaluate_duration_left(self):
         """ Computes the remaining time. """
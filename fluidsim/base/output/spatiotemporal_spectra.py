@@ -14,6 +14,10 @@ Provides:
 
 """
 
+import hashlib
+import os
+import tempfile
+from functools import partial
 from pathlib import Path
 from logging import warn
 from math import pi
@@ -61,10 +65,16 @@ def find_index_first_l(arr: A, value: Uf32f64):
 
 
 def filter_tmins_paths(tmin, tmins, paths):
+    """Remove the files containing only times smaller than tmin
+
+    ``tmins`` are the (rounded) times in the names of the files.
+
+    """
     if tmins.size == 1:
         return tmins, paths
-    delta_tmin = np.diff(tmins).min()
-    start = find_index_first_l(tmin - tmins, delta_tmin)
+    # the file containing tmin is the last file starting before tmin (the
+    # times in the names of the files are rounded)
+    start = max(0, np.count_nonzero(tmins < tmin - 1e-3) - 1)
     return tmins[start:], paths[start:]
 
 
@@ -89,6 +99,237 @@ def get_arange_minmax(times: A, tmin: Uf32f64, tmax: Uf32f64):
     return np.arange(start, stop)
 
 
+def load_times_from_files(tmins_files, paths, tmin, tmax, disable_progress):
+    """Load the times (between tmin and tmax) saved in the files of one rank"""
+    with Progress(disable=disable_progress) as progress:
+        npaths = len(paths)
+        task_files = progress.add_task(
+            "Getting times from rank 0...", total=npaths
+        )
+
+        times = []
+        for ip, path in enumerate(paths):
+            with open_patient(path, "r") as file:
+                # the times in the names of the files are rounded
+                if tmins_files[ip] > tmax + 1e-3:
+                    progress.update(task_files, completed=npaths)
+                    break
+                times_file = file["times"][:]
+                cond_times = (times_file >= tmin) & (times_file <= tmax)
+                times.append(times_file[cond_times])
+                progress.update(task_files, advance=1)
+
+    return np.concatenate(times)
+
+
+def _create_datasets(group, datasets):
+    for key, value in datasets.items():
+        if isinstance(value, dict):
+            _create_datasets(group.create_group(key), value)
+        else:
+            group.create_dataset(key, data=value)
+
+
+def save_h5_atomic(path, datasets):
+    """Save a (nested) dictionary of arrays in a hdf5 file
+
+    The data is written in a temporary file (in the same directory) which is
+    then renamed with ``os.replace``, so that a file at ``path`` is always
+    complete, even if the process is killed during the writing.
+
+    """
+    path = Path(path)
+    fd, path_tmp = tempfile.mkstemp(
+        prefix=path.name + ".", suffix=".tmp", dir=path.parent
+    )
+    os.close(fd)
+    try:
+        with h5py.File(path_tmp, "w") as file:
+            _create_datasets(file, datasets)
+        os.replace(path_tmp, path)
+    except BaseException:
+        try:
+            os.remove(path_tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def get_segments_welch(nb_times, nperseg, noverlap=None):
+    """Return the (start, stop) indices of the segments of the Welch method"""
+    if noverlap is None:
+        noverlap = nperseg // 2
+    if not 0 <= noverlap < nperseg:
+        raise ValueError("noverlap has to be in [0, nperseg)")
+    if nperseg > nb_times:
+        raise ValueError(
+            f"nperseg ({nperseg}) larger than the number of times ({nb_times})"
+        )
+    step = nperseg - noverlap
+    return [
+        (start, start + nperseg)
+        for start in range(0, nb_times - nperseg + 1, step)
+    ]
+
+
+def compute_spectra_welch(
+    times, compute_segment, nperseg, noverlap=None, path_cache=None
+):
+    """Welch method: average of the spectra of overlapping segments
+
+    The segments are processed one after the other (so that the memory usage
+    does not depend on the length of the time series).
+
+    Parameters
+    ----------
+
+    times : 1d array
+
+      Times of the whole time series.
+
+    compute_segment : callable
+
+      ``compute_segment(tmin, tmax)`` returns a dictionary containing the
+      spectra of one segment. The items with keys starting with "spectrum_"
+      are averaged and the other items are taken from one segment.
+
+    nperseg, noverlap : int
+
+      Number of times per segment and number of overlapping times (default
+      ``nperseg // 2``).
+
+    path_cache : str or Path (optional)
+
+      If not None, directory where the spectra of the segments are cached
+      (one hdf5 file per segment, named from the times of the segment).
+      When a run is extended, only the new segments are computed.
+
+    """
+    segments = get_segments_welch(times.size, nperseg, noverlap)
+
+    if path_cache is not None:
+        path_cache = Path(path_cache)
+        path_cache.mkdir(exist_ok=True)
+        # items which are not spectra (wavenumbers, frequencies, ...)
+        path_common = path_cache / "common.h5"
+
+    result = None
+    for start, stop in segments:
+        tmin_seg = times[start]
+        tmax_seg = times[stop - 1]
+        if path_cache is not None:
+            path_seg = path_cache / f"segment_{tmin_seg:.12g}_{tmax_seg:.12g}.h5"
+        if path_cache is not None and path_seg.exists():
+            spectra_seg = {}
+            for path in (path_seg, path_common):
+                with h5py.File(path, "r") as file:
+                    spectra_seg.update(
+                        {key: dset[...] for key, dset in file.items()}
+                    )
+        else:
+            spectra_seg = compute_segment(tmin_seg, tmax_seg)
+            if path_cache is not None:
+                # common.h5 is written before the first segment file
+                if not path_common.exists():
+                    save_h5_atomic(
+                        path_common,
+                        {
+                            key: value
+                            for key, value in spectra_seg.items()
+                            if not key.startswith("spectrum_")
+                        },
+                    )
+                save_h5_atomic(
+                    path_seg,
+                    {
+                        key: value
+                        for key, value in spectra_seg.items()
+                        if key.startswith("spectrum_")
+                    },
+                )
+        if result is None:
+            result = spectra_seg
+            continue
+        for key, value in spectra_seg.items():
+            if key.startswith("spectrum_"):
+                result[key] += value
+
+    for key in result:
+        if key.startswith("spectrum_"):
+            result[key] /= len(segments)
+    return result
+
+
+def compute_spectrum_kzkhomega_bincount(field, khs, kzs, KX, KZ, KH):
+    """Compute the kz-kh-omega spectrum (vectorized with ``np.bincount``)
+
+    The modes are binned along kz and linearly shared between the two
+    nearest kh. Works for 2d and 3d wavenumber arrays
+    (the last dimension of ``field`` corresponds to the frequencies).
+
+    """
+    deltakh = khs[1]
+    deltakz = kzs[1]
+    nkh = len(khs)
+    nkz = len(kzs)
+    nomega = field.shape[-1]
+    field = field.reshape(-1, nomega)
+    KX = KX.ravel()
+    KH = KH.ravel()
+
+    coef = np.where(KX != 0.0, 2.0, 1.0)
+    ikz = np.round(abs(KZ.ravel()) / deltakz).astype(int)
+    ikz = np.minimum(ikz, nkz - 1)
+    ikh = (KH / deltakh).astype(int)
+    clipped = ikh >= nkh - 1
+    ikh = np.minimum(ikh, nkh - 1)
+    coef_share = np.where(clipped, 0.0, (KH - khs[ikh]) / deltakh)
+
+    # each mode contributes to 2 bins (the weight of the second one is 0 for
+    # the modes with kh >= khs[-1])
+    indices = np.concatenate(
+        (ikz * nkh + ikh, ikz * nkh + np.minimum(ikh + 1, nkh - 1))
+    )
+    weights = np.concatenate((coef * (1 - coef_share), coef * coef_share))
+
+    nbins = nkz * nkh
+    spectrum = np.empty((nbins, nomega))
+    # one bincount for a block of frequencies (limited memory usage)
+    nb_omegas_block = max(1, 2 ** 22 // indices.size)
+    for start in range(0, nomega, nb_omegas_block):
+        stop = min(start + nb_omegas_block, nomega)
+        nb_omegas = stop - start
+        values = np.concatenate((field[:, start:stop],) * 2)
+        values = values * weights[:, np.newaxis]
+        indices_block = (
+            indices[:, np.newaxis] * nb_omegas + np.arange(nb_omegas)
+        ).ravel()
+        spectrum[:, start:stop] = np.bincount(
+            indices_block, values.ravel(), minlength=nbins * nb_omegas
+        ).reshape(nbins, nb_omegas)
+    spectrum = spectrum.reshape(nkz, nkh, nomega)
+
+    # get one-sided spectrum in the omega dimension
+    nomega = (nomega + 1) // 2
+    spectrum_onesided = np.empty((nkz, nkh, nomega))
+    spectrum_onesided[:, :, 0] = spectrum[:, :, 0]
+    spectrum_onesided[:, :, 1:] = (
+        spectrum[:, :, 1:nomega] + spectrum[:, :, -1:-nomega:-1]
+    )
+    return spectrum_onesided / (deltakz * deltakh)
+
+
+def sum_wavenumber_vectorized(field, KX, kx_max):
+    """Sum over the wavenumbers (first dimensions of ``field``)
+
+    The modes with ``kx != 0`` and ``kx != kx_max`` are counted twice (they
+    represent also the modes with negative kx).
+
+    """
+    coef = np.where((KX != 0.0) & (KX != kx_max), 2.0, 1.0)
+    return np.tensordot(coef, field, axes=KX.ndim)
+
+
 class SpatioTemporalSpectra3D(SpecificOutput):
     """
     Computes the spatiotemporal spectra.
@@ -438,28 +679,79 @@ class SpatioTemporalSpectra3D(SpecificOutput):
                 self._write_to_file(data)
             self.t_last_save = tsim
 
-    def load_time_series(self, keys=None, tmin=0, tmax=None, dtype=None):
-        """load time series from files"""
-
-        if mpi.nb_proc > 1:
-            raise RuntimeError(
-                "This postprocessing function should not be called with MPI."
+    def _get_paths_ranks(self, tmin):
+        """Return the useful files (from tmin) of each rank"""
+        paths = sorted(self.path_dir.glob("rank*.h5"))
+        ranks = sorted({int(p.name[4:9]) for p in paths})
+        tmins_paths_ranks = {}
+        for rank in ranks:
+            paths_rank = [p for p in paths if p.name.startswith(f"rank{rank:05}")]
+            tmins_files = np.array([float(p.name[14:-3]) for p in paths_rank])
+            tmins_paths_ranks[rank] = filter_tmins_paths(
+                tmin, tmins_files, paths_rank
             )
+        return ranks, tmins_paths_ranks
+
+    def load_time_series(
+        self,
+        keys=None,
+        tmin=0,
+        tmax=None,
+        dtype=None,
+        path_file=None,
+        max_mem_block=1000.0,
+    ):
+        """load time series from files
+
+        Parameters
+        ----------
+
+        keys : sequence of str (optional)
+
+          Keys of the fields (default: all state fields).
+
+        tmin, tmax : float (optional)
+
+          Time range.
+
+        dtype : numpy dtype (optional)
+
+          Data type of the series (default: data type of the files).
+
+        path_file : str or Path (optional)
+
+          If not None, the series are not returned but written (block by
+          block in time) in this hdf5 file (chunked datasets, with the same
+          keys as the returned dictionary) and the path is returned. Useful
+          when the series are larger than the memory. Not supported with MPI.
+
+        max_mem_block : float (default 1000.0)
+
+          Maximum size of a time block in MB (only used with ``path_file``).
+
+        Notes
+        -----
+
+        With MPI, the wavenumber space is split along the first dimension:
+        each process returns the series for a slab of wavenumbers (the arrays
+        ``K*_adim`` give the wavenumbers of the slab).
+
+        """
+
+        if path_file is not None and mpi.nb_proc > 1:
+            raise ValueError("path_file is not supported with MPI.")
 
         if keys is None:
             keys = self.keys_fields
         if tmax is None:
             tmax = self.sim.params.time_stepping.t_end
 
-        # get ranks
-        paths = sorted(self.path_dir.glob("rank*.h5"))
-        ranks = sorted({int(p.name[4:9]) for p in paths})
+        # get ranks and the useful files (from tmin) of each rank
+        ranks, tmins_paths_ranks = self._get_paths_ranks(tmin)
 
         # get times and dimensions order from the files of first rank
-        print(f"load times series...")
-        paths_1st_rank = [
-            p for p in paths if p.name.startswith(f"rank{ranks[0]:05}")
-        ]
+        mpi.printby0(f"load times series...")
+        tmins_files, paths_1st_rank = tmins_paths_ranks[ranks[0]]
 
         with open_patient(paths_1st_rank[0], "r") as file:
             dims_order = file.attrs["dims_order"]
@@ -467,158 +759,227 @@ class SpatioTemporalSpectra3D(SpecificOutput):
             if dtype is None:
                 dtype = file[keys[0] + "_Fourier_loc"].dtype
 
-        # get list of useful files, from tmin
-        tmins_files = np.array([float(p.name[14:-3]) for p in paths_1st_rank])
-        tmins_files, paths_1st_rank = filter_tmins_paths(
-            tmin, tmins_files, paths_1st_rank
+        disable_progress = mpi.rank > 0
+        npaths = len(paths_1st_rank)
+        times = load_times_from_files(
+            tmins_files, paths_1st_rank, tmin, tmax, disable_progress
         )
 
-        with Progress() as progress:
-            npaths = len(paths_1st_rank)
-            task_files = progress.add_task(
-                "Getting times from rank 0...", total=npaths
-            )
-
-            times = []
-            for ip, path in enumerate(paths_1st_rank):
-                with open_patient(path, "r") as file:
-                    if tmins_files[ip] > tmax:
-                        progress.update(task_files, completed=npaths)
-                        break
-                    times_file = file["times"][:]
-                    cond_times = (times_file >= tmin) & (times_file <= tmax)
-                    times.append(times_file[cond_times])
-                    progress.update(task_files, advance=1)
-
-        times = np.concatenate(times)
-
         tmin = times.min()
         tmax = times.max()
-        print(f"tmin={tmin:8.6g}, tmax={tmax:8.6g}, nit={times.size}")
+        mpi.printby0(f"tmin={tmin:8.6g}, tmax={tmax:8.6g}, nit={times.size}")
 
         # get sequential shape of Fourier space
         if self.nb_dim == 3:
             ikxmax, ikymax, ikzmax = region
             iksmax = np.array([ikzmax, ikymax, ikxmax])
             iksmin = np.array([1 - ikzmax, 1 - ikymax, 0])
-            ik0max, ik1max, ik2max = iksmax[dims_order]
-            ik0min, ik1min, ik2min = iksmin[dims_order]
-            shape_series = (
-                ik0max + 1 - ik0min,
-                ik1max + 1 - ik1min,
-                ik2max + 1 - ik2min,
-                times.size,
-            )
         else:
             ikxmax, ikymax = region
             iksmax = np.array([ikymax, ikxmax])
             iksmin = np.array([1 - ikymax, 0])
-            ik0max, ik1max = iksmax[dims_order]
-            ik0min, ik1min = iksmin[dims_order]
-            shape_series = (
-                ik0max + 1 - ik0min,
-                ik1max + 1 - ik1min,
-                times.size,
+        iksmax = iksmax[dims_order]
+        iksmin = iksmin[dims_order]
+        shapeK = tuple(iksmax + 1 - iksmin)
+
+        # slab of the first dimension (split over the processes)
+        n0 = shapeK[0]
+        ik0_start = n0 * mpi.rank // mpi.nb_proc
+        ik0_stop = n0 * (mpi.rank + 1) // mpi.nb_proc
+        shapeK_loc = (ik0_stop - ik0_start,) + shapeK[1:]
+
+        # size of the time blocks
+        if path_file is None:
+            nb_times_block = times.size
+        else:
+            nbytes_time = (
+                len(keys) * np.prod(shapeK_loc) * np.dtype(dtype).itemsize
             )
+            nb_times_block = max(1, int(max_mem_block * 1e6 / nbytes_time))
+            nb_times_block = min(nb_times_block, times.size)
+        starts_blocks = range(0, times.size, nb_times_block)
 
-        # load series, rebuild as state_spect arrays + time
-        series = {
-            f"{k}_Fourier": np.empty(shape_series, dtype=dtype) for k in keys
+        # add Ki_adim arrays, times and dims order
+        Ks_adim = np.meshgrid(
+            *[
+                np.r_[0 : ikmax + 1, ikmin:0]
+                for ikmax, ikmin in zip(iksmax, iksmin)
+            ],
+            indexing="ij",
+        )
+        results = {
+            f"K{index}_adim": K_adim[ik0_start:ik0_stop]
+            for index, K_adim in enumerate(Ks_adim)
         }
-        with Progress() as progress:
-            task_ranks = progress.add_task("Rearranging...", total=len(ranks))
-            task_files = progress.add_task("Rank 00000...", total=npaths)
-            # loop on all files, rank by rank
-            for rank in ranks:
-                paths_rank = [
-                    p for p in paths if p.name.startswith(f"rank{rank:05}")
-                ]
-
-                # get list of useful files, from tmin
-                tmins_files = np.array([float(p.name[14:-3]) for p in paths_rank])
-                tmins_files, paths_rank = filter_tmins_paths(
-                    tmin, tmins_files, paths_rank
+        results["times"] = times
+        results["dims_order"] = dims_order
+
+        if path_file is None:
+            # the series are directly rebuilt in the result arrays
+            series = {
+                f"{k}_Fourier": np.empty(shapeK_loc + (times.size,), dtype=dtype)
+                for k in keys
+            }
+            results.update(series)
+        else:
+            path_file = Path(path_file)
+            file_out = h5py.File(path_file, "w")
+            chunks_time = min(nb_times_block, max(1, 2 ** 20 // n0))
+            for key, value in results.items():
+                file_out.create_dataset(key, data=value)
+            dsets = {
+                f"{k}_Fourier": file_out.create_dataset(
+                    f"{k}_Fourier",
+                    shape=shapeK_loc + (times.size,),
+                    dtype=dtype,
+                    chunks=(1,) + shapeK_loc[1:] + (chunks_time,),
                 )
+                for k in keys
+            }
+            series = {
+                key: np.empty(shapeK_loc + (nb_times_block,), dtype=dtype)
+                for key in dsets
+            }
 
-                npaths = len(paths_rank)
-                progress.update(
-                    task_files,
-                    description=f"Rank {rank:05}...",
-                    total=npaths,
-                    completed=0,
-                )
+        # times of the files (read only once)
+        times_files = {}
+
+        with Progress(disable=disable_progress) as progress:
+            task_ranks = progress.add_task(
+                "Rearranging...", total=len(ranks) * len(starts_blocks)
+            )
+            task_files = progress.add_task("Rank 00000...", total=npaths)
+            for it_start in starts_blocks:
+                it_stop = min(it_start + nb_times_block, times.size)
+                tmin_block = times[it_start]
+                tmax_block = times[it_stop - 1]
+                # loop on all files, rank by rank
+                for rank in ranks:
+                    tmins_files, paths_rank = tmins_paths_ranks[rank]
+                    npaths = len(paths_rank)
+                    progress.update(
+                        task_files,
+                        description=f"Rank {rank:05}...",
+                        total=npaths,
+                        completed=0,
+                    )
 
-                # for a given rank, paths are sorted by time
-                for ip, path_file in enumerate(paths_rank):
-                    # break after the last useful file
-                    if tmins_files[ip] > tmax:
-                        progress.update(task_files, completed=npaths)
-                        break
-
-                    with open_patient(path_file, "r") as file:
-                        # time indices
-                        times_file = file["times"][:]
-                        its_file = get_arange_minmax(times_file, tmin, tmax)
-                        tmin_keep = times_file[its_file[0]]
-                        tmax_keep = times_file[its_file[-1]]
-                        its = get_arange_minmax(times, tmin_keep, tmax_keep)
-
-                        # k_adim_loc = global probes indices!
-                        ik0 = file["probes_k0adim_loc"][:]
-                        ik1 = file["probes_k1adim_loc"][:]
-                        if self.nb_dim == 3:
-                            ik2 = file["probes_k2adim_loc"][:]
-
-                        # load data at desired times for all keys_fields
-                        for key in keys:
-                            skey = key + "_Fourier"
-                            data = file[skey + "_loc"][:, its_file]
-
-                            if self.nb_dim == 3:
-                                for i, it in enumerate(its):
-                                    series[skey][ik0, ik1, ik2, it] = data[:, i]
-                            else:
-                                for i, it in enumerate(its):
-                                    series[skey][ik0, ik1, it] = data[:, i]
+                    # for a given rank, paths are sorted by time
+                    for ip, path in enumerate(paths_rank):
+                        # break after the last useful file (the times in
+                        # the names of the files are rounded)
+                        if tmins_files[ip] > tmax_block + 1e-3:
+                            progress.update(task_files, completed=npaths)
+                            break
+                        self._add_file_to_series(
+                            path,
+                            series,
+                            keys,
+                            times,
+                            times_files,
+                            (tmin_block, tmax_block),
+                            it_start,
+                            (ik0_start, ik0_stop, n0),
+                        )
+                        # update rich task
+                        progress.update(task_files, advance=1)
 
                     # update rich task
-                    progress.update(task_files, advance=1)
+                    progress.update(task_ranks, advance=1)
 
-                # update rich task
-                progress.update(task_ranks, advance=1)
+                if path_file is not None:
+                    for key, dset in dsets.items():
+                        dset[..., it_start:it_stop] = series[key][
+                            ..., : it_stop - it_start
+                        ]
 
-        # add Ki_adim arrays, times and dims order
-        k0_adim = np.r_[0 : ik0max + 1, ik0min:0]
-        k1_adim = np.r_[0 : ik1max + 1, ik1min:0]
+        if path_file is not None:
+            file_out.close()
+            return path_file
 
-        if self.nb_dim == 3:
-            k2_adim = np.r_[0 : ik2max + 1, ik2min:0]
-            K0_adim, K1_adim, K2_adim = np.meshgrid(
-                k0_adim, k1_adim, k2_adim, indexing="ij"
-            )
-        else:
-            K0_adim, K1_adim = np.meshgrid(k0_adim, k1_adim, indexing="ij")
-
-        series.update(
-            {
-                "K0_adim": K0_adim,
-                "K1_adim": K1_adim,
-                "times": times,
-                "dims_order": dims_order,
-            }
-        )
-        if self.nb_dim == 3:
-            series["K2_adim"] = K2_adim
+        return results
 
-        return series
+    def _add_file_to_series(
+        self,
+        path,
+        series,
+        keys,
+        times,
+        times_files,
+        tminmax,
+        it_start,
+        slab,
+    ):
+        """Copy the data of one file in the (block of the) series"""
+        tmin, tmax = tminmax
+        ik0_start, ik0_stop, n0 = slab
+        with open_patient(path, "r") as file:
+            # time indices
+            try:
+                times_file = times_files[path]
+            except KeyError:
+                times_file = times_files[path] = file["times"][:]
+            if (
+                times_file.size == 0
+                or times_file[-1] < tmin
+                or times_file[0] > tmax
+            ):
+                return
+            its_file = get_arange_minmax(times_file, tmin, tmax)
+            if its_file.size == 0:
+                return
+            tmin_keep = times_file[its_file[0]]
+            tmax_keep = times_file[its_file[-1]]
+            its = get_arange_minmax(times, tmin_keep, tmax_keep) - it_start
+            # (contiguous) slices are much faster than lists of indices
+            slice_file = slice(its_file[0], its_file[-1] + 1)
+            slice_series = slice(its[0], its[-1] + 1)
+
+            # k_adim_loc = global probes indices! (possibly negative)
+            ik0 = file["probes_k0adim_loc"][:] % n0
+            iks = [file["probes_k1adim_loc"][:]]
+            if self.nb_dim == 3:
+                iks.append(file["probes_k2adim_loc"][:])
 
-    def _compute_spectrum(self, data):
+            # probes in the slab of this process
+            if ik0_stop - ik0_start == n0:
+                cond_slab = None
+            else:
+                cond_slab = (ik0 >= ik0_start) & (ik0 < ik0_stop)
+                if not cond_slab.any():
+                    return
+                ik0 = ik0[cond_slab]
+                iks = [ik[cond_slab] for ik in iks]
+            indices = (ik0 - ik0_start, *iks, slice_series)
+
+            # load data at desired times for all keys_fields
+            for key in keys:
+                skey = key + "_Fourier"
+                data = file[skey + "_loc"][:, slice_file]
+                if cond_slab is not None:
+                    data = data[cond_slab]
+                # vectorized scatter
+                series[skey][indices] = data
+
+    def _compute_spectrum(self, data, window="boxcar"):
         if not hasattr(self, "f_sample"):
             paths = sorted(self.path_dir.glob("rank*.h5"))
             with h5py.File(paths[0], "r") as file:
                 self.f_sample = 1.0 / file.attrs["period_save"]
-            self.domega = 2 * pi * self.f_sample / data.shape[-1]
 
+        if window != "boxcar":
+            # density scaling so that the energy is conserved on average
+            freq, spectrum = signal.periodogram(
+                data,
+                fs=self.f_sample,
+                window=window,
+                scaling="density",
+                detrend=False,
+                return_onesided=False,
+            )
+            return freq, spectrum / (2 * pi)
+
+        domega = 2 * pi * self.f_sample / data.shape[-1]
         # TODO: I'm not sure if detrend=False is good in prod, but it's much
         # better for testing
         freq, spectrum = signal.periodogram(
@@ -628,13 +989,94 @@ class SpatioTemporalSpectra3D(SpecificOutput):
             detrend=False,
             return_onesided=False,
         )
-        return freq, spectrum / self.domega
+        return freq, spectrum / domega
+
+    def _get_path_cache_welch(self, name, nperseg, noverlap, window, dtype):
+        base = f"welch_{name}_{nperseg}_{noverlap}_{window}"
+        if dtype is not None:
+            base += f"_{dtype}"
+        if mpi.nb_proc > 1:
+            base += f"_rank{mpi.rank:05}"
+        return self.path_dir / base
+
+    def _compute_spectra_welch(
+        self, compute_segment, name, tmin, tmax, dtype, nperseg, noverlap, window
+    ):
+        if noverlap is None:
+            noverlap = nperseg // 2
+        if window is None:
+            window = "hann"
+        ranks, tmins_paths_ranks = self._get_paths_ranks(tmin)
+        tmins_files, paths_1st_rank = tmins_paths_ranks[ranks[0]]
+        times = load_times_from_files(
+            tmins_files, paths_1st_rank, tmin, tmax, mpi.rank > 0
+        )
+        return compute_spectra_welch(
+            times,
+            partial(compute_segment, dtype=dtype, window=window),
+            nperseg,
+            noverlap,
+            self._get_path_cache_welch(name, nperseg, noverlap, window, dtype),
+        )
+
+    def compute_spectra(
+        self,
+        tmin=0,
+        tmax=None,
+        dtype=None,
+        nperseg=None,
+        noverlap=None,
+        window=None,
+    ):
+        """compute spatiotemporal spectra from files
+
+        Parameters
+        ----------
 
-    def compute_spectra(self, tmin=0, tmax=None, dtype=None):
-        """compute spatiotemporal spectra from files"""
+        tmin, tmax : float (optional)
+
+          Time range.
+
+        dtype : numpy dtype (optional)
+
+          Data type of the series.
+
+        nperseg : int (optional)
+
+          If None, one periodogram is computed over the whole time series.
+          Otherwise, the spectra are computed with the Welch method, with
+          segments of ``nperseg`` times. The spectra of the segments are
+          cached in files so that only the new segments are computed when a
+          run is extended.
+
+        noverlap : int (optional)
+
+          Number of overlapping times of the segments (default
+          ``nperseg // 2``).
+
+        window : str (optional)
+
+          Window (default "boxcar" for the periodogram and "hann" for the
+          Welch method).
+
+        """
         if tmax is None:
             tmax = self.sim.params.time_stepping.t_end
 
+        if nperseg is not None:
+            return self._compute_spectra_welch(
+                self.compute_spectra,
+                "spectra",
+                tmin,
+                tmax,
+                dtype,
+                nperseg,
+                noverlap,
+                window,
+            )
+        if window is None:
+            window = "boxcar"
+
         # load time series as state_spect arrays + times
         series = self.load_time_series(tmin=tmin, tmax=tmax, dtype=dtype)
 
@@ -647,7 +1089,7 @@ class SpatioTemporalSpectra3D(SpecificOutput):
             if "_Fourier" not in key:
                 continue
             key_spectrum = "spectrum_" + key.split("_Fourier")[0]
-            freq, spectrum = self._compute_spectrum(data)
+            freq, spectrum = self._compute_spectrum(data, window)
             spectra[key_spectrum] = spectrum
 
         spectra["omegas"] = 2 * pi * freq
@@ -673,38 +1115,123 @@ class SpatioTemporalSpectra2D(SpatioTemporalSpectra3D):
         ]
 
 
+def _get_kwargs_welch(nperseg, noverlap):
+    if nperseg is not None and noverlap is None:
+        noverlap = nperseg // 2
+    return {"nperseg": nperseg, "noverlap": noverlap}
+
+
 class SpatioTemporalSpectraNS:
-    def _get_path_saved_spectra(self, tmin, tmax, dtype, save_urud):
+    def _get_path_saved_spectra(
+        self, tmin, tmax, dtype, save_urud, nperseg=None, noverlap=None
+    ):
         base = f"periodogram_{tmin}_{tmax}"
         if dtype is not None:
             base += f"_{dtype}"
+        if nperseg is not None:
+            base += f"_welch{nperseg}_{noverlap}"
         if save_urud:
             base += "_urud"
         return self.path_dir / (base + ".h5")
 
-    def _get_path_saved_tspectra(self, tmin, tmax, dtype, save_urud):
+    def _get_path_saved_tspectra(
+        self, tmin, tmax, dtype, save_urud, nperseg=None, noverlap=None
+    ):
         base = f"periodogram_temporal_{tmin}_{tmax}"
         if dtype is not None:
             base += f"_{dtype}"
+        if nperseg is not None:
+            base += f"_welch{nperseg}_{noverlap}"
         if save_urud:
             base += "_urud"
         return self.path_dir / (base + ".h5")
 
-    def save_spectra_kzkhomega(
-        self, tmin=0, tmax=None, dtype=None, save_urud=False
+    def _get_path_cache_spectra(
+        self, name, tmin, tmax, dtype, nperseg=None, noverlap=None
     ):
+        """Path of the cache file of the spectra computed for all modes
+
+        The name of the file is built from a hash of the times used for the
+        spectra (and not from tmin and tmax) so that the cache is reused for
+        all time ranges containing the same saved times.
+
         """
-        save:
-            - the spatiotemporal spectra, with a cylindrical average in k-space
-            - the temporal spectra, with an average on the whole k-space
+        ranks, tmins_paths_ranks = self._get_paths_ranks(tmin)
+        tmins_files, paths_1st_rank = tmins_paths_ranks[ranks[0]]
+        times = load_times_from_files(
+            tmins_files, paths_1st_rank, tmin, tmax, True
+        )
+        hasher = hashlib.sha1(f"{name}_{dtype}_{nperseg}_{noverlap}".encode())
+        hasher.update(np.ascontiguousarray(times, dtype=np.float64).tobytes())
+        base = f"cache_{name}_{hasher.hexdigest()[:16]}"
+        if mpi.nb_proc > 1:
+            base += f"_rank{mpi.rank:05}"
+        return self.path_dir / (base + ".h5")
+
+    def _get_spectra_cached(
+        self, name, tmin, tmax, dtype, nperseg=None, noverlap=None
+    ):
+        """Spectra for all modes (``compute_spectra`` or ``compute_spectra_urud``)
+
+        The spectra are loaded from the cache if possible. Otherwise, they are
+        computed and saved in the cache.
+
         """
-        if tmax is None:
-            tmax = self.sim.params.time_stepping.t_end
+        path_cache = self._get_path_cache_spectra(
+            name, tmin, tmax, dtype, nperseg, noverlap
+        )
+        if path_cache.exists():
+            with h5py.File(path_cache, "r") as file:
+                return {key: value[...] for key, value in file.items()}
 
-        # compute spectra
-        print("Computing spectra...")
-        spectra = self.compute_spectra(tmin=tmin, tmax=tmax, dtype=dtype)
+        compute = getattr(self, "compute_" + name)
+        spectra = compute(
+            tmin=tmin, tmax=tmax, dtype=dtype, nperseg=nperseg, noverlap=noverlap
+        )
+        save_h5_atomic(path_cache, spectra)
+        return spectra
 
+    def _get_binned_spectra(
+        self, name, tmin, tmax, dtype, nperseg=None, noverlap=None
+    ):
+        """kz-kh-omega and temporal spectra (one-sided) from the cache
+
+        Returns two dictionaries (``spectra_kzkhomega, tspectra``), which are
+        also cached (file ``cache_*_binned.h5``).
+
+        """
+        path_cache = self._get_path_cache_spectra(
+            name, tmin, tmax, dtype, nperseg, noverlap
+        )
+        path_cache_binned = path_cache.with_name(
+            path_cache.stem + "_binned.h5"
+        )
+        kinds = ("kzkhomega", "temporal")
+        if path_cache_binned.exists():
+            with h5py.File(path_cache_binned, "r") as file:
+                return tuple(
+                    {key: value[...] for key, value in file[kind].items()}
+                    for kind in kinds
+                )
+
+        spectra = self._get_spectra_cached(
+            name, tmin, tmax, dtype, nperseg, noverlap
+        )
+        spectra_kzkhomega, tspectra = self._bin_spectra(spectra)
+        del spectra
+
+        save_h5_atomic(
+            path_cache_binned, dict(zip(kinds, (spectra_kzkhomega, tspectra)))
+        )
+        return spectra_kzkhomega, tspectra
+
+    def _bin_spectra(self, spectra):
+        """Cylindrical average in k-space and average over the whole k-space
+
+        With MPI, the results are summed over the processes (each process
+        computes the spectra for a slab of wavenumbers).
+
+        """
         # get kz, kh
         params_oper = self.sim.params.oper
         deltakx = 2 * pi / params_oper.Lx
@@ -730,8 +1257,13 @@ class SpatioTemporalSpectraNS:
             khmax_spectra = KX.max()
 
         KZ = deltakz * spectra[f"K{order[0]}_adim"]
+        kzmax_spectra = KZ.max()
 
-        kz_spectra = np.arange(0, KZ.max() + 1e-15, deltakz)
+        if mpi.nb_proc > 1:
+            khmax_spectra = mpi.comm.allreduce(khmax_spectra, op=mpi.MPI.MAX)
+            kzmax_spectra = mpi.comm.allreduce(kzmax_spectra, op=mpi.MPI.MAX)
+
+        kz_spectra = np.arange(0, kzmax_spectra + 1e-15, deltakz)
 
         nkh_spectra = max(2, int(khmax_spectra / deltakh))
         kh_spectra = deltakh * np.arange(nkh_spectra)
@@ -752,106 +1284,132 @@ class SpatioTemporalSpectraNS:
         for key, data in spectra.items():
             if not key.startswith("spectrum_"):
                 continue
-            spectra_kzkhomega[key] = self.compute_spectrum_kzkhomega(
-                np.ascontiguousarray(data), kh_spectra, kz_spectra, KX, KZ, KH
+            spectrum_kzkhomega = compute_spectrum_kzkhomega_bincount(
+                data, kh_spectra, kz_spectra, KX, KZ, KH
             )
-            tspectrum = self._sum_wavenumber(data, KX, kx_max)
+            tspectrum = sum_wavenumber_vectorized(data, KX, kx_max)
             # one-sided frequencies
             tspectrum_onesided = np.zeros(nomegas)
             tspectrum_onesided[0] = tspectrum[0]
             tspectrum_onesided[1:] = (
                 tspectrum[1:nomegas] + tspectrum[-1:-nomegas:-1]
             )
+            if mpi.nb_proc > 1:
+                spectrum_kzkhomega = mpi.comm.allreduce(
+                    spectrum_kzkhomega, op=mpi.MPI.SUM
+                )
+                tspectrum_onesided = mpi.comm.allreduce(
+                    tspectrum_onesided, op=mpi.MPI.SUM
+                )
+            spectra_kzkhomega[key] = spectrum_kzkhomega
             tspectra[key] = tspectrum_onesided
 
-        del spectra
+        return spectra_kzkhomega, tspectra
 
+    def _add_energy_spectra(self, spectra):
+        """Adds the kinetic and potential energy spectra to a dict"""
         # total kinetic energy
         if self.nb_dim == 3:
-            spectra_kzkhomega["spectrum_K"] = 0.5 * (
-                spectra_kzkhomega["spectrum_vx"]
-                + spectra_kzkhomega["spectrum_vy"]
-                + spectra_kzkhomega["spectrum_vz"]
-            )
-            tspectra["spectrum_K"] = 0.5 * (
-                tspectra["spectrum_vx"]
-                + tspectra["spectrum_vy"]
-                + tspectra["spectrum_vz"]
+            spectra["spectrum_K"] = 0.5 * (
+                spectra["spectrum_vx"]
+                + spectra["spectrum_vy"]
+                + spectra["spectrum_vz"]
             )
         else:
-            spectra_kzkhomega["spectrum_K"] = 0.5 * (
-                spectra_kzkhomega["spectrum_ux"]
-                + spectra_kzkhomega["spectrum_uy"]
-            )
-            tspectra["spectrum_K"] = 0.5 * (
-                tspectra["spectrum_ux"] + tspectra["spectrum_uy"]
+            spectra["spectrum_K"] = 0.5 * (
+                spectra["spectrum_ux"] + spectra["spectrum_uy"]
             )
 
         # potential energy
         try:
             N = self.sim.params.N
-            spectra_kzkhomega["spectrum_A"] = (
-                0.5 / N ** 2 * spectra_kzkhomega["spectrum_b"]
-            )
-            tspectra["spectrum_A"] = 0.5 / N ** 2 * tspectra["spectrum_b"]
+            spectra["spectrum_A"] = 0.5 / N ** 2 * spectra["spectrum_b"]
         except AttributeError:
             pass
 
-        # save to files
-        path_file = self._get_path_saved_spectra(tmin, tmax, dtype, save_urud)
-        with h5py.File(path_file, "w") as file:
-            file.attrs["tmin"] = tmin
-            file.attrs["tmax"] = tmax
-            for key, val in spectra_kzkhomega.items():
-                file.create_dataset(key, data=val)
+    def save_spectra_kzkhomega(
+        self,
+        tmin=0,
+        tmax=None,
+        dtype=None,
+        save_urud=False,
+        nperseg=None,
+        noverlap=None,
+    ):
+        """
+        save:
+            - the spatiotemporal spectra, with a cylindrical average in k-space
+            - the temporal spectra, with an average on the whole k-space
 
-        path_file = self._get_path_saved_tspectra(tmin, tmax, dtype, save_urud)
-        with h5py.File(path_file, "w") as file:
-            file.attrs["tmin"] = tmin
-            file.attrs["tmax"] = tmax
-            for key, val in tspectra.items():
-                file.create_dataset(key, data=val)
+        With ``nperseg``, the spectra are computed with the Welch method (see
+        :func:`compute_spectra`).
+
+        The spectra computed for all modes and the averaged spectra are cached
+        (files ``cache_*.h5`` named from the times used) so that they are not
+        recomputed for another time range containing the same times or for
+        another value of ``save_urud``.
+        """
+        if tmax is None:
+            tmax = self.sim.params.time_stepping.t_end
+
+        # compute spectra
+        print("Computing spectra...")
+        kwargs_welch = _get_kwargs_welch(nperseg, noverlap)
+        spectra_kzkhomega, tspectra = self._get_binned_spectra(
+            "spectra", tmin, tmax, dtype, **kwargs_welch
+        )
 
         # toroidal/poloidal decomposition
         if save_urud:
             print("Computing ur, ud spectra...")
-            spectra_urud_kzkhomega = {}
-            tspectra_urud = {}
-            spectra = self.compute_spectra_urud(tmin=tmin, tmax=tmax, dtype=dtype)
-
-            for key, data in spectra.items():
-                if not key.startswith("spectrum_"):
-                    continue
-                spectra_urud_kzkhomega[key] = self.compute_spectrum_kzkhomega(
-                    np.ascontiguousarray(data), kh_spectra, kz_spectra, KX, KZ, KH
-                )
-                spectra_kzkhomega[key] = spectra_urud_kzkhomega[key]
-                tspectrum = self._sum_wavenumber(data, KX, kx_max)
-                # one-sided frequencies
-                tspectrum_onesided = np.zeros(nomegas)
-                tspectrum_onesided[0] = tspectrum[0]
-                tspectrum_onesided[1:] = (
-                    tspectrum[1:nomegas] + tspectrum[-1:-nomegas:-1]
-                )
-                tspectra_urud[key] = tspectrum_onesided
-                tspectra[key] = tspectra_urud[key]
+            spectra_urud_kzkhomega, tspectra_urud = self._get_binned_spectra(
+                "spectra_urud", tmin, tmax, dtype, **kwargs_welch
+            )
+            for binned, binned_urud in (
+                (spectra_kzkhomega, spectra_urud_kzkhomega),
+                (tspectra, tspectra_urud),
+            ):
+                for key, value in binned_urud.items():
+                    if key.startswith("spectrum_"):
+                        binned[key] = value
 
-            path_file = self._get_path_saved_spectra(tmin, tmax, dtype, save_urud)
-            with h5py.File(path_file, "a") as file:
-                for key, val in spectra_urud_kzkhomega.items():
-                    file.create_dataset(key, data=val)
+        self._add_energy_spectra(spectra_kzkhomega)
+        self._add_energy_spectra(tspectra)
 
-            path_file = self._get_path_saved_tspectra(
-                tmin, tmax, dtype, save_urud
-            )
-            with h5py.File(path_file, "a") as file:
-                for key, val in tspectra_urud.items():
+        if mpi.rank > 0:
+            return spectra_kzkhomega, tspectra
+
+        # save to files
+        for path_file, spectra in (
+            (
+                self._get_path_saved_spectra(
+                    tmin, tmax, dtype, save_urud, **kwargs_welch
+                ),
+                spectra_kzkhomega,
+            ),
+            (
+                self._get_path_saved_tspectra(
+                    tmin, tmax, dtype, save_urud, **kwargs_welch
+                ),
+                tspectra,
+            ),
+        ):
+            with h5py.File(path_file, "w") as file:
+                file.attrs["tmin"] = tmin
+                file.attrs["tmax"] = tmax
+                for key, val in spectra.items():
                     file.create_dataset(key, data=val)
 
         return spectra_kzkhomega, tspectra
 
     def load_spectra_kzkhomega(
-        self, tmin=0, tmax=None, dtype=None, save_urud=False
+        self,
+        tmin=0,
+        tmax=None,
+        dtype=None,
+        save_urud=False,
+        nperseg=None,
+        noverlap=None,
     ):
         """load kzkhomega spectra from file"""
         if tmax is None:
@@ -859,7 +1417,10 @@ class SpatioTemporalSpectraNS:
 
         spectra = {}
 
-        path_file = self._get_path_saved_spectra(tmin, tmax, dtype, save_urud)
+        kwargs_welch = _get_kwargs_welch(nperseg, noverlap)
+        path_file = self._get_path_saved_spectra(
+            tmin, tmax, dtype, save_urud, **kwargs_welch
+        )
         with h5py.File(path_file, "r") as file:
             for key in file.keys():
                 spectra[key] = file[key][...]
@@ -1070,62 +1631,34 @@ class SpatioTemporalSpectraNS:
         raise NotImplementedError
 
     def compute_temporal_spectra(
-        self, tmin=0, tmax=None, dtype=None, compute_urud=False
+        self,
+        tmin=0,
+        tmax=None,
+        dtype=None,
+        compute_urud=False,
+        nperseg=None,
+        noverlap=None,
     ):
         """compute the temporal spectra by averaging over Fourier space"""
         if tmax is None:
             tmax = self.sim.params.time_stepping.t_end
 
-        tspectra = {}
-
-        # compute kxkykzomega spectra
-        spectra = self.compute_spectra(tmin=tmin, tmax=tmax, dtype=dtype)
+        # kxkykzomega spectra and their average over Fourier space (cached)
+        kwargs_welch = _get_kwargs_welch(nperseg, noverlap)
+        _, tspectra = self._get_binned_spectra(
+            "spectra", tmin, tmax, dtype, **kwargs_welch
+        )
         if compute_urud:
-            spectra.update(
-                self.compute_spectra_urud(tmin=tmin, tmax=tmax, dtype=dtype)
+            _, tspectra_urud = self._get_binned_spectra(
+                "spectra_urud", tmin, tmax, dtype, **kwargs_welch
             )
-
-        # one-sided frequencies
-        nomegas = (spectra["omegas"].size + 1) // 2
-        tspectra["omegas"] = spectra["omegas"][:nomegas]
-
-        order = spectra["dims_order"]
-        KX = spectra[f"K{order[-1]}_adim"]
-        deltakx = 2 * pi / self.sim.params.oper.Lx
-        kx_max = self.sim.params.oper.nx // 2 * deltakx
-
-        # average over Fourier space (kx,ky,kz)
-        for key, spectrum in spectra.items():
-            if not key.startswith("spectrum_"):
-                continue
-            tspectrum = self._sum_wavenumber(spectrum, KX, kx_max)
-            # one-sided frequencies
-            tspectrum_onesided = np.zeros(nomegas)
-            tspectrum_onesided[0] = tspectrum[0]
-            tspectrum_onesided[1:] = (
-                tspectrum[1:nomegas] + tspectrum[-1:-nomegas:-1]
+            tspectra.update(
+                (key, value)
+                for key, value in tspectra_urud.items()
+                if key.startswith("spectrum_")
             )
-            tspectra[key] = tspectrum_onesided
-
-        # total kinetic energy
-        if self.nb_dim == 3:
-            tspectra["spectrum_K"] = 0.5 * (
-                tspectra["spectrum_vx"]
-                + tspectra["spectrum_vy"]
-                + tspectra["spectrum_vz"]
-            )
-        else:
-            tspectra["spectrum_K"] = 0.5 * (
-                tspectra["spectrum_ux"] + tspectra["spectrum_uy"]
-            )
-
-        # potential energy
-        try:
-            N = self.sim.params.N
-            tspectra["spectrum_A"] = 0.5 / N ** 2 * tspectra["spectrum_b"]
-        except AttributeError:
-            pass
 
+        self._add_energy_spectra(tspectra)
         return tspectra
 
     def plot_temporal_spectra(
@@ -1247,7 +1780,13 @@ class SpatioTemporalSpectraNS:
             ax.legend()
 
     def load_temporal_spectra(
-        self, tmin=0, tmax=None, dtype=None, save_urud=False
+        self,
+        tmin=0,
+        tmax=None,
+        dtype=None,
+        save_urud=False,
+        nperseg=None,
+        noverlap=None,
     ):
         """load temporal spectra from file"""
         if tmax is None:
@@ -1255,7 +1794,10 @@ class SpatioTemporalSpectraNS:
 
         tspectra = {}
 
-        path_file = self._get_path_saved_tspectra(tmin, tmax, dtype, save_urud)
+        kwargs_welch = _get_kwargs_welch(nperseg, noverlap)
+        path_file = self._get_path_saved_tspectra(
+            tmin, tmax, dtype, save_urud, **kwargs_welch
+        )
         with h5py.File(path_file, "r") as file:
             for key in file.keys():
                 tspectra[key] = file[key][...]
@@ -1263,17 +1805,31 @@ class SpatioTemporalSpectraNS:
         return tspectra
 
     def save_temporal_spectra(
-        self, tmin=0, tmax=None, dtype=None, save_urud=False
+        self,
+        tmin=0,
+        tmax=None,
+        dtype=None,
+        save_urud=False,
+        nperseg=None,
+        noverlap=None,
     ):
         """compute temporal spectra from files"""
         if tmax is None:
             tmax = self.sim.params.time_stepping.t_end
 
         tspectra = self.compute_temporal_spectra(
-            tmin=tmin, tmax=tmax, dtype=dtype, compute_urud=save_urud
+            tmin=tmin,
+            tmax=tmax,
+            dtype=dtype,
+            compute_urud=save_urud,
+            nperseg=nperseg,
+            noverlap=noverlap,
         )
 
-        path_file = self._get_path_saved_tspectra(tmin, tmax, dtype, save_urud)
+        kwargs_welch = _get_kwargs_welch(nperseg, noverlap)
+        path_file = self._get_path_saved_tspectra(
+            tmin, tmax, dtype, save_urud, **kwargs_welch
+        )
         with h5py.File(path_file, "w") as file:
             file.attrs["tmin"] = tmin
             file.attrs["tmax"] = tmax
@@ -13,8 +13,14 @@ Provides:
    :members:
    :private-members:
 
+.. autoclass:: OnlineWelch
+   :members:
+
+.. autofunction:: get_spectrum_onesided
+
 """
 
+from functools import partial
 from pathlib import Path
 from logging import warn
 
@@ -27,11 +33,94 @@ from rich.progress import Progress, track
 from fluiddyn.util import mpi
 from fluidsim.base.output.base import SpecificOutput
 from fluidsim.base.output.spatiotemporal_spectra import (
+    compute_spectra_welch,
     filter_tmins_paths,
     get_arange_minmax,
+    load_times_from_files,
 )
 
 
+def get_spectrum_onesided(spectrum):
+    """Fold the negative frequencies of a two-sided spectrum (last axis)
+
+    The frequencies are ordered as with ``np.fft.fftfreq``. For an even
+    number of frequencies, the Nyquist frequency is kept once.
+
+    """
+    nfreqs = spectrum.shape[-1]
+    nomega = nfreqs // 2 + 1
+    spectrum_onesided = spectrum[..., :nomega].copy()
+    # bins having a distinct opposite frequency
+    nfold = (nfreqs + 1) // 2
+    spectrum_onesided[..., 1:nfold] += spectrum[..., -1:-nfold:-1]
+    return spectrum_onesided
+
+
+class OnlineWelch:
+    """Accumulate the spectra of overlapping windowed segments (sliding Welch)
+
+    The last ``nperseg`` samples of the probes are kept in a ring buffer.
+    Each time ``nperseg - noverlap`` new samples have been added (and the
+    buffer is full), the (two-sided) spectral densities of the segment are
+    added to ``sums`` (sum over the segments and over the probes).
+
+    Parameters
+    ----------
+
+    nb_keys, nb_probes : int
+
+      Number of fields and number of probes.
+
+    nperseg, noverlap : int
+
+      Number of samples per segment and number of overlapping samples.
+
+    window : str
+
+      Window (see ``scipy.signal.get_window``).
+
+    f_sample : float
+
+      Sampling frequency.
+
+    """
+
+    def __init__(self, nb_keys, nb_probes, nperseg, noverlap, window, f_sample):
+        if not 0 <= noverlap < nperseg:
+            raise ValueError("noverlap has to be in [0, nperseg)")
+        self.nperseg = nperseg
+        self.step = nperseg - noverlap
+        self.buffer = np.zeros((nb_keys, nb_probes, nperseg))
+        self.window = signal.get_window(window, nperseg)
+        # density scaling (as scipy.signal.welch) divided by 2 pi (omega)
+        self.coef_norm = 1.0 / (2 * pi * f_sample * (self.window ** 2).sum())
+        self.sums = np.zeros((nb_keys, nperseg))
+        self.nb_samples = 0
+        self.nb_segments = 0
+
+    def add_sample(self, values):
+        """Add one sample (sequence of arrays of shape ``(nb_probes,)``)
+
+        Returns True if a new segment has been added to the sums.
+
+        """
+        index = self.nb_samples % self.nperseg
+        for ikey, values_key in enumerate(values):
+            self.buffer[ikey, :, index] = values_key
+        self.nb_samples += 1
+        if (
+            self.nb_samples < self.nperseg
+            or (self.nb_samples - self.nperseg) % self.step
+        ):
+            return False
+        # oldest sample first
+        indices = (index + 1 + np.arange(self.nperseg)) % self.nperseg
+        data = self.buffer[:, :, indices] * self.window
+        self.sums += (abs(np.fft.fft(data)) ** 2).sum(1) * self.coef_norm
+        self.nb_segments += 1
+        return True
+
+
 class TemporalSpectra3D(SpecificOutput):
     """
     Computes the temporal spectra.
@@ -62,6 +151,41 @@ class TemporalSpectra3D(SpecificOutput):
             attribs=attribs,
         )
 
+        params.output.temporal_spectra._set_child(
+            "online",
+            attribs={
+                "enable": False,
+                "nperseg": 64,
+                "noverlap": None,
+                "window": "hann",
+            },
+        )
+        params.output.temporal_spectra.online._set_doc(
+            """
+enable: bool (default False)
+
+    If True, the raw time series of the probes are not saved. The spectra are
+    computed during the simulation with the Welch method (overlapping windowed
+    segments) and the averaged spectra are written in the file
+    ``probes/spectra_online.h5`` after each segment.
+
+nperseg: int (default 64)
+
+    Number of samples per segment (one sample every
+    ``params.output.periods_save.temporal_spectra``).
+
+noverlap: int or None (default None)
+
+    Number of overlapping samples of consecutive segments (if None,
+    ``nperseg // 2``).
+
+window: str (default "hann")
+
+    Window applied to the segments (see ``scipy.signal.get_window``).
+
+"""
+        )
+
         params.output.temporal_spectra._set_doc(
             """
             probes_deltax, probes_deltay and probes_deltaz: float (default: 0.1)
@@ -123,6 +247,15 @@ class TemporalSpectra3D(SpecificOutput):
         if self.period_save == 0.0:
             return
 
+        try:
+            params_online = params_tspec.online
+        except AttributeError:
+            # parameters of old simulations
+            self.online_enable = False
+        else:
+            self.online_enable = params_online.enable
+        self._online_welch = None
+
         if params_tspec.probes_region is not None:
             self.probes_region = params_tspec.probes_region
             if self.nb_dim == 3:
@@ -289,9 +422,12 @@ class TemporalSpectra3D(SpecificOutput):
             self.index_file = 0
             self.number_times_in_file = 0
             self.t_last_save = -self.period_save
-            if self.probes_nb_loc > 0:
+            if self.probes_nb_loc > 0 and not self.online_enable:
                 self._init_new_file(tmin_file=self.sim.time_stepping.t)
 
+        if self.online_enable:
+            self._init_online_welch(params_online)
+
         # size of a single write: nb_fields * probes_nb_loc + time
         probes_write_size = (
             len(self.keys_fields) * self.probes_nb_loc + 1
@@ -304,6 +440,41 @@ class TemporalSpectra3D(SpecificOutput):
         # we don't want to do anything when this function is called.
         pass
 
+    def _init_online_welch(self, params_online):
+        """Initialize the online computation of the spectra"""
+        nperseg = params_online.nperseg
+        noverlap = params_online.noverlap
+        if noverlap is None:
+            noverlap = nperseg // 2
+        self._online_welch = OnlineWelch(
+            len(self.keys_fields),
+            self.probes_nb_loc,
+            nperseg,
+            noverlap,
+            params_online.window,
+            1.0 / self.period_save,
+        )
+        self._online_window = params_online.window
+        self.path_file_online = self.path_dir / "spectra_online.h5"
+
+        # sums of a previous simulation (only used by the process 0)
+        self._online_sums_previous = 0.0
+        self._online_nb_segments_previous = 0
+        self._online_tmin = self.sim.time_stepping.t
+        if self.path_file_online.exists():
+            with h5py.File(self.path_file_online, "r") as file:
+                attrs = file.attrs
+                if attrs["nperseg"] != nperseg or attrs["noverlap"] != noverlap:
+                    raise ValueError(
+                        "nperseg and noverlap are different from the file "
+                        f"{self.path_file_online}"
+                    )
+                self.t_last_save = attrs["t_last_sample"]
+                self._online_tmin = attrs["tmin"]
+                if mpi.rank == 0:
+                    self._online_sums_previous = file["sums"][...]
+                    self._online_nb_segments_previous = attrs["nb_segments"]
+
     def _init_new_file(self, tmin_file=None):
         """Initializes a new file"""
         if tmin_file is not None:
@@ -369,6 +540,9 @@ class TemporalSpectra3D(SpecificOutput):
 
     def _online_save(self):
         """Prepares data and writes to file"""
+        if self._online_welch is not None:
+            self._online_save_welch()
+            return
         if self.probes_nb_loc > 0:
             tsim = self.sim.time_stepping.t
             if (
@@ -389,6 +563,75 @@ class TemporalSpectra3D(SpecificOutput):
                 self._write_to_file(data)
                 self.t_last_save = tsim
 
+    def _online_save_welch(self):
+        """Adds a sample to the online spectra and writes them if needed"""
+        tsim = self.sim.time_stepping.t
+        if (
+            tsim + 1e-15
+        ) // self.period_save <= self.t_last_save // self.period_save:
+            return
+        self.t_last_save = tsim
+        values = [
+            self._get_data_probe_from_field(self.sim.state.get_var(key))
+            for key in self.keys_fields
+        ]
+        # same value for all processes (collective operations below)
+        if self._online_welch.add_sample(values):
+            self._write_online_spectra()
+
+    def _write_online_spectra(self):
+        """Reduces the sums of the processes and writes the spectra"""
+        welch = self._online_welch
+        sums = welch.sums
+        nb_probes = self.probes_nb_loc
+        if mpi.nb_proc > 1:
+            sums = mpi.comm.reduce(sums, op=mpi.MPI.SUM, root=0)
+            nb_probes = mpi.comm.reduce(nb_probes, op=mpi.MPI.SUM, root=0)
+        if mpi.rank > 0:
+            return
+
+        sums = sums + self._online_sums_previous
+        nb_segments = welch.nb_segments + self._online_nb_segments_previous
+        if nb_probes == 0:
+            warn("No probes: the online spectra are not written")
+            return
+        nperseg = welch.nperseg
+        nomega = nperseg // 2 + 1
+        omegas = 2 * pi * abs(np.fft.fftfreq(nperseg, self.period_save))
+        spectra = get_spectrum_onesided(sums) / (nb_segments * nb_probes)
+
+        with h5py.File(self.path_file_online, "w") as file:
+            file.attrs["nperseg"] = nperseg
+            file.attrs["noverlap"] = nperseg - welch.step
+            file.attrs["window"] = self._online_window
+            file.attrs["nb_segments"] = nb_segments
+            file.attrs["nb_probes"] = nb_probes
+            file.attrs["tmin"] = self._online_tmin
+            file.attrs["t_last_sample"] = self.t_last_save
+            file.attrs["period_save"] = self.period_save
+            file.create_dataset("omegas", data=omegas[:nomega])
+            file.create_dataset("sums", data=sums)
+            for key, spectrum in zip(self.keys_fields, spectra):
+                file.create_dataset(f"spectrum_{key}", data=spectrum)
+
+    def load_spectra_online(self):
+        """Loads the spectra computed during the simulation
+
+        The energy spectra "spectrum_K" and "spectrum_A" are computed as with
+        :func:`compute_spectra`.
+
+        """
+        path_file = self.path_dir / "spectra_online.h5"
+        spectra = {}
+        with h5py.File(path_file, "r") as file:
+            for key, value in file.items():
+                if key != "sums":
+                    spectra[key] = value[...]
+            for key, value in file.attrs.items():
+                spectra[key] = value
+        self._add_energy_spectra(spectra)
+        return spectra
+
     def load_time_series(
         self, keys=None, region=None, tmin=0, tmax=None, dtype=None
     ):
@@ -425,24 +668,10 @@ class TemporalSpectra3D(SpecificOutput):
             tmin, tmins_files, paths_1st_rank
         )
 
-        with Progress() as progress:
-            npaths = len(paths_1st_rank)
-            task_files = progress.add_task(
-                "Getting times from rank 0...", total=npaths
-            )
-
-            times = []
-            for ip, path in enumerate(paths_1st_rank):
-                with h5py.File(path, "r") as file:
-                    if tmins_files[ip] > tmax:
-                        progress.update(task_files, completed=npaths)
-                        break
-                    times_file = file["times"][:]
-                    cond_times = (times_file >= tmin) & (times_file <= tmax)
-                    times.append(times_file[cond_times])
-                    progress.update(task_files, advance=1)
-
-        times = np.concatenate(times)
+        npaths = len(paths_1st_rank)
+        times = load_times_from_files(
+            tmins_files, paths_1st_rank, tmin, tmax, False
+        )
 
         tmin = times.min()
         tmax = times.max()
@@ -475,13 +704,21 @@ class TemporalSpectra3D(SpecificOutput):
 
                 # for a given rank, paths are sorted by time
                 data = {f"probes_{k}_loc": [] for k in keys}
-                for path_file in paths_rank:
-                    # break after the last useful file
-                    if tmins_files[ip] > tmax:
+                for ip, path_file in enumerate(paths_rank):
+                    # break after the last useful file (the times in the
+                    # names of the files are rounded)
+                    if tmins_files[ip] > tmax + 1e-3:
                         progress.update(task_files, completed=npaths)
                         break
 
                     with h5py.File(path_file, "r") as file:
+                        times_file = file["times"][:]
+                        if times_file[-1] < tmin or times_file[0] > tmax:
+                            progress.update(task_files, advance=1)
+                            continue
+                        its_file = get_arange_minmax(times_file, tmin, tmax)
+                        slice_file = slice(its_file[0], its_file[-1] + 1)
+
                         probes_x = file["probes_x_loc"][:]
                         probes_y = file["probes_y_loc"][:]
                         probes_z = file["probes_z_loc"][:]
@@ -504,11 +741,9 @@ class TemporalSpectra3D(SpecificOutput):
 
                         for key in keys:
                             skey = f"probes_{key}_loc"
-                            tmp = file[skey][cond_region, :]
-
-                            times_file = file["times"][:]
-                            its_file = get_arange_minmax(times_file, tmin, tmax)
-                            data[skey].append(tmp[:, its_file])
+                            data[skey].append(
+                                file[skey][cond_region, slice_file]
+                            )
 
                     # update rich task
                     progress.update(task_files, advance=1)
@@ -523,13 +758,52 @@ class TemporalSpectra3D(SpecificOutput):
         series["times"] = times
         return series
 
-    def _compute_spectrum(self, data):
+    def load_times(self, tmin=0, tmax=None):
+        """load the times of the time series (between tmin and tmax)"""
+        if tmax is None:
+            tmax = self.sim.params.time_stepping.t_end
+        paths = sorted(self.path_dir.glob("rank*.h5"))
+        # files of the first rank
+        paths_1st_rank = [
+            p for p in paths if p.name.startswith(paths[0].name[:9])
+        ]
+        tmins_files = np.array([float(p.name[14:-3]) for p in paths_1st_rank])
+        tmins_files, paths_1st_rank = filter_tmins_paths(
+            tmin, tmins_files, paths_1st_rank
+        )
+        return load_times_from_files(
+            tmins_files, paths_1st_rank, tmin, tmax, False
+        )
+
+    def _get_path_cache_welch(self, region, nperseg, noverlap, window, dtype):
+        base = (
+            "welch_"
+            + "_".join(str(x) for x in region)
+            + f"_{nperseg}_{noverlap}_{window}"
+        )
+        if dtype is not None:
+            base += f"_{dtype}"
+        return self.path_dir / base
+
+    def _compute_spectrum(self, data, window="boxcar"):
         if not hasattr(self, "f_sample"):
             paths = sorted(self.path_dir.glob("rank*.h5"))
             with h5py.File(paths[0], "r") as file:
                 self.f_sample = 1.0 / file.attrs["period_save"]
-            self.domega = 2 * pi * self.f_sample / data.shape[-1]
 
+        if window != "boxcar":
+            # density scaling so that the energy is conserved on average
+            freq, spectrum = signal.periodogram(
+                data,
+                fs=self.f_sample,
+                window=window,
+                scaling="density",
+                detrend=False,
+                return_onesided=False,
+            )
+            return freq, spectrum / (2 * pi)
+
+        domega = 2 * pi * self.f_sample / data.shape[-1]
         # TODO: I'm not sure if detrend=False is good in prod, but it's much
         # better for testing
         freq, spectrum = signal.periodogram(
@@ -539,15 +813,51 @@ class TemporalSpectra3D(SpecificOutput):
             detrend=False,
             return_onesided=False,
         )
-        return freq, spectrum / self.domega
+        return freq, spectrum / domega
+
+    def compute_spectra(
+        self,
+        region=None,
+        tmin=0,
+        tmax=None,
+        dtype=None,
+        nperseg=None,
+        noverlap=None,
+        window=None,
+    ):
+        """compute temporal spectra from files
 
-    def compute_spectra(self, region=None, tmin=0, tmax=None, dtype=None):
-        """compute temporal spectra from files"""
+        With ``nperseg``, the spectra are computed with the Welch method and
+        the spectra of the segments are cached (see
+        ``SpatioTemporalSpectra3D.compute_spectra``).
+
+        """
         if region is None:
             region = self._get_default_region()
         if tmax is None:
             tmax = self.sim.params.time_stepping.t_end
 
+        if nperseg is not None:
+            if noverlap is None:
+                noverlap = nperseg // 2
+            if window is None:
+                window = "hann"
+            spectra = compute_spectra_welch(
+                self.load_times(tmin, tmax),
+                partial(
+                    self.compute_spectra, region, dtype=dtype, window=window
+                ),
+                nperseg,
+                noverlap,
+                self._get_path_cache_welch(
+                    region, nperseg, noverlap, window, dtype
+                ),
+            )
+            spectra.update({"region": region, "tmin": tmin, "tmax": tmax})
+            return spectra
+        if window is None:
+            window = "boxcar"
+
         spectra = {"region": region, "tmin": tmin, "tmax": tmax}
 
         # load data
@@ -559,21 +869,20 @@ class TemporalSpectra3D(SpecificOutput):
         for key in series.keys():
             if key.startswith("probes_"):
                 freq, spectrum = self._compute_spectrum(
-                    np.concatenate(series[key])
+                    np.concatenate(series[key]), window
                 )
                 spectrum = spectrum.mean(0)
-                # get one-sided spectra
-                nomega = freq.size // 2 + 1
-                spectrum_onesided = np.zeros(nomega)
-                spectrum_onesided[0] = spectrum[0]
-                spectrum_onesided[1:] = (
-                    spectrum[1:nomega] + spectrum[-1:-nomega:-1]
+                spectra["spectrum_" + key[7:-4]] = get_spectrum_onesided(
+                    spectrum
                 )
 
-                spectra["spectrum_" + key[7:-4]] = spectrum_onesided
-
-        spectra["omegas"] = 2 * pi * freq[:nomega]
+        nomega = freq.size // 2 + 1
+        spectra["omegas"] = 2 * pi * abs(freq[:nomega])
+        self._add_energy_spectra(spectra)
+        return spectra
 
+    def _add_energy_spectra(self, spectra):
+        """Adds the kinetic and potential energy spectra to a dict"""
         # total kinetic energy
         if self.nb_dim == 3:
             spectra["spectrum_K"] = 0.5 * (
@@ -593,8 +902,6 @@ class TemporalSpectra3D(SpecificOutput):
         except AttributeError:
             pass
 
-        return spectra
-
     def _get_default_region(self):
         p_oper = self.sim.params.oper
         return (0, p_oper.Lx, 0, p_oper.Ly, 0, p_oper.Lz)
@@ -795,15 +1102,29 @@ class TemporalSpectra3D(SpecificOutput):
                 # sim info
                 self.sim.info._save_as_hdf5(hdf5_parent=file)
 
-    def _get_path_saved_spectra(self, region, tmin, tmax, dtype):
+    def _get_path_saved_spectra(
+        self, region, tmin, tmax, dtype, nperseg=None, noverlap=None
+    ):
         base = (
             "periodogram_" + "_".join(str(x) for x in region) + f"_{tmin}_{tmax}"
         )
         if dtype is not None:
             base += f"_{dtype}"
+        if nperseg is not None:
+            if noverlap is None:
+                noverlap = nperseg // 2
+            base += f"_welch{nperseg}_{noverlap}"
         return self.path_dir / (base + ".h5")
 
-    def save_spectra(self, region=None, tmin=0, tmax=None, dtype=None):
+    def save_spectra(
+        self,
+        region=None,
+        tmin=0,
+        tmax=None,
+        dtype=None,
+        nperseg=None,
+        noverlap=None,
+    ):
         """compute temporal spectra from files"""
         if region is None:
             region = self._get_default_region()
@@ -811,10 +1132,17 @@ class TemporalSpectra3D(SpecificOutput):
             tmax = self.sim.params.time_stepping.t_end
 
         spectra = self.compute_spectra(
-            region=region, tmin=tmin, tmax=tmax, dtype=dtype
+            region=region,
+            tmin=tmin,
+            tmax=tmax,
+            dtype=dtype,
+            nperseg=nperseg,
+            noverlap=noverlap,
         )
 
-        path_file = self._get_path_saved_spectra(region, tmin, tmax, dtype)
+        path_file = self._get_path_saved_spectra(
+            region, tmin, tmax, dtype, nperseg, noverlap
+        )
         with h5py.File(path_file, "w") as file:
             file.attrs["region"] = region
             file.attrs["tmin"] = tmin
@@ -824,7 +1152,15 @@ class TemporalSpectra3D(SpecificOutput):
 
         return spectra
 
-    def load_spectra(self, region=None, tmin=0, tmax=None, dtype=None):
+    def load_spectra(
+        self,
+        region=None,
+        tmin=0,
+        tmax=None,
+        dtype=None,
+        nperseg=None,
+        noverlap=None,
+    ):
         """load temporal spectra from file"""
         if region is None:
             region = self._get_default_region()
@@ -833,7 +1169,9 @@ class TemporalSpectra3D(SpecificOutput):
 
         spectra = {"region": region, "tmin": tmin, "tmax": tmax}
 
-        path_file = self._get_path_saved_spectra(region, tmin, tmax, dtype)
+        path_file = self._get_path_saved_spectra(
+            region, tmin, tmax, dtype, nperseg, noverlap
+        )
         with h5py.File(path_file, "r") as file:
             for key in file.keys():
                 spectra[key] = file[key][...]
@@ -63,7 +63,7 @@ class StateBase:
         self.state_phys = SetOfVariables(
             keys=self.keys_state_phys,
             shape_variable=self.oper.shapeX_loc,
-            dtype=np.float64,
+            dtype=getattr(self.oper, "dtype_real", np.float64),
             info="state_phys",
         )
         self.vars_computed = {}
@@ -244,7 +244,7 @@ class StatePseudoSpectral(StateBase):
         self.state_spect = SetOfVariables(
             keys=self.keys_state_spect,
             shape_variable=self.oper.shapeK_loc,
-            dtype=np.complex128,
+            dtype=getattr(self.oper, "dtype_complex", np.complex128),
             info="state_spect",
         )
 
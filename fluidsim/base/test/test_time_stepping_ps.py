@@ -0,0 +1,86 @@
+import unittest
+
+import numpy as np
+
+from fluidsim.base.time_stepping.pseudo_spect import (
+    call_fused_kernel,
+    compute_coefs_adams_bashforth,
+    rk4_step0_fused,
+    rk4_step0_numpy,
+    rk4_step1_fused,
+    rk4_step1_numpy,
+    rk4_step2_fused,
+    rk4_step2_numpy,
+    rk4_step3_fused,
+    rk4_step3_numpy,
+)
+
+
+def _random_complex(shape):
+    return np.random.rand(*shape) + 1j * np.random.rand(*shape)
+
+
+class TestFusedKernelsRK4(unittest.TestCase):
+    def _check(self, shape_diss, dtype_diss):
+        shape = (3, 4, 5)
+        dt = 0.1
+        state = _random_complex(shape)
+        tendencies = _random_complex(shape)
+        diss = np.random.rand(*shape_diss).astype(dtype_diss)
+        diss2 = np.random.rand(*shape_diss).astype(dtype_diss)
+
+        for kernel_fused, kernel_numpy, coefs in (
+            (rk4_step0_fused, rk4_step0_numpy, (diss, diss2)),
+            (rk4_step1_fused, rk4_step1_numpy, (diss2,)),
+            (rk4_step2_fused, rk4_step2_numpy, (diss, diss2)),
+        ):
+            outputs = [_random_complex(shape) for _ in range(2)]
+            outputs_numpy = [out.copy() for out in outputs]
+            call_fused_kernel(
+                kernel_fused, state, (state, tendencies, *outputs), coefs, (dt,)
+            )
+            kernel_numpy(state, tendencies, *coefs, dt, *outputs_numpy)
+            for out, out_numpy in zip(outputs, outputs_numpy):
+                self.assertTrue(np.allclose(out, out_numpy))
+
+        state_tmp = _random_complex(shape)
+        state_numpy = state.copy()
+        call_fused_kernel(
+            rk4_step3_fused, state, (state, tendencies, state_tmp), (), (dt,)
+        )
+        rk4_step3_numpy(state_numpy, tendencies, dt, state_tmp)
+        self.assertTrue(np.allclose(state, state_numpy))
+
+    def test_diss_like_state(self):
+        self._check((3, 4, 5), np.float64)
+
+    def test_diss_broadcast(self):
+        self._check((4, 5), np.float64)
+
+    def test_diss_complex(self):
+        self._check((3, 4, 5), np.complex128)
+
+
+class TestAdamsBashforth(unittest.TestCase):
+    def test_coefs_constant_dt(self):
+        dt = 0.1
+        self.assertTrue(np.allclose(compute_coefs_adams_bashforth(dt, []), [1]))
+        self.assertTrue(
+            np.allclose(compute_coefs_adams_bashforth(dt, [dt]), [1.5, -0.5])
+        )
+        self.assertTrue(
+            np.allclose(
+                compute_coefs_adams_bashforth(dt, [dt, dt]),
+                np.array([23, -16, 5]) / 12,
+            )
+        )
+
+    def test_coefs_variable_dt(self):
+        dt = 0.1
+        ratio = 0.5
+        coefs = compute_coefs_adams_bashforth(dt, [dt / ratio])
+        self.assertTrue(np.allclose(coefs, [1 + ratio / 2, -ratio / 2]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import json
+import os
+from threading import Barrier, Thread
+
+import fluiddyn.util.mpi as mpi
+
+from fluidsim.base.time_stepping.timers import Timers
+from fluidsim.util.testing import TestSimul, classproperty, skip_if_no_fluidfft
+
+
+class TestTimers(unittest.TestCase):
+    def test_nested(self):
+        timers = Timers()
+        func = timers.wrap("func", lambda x: 2 * x)
+        with timers("func"):
+            self.assertEqual(func(1), 2)
+        self.assertEqual(func(2), 4)
+        timer = timers("func")
+        self.assertEqual(timer.count, 2)
+        self.assertGreater(timer.duration, 0.0)
+
+        stats = timers.gather()
+        if mpi.rank == 0:
+            self.assertEqual(stats["func"]["count"], 2)
+            self.assertIn("func", timers.format_summary())
+
+    def test_threads(self):
+        timers = Timers()
+        timer = timers("func")
+        nb_threads = 4
+        barrier = Barrier(nb_threads)
+
+        def func():
+            with timer:
+                # all threads are inside the timer at the same time
+                barrier.wait()
+                with timer:
+                    pass
+
+        threads = [Thread(target=func) for _ in range(nb_threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(timer.count, nb_threads)
+        with timer:
+            pass
+        self.assertEqual(timer.count, nb_threads + 1)
+
+    def test_disabled(self):
+        timers = Timers(enable=False)
+
+        def func():
+            pass
+
+        self.assertIs(timers.wrap("func", func), func)
+        with timers("func"):
+            pass
+        self.assertEqual(timers.get_local_results(), {})
+
+
+@skip_if_no_fluidfft
+class TestSimulTimers(TestSimul):
+    @classproperty
+    def Simul(cls):
+        from fluidsim.solvers.ns2d.solver import Simul
+
+        return Simul
+
+    @classmethod
+    def init_params(cls):
+        super().init_params()
+        params = cls.params
+        params.short_name_type_run = "test_timers"
+        params.oper.nx = params.oper.ny = 16
+        params.init_fields.type = "noise"
+        params.time_stepping.it_end = 6
+        params.time_stepping.timers.period_save = 0.2
+        params.output.periods_save.spatial_means = 0.1
+
+    def test_timers(self):
+        sim = self.sim
+        sim.time_stepping.start()
+        if mpi.rank > 0:
+            return
+
+        path_file = os.path.join(sim.output.path_run, "timers.jsonl")
+        with open(path_file) as file:
+            lines = file.readlines()
+        self.assertGreater(len(lines), 1)
+        data = json.loads(lines[-1])
+        self.assertEqual(data["it"], sim.time_stepping.it)
+        stats = data["timers"]
+        for name in (
+            "one_time_step",
+            "one_time_step_computation",
+            "tendencies_nonlin",
+            "ifft",
+            "output.spatial_means._online_save",
+        ):
+            self.assertGreater(stats[name]["count"], 0)
+        self.assertEqual(stats["one_time_step"]["count"], sim.time_stepping.it)
+
+
+if __name__ == "__main__":
+    unittest.main()
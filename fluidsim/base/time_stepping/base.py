@@ -13,6 +13,7 @@ Provides:
 
 """
 
+import os
 from signal import signal
 from warnings import warn
 from math import pi
@@ -21,6 +22,8 @@ from time import time
 
 from fluiddyn.util import mpi
 
+from .timers import Timers
+
 
 def max_abs(arr):
     return max(abs(arr.min()), abs(arr.max()))
@@ -69,7 +72,16 @@ USE_CFL: bool (default False)
 
 type_time_scheme: str (default "RK4")
 
-    Type of time scheme. Can be in ("RK2", "RK4").
+    Type of time scheme. Can be in ("RK2", "RK4"). Pseudo-spectral solvers
+    also support ("Euler", "Euler_phaseshift", "Euler_phaseshift_random",
+    "RK2_trapezoid", "RK2_phaseshift", "RK2_phaseshift_random",
+    "RK2_phaseshift_exact", "RK3_low_storage", "RK4_low_storage", "AB2",
+    "AB3", "AB2_phaseshift", "AB3_phaseshift", "RK3_adaptive",
+    "RK4_adaptive"). The low storage schemes need only one array in addition
+    to the state and the tendencies. The Adams-Bashforth schemes ("AB*") need
+    only one evaluation of the nonlinear terms per time step. For the adaptive
+    schemes, the time step is computed from an estimation of the local error
+    (see ``params.time_stepping.adaptive``).
 
 deltat0: float (default 0.2)
 
@@ -90,6 +102,30 @@ max_elapsed: number or str (default None)
     than `max_elapsed`. Can be a number (in seconds) or a string (formated as
     "%H:%M:%S").
 
+"""
+        )
+
+        params.time_stepping._set_child(
+            "timers", attribs={"enable": True, "period_save": 0.0}
+        )
+        params.time_stepping.timers._set_doc(
+            """
+
+See :mod:`fluidsim.base.time_stepping.timers`.
+
+enable: bool (default True)
+
+    If True, measure the time spent in the different phases of the time
+    stepping (CFL condition, forcing, outputs, nonlinear terms, FFTs, ...). A
+    summary is printed at the end of the simulation and, if the outputs are
+    saved, the statistics are appended in the file ``timers.jsonl``.
+
+period_save: float (default 0.)
+
+    Period (in equation time) to save the statistics of the timers during the
+    simulation. If 0, the statistics are only saved at the end of the
+    simulation.
+
 """
         )
 
@@ -136,6 +172,55 @@ max_elapsed: number or str (default None)
         else:
             self.max_elapsed = None
 
+        self._init_timers()
+
+    def _init_timers(self):
+        try:
+            params_timers = self.params.time_stepping.timers
+        except AttributeError:
+            # parameters of old simulations
+            enable = False
+            self.period_save_timers = 0.0
+        else:
+            enable = params_timers.enable
+            self.period_save_timers = params_timers.period_save
+
+        self.timers = Timers(enable)
+        self._t_last_save_timers = self.t
+        if not enable:
+            return
+
+        # the functions of the solver and of the operator are replaced by
+        # timed functions
+        sim = self.sim
+        sim.tendencies_nonlin = self.timers.wrap(
+            "tendencies_nonlin", sim.tendencies_nonlin
+        )
+        oper = getattr(sim, "oper", None)
+        for name_timer, names_func in (
+            ("fft", ("fft", "fft_as_arg", "fft_many")),
+            (
+                "ifft",
+                ("ifft", "ifft_as_arg", "ifft_as_arg_destroy", "ifft_many"),
+            ),
+            ("wait_transforms", ("wait_transforms",)),
+        ):
+            for name_func in names_func:
+                func = getattr(oper, name_func, None)
+                if func is not None:
+                    setattr(oper, name_func, self.timers.wrap(name_timer, func))
+
+    def save_timers(self):
+        """Save the statistics of the timers (collective operation)"""
+        if not self.timers.enable or not self.sim.output._has_to_save:
+            return
+        self._t_last_save_timers = self.t
+        self.timers.save(
+            os.path.join(self.sim.output.path_run, "timers.jsonl"),
+            t=self.t,
+            it=self.it,
+        )
+
     def start(self):
         """Loop to run the function :func:`one_time_step`.
 
@@ -202,10 +287,39 @@ max_elapsed: number or str (default None)
 
     def one_time_step(self):
         """Main time stepping function."""
+        with self.timers("one_time_step"):
+            self._one_time_step()
+        if (
+            self.period_save_timers
+            and self.t - self._t_last_save_timers >= self.period_save_timers
+        ):
+            self.save_timers()
+
+    def _adapt_time_increment(self):
+        """Modify the time increment before computing the forcing.
+
+        Used by the adaptive time schemes (nothing by default).
+
+        """
+
+    def _one_time_step_computation(self):
+        """Call :func:`one_time_step_computation`.
+
+        The solvers override ``one_time_step_computation``. This wrapper can be
+        overridden by the time stepping classes to do something around it.
+
+        """
+        self.one_time_step_computation()
+
+    def _one_time_step(self):
+        timers = self.timers
         if self.params.time_stepping.USE_CFL:
-            self.compute_time_increment_CLF()
+            with timers("compute_time_increment_CLF"):
+                self.compute_time_increment_CLF()
+        self._adapt_time_increment()
         if self.sim.is_forcing_enabled:
-            self.sim.forcing.compute()
+            with timers("forcing"):
+                self.sim.forcing.compute()
         if self.max_elapsed is not None:
             if mpi.rank == 0:
                 now = time()
@@ -218,8 +332,10 @@ max_elapsed: number or str (default None)
                     "Maximum elapsed time reached. Should stop soon."
                 )
                 self._has_to_stop = True
-        self.sim.output.one_time_step()
-        self.one_time_step_computation()
+        with timers("output"):
+            self.sim.output.one_time_step()
+        with timers("one_time_step_computation"):
+            self._one_time_step_computation()
         self.t += self.deltat
         self.it += 1
 
@@ -237,6 +353,12 @@ class TimeSteppingBase(TimeSteppingBase0):
                 for scheme in ["RK2", "Euler"]
             ):
                 self.CFL = 0.4
+            elif params_ts.type_time_scheme.startswith("AB2"):
+                self.CFL = 0.2
+            elif params_ts.type_time_scheme.startswith("AB3"):
+                self.CFL = 0.25
+            elif params_ts.type_time_scheme.startswith("RK3"):
+                self.CFL = 0.6
             elif params_ts.type_time_scheme.startswith("RK4"):
                 self.CFL = 1.0
             else:
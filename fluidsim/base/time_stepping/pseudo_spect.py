@@ -7,12 +7,14 @@ Provides:
    :members:
    :private-members:
 
+.. autofunction:: compute_coefs_adams_bashforth
+
 .. todo::
 
-  It would be interesting to also implement the Adams-Bashforth (leapfrog)
-  scheme with phase-shifting. It is very close to
-  :func:`_time_step_RK2_phaseshift` with 2 evaluations of the non-linear terms
-  per time step (but with 2 symmetrical and equivalent steps).
+  It would be interesting to also implement the leapfrog scheme with
+  phase-shifting. It is very close to :func:`_time_step_RK2_phaseshift` with 2
+  evaluations of the non-linear terms per time step (but with 2 symmetrical
+  and equivalent steps).
 
 .. note::
 
@@ -22,18 +24,24 @@ Provides:
 
 """
 from random import randint
+import tracemalloc
 
 import numpy as np
 
-from transonic import Transonic, Type, NDim, Array, boost, Union
+from transonic import Transonic, Type, NDim, Array, boost
+
+from fluiddyn.util import mpi
+
+from fluidsim import _is_testing
 
 from .base import TimeSteppingBase
 
 ts = Transonic()
 
+# state in double or single precision (params.oper.precision)
+Tc = Type(np.complex128, np.complex64)
+
 N = NDim(2, 3, 4)
-A = Array[np.complex128, N, "C"]
-Am1 = Array[np.complex128, N - 1, "C"]
 
 N123 = NDim(1, 2, 3)
 A123c = Array[np.complex128, N123, "C"]
@@ -42,48 +50,130 @@ A123f = Array[np.float64, N123, "C"]
 T = Type(np.float64, np.complex128)
 A1 = Array[T, N, "C"]
 A2 = Array[T, N - 1, "C"]
-ArrayDiss = Union[A1, A2]
+
+Ac1d = Array[Tc, "1d", "C"]
+ADiss1d = Array[T, "1d", "C"]
 
 uniform = np.random.default_rng().uniform
 
 
 @boost
-def step_Euler(
-    state_spect: A, dt: float, tendencies: A, diss: ArrayDiss, output: A
+def step_Euler_fused(
+    state_spect: Ac1d,
+    tendencies: Ac1d,
+    diss: ADiss1d,
+    dt: float,
+    output: Ac1d,
 ):
-    output[:] = (state_spect + dt * tendencies) * diss
-    return output
+    for i in range(state_spect.size):
+        output[i] = (state_spect[i] + dt * tendencies[i]) * diss[i]
 
 
 @boost
-def step_Euler_inplace(state_spect: A, dt: float, tendencies: A, diss: ArrayDiss):
-    step_Euler(state_spect, dt, tendencies, diss, state_spect)
+def step_like_RK2_fused(
+    state_spect: Ac1d,
+    tendencies: Ac1d,
+    diss: ADiss1d,
+    diss2: ADiss1d,
+    dt: float,
+    output: Ac1d,
+):
+    for i in range(state_spect.size):
+        output[i] = state_spect[i] * diss[i] + dt * diss2[i] * tendencies[i]
 
 
 @boost
-def step_like_RK2(
-    state_spect: A, dt: float, tendencies: A, diss: ArrayDiss, diss2: ArrayDiss
+def mean_with_phaseshift_fused(
+    tendencies_0: Ac1d,
+    tendencies_1_shift: Ac1d,
+    phaseshift: ADiss1d,
+    output: Ac1d,
 ):
-    state_spect[:] = state_spect * diss + dt * diss2 * tendencies
+    for i in range(tendencies_0.size):
+        output[i] = 0.5 * (
+            tendencies_0[i] + tendencies_1_shift[i] / phaseshift[i]
+        )
 
 
 @boost
-def mean_with_phaseshift(
-    tendencies_0: A, tendencies_1_shift: A, phaseshift: Am1, output: A
+def mul_fused(state_spect: Ac1d, phaseshift: ADiss1d, output: Ac1d):
+    for i in range(state_spect.size):
+        output[i] = phaseshift[i] * state_spect[i]
+
+
+@boost
+def div_fused(arr: Ac1d, phaseshift: ADiss1d, output: Ac1d):
+    for i in range(arr.size):
+        output[i] = arr[i] / phaseshift[i]
+
+
+def step_Euler_numpy(state_spect, tendencies, diss, dt, output):
+    output[:] = (state_spect + dt * tendencies) * diss
+
+
+def step_like_RK2_numpy(state_spect, tendencies, diss, diss2, dt, output):
+    output[:] = state_spect * diss + dt * diss2 * tendencies
+
+
+def mean_with_phaseshift_numpy(
+    tendencies_0, tendencies_1_shift, phaseshift, output
 ):
     output[:] = 0.5 * (tendencies_0 + tendencies_1_shift / phaseshift)
+
+
+def mul_numpy(state_spect, phaseshift, output):
+    np.multiply(phaseshift, state_spect, out=output)
+
+
+def div_numpy(arr, phaseshift, output):
+    np.divide(arr, phaseshift, out=output)
+
+
+def step_Euler(state_spect, dt, tendencies, diss, output):
+    """Euler step (written in ``output``, which can be ``state_spect``)"""
+    call_fused_kernel(
+        step_Euler_fused,
+        state_spect,
+        (state_spect, tendencies, output),
+        (diss,),
+        (dt,),
+    )
     return output
 
 
-@boost
-def mul(phaseshift: Am1, state_spect: A, output: A):
-    output[:] = phaseshift * state_spect
+def step_Euler_inplace(state_spect, dt, tendencies, diss):
+    step_Euler(state_spect, dt, tendencies, diss, state_spect)
+
+
+def step_like_RK2(state_spect, dt, tendencies, diss, diss2):
+    call_fused_kernel(
+        step_like_RK2_fused,
+        state_spect,
+        (state_spect, tendencies, state_spect),
+        (diss, diss2),
+        (dt,),
+    )
+
+
+def mean_with_phaseshift(tendencies_0, tendencies_1_shift, phaseshift, output):
+    call_fused_kernel(
+        mean_with_phaseshift_fused,
+        tendencies_0,
+        (tendencies_0, tendencies_1_shift, output),
+        (phaseshift,),
+    )
     return output
 
 
-@boost
-def div_inplace(arr: A, phaseshift: Am1):
-    arr /= phaseshift
+def mul(phaseshift, state_spect, output):
+    call_fused_kernel(
+        mul_fused, state_spect, (state_spect, output), (phaseshift,), nb_inputs=1
+    )
+    return output
+
+
+def div_inplace(arr, phaseshift):
+    call_fused_kernel(div_fused, arr, (arr, arr), (phaseshift,), nb_inputs=1)
     return arr
 
 
@@ -99,6 +189,402 @@ def compute_phaseshift_terms(
     return phaseshift_alpha, phaseshift_beta
 
 
+@boost
+def rk4_step0_fused(
+    state_spect: Ac1d,
+    tendencies_0: Ac1d,
+    diss: ADiss1d,
+    diss2: ADiss1d,
+    dt: float,
+    state_spect_tmp: Ac1d,
+    state_spect_12_approx1: Ac1d,
+):
+    for i in range(state_spect.size):
+        state = state_spect[i]
+        tendency = tendencies_0[i]
+        state_spect_tmp[i] = (state + dt / 6 * tendency) * diss[i]
+        state_spect_12_approx1[i] = (state + dt / 2 * tendency) * diss2[i]
+
+
+@boost
+def rk4_step1_fused(
+    state_spect: Ac1d,
+    tendencies_1: Ac1d,
+    diss2: ADiss1d,
+    dt: float,
+    state_spect_tmp: Ac1d,
+    state_spect_12_approx2: Ac1d,
+):
+    for i in range(state_spect.size):
+        tendency = tendencies_1[i]
+        coef = diss2[i]
+        state_spect_tmp[i] += dt / 3 * coef * tendency
+        state_spect_12_approx2[i] = state_spect[i] * coef + dt / 2 * tendency
+
+
+@boost
+def rk4_step2_fused(
+    state_spect: Ac1d,
+    tendencies_2: Ac1d,
+    diss: ADiss1d,
+    diss2: ADiss1d,
+    dt: float,
+    state_spect_tmp: Ac1d,
+    state_spect_1_approx: Ac1d,
+):
+    for i in range(state_spect.size):
+        tendency_diss2 = diss2[i] * tendencies_2[i]
+        state_spect_tmp[i] += dt / 3 * tendency_diss2
+        state_spect_1_approx[i] = state_spect[i] * diss[i] + dt * tendency_diss2
+
+
+@boost
+def rk4_step3_fused(
+    state_spect: Ac1d, tendencies_3: Ac1d, dt: float, state_spect_tmp: Ac1d
+):
+    for i in range(state_spect.size):
+        state_spect[i] = state_spect_tmp[i] + dt / 6 * tendencies_3[i]
+
+
+def rk4_step0_numpy(
+    state_spect,
+    tendencies_0,
+    diss,
+    diss2,
+    dt,
+    state_spect_tmp,
+    state_spect_12_approx1,
+):
+    state_spect_tmp[:] = (state_spect + dt / 6 * tendencies_0) * diss
+    state_spect_12_approx1[:] = (state_spect + dt / 2 * tendencies_0) * diss2
+
+
+def rk4_step1_numpy(
+    state_spect, tendencies_1, diss2, dt, state_spect_tmp, state_spect_12_approx2
+):
+    state_spect_tmp[:] += dt / 3 * diss2 * tendencies_1
+    state_spect_12_approx2[:] = state_spect * diss2 + dt / 2 * tendencies_1
+
+
+def rk4_step2_numpy(
+    state_spect,
+    tendencies_2,
+    diss,
+    diss2,
+    dt,
+    state_spect_tmp,
+    state_spect_1_approx,
+):
+    state_spect_tmp[:] += dt / 3 * diss2 * tendencies_2
+    state_spect_1_approx[:] = state_spect * diss + dt * diss2 * tendencies_2
+
+
+def rk4_step3_numpy(state_spect, tendencies_3, dt, state_spect_tmp):
+    state_spect[:] = state_spect_tmp + dt / 6 * tendencies_3
+
+
+@boost
+def step_AB2_fused(
+    state_spect: Ac1d,
+    tendencies: Ac1d,
+    diss: ADiss1d,
+    coef0: float,
+    coef1: float,
+    dt: float,
+    tendencies_1: Ac1d,
+):
+    for i in range(state_spect.size):
+        tendency = tendencies[i]
+        exact = diss[i]
+        state_spect[i] = (
+            state_spect[i] + dt * (coef0 * tendency + coef1 * tendencies_1[i])
+        ) * exact
+        tendencies_1[i] = tendency * exact
+
+
+@boost
+def step_AB3_fused(
+    state_spect: Ac1d,
+    tendencies: Ac1d,
+    diss: ADiss1d,
+    coef0: float,
+    coef1: float,
+    coef2: float,
+    dt: float,
+    tendencies_1: Ac1d,
+    tendencies_2: Ac1d,
+):
+    for i in range(state_spect.size):
+        tendency = tendencies[i]
+        tendency_1 = tendencies_1[i]
+        exact = diss[i]
+        state_spect[i] = (
+            state_spect[i]
+            + dt
+            * (coef0 * tendency + coef1 * tendency_1 + coef2 * tendencies_2[i])
+        ) * exact
+        tendencies_2[i] = tendency * exact
+        tendencies_1[i] = tendency_1 * exact
+
+
+def step_AB2_numpy(
+    state_spect, tendencies, diss, coef0, coef1, dt, tendencies_1
+):
+    state_spect[:] = (
+        state_spect + dt * (coef0 * tendencies + coef1 * tendencies_1)
+    ) * diss
+    tendencies_1[:] = tendencies * diss
+
+
+def step_AB3_numpy(
+    state_spect,
+    tendencies,
+    diss,
+    coef0,
+    coef1,
+    coef2,
+    dt,
+    tendencies_1,
+    tendencies_2,
+):
+    state_spect[:] = (
+        state_spect
+        + dt
+        * (coef0 * tendencies + coef1 * tendencies_1 + coef2 * tendencies_2)
+    ) * diss
+    tendencies_2[:] = tendencies * diss
+    tendencies_1[:] = tendencies_1 * diss
+
+
+@boost
+def step_low_storage_fused(
+    state_spect: Ac1d,
+    tendencies: Ac1d,
+    exact: ADiss1d,
+    coef_a: float,
+    coef_b: float,
+    dt: float,
+    state_spect_delta: Ac1d,
+):
+    for i in range(state_spect.size):
+        delta = coef_a * state_spect_delta[i] + dt * tendencies[i]
+        state_spect[i] = (state_spect[i] + coef_b * delta) * exact[i]
+        state_spect_delta[i] = delta * exact[i]
+
+
+def step_low_storage_numpy(
+    state_spect, tendencies, exact, coef_a, coef_b, dt, state_spect_delta
+):
+    # in-place operations (no temporary arrays)
+    state_spect_delta *= coef_a / dt
+    state_spect_delta += tendencies
+    state_spect_delta *= dt
+    state_spect_delta *= exact
+    state_spect *= exact
+    state_spect_delta *= coef_b
+    state_spect += state_spect_delta
+    state_spect_delta /= coef_b
+
+
+@boost
+def rk3_bs_step1_fused(
+    state_spect: Ac1d,
+    tendencies_1: Ac1d,
+    coef: ADiss1d,
+    coef2: ADiss1d,
+    dt: float,
+    state_spect_stage: Ac1d,
+):
+    for i in range(state_spect.size):
+        state_spect_stage[i] = coef[i] * (
+            coef2[i] * state_spect[i] + 3 * dt / 4 * tendencies_1[i]
+        )
+
+
+@boost
+def rk3_bs_step2_fused(
+    state_spect: Ac1d,
+    tendencies_0: Ac1d,
+    coef: ADiss1d,
+    coef2: ADiss1d,
+    coef4: ADiss1d,
+    dt: float,
+    tendencies_1: Ac1d,
+    tendencies_2: Ac1d,
+    state_spect_new: Ac1d,
+):
+    for i in range(state_spect.size):
+        tendency_0 = coef4[i] * tendencies_0[i]
+        tendency_1 = coef2[i] * tendencies_1[i]
+        tendency_2 = coef[i] * tendencies_2[i]
+        state_spect_new[i] = coef4[i] * state_spect[i] + dt * (
+            2 / 9 * tendency_0 + 1 / 3 * tendency_1 + 4 / 9 * tendency_2
+        )
+        # error without the term in tendencies_3
+        tendencies_2[i] = dt * (
+            -5 / 72 * tendency_0 + 1 / 12 * tendency_1 + 1 / 9 * tendency_2
+        )
+
+
+@boost
+def rk3_bs_step3_fused(error: Ac1d, tendencies_3: Ac1d, dt: float):
+    for i in range(error.size):
+        error[i] -= dt / 8 * tendencies_3[i]
+
+
+def rk3_bs_step1_numpy(
+    state_spect, tendencies_1, coef, coef2, dt, state_spect_stage
+):
+    state_spect_stage[:] = coef * (
+        coef2 * state_spect + 3 * dt / 4 * tendencies_1
+    )
+
+
+def rk3_bs_step2_numpy(
+    state_spect,
+    tendencies_0,
+    coef,
+    coef2,
+    coef4,
+    dt,
+    tendencies_1,
+    tendencies_2,
+    state_spect_new,
+):
+    state_spect_new[:] = coef4 * state_spect + dt * (
+        2 / 9 * coef4 * tendencies_0
+        + 1 / 3 * coef2 * tendencies_1
+        + 4 / 9 * coef * tendencies_2
+    )
+    tendencies_2[:] = dt * (
+        -5 / 72 * coef4 * tendencies_0
+        + 1 / 12 * coef2 * tendencies_1
+        + 1 / 9 * coef * tendencies_2
+    )
+
+
+def rk3_bs_step3_numpy(error, tendencies_3, dt):
+    error -= dt / 8 * tendencies_3
+
+
+if not ts.is_transpiling and not ts.is_compiled and not _is_testing:
+    # for example if Pythran is not available
+    rk4_step0_fused = rk4_step0_numpy
+    rk4_step1_fused = rk4_step1_numpy
+    rk4_step2_fused = rk4_step2_numpy
+    rk4_step3_fused = rk4_step3_numpy
+    step_low_storage_fused = step_low_storage_numpy
+    step_AB2_fused = step_AB2_numpy
+    step_AB3_fused = step_AB3_numpy
+    rk3_bs_step1_fused = rk3_bs_step1_numpy
+    rk3_bs_step2_fused = rk3_bs_step2_numpy
+    rk3_bs_step3_fused = rk3_bs_step3_numpy
+    step_Euler_fused = step_Euler_numpy
+    step_like_RK2_fused = step_like_RK2_numpy
+    mean_with_phaseshift_fused = mean_with_phaseshift_numpy
+    mul_fused = mul_numpy
+    div_fused = div_numpy
+
+
+def _flat_view(arr):
+    """Return a 1d view (never a copy) of a C-contiguous array."""
+    flat = arr.view(np.ndarray)
+    flat.shape = (arr.size,)
+    return flat
+
+
+def call_fused_kernel(
+    kernel, state_spect, arrays, coefs, scalars=(), nb_inputs=2
+):
+    """Call a fused kernel variable by variable on 1d views.
+
+    The kernel is called as ``kernel(*inputs, *coefs, *scalars, *outputs)``,
+    where ``arrays = (*inputs, *outputs)`` are shaped like ``state_spect``
+    (with ``len(inputs) == nb_inputs``). The coefficients can be shaped like
+    ``state_spect`` or like one of its variables (then they are used for all
+    variables).
+
+    """
+    ndim = state_spect.ndim
+    for ik in range(state_spect.shape[0]):
+        views = [_flat_view(arr[ik]) for arr in arrays]
+        coefs_ik = [
+            _flat_view(coef[ik] if coef.ndim == ndim else coef)
+            for coef in coefs
+        ]
+        kernel(*views[:nb_inputs], *coefs_ik, *scalars, *views[nb_inputs:])
+
+
+# coefficients (A, B, C) of the 2N-storage Runge-Kutta schemes:
+# - RK3_low_storage: Williamson (1980), 3 stages, 3rd order
+# - RK4_low_storage: Carpenter & Kennedy (1994), 5 stages, 4th order
+# (no comments inside the literal: they break the transonic analysis)
+coefs_low_storage = {
+    "RK3_low_storage": (
+        (0.0, -5 / 9, -153 / 128),
+        (1 / 3, 15 / 16, 8 / 15),
+        (0.0, 1 / 3, 3 / 4),
+    ),
+    "RK4_low_storage": (
+        (
+            0.0,
+            -567301805773 / 1357537059087,
+            -2404267990393 / 2016746695238,
+            -3550918686646 / 2091501179385,
+            -1275806237668 / 842570457699,
+        ),
+        (
+            1432997174477 / 9575080441755,
+            5161836677717 / 13612068292357,
+            1720146321549 / 2090206949498,
+            3134564353537 / 4481467310338,
+            2277821191437 / 14882151754819,
+        ),
+        (
+            0.0,
+            1432997174477 / 9575080441755,
+            2526269341429 / 6820363962896,
+            2006345519317 / 3224310063776,
+            2802321613138 / 2924317926251,
+        ),
+    ),
+}
+
+
+def compute_coefs_adams_bashforth(dt, deltats_previous):
+    """Compute the coefficients of a variable step Adams-Bashforth scheme.
+
+    Parameters
+    ----------
+
+    dt : float
+      The time increment of the step.
+
+    deltats_previous : sequence of float
+      The time increments of the previous steps (the most recent first). Its
+      length gives the order of the scheme minus one.
+
+    Returns
+    -------
+
+    coefs : list of float
+      The coefficients of the tendencies (the most recent first), such that
+      the increment of the step is ``dt * sum(coefs[i] * tendencies[i])``.
+
+    """
+    times = [0.0]
+    for deltat in deltats_previous:
+        times.append(times[-1] - deltat)
+
+    coefs = []
+    for index, time in enumerate(times):
+        # integral over the step of the Lagrange polynomial of the node index
+        poly = np.atleast_1d(np.poly(times[:index] + times[index + 1 :]))
+        integral = np.polyval(np.polyint(poly), dt)
+        coefs.append(float(integral / (dt * np.polyval(poly, time))))
+    return coefs
+
+
 class ExactLinearCoefs:
     """Handle the computation of the exact coefficient for the RK4."""
 
@@ -165,6 +651,59 @@ class TimeSteppingPseudoSpectral(TimeSteppingBase):
             attribs=dict(nb_pairs=1, nb_steps_compute_new_pair=None),
         )
 
+        params.time_stepping._set_child(
+            "adaptive",
+            attribs=dict(
+                tolerance=1e-4, safety=0.9, factor_min=0.2, factor_max=5.0
+            ),
+        )
+        params.time_stepping.adaptive._set_doc(
+            """
+Parameters of the adaptive time schemes ("RK3_adaptive" and "RK4_adaptive"),
+for which the time step is computed from an estimation of the local error.
+
+tolerance: float (default 1e-4)
+
+    Relative tolerance for the local error (normalized by the norm of the
+    state).
+
+safety: float (default 0.9)
+
+    Safety factor used to compute the time step.
+
+factor_min: float (default 0.2)
+
+    Minimum ratio between two consecutive time steps.
+
+factor_max: float (default 5.0)
+
+    Maximum ratio between two consecutive time steps.
+
+"""
+        )
+
+        params.time_stepping._set_child(
+            "check_allocations", attribs=dict(enable=False, max_nb_bytes=None)
+        )
+        params.time_stepping.check_allocations._set_doc(
+            """
+Debug mode to check that the time steps do not allocate large arrays.
+
+enable: bool (default False)
+
+    If True, the memory allocated during each time step is measured with
+    :mod:`tracemalloc` (peak of the traced memory, stored in the attribute
+    ``nb_bytes_allocated`` of the time stepping object). Tracing the
+    allocations slows down the simulation.
+
+max_nb_bytes: int or None (default None)
+
+    If not None, a ValueError is raised when more memory is allocated during
+    one time step.
+
+"""
+        )
+
     def __init__(self, sim):
         super().__init__(sim)
         self.init_from_params()
@@ -174,6 +713,7 @@ class TimeSteppingPseudoSpectral(TimeSteppingBase):
         self._init_compute_time_step()
         self._init_exact_linear_coef()
         self._init_time_scheme()
+        self._init_check_allocations()
 
     def _init_freq_lin(self):
         f_d, f_d_hypo = self.sim.compute_freq_diss()
@@ -191,8 +731,11 @@ class TimeSteppingPseudoSpectral(TimeSteppingBase):
 
         type_time_scheme = self.params.time_stepping.type_time_scheme
 
+        self._stage_buffers = []
+        self._tendencies_buffers = []
+        self.nb_steps_rejected = None
         if type_time_scheme.startswith("RK"):
-            self._state_spect_tmp = np.empty_like(self.sim.state.state_spect)
+            self._state_spect_tmp = self._get_stage_buffers(1)[0]
 
         if type_time_scheme.endswith("_random"):
             self._init_phaseshift_random()
@@ -216,13 +759,135 @@ class TimeSteppingPseudoSpectral(TimeSteppingBase):
         elif type_time_scheme == "RK2_phaseshift_exact":
             time_step_RK = self._time_step_RK2_phaseshift_exact
         elif type_time_scheme == "RK4":
-            self._state_spect_tmp1 = np.empty_like(self.sim.state.state_spect)
+            self._state_spect_tmp1 = self._get_stage_buffers(2)[1]
             time_step_RK = self._time_step_RK4
+        elif type_time_scheme.startswith("AB"):
+            self._init_adams_bashforth()
+            time_step_RK = self._time_step_adams_bashforth
+        elif type_time_scheme in ("RK3_adaptive", "RK4_adaptive"):
+            self._init_adaptive()
+            time_step_RK = self._time_step_adaptive
+        elif type_time_scheme in coefs_low_storage:
+            self._coefs_low_storage = coefs_low_storage[type_time_scheme]
+            self._state_spect_tmp.fill(0.0)
+            self._exacts_low_storage = [
+                np.empty_like(self.freq_lin) for _ in self._coefs_low_storage[0]
+            ]
+            self._dt_exacts_low_storage = None
+            time_step_RK = self._time_step_low_storage
         else:
             raise ValueError(f'Problem name time_scheme ("{type_time_scheme}")')
 
         self._time_step_RK = time_step_RK
 
+    def _init_adams_bashforth(self):
+        """Initialize the Adams-Bashforth schemes (history and buffers)."""
+        type_time_scheme = self.params.time_stepping.type_time_scheme
+        if type_time_scheme not in (
+            "AB2",
+            "AB3",
+            "AB2_phaseshift",
+            "AB3_phaseshift",
+        ):
+            raise ValueError(
+                f'Problem name time_scheme ("{type_time_scheme}")'
+            )
+
+        order = int(type_time_scheme[2])
+        self._use_phaseshift_adams_bashforth = type_time_scheme.endswith(
+            "_phaseshift"
+        )
+        buffers = self._get_stage_buffers(order + 1)
+        # used for the startup steps (RK2)
+        self._state_spect_tmp = buffers[0]
+        self._tendencies_adams_bashforth = buffers[1]
+        # previous tendencies (the most recent first) multiplied by the
+        # integrating factor up to the current time
+        self._tendencies_previous = buffers[2:]
+        self._deltats_previous = []
+
+    def _init_adaptive(self):
+        """Initialize the adaptive schemes (controller and buffers)."""
+        type_time_scheme = self.params.time_stepping.type_time_scheme
+        buffers = self._get_stage_buffers(6)
+        if type_time_scheme == "RK4_adaptive":
+            self._order_error_estimate = 3
+            self._state_spect_tmp1 = buffers[1]
+            self._buffers_embedded = buffers[2:]
+            self._time_step_embedded = self._time_step_embedded_RK4
+        else:
+            self._order_error_estimate = 2
+            self._buffers_embedded = buffers[1:]
+            self._time_step_embedded = self._time_step_embedded_RK3
+            # exp(-dt / 4 * freq_lin), updated only when dt changes
+            self._coef_quarter = np.empty_like(self.freq_lin)
+            self._deltat_coef_quarter = None
+        # first same as last: tendencies of the state of the end of the step
+        self._tendencies_fsal = None
+
+        self.nb_steps_rejected = 0
+        self.error_ratio = 0.0
+        self._error_ratio_previous = 1.0
+        self._deltat_next = self.params.time_stepping.deltat0
+
+        # the time step changes at each time step
+        coefs = self.exact_linear_coefs
+        coefs.get_updated_coefs = coefs.get_updated_coefs_CLF
+
+    def _get_stage_buffers(self, nb_buffers):
+        """Get preallocated arrays shaped like the spectral state.
+
+        The buffers are owned by the time stepping object and reused for all
+        time steps so that the time schemes do not allocate in the loop. The
+        first buffer is ``self._state_spect_tmp``.
+
+        """
+        buffers = self._stage_buffers
+        while len(buffers) < nb_buffers:
+            buffers.append(np.empty_like(self.sim.state.state_spect))
+        return buffers[:nb_buffers]
+
+    def _get_tendencies_buffers(self, nb_buffers):
+        """Get preallocated arrays for the nonlinear terms.
+
+        These buffers are given to ``sim.tendencies_nonlin`` (argument
+        ``old``) so that the nonlinear terms are computed without allocating
+        new arrays. They are distinct from the stage buffers.
+
+        """
+        buffers = self._tendencies_buffers
+        while len(buffers) < nb_buffers:
+            buffers.append(np.empty_like(self.sim.state.state_spect))
+        return buffers[:nb_buffers]
+
+    def _init_check_allocations(self):
+        """Initialize the debug mode checking the allocations."""
+        self.nb_bytes_allocated = None
+        params = self.params.time_stepping.check_allocations
+        if params.enable:
+            self.nb_bytes_allocated = 0
+
+    def _start_tracing_allocations(self):
+        """Start tracing the allocations (only during the time step)."""
+        self._tracemalloc_was_tracing = tracemalloc.is_tracing()
+        if self._tracemalloc_was_tracing:
+            # resets the traced memory and its peak
+            tracemalloc.clear_traces()
+        else:
+            tracemalloc.start()
+
+    def _check_allocations(self):
+        """Measure the memory allocated during the time step."""
+        self.nb_bytes_allocated = tracemalloc.get_traced_memory()[1]
+        if not self._tracemalloc_was_tracing:
+            tracemalloc.stop()
+        max_nb_bytes = self.params.time_stepping.check_allocations.max_nb_bytes
+        if max_nb_bytes is not None and self.nb_bytes_allocated > max_nb_bytes:
+            raise ValueError(
+                f"{self.nb_bytes_allocated} bytes allocated during the time "
+                f"step it = {self.it} (max_nb_bytes = {max_nb_bytes})"
+            )
+
     def _compute_freq_complex(self):
         state_spect = self.sim.state.state_spect
         freq_complex = np.empty_like(state_spect)
@@ -233,13 +898,27 @@ class TimeSteppingPseudoSpectral(TimeSteppingBase):
     def _init_exact_linear_coef(self):
         self.exact_linear_coefs = ExactLinearCoefs(self)
 
+    def _one_time_step_computation(self):
+        """Call :func:`one_time_step_computation` (checking the allocations).
+
+        The allocations are checked here so that the solvers overriding
+        ``one_time_step_computation`` do not have to do it.
+
+        """
+        if self.nb_bytes_allocated is None:
+            self.one_time_step_computation()
+            return
+        self._start_tracing_allocations()
+        self.one_time_step_computation()
+        self._check_allocations()
+
     def one_time_step_computation(self):
         """One time step."""
         self._time_step_RK()
         self.sim.oper.dealiasing(self.sim.state.state_spect)
         self.sim.state.statephys_from_statespect()
-        # np.isnan(np.sum seems to be really fast
-        if np.isnan(np.sum(self.sim.state.state_spect[0])):
+        # np.isnan(np.sum seems to be really fast (1d view: no copy)
+        if np.isnan(np.sum(self.sim.state.state_spect[0].ravel())):
             raise ValueError(f"nan at it = {self.it}, t = {self.t:.4f}")
 
     def _time_step_Euler(self):
@@ -275,7 +954,7 @@ class TimeSteppingPseudoSpectral(TimeSteppingBase):
         compute_tendencies = self.sim.tendencies_nonlin
         state_spect = self.sim.state.state_spect
 
-        tendencies_0 = compute_tendencies()
+        tendencies_0 = compute_tendencies(old=self._get_tendencies_buffers(1)[0])
         step_Euler_inplace(state_spect, dt, tendencies_0, diss)
 
     def _get_phaseshift(self):
@@ -408,15 +1087,19 @@ class TimeSteppingPseudoSpectral(TimeSteppingBase):
         compute_tendencies = self.sim.tendencies_nonlin
         state_spect = self.sim.state.state_spect
 
+        tmp0, tmp1 = self._get_tendencies_buffers(2)
         # regular tendencies
-        tendencies_0 = compute_tendencies()
+        tendencies_0 = compute_tendencies(old=tmp0)
         # shifted tendencies
         phaseshift = self._get_phaseshift()
-        tendencies_shifted = (
-            compute_tendencies(phaseshift * state_spect) / phaseshift
+        state_spect_shift = mul(
+            phaseshift, state_spect, output=self._get_stage_buffers(1)[0]
         )
+        tendencies_shift = compute_tendencies(state_spect_shift, old=tmp1)
         # dealiased tendencies
-        tendencies_dealiased = 0.5 * (tendencies_0 + tendencies_shifted)
+        tendencies_dealiased = mean_with_phaseshift(
+            tendencies_0, tendencies_shift, phaseshift, output=tmp0
+        )
         step_Euler_inplace(state_spect, dt, tendencies_dealiased, diss)
 
     def _time_step_Euler_phaseshift_random(self):
@@ -455,19 +1138,25 @@ class TimeSteppingPseudoSpectral(TimeSteppingBase):
         compute_tendencies = self.sim.tendencies_nonlin
         state_spect = self.sim.state.state_spect
 
+        tmp0, tmp1 = self._get_tendencies_buffers(2)
+        buffer_shift = self._get_stage_buffers(1)[0]
         # shifted tendencies
         phaseshift_alpha, phaseshift_beta = self._get_phaseshift_random()
-        tendencies_alpha = (
-            compute_tendencies(phaseshift_alpha * state_spect) / phaseshift_alpha
+        state_spect_shift = mul(
+            phaseshift_alpha, state_spect, output=buffer_shift
         )
-        tendencies_beta = (
-            compute_tendencies(phaseshift_beta * state_spect) / phaseshift_beta
+        tendencies_alpha = div_inplace(
+            compute_tendencies(state_spect_shift, old=tmp0), phaseshift_alpha
         )
+        state_spect_shift = mul(phaseshift_beta, state_spect, output=buffer_shift)
+        tendencies_beta_shift = compute_tendencies(state_spect_shift, old=tmp1)
         # dealiased tendencies
-        tendencies_dealiased = 0.5 * (tendencies_alpha + tendencies_beta)
+        tendencies_dealiased = mean_with_phaseshift(
+            tendencies_alpha, tendencies_beta_shift, phaseshift_beta, output=tmp0
+        )
         step_Euler_inplace(state_spect, dt, tendencies_dealiased, diss)
 
-    def _time_step_RK2(self):
+    def _time_step_RK2(self, tendencies_0=None):
         r"""Runge-Kutta 2 method.
 
         Notes
@@ -507,7 +1196,10 @@ class TimeSteppingPseudoSpectral(TimeSteppingBase):
         compute_tendencies = self.sim.tendencies_nonlin
         state_spect = self.sim.state.state_spect
 
-        tendencies_0 = compute_tendencies()
+        if tendencies_0 is None:
+            tendencies_0 = compute_tendencies(
+                old=self._get_tendencies_buffers(1)[0]
+            )
 
         state_spect_12 = self._state_spect_tmp
         step_Euler(
@@ -558,16 +1250,17 @@ class TimeSteppingPseudoSpectral(TimeSteppingBase):
         compute_tendencies = self.sim.tendencies_nonlin
         state_spect = self.sim.state.state_spect
 
-        tendencies_0 = compute_tendencies()
+        tmp0, tmp1 = self._get_tendencies_buffers(2)
+        tendencies_0 = compute_tendencies(old=tmp0)
 
         state_spect_1 = self._state_spect_tmp
         step_Euler(state_spect, dt, tendencies_0, diss, output=state_spect_1)
 
-        tendencies_1 = compute_tendencies(state_spect_1)
+        tendencies_1 = compute_tendencies(state_spect_1, old=tmp1)
 
-        state_spect[:] = (
-            state_spect + dt / 2 * tendencies_0
-        ) * diss + dt / 2 * tendencies_1
+        step_Euler_inplace(state_spect, dt / 2, tendencies_0, diss)
+        tendencies_1 *= dt / 2
+        state_spect += tendencies_1
 
     def _time_step_RK2_phaseshift(self):
         r"""Runge-Kutta 2 method with phase-shifting.
@@ -617,25 +1310,21 @@ class TimeSteppingPseudoSpectral(TimeSteppingBase):
         compute_tendencies = self.sim.tendencies_nonlin
         state_spect = self.sim.state.state_spect
 
-        tendencies_0 = compute_tendencies()
+        tmp0, tmp1 = self._get_tendencies_buffers(2)
+        tendencies_0 = compute_tendencies(old=tmp0)
 
         state_spect_1 = self._state_spect_tmp
         step_Euler(state_spect, dt, tendencies_0, diss, output=state_spect_1)
 
         phaseshift = self._get_phaseshift()
-        tendencies_1_shift = compute_tendencies(phaseshift * state_spect_1)
+        state_spect_1_shift = mul(
+            phaseshift, state_spect_1, output=self._get_stage_buffers(2)[1]
+        )
+        tendencies_1_shift = compute_tendencies(state_spect_1_shift, old=tmp1)
 
-        tendencies_d = self._state_spect_tmp
-        if ts.is_transpiled:
-            ts.use_block("rk2_tendencies_d")
-        else:
-            # transonic block (
-            #     A tendencies_d, tendencies_0, tendencies_1_shift;
-            #     Am1 phaseshift;
-            # )
-            tendencies_d[:] = 0.5 * (
-                tendencies_0 + tendencies_1_shift / phaseshift
-            )
+        tendencies_d = mean_with_phaseshift(
+            tendencies_0, tendencies_1_shift, phaseshift, output=state_spect_1
+        )
 
         step_like_RK2(state_spect, dt, tendencies_d, diss, diss2)
 
@@ -684,11 +1373,12 @@ class TimeSteppingPseudoSpectral(TimeSteppingBase):
         compute_tendencies = self.sim.tendencies_nonlin
         state_spect = self.sim.state.state_spect
 
-        tmp0 = np.empty_like(state_spect)
-        state_spect_shift = mul(phaseshift_alpha, state_spect, output=tmp0)
-        tendencies_0_shift = compute_tendencies(
-            state_spect_shift, old=state_spect_shift
+        tmp0, tmp1 = self._get_tendencies_buffers(2)
+        buffer_shift = self._get_stage_buffers(2)[1]
+        state_spect_shift = mul(
+            phaseshift_alpha, state_spect, output=buffer_shift
         )
+        tendencies_0_shift = compute_tendencies(state_spect_shift, old=tmp0)
 
         tendencies_0 = div_inplace(tendencies_0_shift, phaseshift_alpha)
 
@@ -696,11 +1386,10 @@ class TimeSteppingPseudoSpectral(TimeSteppingBase):
             state_spect, dt, tendencies_0, diss, output=self._state_spect_tmp
         )
 
-        tmp1 = np.empty_like(state_spect)
-        state_spect_1_shift = mul(phaseshift_beta, state_spect_1, output=tmp1)
-        tendencies_1_shift = compute_tendencies(
-            state_spect_1_shift, old=state_spect_1_shift
+        state_spect_1_shift = mul(
+            phaseshift_beta, state_spect_1, output=buffer_shift
         )
+        tendencies_1_shift = compute_tendencies(state_spect_1_shift, old=tmp1)
 
         tendencies_d = mean_with_phaseshift(
             tendencies_0,
@@ -755,16 +1444,12 @@ class TimeSteppingPseudoSpectral(TimeSteppingBase):
         compute_tendencies = self.sim.tendencies_nonlin
         state_spect = self.sim.state.state_spect
 
-        tmp0 = np.empty_like(state_spect)
-        tmp1 = np.empty_like(state_spect)
-        tmp2 = np.empty_like(state_spect)
-        tmp3 = np.empty_like(state_spect)
+        tmp0, tmp1 = self._get_tendencies_buffers(2)
+        buffer_shift, tmp2, tmp3 = self._get_stage_buffers(4)[1:]
 
         tendencies_0 = compute_tendencies(state_spect, old=tmp0)
-        state_spect_shift = mul(phaseshift, state_spect, output=tmp1)
-        tendencies_0_shift = compute_tendencies(
-            state_spect_shift, old=state_spect_shift
-        )
+        state_spect_shift = mul(phaseshift, state_spect, output=buffer_shift)
+        tendencies_0_shift = compute_tendencies(state_spect_shift, old=tmp1)
         tendencies_d0 = mean_with_phaseshift(
             tendencies_0, tendencies_0_shift, phaseshift, output=tmp2
         )
@@ -774,29 +1459,19 @@ class TimeSteppingPseudoSpectral(TimeSteppingBase):
         )
 
         tendencies_1 = compute_tendencies(state_spect_1, old=tmp0)
-        state_spect_shift = mul(phaseshift, state_spect_1, output=tmp1)
-        tendencies_1_shift = compute_tendencies(
-            state_spect_shift, old=state_spect_shift
-        )
-
-        tendencies_d = tmp3
-        if ts.is_transpiled:
-            ts.use_block("rk2_exact")
-        else:
-            # based on approximation 1
-            # transonic block (
-            #     A tendencies_d, tendencies_d0, tendencies_1, tendencies_1_shift;
-            #     Am1 phaseshift
-            # )
+        state_spect_shift = mul(phaseshift, state_spect_1, output=buffer_shift)
+        tendencies_1_shift = compute_tendencies(state_spect_shift, old=tmp1)
 
-            tendencies_d[:] = 0.5 * (
-                tendencies_d0
-                + 0.5 * (tendencies_1 + tendencies_1_shift / phaseshift)
-            )
+        # based on approximation 1
+        tendencies_d = mean_with_phaseshift(
+            tendencies_1, tendencies_1_shift, phaseshift, output=tmp3
+        )
+        tendencies_d += tendencies_d0
+        tendencies_d *= 0.5
 
         step_like_RK2(state_spect, dt, tendencies_d, diss, diss2)
 
-    def _time_step_RK4(self):
+    def _time_step_RK4(self, tendencies_0=None):
         r"""Runge-Kutta 4 method.
 
         Notes
@@ -896,19 +1571,22 @@ class TimeSteppingPseudoSpectral(TimeSteppingBase):
         compute_tendencies = self.sim.tendencies_nonlin
         state_spect = self.sim.state.state_spect
 
-        tendencies_0 = compute_tendencies()
+        if tendencies_0 is None:
+            tendencies_0 = compute_tendencies(
+                old=self._get_tendencies_buffers(1)[0]
+            )
+        state_spect_tmp = self._state_spect_tmp
         state_spect_tmp1 = self._state_spect_tmp1
 
-        # rk4_step0
-        state_spect_tmp = step_Euler(
-            state_spect, dt / 6, tendencies_0, diss, output=self._state_spect_tmp
-        )
-        state_spect_12_approx1 = step_Euler(
+        # each stage is one pass over the state, the tendencies and the
+        # coefficients (see the ``rk4_step*_fused`` kernels)
+        state_spect_12_approx1 = state_spect_tmp1
+        call_fused_kernel(
+            rk4_step0_fused,
             state_spect,
-            dt / 2,
-            tendencies_0,
-            diss2,
-            output=state_spect_tmp1,
+            (state_spect, tendencies_0, state_spect_tmp, state_spect_12_approx1),
+            (diss, diss2),
+            (dt,),
         )
 
         tendencies_1 = compute_tendencies(
@@ -916,70 +1594,455 @@ class TimeSteppingPseudoSpectral(TimeSteppingBase):
         )
         del state_spect_12_approx1
 
+        # based on approximation 1
         state_spect_12_approx2 = state_spect_tmp1
-
-        if ts.is_transpiled:
-            ts.use_block("rk4_step1")
-        else:
-            # based on approximation 1
-            # transonic block (
-            #     A state_spect, state_spect_tmp,
-            #       state_spect_12_approx2, tendencies_1;
-            #     A1 diss2;
-            #     float dt
-            # )
-
-            # transonic block (
-            #     A state_spect, state_spect_tmp,
-            #       state_spect_12_approx2, tendencies_1;
-            #     A2 diss2;
-            #     float dt
-            # )
-
-            state_spect_tmp[:] += dt / 3 * diss2 * tendencies_1
-            state_spect_12_approx2[:] = (
-                state_spect * diss2 + dt / 2 * tendencies_1
-            )
+        call_fused_kernel(
+            rk4_step1_fused,
+            state_spect,
+            (state_spect, tendencies_1, state_spect_tmp, state_spect_12_approx2),
+            (diss2,),
+            (dt,),
+        )
 
         tendencies_2 = compute_tendencies(
             state_spect_12_approx2, old=tendencies_1
         )
         del state_spect_12_approx2
 
+        # based on approximation 2
         state_spect_1_approx = state_spect_tmp1
+        call_fused_kernel(
+            rk4_step2_fused,
+            state_spect,
+            (state_spect, tendencies_2, state_spect_tmp, state_spect_1_approx),
+            (diss, diss2),
+            (dt,),
+        )
 
-        if ts.is_transpiled:
-            ts.use_block("rk4_step2")
+        tendencies_3 = compute_tendencies(state_spect_1_approx, old=tendencies_2)
+        del state_spect_1_approx
+
+        # result using the 4 approximations
+        call_fused_kernel(
+            rk4_step3_fused,
+            state_spect,
+            (state_spect, tendencies_3, state_spect_tmp),
+            (),
+            (dt,),
+        )
+        return tendencies_3
+
+    def _time_step_low_storage(self):
+        r"""Low-storage (2N) Runge-Kutta methods with integrating factor.
+
+        Notes
+        -----
+
+        We consider an equation of the form
+
+        .. math:: \p_t S = \sigma S + N(S),
+
+        The 2N-storage Runge-Kutta methods (Williamson, 1980) only use one
+        array :math:`\Delta S` in addition to the state. For the stage
+        :math:`i`,
+
+        .. math::
+           \Delta S = A_i \Delta S + \dt N(S),
+
+        .. math:: S = S + B_i \Delta S.
+
+        The linear term is integrated exactly with the variable :math:`S
+        e^{-\sigma t}`: after each stage, :math:`S` and :math:`\Delta S` are
+        multiplied by :math:`e^{\sigma (c_{i+1} - c_i) \dt}`, where
+        :math:`c_i` is the time of the stage :math:`i` (with :math:`c_{s+1} =
+        1` for the last stage).
+
+        Two schemes are implemented: "RK3_low_storage" (Williamson, 3 stages,
+        3rd order) and "RK4_low_storage" (Carpenter & Kennedy, 5 stages, 4th
+        order).
+
+        """
+        dt = self.deltat
+        coefs_a, coefs_b, _ = self._coefs_low_storage
+        nb_stages = len(coefs_a)
+        exacts = self._get_exacts_low_storage(dt)
+
+        compute_tendencies = self.sim.tendencies_nonlin
+        state_spect = self.sim.state.state_spect
+        state_spect_delta = self._state_spect_tmp
+
+        tendencies = None
+        for index in range(nb_stages):
+            if index == 0:
+                tendencies = compute_tendencies(
+                    old=self._get_tendencies_buffers(1)[0]
+                )
+            else:
+                tendencies = compute_tendencies(state_spect, old=tendencies)
+            call_fused_kernel(
+                step_low_storage_fused,
+                state_spect,
+                (state_spect, tendencies, state_spect_delta),
+                (exacts[index],),
+                (coefs_a[index], coefs_b[index], dt),
+            )
+
+    def _get_exacts_low_storage(self, dt):
+        r"""Return the exact coefficients of the stages of the 2N-storage schemes
+
+        The coefficients :math:`e^{-\sigma (c_{i+1} - c_i) \dt}` are only
+        recomputed when the time increment changes.
+
+        """
+        if dt != self._dt_exacts_low_storage:
+            coefs_c = self._coefs_low_storage[2]
+            for exact, coef_c, coef_c_next in zip(
+                self._exacts_low_storage, coefs_c, coefs_c[1:] + (1.0,)
+            ):
+                exact[:] = np.exp(-(coef_c_next - coef_c) * dt * self.freq_lin)
+            self._dt_exacts_low_storage = dt
+        return self._exacts_low_storage
+
+    def _compute_tendencies_adams_bashforth(self):
+        """Compute the tendencies (phase-shifted one step out of two)."""
+        compute_tendencies = self.sim.tendencies_nonlin
+        buffer = self._tendencies_adams_bashforth
+
+        if not self._use_phaseshift_adams_bashforth or self.it % 2 == 0:
+            return compute_tendencies(old=buffer)
+
+        phaseshift = self._get_phaseshift()
+        # the input and the output of tendencies_nonlin have to be distinct
+        # (self._state_spect_tmp is only used afterwards by the startup steps)
+        state_spect_shift = mul(
+            phaseshift, self.sim.state.state_spect, output=self._state_spect_tmp
+        )
+        tendencies_shift = compute_tendencies(state_spect_shift, old=buffer)
+        return div_inplace(tendencies_shift, phaseshift)
+
+    def _time_step_adams_bashforth(self):
+        r"""Adams-Bashforth methods (2nd and 3rd order) with integrating factor.
+
+        Notes
+        -----
+
+        We consider an equation of the form
+
+        .. math:: \p_t S = \sigma S + N(S),
+
+        The Adams-Bashforth methods reuse the nonlinear terms of the previous
+        time steps so that only one evaluation of the nonlinear terms is
+        needed per time step. With the integrating factor, the scheme of order
+        :math:`p` reads
+
+        .. math::
+           S_{n+1} = e^{\sigma \dt_n} \left( S_n + \dt_n \sum_{j=0}^{p-1}
+           \beta_j e^{\sigma (t_n - t_{n-j})} N_{n-j} \right),
+
+        where the coefficients :math:`\beta_j` are computed at each time step
+        from the previous time increments (see
+        :func:`compute_coefs_adams_bashforth`), so that the scheme stays
+        consistent when the time step changes (for example with the CFL
+        condition). The previous nonlinear terms are stored already multiplied
+        by the integrating factor and updated during the time step.
+
+        The first :math:`p-1` time steps (startup) are computed with the RK2
+        method, which is accurate enough to keep the global order of the
+        scheme.
+
+        For the "_phaseshift" variants, the nonlinear terms are computed one
+        time step out of two on a phase-shifted grid (as in
+        :func:`_time_step_Euler_phaseshift`), so that the aliasing errors of
+        consecutive time steps are decorrelated. Since the Adams-Bashforth
+        weights of the two evaluations are not equal, the aliasing errors do
+        not cancel as for the phase-shifted Runge-Kutta schemes.
+
+        """
+        dt = self.deltat
+        diss = self.exact_linear_coefs.get_updated_coefs()[0]
+        state_spect = self.sim.state.state_spect
+
+        tendencies = self._compute_tendencies_adams_bashforth()
+
+        previous = self._tendencies_previous
+        deltats = self._deltats_previous
+        nb_previous = len(deltats)
+
+        if nb_previous < len(previous):
+            # startup
+            for index in range(nb_previous, 0, -1):
+                previous[index][:] = previous[index - 1] * diss
+            previous[0][:] = tendencies * diss
+            self._time_step_RK2(tendencies_0=tendencies)
         else:
-            # based on approximation 2
-            # transonic block (
-            #     A state_spect, state_spect_tmp,
-            #       state_spect_1_approx, tendencies_2;
-            #     A1 diss, diss2;
-            #     float dt
-            # )
+            coefs = compute_coefs_adams_bashforth(dt, deltats)
+            if len(previous) == 1:
+                kernel = step_AB2_fused
+            else:
+                kernel = step_AB3_fused
+            call_fused_kernel(
+                kernel,
+                state_spect,
+                (state_spect, tendencies, *previous),
+                (diss,),
+                (*coefs, dt),
+            )
+            # the most recent tendencies are now in the last buffer
+            previous.insert(0, previous.pop())
 
-            # transonic block (
-            #     A state_spect, state_spect_tmp,
-            #       state_spect_1_approx, tendencies_2;
-            #     A2 diss, diss2;
-            #     float dt
-            # )
+        deltats.insert(0, dt)
+        del deltats[len(previous) :]
+
+    def _compute_norm2(self, arr):
+        """Compute the square of the L2 norm of a spectral array."""
+        flat = _flat_view(arr)
+        result = np.vdot(flat, flat).real
+        if mpi.nb_proc > 1:
+            result = mpi.comm.allreduce(result, op=mpi.MPI.SUM)
+        return result
+
+    def _time_step_adaptive(self):
+        r"""Adaptive time step with an embedded Runge-Kutta pair.
+
+        Notes
+        -----
+
+        The time step is not computed from the CFL condition but from an
+        estimation of the local error :math:`E` given by an embedded scheme of
+        lower order :math:`\hat p`. A step is accepted if
+
+        .. math:: r = \frac{\|E\|}{\mathrm{tol} \|S_{\dt}\|} \leq 1,
+
+        where tol is ``params.time_stepping.adaptive.tolerance``. Otherwise,
+        the step is rejected and computed again with a smaller time step.
+        After an accepted step, the next time step is computed with a PI
+        controller:
+
+        .. math::
+           \dt_{n+1} = \dt_n \, s \, r_n^{-0.7 / (\hat p + 1)}
+           \, r_{n-1}^{0.4 / (\hat p + 1)},
+
+        where :math:`s` is a safety factor. If ``params.time_stepping.USE_CFL``
+        is True, the time step is also limited by the CFL condition. The number
+        of rejected steps is printed by the output print_stdout.
+
+        Two pairs (with integrating factor) are implemented:
+
+        - "RK3_adaptive": Bogacki-Shampine 3(2),
+
+        - "RK4_adaptive": the RK4 scheme (see :func:`_time_step_RK4`) with an
+          embedded 3rd order scheme using the nonlinear term of the final
+          state, which is reused for the next time step (first same as last).
+
+        """
+        params_adaptive = self.params.time_stepping.adaptive
+        exponent = 1.0 / (self._order_error_estimate + 1)
+
+        # computed before the forcing in _adapt_time_increment
+        dt = self.deltat
+        # reused if the step is rejected
+        tendencies_0 = self._get_tendencies_fsal()
+
+        nb_rejected = 0
+        while True:
+            error_ratio = self._time_step_embedded(dt, tendencies_0)
+            if error_ratio <= 1.0:
+                break
+            self.nb_steps_rejected += 1
+            nb_rejected += 1
+            if nb_rejected > 50:
+                raise ValueError(
+                    f"Too many rejected steps at it = {self.it}, "
+                    f"t = {self.t:.4f} (deltat = {dt:.4g})"
+                )
+            if np.isfinite(error_ratio):
+                factor = params_adaptive.safety * error_ratio ** (-exponent)
+            else:
+                factor = 0.0
+            dt *= max(params_adaptive.factor_min, factor)
+            self.deltat = dt
+            if self.sim.is_forcing_enabled:
+                # the forcing depends on the time increment (normalization)
+                self.sim.forcing.forcing_maker.compute()
+                tendencies_0 = self.sim.tendencies_nonlin(
+                    old=self._get_tendencies_buffers(1)[0]
+                )
+
+        self.error_ratio = error_ratio
+        error_ratio = max(error_ratio, 1e-10)
+        factor = (
+            params_adaptive.safety
+            * error_ratio ** (-0.7 * exponent)
+            * self._error_ratio_previous ** (0.4 * exponent)
+        )
+        factor = min(
+            params_adaptive.factor_max, max(params_adaptive.factor_min, factor)
+        )
+        self._deltat_next = dt * factor
+        self._error_ratio_previous = error_ratio
+
+    def _adapt_time_increment(self):
+        """Compute the time increment of the adaptive time schemes.
+
+        It is called before the computation of the forcing, which depends on
+        the time increment. The last time step ends exactly at ``t_end``.
+
+        """
+        if self.nb_steps_rejected is None:
+            return
+        params = self.params.time_stepping
+        dt = min(self._deltat_next, self.deltat_max)
+        if params.USE_CFL:
+            dt = min(dt, self.deltat)
+        if params.USE_T_END and self.t + dt > params.t_end:
+            dt = params.t_end - self.t
+        self.deltat = dt
+
+    def _get_error_ratio(self, error, state_spect_new):
+        norm2_error = self._compute_norm2(error)
+        norm2_state = self._compute_norm2(state_spect_new)
+        tolerance = self.params.time_stepping.adaptive.tolerance
+        if norm2_state == 0.0:
+            return 0.0 if norm2_error == 0.0 else np.inf
+        return np.sqrt(norm2_error / norm2_state) / tolerance
+
+    def _get_tendencies_fsal(self):
+        """Get the nonlinear terms of the current state.
+
+        The nonlinear terms computed at the end of the previous step are
+        reused if they are still valid (no forcing).
 
-            state_spect_tmp[:] += dt / 3 * diss2 * tendencies_2
-            state_spect_1_approx[:] = (
-                state_spect * diss + dt * diss2 * tendencies_2
+        """
+        tendencies = self._tendencies_fsal
+        self._tendencies_fsal = None
+        if tendencies is None or self.sim.is_forcing_enabled:
+            tendencies = self.sim.tendencies_nonlin(
+                old=self._get_tendencies_buffers(1)[0]
             )
+        return tendencies
 
-        tendencies_3 = compute_tendencies(state_spect_1_approx, old=tendencies_2)
-        del state_spect_1_approx
+    def _time_step_embedded_RK4(self, dt, tendencies_0):
+        """RK4 step with an embedded 3rd order scheme (returns the error ratio).
 
-        if ts.is_transpiled:
-            ts.use_block("rk4_step3")
+        The state is modified in place and restored if the step is rejected.
+        ``tendencies_0`` is not modified.
+
+        """
+        state_spect = self.sim.state.state_spect
+        (
+            state_spect_backup,
+            tendencies_stages,
+            buffer_a,
+            buffer_b,
+        ) = self._buffers_embedded
+        state_spect_backup[:] = state_spect
+
+        # the RK4 stages overwrite their input tendencies
+        tendencies_stages[:] = tendencies_0
+        tendencies_3 = self._time_step_RK4(tendencies_0=tendencies_stages)
+
+        # tendencies of the new state in a buffer not used by tendencies_0
+        buffer = buffer_b if tendencies_0 is buffer_a else buffer_a
+        tendencies_new = self.sim.tendencies_nonlin(state_spect, old=buffer)
+
+        # error = dt / 6 * (N(S_A3dt) - N(S_dt))
+        error = tendencies_3
+        error -= tendencies_new
+        error *= dt / 6
+        error_ratio = self._get_error_ratio(error, state_spect)
+
+        if error_ratio <= 1.0:
+            self._tendencies_fsal = tendencies_new
         else:
-            # result using the 4 approximations
-            # transonic block (
-            #     A state_spect, state_spect_tmp, tendencies_3;
-            #     float dt
-            # )
-            state_spect[:] = state_spect_tmp + dt / 6 * tendencies_3
+            state_spect[:] = state_spect_backup
+        return error_ratio
+
+    def _time_step_embedded_RK3(self, dt, tendencies_0):
+        r"""Bogacki-Shampine 3(2) step (returns the error ratio).
+
+        With :math:`q = e^{\sigma \dt / 4}` (Lawson integrating factor):
+
+        .. math::
+           S_1 = q^2 (S_0 + \frac{\dt}{2} N_0),
+
+        .. math::
+           S_2 = q^3 S_0 + \frac{3 \dt}{4} q N_1,
+
+        .. math::
+           S_\dt = q^4 S_0 + \dt \left( \frac{2}{9} q^4 N_0
+           + \frac{1}{3} q^2 N_1 + \frac{4}{9} q N_2 \right),
+
+        and the error is estimated with :math:`N_3 = N(S_\dt)` as
+
+        .. math::
+           E = \dt \left( -\frac{5}{72} q^4 N_0 + \frac{1}{12} q^2 N_1
+           + \frac{1}{9} q N_2 - \frac{1}{8} N_3 \right).
+
+        ``tendencies_0`` is not modified.
+
+        """
+        compute_tendencies = self.sim.tendencies_nonlin
+        state_spect = self.sim.state.state_spect
+        state_spect_stage = self._state_spect_tmp
+        (
+            tendencies_1_buffer,
+            tendencies_2_buffer,
+            state_spect_new,
+            buffer_a,
+            buffer_b,
+        ) = self._buffers_embedded
+
+        coef = self._coef_quarter
+        if dt != self._deltat_coef_quarter:
+            np.multiply(self.freq_lin, -dt / 4, out=coef)
+            np.exp(coef, out=coef)
+            self._deltat_coef_quarter = dt
+        # exp(-dt * freq_lin) and exp(-dt / 2 * freq_lin) (self.deltat == dt)
+        coef4, coef2 = self.exact_linear_coefs.get_updated_coefs()
+
+        step_Euler(
+            state_spect, dt / 2, tendencies_0, coef2, output=state_spect_stage
+        )
+        tendencies_1 = compute_tendencies(
+            state_spect_stage, old=tendencies_1_buffer
+        )
+
+        call_fused_kernel(
+            rk3_bs_step1_fused,
+            state_spect,
+            (state_spect, tendencies_1, state_spect_stage),
+            (coef, coef2),
+            (dt,),
+        )
+        tendencies_2 = compute_tendencies(
+            state_spect_stage, old=tendencies_2_buffer
+        )
+
+        # computes also the error without the term in tendencies_3
+        call_fused_kernel(
+            rk3_bs_step2_fused,
+            state_spect,
+            (
+                state_spect,
+                tendencies_0,
+                tendencies_1,
+                tendencies_2,
+                state_spect_new,
+            ),
+            (coef, coef2, coef4),
+            (dt,),
+        )
+        error = tendencies_2
+        # tendencies of the new state in a buffer not used by tendencies_0
+        buffer = buffer_b if tendencies_0 is buffer_a else buffer_a
+        tendencies_3 = compute_tendencies(state_spect_new, old=buffer)
+
+        call_fused_kernel(
+            rk3_bs_step3_fused, state_spect, (error, tendencies_3), (), (dt,)
+        )
+        error_ratio = self._get_error_ratio(error, state_spect_new)
+
+        if error_ratio <= 1.0:
+            state_spect[:] = state_spect_new
+            self._tendencies_fsal = tendencies_3
+        return error_ratio
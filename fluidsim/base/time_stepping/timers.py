@@ -0,0 +1,217 @@
+"""Timers of the time stepping (:mod:`fluidsim.base.time_stepping.timers`)
+=========================================================================
+
+Lightweight registry of timers used to measure the time spent in the
+different phases of the time stepping (CFL condition, forcing, outputs,
+nonlinear terms, FFTs, ...). The times are inclusive: for example, the time
+of the FFTs is also counted in the time of the nonlinear terms.
+
+The timers are enabled with ``params.time_stepping.timers.enable``. The
+statistics over the MPI processes (minimum, mean and maximum) are printed at
+the end of the simulation and saved in the file ``timers.jsonl`` (one JSON
+object per line) of the directory of the simulation.
+
+Provides:
+
+.. autoclass:: Timer
+   :members:
+
+.. autoclass:: Timers
+   :members:
+
+"""
+
+import json
+import threading
+from functools import wraps
+from time import perf_counter
+
+from fluiddyn.util import mpi
+
+
+class _TimerDisabled:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+_timer_disabled = _TimerDisabled()
+
+
+class Timer:
+    """Accumulate the time spent in one phase (used as a context manager)
+
+    Nested calls (for example an FFT function calling another FFT function)
+    are counted only once. A timer can be used by several threads (for
+    example the worker thread of ``params.oper.overlap_comm``): the nesting
+    depth is local to each thread.
+
+    """
+
+    __slots__ = ("name", "duration", "count", "_local", "_lock")
+
+    def __init__(self, name):
+        self.name = name
+        self.duration = 0.0
+        self.count = 0
+        # nesting depth and start time of the current thread
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        local = self._local
+        depth = getattr(local, "depth", 0)
+        if depth == 0:
+            local.t_start = perf_counter()
+        local.depth = depth + 1
+        return self
+
+    def __exit__(self, *args):
+        local = self._local
+        local.depth -= 1
+        if local.depth == 0:
+            duration = perf_counter() - local.t_start
+            with self._lock:
+                self.duration += duration
+                self.count += 1
+
+
+class Timers:
+    """Registry of timers
+
+    Parameters
+    ----------
+
+    enable : bool
+
+      If False, the timers do nothing.
+
+    """
+
+    def __init__(self, enable=True):
+        self.enable = enable
+        self._timers = {}
+
+    def __call__(self, name):
+        """Return the timer called ``name`` (created if needed)."""
+        if not self.enable:
+            return _timer_disabled
+        try:
+            return self._timers[name]
+        except KeyError:
+            timer = self._timers[name] = Timer(name)
+            return timer
+
+    def wrap(self, name, func):
+        """Return a function calling ``func`` inside the timer ``name``."""
+        if not self.enable:
+            return func
+
+        timer = self(name)
+
+        @wraps(func)
+        def func_timed(*args, **kwargs):
+            with timer:
+                return func(*args, **kwargs)
+
+        return func_timed
+
+    def get_local_results(self):
+        """Return the durations and the counts of the local process"""
+        return {
+            name: (timer.duration, timer.count)
+            for name, timer in self._timers.items()
+        }
+
+    def gather(self):
+        """Gather the results of all processes (collective operation)
+
+        Returns a dictionary ``{name: stats}`` (only for the process 0, None
+        for the others), where ``stats`` contains the keys "count", "min",
+        "mean", "max", "rank_min" and "rank_max".
+
+        """
+        results = self.get_local_results()
+        if mpi.nb_proc > 1:
+            results_ranks = mpi.comm.gather(results, root=0)
+        else:
+            results_ranks = [results]
+
+        if mpi.rank > 0:
+            return None
+
+        names = sorted(set().union(*results_ranks))
+        stats = {}
+        for name in names:
+            durations = [
+                results_rank.get(name, (0.0, 0))[0]
+                for results_rank in results_ranks
+            ]
+            counts = [
+                results_rank.get(name, (0.0, 0))[1]
+                for results_rank in results_ranks
+            ]
+            duration_min = min(durations)
+            duration_max = max(durations)
+            stats[name] = {
+                "count": max(counts),
+                "min": duration_min,
+                "mean": sum(durations) / len(durations),
+                "max": duration_max,
+                "rank_min": durations.index(duration_min),
+                "rank_max": durations.index(duration_max),
+            }
+        return stats
+
+    def save(self, path_file, **infos):
+        """Append the statistics in a JSON lines file (collective operation)
+
+        The keyword arguments (for example ``t`` and ``it``) are saved with
+        the statistics.
+
+        """
+        stats = self.gather()
+        if mpi.rank > 0:
+            return
+        data = dict(infos)
+        data["nb_proc"] = mpi.nb_proc
+        data["timers"] = stats
+        with open(path_file, "a") as file:
+            file.write(json.dumps(data) + "\n")
+
+    def format_summary(self, name_total="one_time_step"):
+        """Return a string summarizing the timers (collective operation)
+
+        The percentages are computed relative to the mean duration of the
+        timer ``name_total``.
+
+        """
+        stats = self.gather()
+        if mpi.rank > 0 or not stats:
+            return ""
+
+        try:
+            duration_total = stats[name_total]["mean"]
+        except KeyError:
+            duration_total = 0.0
+
+        lines = [
+            f"Timers (inclusive times in s over {mpi.nb_proc} process(es))",
+            f"{'name':36s}{'count':>9s}{'mean':>11s}{'max':>11s}"
+            f"{'rank_max':>9s}{'%':>7s}",
+        ]
+        for name, stats_name in sorted(
+            stats.items(), key=lambda item: -item[1]["mean"]
+        ):
+            if duration_total > 0:
+                percent = 100 * stats_name["mean"] / duration_total
+            else:
+                percent = 0.0
+            lines.append(
+                f"{name:36s}{stats_name['count']:9d}{stats_name['mean']:11.4g}"
+                f"{stats_name['max']:11.4g}{stats_name['rank_max']:9d}"
+                f"{percent:7.1f}"
+            )
+        return "\n".join(lines)
@@ -9,6 +9,7 @@ Provides
    operators0d
    operators2d
    operators3d
+   fft_float32
    sphericalharmo
    op_finitediff1d
    op_finitediff2d
@@ -5,6 +5,10 @@ Numerical method agnostic base operator classes
 
 Provides:
 
+.. autoclass:: OperatorBase
+   :members:
+   :private-members:
+
 .. autoclass:: OperatorBase1D
    :members:
    :private-members:
@@ -13,8 +17,338 @@ Provides:
 
 import numpy as np
 
+try:
+    import pyfftw
+except ImportError:
+    pyfftw = None
+
+from fluiddyn.util import mpi
+from fluiddyn.calcul.easypyfft import BasePyFFT, nthreads
+
+
+def _is_stacked_array(arrays, shape, dtype):
+    return (
+        isinstance(arrays, np.ndarray)
+        and arrays.shape[1:] == tuple(shape)
+        and arrays.dtype == dtype
+        and arrays.flags.c_contiguous
+    )
+
 
 class OperatorBase:
+    """Base class for the operators."""
+
+    # types of the arrays in physical and spectral spaces
+    dtype_real = np.float64
+    dtype_complex = np.complex128
+
+    def create_arrays_many(self, nb_fields, spectral=False):
+        """Create arrays for several fields.
+
+        The arrays are stacked in one array ``(nb_fields, ...)`` (so that
+        ``fft_many`` and ``ifft_many`` can use only one plan) when this
+        keeps each field aligned in memory. Otherwise, a tuple of arrays is
+        returned.
+
+        """
+        if spectral:
+            shape, dtype = tuple(self.shapeK_loc), self.dtype_complex
+        else:
+            shape, dtype = tuple(self.shapeX_loc), self.dtype_real
+
+        if pyfftw is None:
+            return np.empty((nb_fields,) + shape, dtype)
+
+        nb_bytes = np.prod(shape) * np.dtype(dtype).itemsize
+        if nb_bytes % pyfftw.simd_alignment:
+            return tuple(
+                pyfftw.empty_aligned(shape, dtype) for _ in range(nb_fields)
+            )
+        return pyfftw.empty_aligned((nb_fields,) + shape, dtype)
+
+    def fft_many(self, arrays, arrays_fft):
+        """Compute the FFT of several fields.
+
+        Parameters
+        ----------
+
+        arrays : sequence of arrays or stacked array ``(nvar, ...)``
+            The fields in physical space.
+
+        arrays_fft : sequence of arrays or stacked array ``(nvar, ...)``
+            The output arrays in spectral space.
+
+        Notes
+        -----
+
+        For stacked arrays with a sequential pyfftw backend, all fields are
+        transformed with only one FFTW plan ("howmany" plan). Otherwise, the
+        fields are transformed one by one.
+
+        """
+        plans = self._get_plans_many(arrays, arrays_fft)
+        if plans is None:
+            for arr, arr_fft in zip(arrays, arrays_fft):
+                self.fft_as_arg(arr, arr_fft)
+            return arrays_fft
+
+        plan_fft = plans[0]
+        plan_fft(input_array=arrays, output_array=arrays_fft)
+        arrays_fft *= self.oper_fft.inv_coef_norm
+        return arrays_fft
+
+    def ifft_many(self, arrays_fft, arrays, destroy=False):
+        """Compute the inverse FFT of several fields.
+
+        Parameters
+        ----------
+
+        arrays_fft : sequence of arrays or stacked array ``(nvar, ...)``
+            The fields in spectral space.
+
+        arrays : sequence of arrays or stacked array ``(nvar, ...)``
+            The output arrays in physical space.
+
+        destroy : bool (default False)
+
+            If True, the input arrays can be modified.
+
+        """
+        plans = self._get_plans_many(arrays, arrays_fft)
+        if plans is None:
+            if destroy and hasattr(self, "ifft_as_arg_destroy"):
+                ifft_as_arg = self.ifft_as_arg_destroy
+            else:
+                ifft_as_arg = self.ifft_as_arg
+            for arr_fft, arr in zip(arrays_fft, arrays):
+                ifft_as_arg(arr_fft, arr)
+            return arrays
+
+        plan_ifft, arrays_fft_tmp = plans[1:]
+        if not destroy:
+            # c2r FFTW plans destroy their input
+            arrays_fft_tmp[:] = arrays_fft
+            arrays_fft = arrays_fft_tmp
+        plan_ifft(
+            input_array=arrays_fft, output_array=arrays, normalise_idft=False
+        )
+        return arrays
+
+    def _get_plans_many(self, arrays, arrays_fft):
+        """Get the FFTW plans for stacked arrays (None if not available)."""
+        oper_fft = getattr(self, "oper_fft", None)
+        if pyfftw is None or not isinstance(oper_fft, BasePyFFT):
+            return None
+
+        shapeX = tuple(oper_fft.shapeX)
+        shapeK = tuple(oper_fft.shapeK)
+        if not (
+            _is_stacked_array(arrays, shapeX, self.dtype_real)
+            and _is_stacked_array(arrays_fft, shapeK, self.dtype_complex)
+            and len(arrays) == len(arrays_fft)
+            and pyfftw.is_byte_aligned(arrays)
+            and pyfftw.is_byte_aligned(arrays_fft)
+        ):
+            return None
+
+        nb_fields = len(arrays)
+        if not hasattr(self, "_plans_many"):
+            self._plans_many = {}
+        try:
+            return self._plans_many[nb_fields]
+        except KeyError:
+            pass
+
+        arrays_tmp = pyfftw.empty_aligned(
+            (nb_fields,) + shapeX, self.dtype_real
+        )
+        arrays_fft_tmp = pyfftw.empty_aligned(
+            (nb_fields,) + shapeK, self.dtype_complex
+        )
+        axes = tuple(range(1, len(shapeX) + 1))
+        plan_fft = pyfftw.FFTW(
+            input_array=arrays_tmp,
+            output_array=arrays_fft_tmp,
+            axes=axes,
+            direction="FFTW_FORWARD",
+            threads=nthreads,
+        )
+        plan_ifft = pyfftw.FFTW(
+            input_array=arrays_fft_tmp,
+            output_array=arrays_tmp,
+            axes=axes,
+            direction="FFTW_BACKWARD",
+            threads=nthreads,
+        )
+        plans = self._plans_many[nb_fields] = (
+            plan_fft,
+            plan_ifft,
+            arrays_fft_tmp,
+        )
+        return plans
+
+    def _get_axes_coarse_K(self):
+        """Return the axes of the coarse arrays for each axis in K space."""
+        raise NotImplementedError
+
+    def _get_Kx(self):
+        """Return the local array of the wavenumbers kx (in K space)."""
+        raise NotImplementedError
+
+    def _get_coarse_index_maps(self, shapeK_loc_coarse):
+        """Index maps between a sequential coarse array and the local array
+
+        The maps are computed only once for each coarse shape (collective
+        operation during the first call). The coarse arrays are sequential
+        arrays (only relevant for the process 0) with the axes ordered as in
+        physical space (``(ky, kx)`` in 2D and ``(kz, ky, kx)`` in 3D).
+
+        """
+        shapeK_loc_coarse = tuple(int(n) for n in shapeK_loc_coarse)
+        try:
+            coarse_index_maps = self._coarse_index_maps
+        except AttributeError:
+            coarse_index_maps = self._coarse_index_maps = {}
+        try:
+            return coarse_index_maps[shapeK_loc_coarse]
+        except KeyError:
+            pass
+
+        ndim = len(shapeK_loc_coarse)
+        axes_coarse = self._get_axes_coarse_K()
+        strides_coarse = np.cumprod((shapeK_loc_coarse + (1,))[:0:-1])[::-1]
+
+        iks_loc = []
+        iks_coarse = []
+        for axis_K, axis_coarse in enumerate(axes_coarse):
+            nkc = shapeK_loc_coarse[axis_coarse]
+            ikc = np.arange(nkc)
+            if axis_coarse == ndim - 1:
+                # real to complex transform: only kx >= 0
+                ik = ikc.copy()
+            else:
+                ik = np.where(
+                    ikc <= nkc / 2, ikc, ikc - nkc + self.shapeK_seq[axis_K]
+                )
+            ik -= self.seq_indices_first_K[axis_K]
+            is_local = (ik >= 0) & (ik < self.shapeK_loc[axis_K])
+            iks_loc.append(ik[is_local])
+            iks_coarse.append(ikc[is_local] * strides_coarse[axis_coarse])
+
+        # flat indices in the coarse array of the local modes (in the order
+        # of the local array)
+        indices = sum(np.ix_(*iks_coarse)).ravel()
+
+        index_loc = np.ix_(*iks_loc)
+        maps = {
+            "index_loc": index_loc,
+            "ind_loc": np.ravel_multi_index(
+                np.broadcast_arrays(*index_loc), self.shapeK_loc
+            ).ravel(),
+            "shape_loc": tuple(ik.size for ik in iks_loc),
+            "indices": indices,
+            "indices_ranks": indices,
+        }
+        if not self.is_sequential:
+            counts = np.array(mpi.comm.allgather(indices.size))
+            maps["counts"] = counts
+            maps["displs"] = np.concatenate(([0], np.cumsum(counts[:-1])))
+            indices_ranks = mpi.comm.gather(indices, root=0)
+            if mpi.rank == 0:
+                maps["indices_ranks"] = np.concatenate(indices_ranks)
+
+        coarse_index_maps[shapeK_loc_coarse] = maps
+        return maps
+
+    def _scatter_coarse_values(self, arr_coarse, shapeK_loc_coarse, nb_fields):
+        """Return the values of a coarse array (process 0) for the local modes
+
+        The returned array has the shape ``(nb_fields, nb_modes_loc)``, with
+        the local modes in the order of the flat indices
+        ``maps["ind_loc"]``. Only one collective communication
+        (``Scatterv``) is used.
+
+        """
+        maps = self._get_coarse_index_maps(shapeK_loc_coarse)
+
+        if self.is_sequential:
+            return arr_coarse.reshape(nb_fields, -1)[:, maps["indices"]]
+
+        if mpi.rank == 0:
+            values_ranks = np.ascontiguousarray(
+                arr_coarse.reshape(nb_fields, -1)[:, maps["indices_ranks"]].T,
+                dtype=np.complex128,
+            )
+            sendbuf = [
+                values_ranks,
+                maps["counts"] * nb_fields,
+                maps["displs"] * nb_fields,
+                mpi.MPI.DOUBLE_COMPLEX,
+            ]
+        else:
+            sendbuf = None
+        values = np.empty((maps["indices"].size, nb_fields), np.complex128)
+        mpi.comm.Scatterv(sendbuf, [values, mpi.MPI.DOUBLE_COMPLEX], root=0)
+        return values.T
+
+    def _put_coarse_array_in_array_fft(self, arr_coarse, arr, shapeK_loc_coarse):
+        """Put the values of a coarse array (process 0) in a local array
+
+        The arrays can contain several fields (leading dimensions). Only one
+        collective communication (``Scatterv``) is used.
+
+        """
+        maps = self._get_coarse_index_maps(shapeK_loc_coarse)
+        shape_lead = arr.shape[: arr.ndim - len(shapeK_loc_coarse)]
+        nb_fields = int(np.prod(shape_lead))
+        values = self._scatter_coarse_values(
+            arr_coarse, shapeK_loc_coarse, nb_fields
+        )
+        arr[(Ellipsis,) + maps["index_loc"]] = values.reshape(
+            shape_lead + maps["shape_loc"]
+        )
+
+    def _coarse_seq_from_fft_loc(self, f_fft, shapeK_loc_coarse):
+        """Return a sequential coarse array (process 0) from a local array
+
+        Only one collective communication (``Gatherv``) is used. For the
+        processes other than 0, the returned array is filled with zeros.
+
+        """
+        maps = self._get_coarse_index_maps(shapeK_loc_coarse)
+        shape_lead = f_fft.shape[: f_fft.ndim - len(shapeK_loc_coarse)]
+        nb_fields = int(np.prod(shape_lead))
+        shape = shape_lead + tuple(shapeK_loc_coarse)
+
+        values = f_fft[(Ellipsis,) + maps["index_loc"]].reshape(nb_fields, -1)
+
+        if self.is_sequential:
+            fc_fft = np.empty(shape, np.complex128)
+            fc_fft.reshape(nb_fields, -1)[:, maps["indices"]] = values
+            return fc_fft
+
+        values = np.ascontiguousarray(values.T, dtype=np.complex128)
+        if mpi.rank == 0:
+            values_ranks = np.empty(
+                (maps["indices_ranks"].size, nb_fields), np.complex128
+            )
+            recvbuf = [
+                values_ranks,
+                maps["counts"] * nb_fields,
+                maps["displs"] * nb_fields,
+                mpi.MPI.DOUBLE_COMPLEX,
+            ]
+        else:
+            recvbuf = None
+        mpi.comm.Gatherv([values, mpi.MPI.DOUBLE_COMPLEX], recvbuf, root=0)
+
+        fc_fft = np.zeros(shape, np.complex128)
+        if mpi.rank == 0:
+            fc_fft.reshape(nb_fields, -1)[:, maps["indices_ranks"]] = (
+                values_ranks.T
+            )
+        return fc_fft
+
     def _modify_sim_repr_maker(self, sim_repr_maker):
         if not hasattr(self, "produce_str_describing_oper"):
             return
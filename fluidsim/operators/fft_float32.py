@@ -0,0 +1,126 @@
+"""Single precision FFT classes (:mod:`fluidsim.operators.fft_float32`)
+=======================================================================
+
+The FFT classes of fluidfft only work in double precision. This module
+provides sequential FFT classes based on pyfftw working with ``float32`` and
+``complex64`` arrays. They are used by the operators when
+``params.oper.precision == "float32"``.
+
+The sums over the wavenumbers (used for the energy diagnostics) are computed
+in double precision.
+
+Provides:
+
+.. autoclass:: FFT3DFloat32WithPYFFTW
+   :members:
+
+"""
+
+import numpy as np
+
+try:
+    import pyfftw
+except ImportError:
+    pyfftw = None
+
+from fluiddyn.calcul.easypyfft import nthreads
+
+if pyfftw is not None:
+    from fluidfft.fft3d.with_pyfftw import FFT3DWithPYFFTW
+else:
+    FFT3DWithPYFFTW = object
+
+
+class _Float32Mixin:
+    """Replace the double precision plans and arrays of a pyfftw class"""
+
+    dtype_real = np.float32
+    dtype_complex = np.complex64
+
+    def _init_float32(self):
+        self.arrayX = pyfftw.empty_aligned(self.shapeX, self.dtype_real)
+        self.arrayK = pyfftw.empty_aligned(self.shapeK, self.dtype_complex)
+
+        axes = tuple(range(len(self.shapeX)))
+        self.fftplan = pyfftw.FFTW(
+            input_array=self.arrayX,
+            output_array=self.arrayK,
+            axes=axes,
+            direction="FFTW_FORWARD",
+            threads=nthreads,
+        )
+        self.ifftplan = pyfftw.FFTW(
+            input_array=self.arrayK,
+            output_array=self.arrayX,
+            axes=axes,
+            direction="FFTW_BACKWARD",
+            threads=nthreads,
+        )
+
+    def fft(self, fieldX):
+        fieldK = pyfftw.empty_aligned(self.shapeK, self.dtype_complex)
+        self.fftplan(input_array=fieldX, output_array=fieldK)
+        fieldK *= self.inv_coef_norm
+        return fieldK
+
+    def ifft(self, fieldK):
+        fieldX = pyfftw.empty_aligned(self.shapeX, self.dtype_real)
+        # copy needed because the c2r transforms destroy their input
+        self.arrayK[:] = fieldK
+        self.ifftplan(
+            input_array=self.arrayK, output_array=fieldX, normalise_idft=False
+        )
+        return fieldX
+
+    # the output arrays can also be in double precision (for example arrays
+    # created by user code), which is not supported by the FFTW plans
+
+    def fft_as_arg(self, fieldX, fieldK):
+        if fieldK.dtype != self.dtype_complex:
+            fieldK[:] = self.fft(fieldX)
+            return
+        self.fftplan(input_array=fieldX, output_array=fieldK)
+        fieldK *= self.inv_coef_norm
+
+    def ifft_as_arg(self, fieldK, fieldX):
+        # copy needed because the c2r transforms destroy their input
+        self.arrayK[:] = fieldK
+        self.ifft_as_arg_destroy(self.arrayK, fieldX)
+
+    def ifft_as_arg_destroy(self, fieldK, fieldX):
+        if fieldX.dtype != self.dtype_real:
+            fieldX[:] = self.ifft(fieldK)
+            return
+        self.ifftplan(
+            input_array=fieldK, output_array=fieldX, normalise_idft=False
+        )
+
+    def create_arrayX(self, value=None, shape=None):
+        """Return a constant array in real space."""
+        field = pyfftw.empty_aligned(self.shapeX, self.dtype_real)
+        if value is not None:
+            field.fill(value)
+        return field
+
+    def create_arrayK(self, value=None, shape=None):
+        """Return a constant array in spectral space."""
+        field = pyfftw.empty_aligned(self.shapeK, self.dtype_complex)
+        if value is not None:
+            field.fill(value)
+        return field
+
+    def sum_wavenumbers(self, ff_fft):
+        # accumulation in double precision
+        ff_fft = np.asarray(ff_fft, dtype=np.promote_types(ff_fft.dtype, "d"))
+        return super().sum_wavenumbers(ff_fft)
+
+    def compute_energy_from_X(self, fieldX):
+        return np.mean(fieldX ** 2, dtype=np.float64) / 2.0
+
+
+class FFT3DFloat32WithPYFFTW(_Float32Mixin, FFT3DWithPYFFTW):
+    """Sequential 3D FFT class in single precision"""
+
+    def __init__(self, n0, n1, n2):
+        super().__init__(n0, n1, n2)
+        self._init_float32()
@@ -11,14 +11,17 @@ Provides
 
 from math import pi
 from copy import deepcopy
+from warnings import warn
 from random import uniform
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 
-from transonic import boost, Array, Transonic
+from transonic import boost, Array, Transonic, Type
 from fluiddyn.util import mpi
 from fluiddyn.util.mpi import nb_proc, rank
 from fluidfft.fft3d.operators import OperatorsPseudoSpectral3D as _Operators
+from fluidfft.fft3d.operators import vector_product
 
 from fluidsim.base.setofvariables import SetOfVariables
 from fluidsim.base.params import Parameters
@@ -26,13 +29,19 @@ from fluidsim.base.params import Parameters
 from .operators2d import OperatorsPseudoSpectral2D as OpPseudoSpectral2D
 from .. import _is_testing
 from .base import OperatorBase
+from .fft_float32 import FFT3DFloat32WithPYFFTW, pyfftw
 
 ts = Transonic()
 
-Asov = Array[np.complex128, "4d"]
+# fields in double or single precision (params.oper.precision)
+Tc = Type(np.complex128, np.complex64)
+Tf = Type(np.float64, np.float32)
+
+Asov = Array[Tc, "4d"]
 Aui8 = Array[np.uint8, "3d"]
-Ac = Array[np.complex128, "3d"]
+Ac = Array[Tc, "3d"]
 Af = Array[np.float64, "3d"]
+Ar = Array[Tf, "3d"]
 
 
 @boost
@@ -104,6 +113,13 @@ def compute_energy_from_3fields(
     return 0.5 * (np.abs(vx) ** 2 + np.abs(vy) ** 2 + np.abs(vz) ** 2)
 
 
+@boost
+def vector_product_component(a1: Ar, b2: Ar, a2: Ar, b1: Ar, out: Ar):
+    """Compute one component ``a1 * b2 - a2 * b1`` of a vector product
+    (written in ``out``)."""
+    out[:] = a1 * b2 - a2 * b1
+
+
 if not ts.is_transpiling and not ts.is_compiled and not _is_testing:
     # for example if Pythran is not available
     dealiasing_variable = dealiasing_variable_numpy
@@ -168,6 +184,8 @@ class OperatorsPseudoSpectral3D(_Operators, OperatorBase):
             "Lz": 2 * pi,
             "truncation_shape": "cubic",
             "NO_SHEAR_MODES": False,
+            "overlap_comm": False,
+            "precision": "float64",
         }
         params._set_child("oper", attribs=attribs)
         params.oper._set_doc(
@@ -205,6 +223,26 @@ Lx, Ly and Lz: float
 
     Length of the edges of the numerical domain.
 
+overlap_comm: bool
+
+    If True, the transforms of the nonlinear terms are computed in a worker
+    thread so that the transform of a field overlaps with the computation of
+    the next fields (pipelined mode). The transforms (and the MPI
+    communications that they contain) are still computed one after the
+    other. This mode needs two more arrays in physical space and is only
+    useful with FFT classes releasing the GIL during the transforms. With
+    MPI, it is only used if the thread support level is at least
+    MPI_THREAD_SERIALIZED (otherwise, the transforms are synchronous).
+
+precision: str (default "float64")
+
+    Floating point precision of the fields ("float64" or "float32"). In
+    single precision, the state, the FFTs, the nonlinear terms and the
+    dealiasing are computed with ``float32`` and ``complex64`` arrays (which
+    halves the memory used by the fields), whereas the energy diagnostics
+    are accumulated in double precision. Single precision is only
+    implemented for sequential runs with pyfftw.
+
 """
         )
 
@@ -224,6 +262,39 @@ Lx, Ly and Lz: float
             ny = params.oper.ny
             nz = params.oper.nz
 
+        fft = params.oper.type_fft
+        try:
+            precision = params.oper.precision
+        except AttributeError:
+            # parameters of old simulations
+            precision = "float64"
+
+        if precision == "float32":
+            if (
+                nb_proc > 1
+                or pyfftw is None
+                or fft
+                not in (
+                    "default",
+                    "sequential",
+                    "fft3d.with_pyfftw",
+                    "fluidfft.fft3d.with_pyfftw",
+                )
+            ):
+                raise ValueError(
+                    'params.oper.precision = "float32" is only implemented '
+                    "for sequential runs with pyfftw "
+                    f"(type_fft = {fft}, nb_proc = {nb_proc})"
+                )
+            fft = FFT3DFloat32WithPYFFTW
+            self.dtype_real = np.float32
+            self.dtype_complex = np.complex64
+        elif precision != "float64":
+            raise ValueError(
+                f"Unknown precision {precision!r} "
+                '(should be "float64" or "float32")'
+            )
+
         super().__init__(
             nx,
             ny,
@@ -231,7 +302,7 @@ Lx, Ly and Lz: float
             params.oper.Lx,
             params.oper.Ly,
             params.oper.Lz,
-            fft=params.oper.type_fft,
+            fft=fft,
             coef_dealiasing=params.oper.coef_dealiasing,
         )
 
@@ -239,6 +310,9 @@ Lx, Ly and Lz: float
         if not hasattr(self, "oper_fft") and hasattr(self, "_op_fft"):
             self.oper_fft = self._op_fft
 
+        if precision == "float32":
+            self._use_methods_float32()
+
         # problem here type_fft
         params2d = deepcopy(params)
         params2d.oper.type_fft = params2d.oper.type_fft2d
@@ -270,6 +344,28 @@ Lx, Ly and Lz: float
 
         self._reinit_truncation()
 
+        try:
+            self.overlap_comm = self.params.oper.overlap_comm
+        except AttributeError:
+            # parameters of old simulations
+            self.overlap_comm = False
+        if (
+            self.overlap_comm
+            and nb_proc > 1
+            and mpi.MPI.Query_thread() < mpi.MPI.THREAD_SERIALIZED
+        ):
+            # the MPI communications of the transforms would be called from
+            # the worker thread
+            warn(
+                "params.oper.overlap_comm is ignored because MPI has not been "
+                "initialized with a thread support level >= "
+                "MPI_THREAD_SERIALIZED."
+            )
+            self.overlap_comm = False
+        self._executor_transforms = None
+        self._futures_transforms = []
+        self._arrays_tmp_pipeline = None
+
         try:
             NO_SHEAR_MODES = self.params.oper.NO_SHEAR_MODES
         except AttributeError:
@@ -346,12 +442,21 @@ Lx, Ly and Lz: float
             elif isinstance(thing, np.ndarray):
                 dealiasing_variable(thing, self.where_dealiased)
 
+    def _get_axes_coarse_K(self):
+        if self.is_sequential:
+            return (0, 1, 2)
+        return tuple(self.dimX_K)
+
+    def _get_Kx(self):
+        return self.Kx
+
     def put_coarse_array_in_array_fft(
         self, arr_coarse, arr, oper_coarse, shapeK_loc_coarse
     ):
         """Put the values contained in a coarse array in an array.
 
-        Both arrays are in Fourier space.
+        Both arrays are in Fourier space. The coarse array is only used in
+        the process 0.
 
         """
         if arr.ndim == 4:
@@ -359,139 +464,11 @@ Lx, Ly and Lz: float
                 if arr_coarse.ndim != 4:
                     raise ValueError
 
-            for ikey in range(arr.shape[0]):
-                if rank == 0:
-                    arr3d_coarse = arr_coarse[ikey]
-                else:
-                    arr3d_coarse = None
-                self.put_coarse_array_in_array_fft(
-                    arr3d_coarse, arr[ikey], oper_coarse, shapeK_loc_coarse
-                )
-            return
-
-        nkzc, nkyc, nkxc = shapeK_loc_coarse
-
-        if nb_proc > 1:
-            nk0, nk1, nk2 = self.shapeK_seq
-            if mpi.rank == 0:
-                if self.dimX_K == (1, 0, 2):
-                    fck_fft = np.zeros((nkyc, nkzc, nkxc), dtype=np.complex128)
-                    for i0 in range(nkzc):
-                        for i1 in range(nkyc):
-                            fck_fft[i1, i0, :] = arr_coarse[i0, i1, :]
-                if self.dimX_K == (2, 1, 0):
-                    fck_fft = np.zeros((nkxc, nkyc, nkzc), dtype=np.complex128)
-                    for i0 in range(nkzc):
-                        for i1 in range(nkyc):
-                            for i2 in range(nkxc):
-                                fck_fft[i2, i1, i0] = arr_coarse[i0, i1, i2]
-
-            if self.dimX_K == (1, 0, 2):
-                nk1c, nk0c, nk2c = shapeK_loc_coarse
-            elif self.dimX_K == (2, 1, 0):
-                nk2c, nk1c, nk0c = shapeK_loc_coarse
-
-            for ik0c in range(nk0c):
-                ik1c = 0
-                ik2c = 0
-                ik0 = _ik_from_ikc(ik0c, nk0c, nk0)
-                rank_ik, ik0loc, ik1loc, ik2loc = self.where_is_wavenumber(
-                    ik0, ik1c, ik2c
-                )
-                if mpi.rank == 0:
-                    fc1D = fck_fft[ik0c, :, :]
-                if rank_ik != 0:
-                    # message fc1D
-                    if mpi.rank == rank_ik:
-                        fc1D = np.empty([nk1c, nk2c], dtype=np.complex128)
-                    if mpi.rank == 0 or mpi.rank == rank_ik:
-                        fc1D = np.ascontiguousarray(fc1D)
-                    if mpi.rank == 0:
-                        mpi.comm.Send(
-                            [fc1D, mpi.MPI.COMPLEX], dest=rank_ik, tag=ik0c
-                        )
-                    elif mpi.rank == rank_ik:
-                        mpi.comm.Recv([fc1D, mpi.MPI.COMPLEX], source=0, tag=ik0c)
-                if mpi.rank == rank_ik:
-                    # copy
-                    for ik1c in range(nk1c):
-                        ik1 = _ik_from_ikc(ik1c, nk1c, nk1)
-                        arr[ik0loc, ik1, 0:nk2c] = fc1D[ik1c, :]
-
-        else:
-            nkz, nky, nkx = self.shapeK_seq
-            for ikzc in range(nkzc):
-                ikz = _ik_from_ikc(ikzc, nkzc, nkz)
-                for ikyc in range(nkyc):
-                    iky = _ik_from_ikc(ikyc, nkyc, nky)
-                    for ikxc in range(nkxc):
-                        arr[ikz, iky, ikxc] = arr_coarse[ikzc, ikyc, ikxc]
+        self._put_coarse_array_in_array_fft(arr_coarse, arr, shapeK_loc_coarse)
 
     def coarse_seq_from_fft_loc(self, f_fft, shapeK_loc_coarse):
         """Return a coarse field in K space."""
-        nkzc, nkyc, nkxc = shapeK_loc_coarse
-        if nb_proc > 1:
-            if self.shapeK_seq[1:2] != self.shapeK_loc[1:2]:
-                raise NotImplementedError()
-
-            if self.dimX_K == (1, 0, 2):
-                nk1c, nk0c, nk2c = shapeK_loc_coarse
-            elif self.dimX_K == (2, 1, 0):
-                nk2c, nk1c, nk0c = shapeK_loc_coarse
-
-            fc_fft_tmp = np.empty([nk0c, nk1c, nk2c], np.complex128)
-            nk0, nk1, nk2 = self.shapeK_seq
-            f1d_temp = np.empty([nk1c, nk2c], np.complex128)
-
-            for ik0c in range(nk0c):
-                ik1c = 0
-                ik2c = 0
-                ik0 = _ik_from_ikc(ik0c, nk0c, nk0)
-                rank_ik, ik0loc, ik1loc, ik1loc = self.where_is_wavenumber(
-                    ik0, ik1c, ik2c
-                )
-                if rank == rank_ik:
-                    # create f1d_temp
-                    for ik1c in range(nk1c):
-                        ik1 = _ik_from_ikc(ik1c, nk1c, nk1)
-                        f1d_temp[ik1c, :] = f_fft[ik0loc, ik1, 0:nk2c]
-
-                if rank_ik != 0:
-                    # message f1d_temp
-                    if rank == 0:
-                        comm.Recv(
-                            [f1d_temp, MPI.DOUBLE_COMPLEX],
-                            source=rank_ik,
-                            tag=ik0c,
-                        )
-                    elif rank == rank_ik:
-                        comm.Send(
-                            [f1d_temp, MPI.DOUBLE_COMPLEX], dest=0, tag=ik0c
-                        )
-                if rank == 0:
-                    # copy into fc_fft
-                    fc_fft_tmp[ik0c] = f1d_temp.copy()
-            fc_fft = np.zeros(shapeK_loc_coarse, dtype=np.complex128)
-            if rank == 0:
-                if self.dimX_K == (1, 0, 2):
-                    for i0 in range(nkzc):
-                        for i1 in range(nkyc):
-                            fc_fft[i0, i1, :] = fc_fft_tmp[i1, i0, :]
-                if self.dimX_K == (2, 1, 0):
-                    for i0 in range(nkzc):
-                        for i1 in range(nkyc):
-                            for i2 in range(nkxc):
-                                fc_fft[i0, i1, i2] = fc_fft_tmp[i2, i1, i0]
-        else:
-            fc_fft = np.empty(shapeK_loc_coarse, np.complex128)
-            nkz, nky, nkx = self.shapeK_seq
-            for ikzc in range(nkzc):
-                ikz = _ik_from_ikc(ikzc, nkzc, nkz)
-                for ikyc in range(nkyc):
-                    iky = _ik_from_ikc(ikyc, nkyc, nky)
-                    for ikxc in range(nkxc):
-                        fc_fft[ikzc, ikyc, ikxc] = f_fft[ikz, iky, ikxc]
-        return fc_fft
+        return self._coarse_seq_from_fft_loc(f_fft, shapeK_loc_coarse)
 
     def where_is_wavenumber(self, ik0, ik1, ik2):
         """Give local indices and rank from the sequential indices"""
@@ -555,6 +532,211 @@ Lx, Ly and Lz: float
 
         return urx_fft, ury_fft, udx_fft, udy_fft
 
+    # The following methods replace compiled methods of fluidfft (which only
+    # accept double precision arrays) for params.oper.precision = "float32"
+    # (see _use_methods_float32).
+
+    _names_methods_float32 = (
+        "project_perpk3d",
+        "rotfft_from_vecfft_outin",
+        "rotfft_from_vecfft",
+        "divfft_from_vecfft",
+        "rotzfft_from_vxvyfft",
+        "_compute_spectrum3d_loc",
+    )
+
+    def _use_methods_float32(self):
+        """Use the methods supporting single precision arrays"""
+        for name in self._names_methods_float32:
+            setattr(self, name, getattr(self, name + "_float32"))
+
+    @boost
+    def project_perpk3d_float32(self, vx_fft: Ac, vy_fft: Ac, vz_fft: Ac):
+        """Project (inplace) a vector perpendicular to the wavevector.
+
+        The resulting vector is divergence-free.
+
+        """
+        # function important for the performance of 3d fluidsim solvers
+        n0, n1, n2 = vx_fft.shape
+        for i0 in range(n0):
+            for i1 in range(n1):
+                for i2 in range(n2):
+                    tmp = (
+                        self.Kx[i0, i1, i2] * vx_fft[i0, i1, i2]
+                        + self.Ky[i0, i1, i2] * vy_fft[i0, i1, i2]
+                        + self.Kz[i0, i1, i2] * vz_fft[i0, i1, i2]
+                    ) * self.inv_K_square_nozero[i0, i1, i2]
+
+                    vx_fft[i0, i1, i2] -= self.Kx[i0, i1, i2] * tmp
+                    vy_fft[i0, i1, i2] -= self.Ky[i0, i1, i2] * tmp
+                    vz_fft[i0, i1, i2] -= self.Kz[i0, i1, i2] * tmp
+
+    @boost
+    def rotfft_from_vecfft_outin_float32(
+        self,
+        vx_fft: Ac,
+        vy_fft: Ac,
+        vz_fft: Ac,
+        rotxfft: Ac,
+        rotyfft: Ac,
+        rotzfft: Ac,
+    ):
+        """Compute the curl of a vector in spectral space (written in
+        ``rotxfft``, ``rotyfft`` and ``rotzfft``)."""
+        # function important for the performance of 3d fluidsim solvers
+        n0, n1, n2 = vx_fft.shape
+        for i0 in range(n0):
+            for i1 in range(n1):
+                for i2 in range(n2):
+                    rotxfft[i0, i1, i2] = 1j * (
+                        self.Ky[i0, i1, i2] * vz_fft[i0, i1, i2]
+                        - self.Kz[i0, i1, i2] * vy_fft[i0, i1, i2]
+                    )
+                    rotyfft[i0, i1, i2] = 1j * (
+                        self.Kz[i0, i1, i2] * vx_fft[i0, i1, i2]
+                        - self.Kx[i0, i1, i2] * vz_fft[i0, i1, i2]
+                    )
+                    rotzfft[i0, i1, i2] = 1j * (
+                        self.Kx[i0, i1, i2] * vy_fft[i0, i1, i2]
+                        - self.Ky[i0, i1, i2] * vx_fft[i0, i1, i2]
+                    )
+
+    @boost
+    def rotfft_from_vecfft_float32(self, vx_fft: Ac, vy_fft: Ac, vz_fft: Ac):
+        """Return the curl of a vector in spectral space."""
+        return (
+            1j * (self.Ky * vz_fft - self.Kz * vy_fft),
+            1j * (self.Kz * vx_fft - self.Kx * vz_fft),
+            1j * (self.Kx * vy_fft - self.Ky * vx_fft),
+        )
+
+    @boost
+    def divfft_from_vecfft_float32(self, vx_fft: Ac, vy_fft: Ac, vz_fft: Ac):
+        """Return the divergence of a vector in spectral space."""
+        return 1j * (self.Kx * vx_fft + self.Ky * vy_fft + self.Kz * vz_fft)
+
+    @boost
+    def rotzfft_from_vxvyfft_float32(self, vx_fft: Ac, vy_fft: Ac):
+        """Compute the z component of the curl in spectral space."""
+        return 1j * (self.Kx * vy_fft - self.Ky * vx_fft)
+
+    def _compute_spectrum3d_loc_float32(self, field_fft):
+        # the spectra are computed in double precision
+        return super()._compute_spectrum3d_loc(
+            np.asarray(field_fft, dtype=np.float64)
+        )
+
+    @boost
+    def divfft_from_vecfft_outin(
+        self, vx_fft: Ac, vy_fft: Ac, vz_fft: Ac, div_fft: Ac
+    ):
+        """Compute the divergence of a vector in spectral space (written in
+        ``div_fft``)."""
+        div_fft[:] = 1j * (self.Kx * vx_fft + self.Ky * vy_fft + self.Kz * vz_fft)
+
+    def div_vb_fft_from_vb_outin(
+        self, vx, vy, vz, b, div_vb_fft, field_tmp, vxb_fft, vyb_fft
+    ):
+        r"""Compute :math:`\nabla \cdot (\boldsymbol{v} b)` in spectral space.
+
+        The result is written in ``div_vb_fft``. ``field_tmp`` (physical
+        space), ``vxb_fft`` and ``vyb_fft`` (spectral space) are preallocated
+        arrays used as temporary arrays.
+
+        """
+        if self.overlap_comm:
+            tmp0, tmp1 = self._get_arrays_tmp_pipeline()
+            np.multiply(vx, b, out=tmp0)
+            self.fft_many_start((tmp0,), (vxb_fft,))
+            np.multiply(vy, b, out=tmp1)
+            self.fft_many_start((tmp1,), (vyb_fft,))
+            np.multiply(vz, b, out=field_tmp)
+            self.fft_many_start((field_tmp,), (div_vb_fft,))
+            self.wait_transforms()
+        else:
+            fft_as_arg = self.fft_as_arg
+            np.multiply(vx, b, out=field_tmp)
+            fft_as_arg(field_tmp, vxb_fft)
+            np.multiply(vy, b, out=field_tmp)
+            fft_as_arg(field_tmp, vyb_fft)
+            np.multiply(vz, b, out=field_tmp)
+            fft_as_arg(field_tmp, div_vb_fft)
+
+        self.divfft_from_vecfft_outin(vxb_fft, vyb_fft, div_vb_fft, div_vb_fft)
+
+    def vecfft_from_vector_product_outin(self, a, b, c_fft):
+        r"""Compute the vector product :math:`\boldsymbol{a} \times
+        \boldsymbol{b}` in spectral space.
+
+        ``a``, ``b`` and ``c_fft`` are sequences of 3 arrays (or stacked
+        arrays). The result is written in ``c_fft`` and the arrays of ``b``
+        are used as temporary arrays.
+
+        With ``params.oper.overlap_comm``, the components are computed one by
+        one and the FFT of a component overlaps with the computation of the
+        next one.
+
+        """
+        ax, ay, az = a
+        bx, by, bz = b
+        # the vector_product of fluidfft only works in double precision
+        if not self.overlap_comm and self.dtype_real == np.float64:
+            vector_product(ax, ay, az, bx, by, bz)
+            self.fft_many(b, c_fft)
+            return
+
+        tmp0, tmp1 = self._get_arrays_tmp_pipeline()
+        vector_product_component(ay, bz, az, by, tmp0)
+        self.fft_many_start((tmp0,), (c_fft[0],))
+        vector_product_component(az, bx, ax, bz, tmp1)
+        self.fft_many_start((tmp1,), (c_fft[1],))
+        # bz is no longer needed
+        vector_product_component(ax, by, ay, bx, bz)
+        self.fft_many_start((bz,), (c_fft[2],))
+        self.wait_transforms()
+
+    def _get_arrays_tmp_pipeline(self):
+        if self._arrays_tmp_pipeline is None:
+            self._arrays_tmp_pipeline = self.create_arrays_many(2)
+        return self._arrays_tmp_pipeline
+
+    def fft_many_start(self, arrays, arrays_fft):
+        """Start the FFT of several fields.
+
+        With ``params.oper.overlap_comm``, the transforms are computed in a
+        worker thread and :meth:`wait_transforms` has to be called before
+        using the results and before calling other transforms. Otherwise,
+        the transforms are computed before returning.
+
+        """
+        self._start_transform(self.fft_many, arrays, arrays_fft)
+
+    def ifft_many_start(self, arrays_fft, arrays, destroy=False):
+        """Start the inverse FFT of several fields (see
+        :meth:`fft_many_start`)."""
+        self._start_transform(self.ifft_many, arrays_fft, arrays, destroy)
+
+    def _start_transform(self, function, *args):
+        if not self.overlap_comm:
+            function(*args)
+            return
+
+        if self._executor_transforms is None:
+            # only one worker so that the transforms (and the MPI
+            # communications that they contain) are serialized
+            self._executor_transforms = ThreadPoolExecutor(max_workers=1)
+        self._futures_transforms.append(
+            self._executor_transforms.submit(function, *args)
+        )
+
+    def wait_transforms(self):
+        """Wait for the transforms started with the ``*_start`` methods."""
+        futures = self._futures_transforms
+        self._futures_transforms = []
+        for future in futures:
+            future.result()
+
     @boost
     def divhfft_from_vxvyfft(self, vx_fft: Ac, vy_fft: Ac):
         """Compute the horizontal divergence in spectral space."""
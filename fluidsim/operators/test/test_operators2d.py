@@ -96,6 +96,40 @@ class TestOperators(TestCase):
             ff_fft / oper.K2_not0, invlap_fft, self.rtol, self.atol
         )
 
+    def test_fft_many(self):
+        """Test batched transforms against field-by-field transforms"""
+        # the fields of the stacked arrays are aligned only for even sizes
+        for oper in (self.oper, create_oper(nh=8)):
+            self._check_fft_many(oper)
+
+    def _check_fft_many(self, oper):
+        nb_fields = 3
+        arrays = oper.create_arrays_many(nb_fields)
+        for array in arrays:
+            array[:] = oper.create_arrayX_random()
+        arrays_copy = np.array(arrays)
+        # the forward transforms can destroy their input
+        arrays_fft_ref = [oper.fft(array.copy()) for array in arrays]
+
+        arrays_fft = oper.create_arrays_many(nb_fields, spectral=True)
+        oper.fft_many(arrays, arrays_fft)
+        arrays_fft_tuple = tuple(oper.create_arrayK() for _ in range(nb_fields))
+        oper.fft_many(tuple(arrays_copy.copy()), arrays_fft_tuple)
+        for array_fft_ref, array_fft, array_fft_tuple in zip(
+            arrays_fft_ref, arrays_fft, arrays_fft_tuple
+        ):
+            np.testing.assert_allclose(array_fft, array_fft_ref)
+            np.testing.assert_allclose(array_fft_tuple, array_fft_ref)
+
+        arrays_fft_copy = np.array(arrays_fft)
+        oper.ifft_many(arrays_fft, arrays)
+        np.testing.assert_equal(np.array(arrays_fft), arrays_fft_copy)
+        np.testing.assert_allclose(np.array(arrays), arrays_copy)
+
+        arrays_back = tuple(oper.create_arrayX() for _ in range(nb_fields))
+        oper.ifft_many(arrays_fft, arrays_back, destroy=True)
+        np.testing.assert_allclose(np.array(arrays_back), arrays_copy)
+
     def test_compute_increments_dim1(self):
         """Test computing increments of var over the dim 1."""
         oper = self.oper
@@ -253,6 +287,49 @@ class TestCoarse(unittest.TestCase):
             print("OK np.allclose(energy, energy_back)")
             assert np.allclose(energy, energy_big)
 
+    @unittest.skipIf(mpi.nb_proc > 1, "sequential reference only")
+    def test_coarse_index_maps(self):
+
+        params = self.Oper._create_default_params()
+        params.oper.nx = 32
+        params.oper.ny = 48
+        shape_coarse = (12, 9)
+        if self.nb_dim == 3:
+            params.oper.nz = 16
+            shape_coarse = (6,) + shape_coarse
+        oper = self.Oper(params)
+
+        arr_coarse = np.random.rand(2, *shape_coarse) + 1j
+        # zeros because of conditions in put_coarse_array_in_array_fft
+        arr_coarse[..., shape_coarse[-2] // 2, :] = 0
+        arr_coarse[..., -1] = 0
+
+        # reference with loops over the coarse modes
+        arr_ref = np.zeros((2,) + tuple(oper.shapeK_loc), np.complex128)
+        for ikc in np.ndindex(*shape_coarse):
+            ik = tuple(
+                ic if ic <= nc / 2 or axis == self.nb_dim - 1 else ic - nc + n
+                for axis, (ic, nc, n) in enumerate(
+                    zip(ikc, shape_coarse, oper.shapeK_seq)
+                )
+            )
+            arr_ref[(slice(None),) + ik] = arr_coarse[(slice(None),) + ikc]
+
+        arr = np.zeros_like(arr_ref)
+        oper.put_coarse_array_in_array_fft(arr_coarse, arr, None, shape_coarse)
+        self.assertTrue(np.array_equal(arr, arr_ref))
+
+        arr = np.zeros_like(arr_ref[0])
+        oper.put_coarse_array_in_array_fft(
+            arr_coarse[1], arr, None, shape_coarse
+        )
+        self.assertTrue(np.array_equal(arr, arr_ref[1]))
+
+        arr_coarse_back = oper.coarse_seq_from_fft_loc(arr_ref, shape_coarse)
+        self.assertTrue(np.array_equal(arr_coarse_back, arr_coarse))
+        arr_coarse_back = oper.coarse_seq_from_fft_loc(arr, shape_coarse)
+        self.assertTrue(np.array_equal(arr_coarse_back, arr_coarse[1]))
+
 
 if __name__ == "__main__":
     unittest.main()
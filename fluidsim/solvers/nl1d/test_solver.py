@@ -163,3 +163,57 @@ class TestTimeStepping(TestSimul):
 
     def test_RK4(self):
         self._test_type_time_scheme("RK4")
+
+    def test_RK3_low_storage(self):
+        self._test_type_time_scheme("RK3_low_storage")
+
+    def test_RK4_low_storage(self):
+        self._test_type_time_scheme("RK4_low_storage")
+
+    def test_RK3_adaptive(self):
+        self._test_type_time_scheme("RK3_adaptive")
+
+    def test_RK4_adaptive(self):
+        self._test_type_time_scheme("RK4_adaptive")
+
+    def test_adaptive_t_end(self):
+        sim = self.sim
+        params = sim.params
+
+        sim.state.init_statephys_from(s=self.s_init.copy())
+        sim.state.statespect_from_statephys()
+
+        t_end = sim.time_stepping.t + 10.5 * self.deltat
+        params.time_stepping.type_time_scheme = "RK3_adaptive"
+        params.time_stepping.USE_T_END = True
+        params.time_stepping.t_end = t_end
+        sim.time_stepping.init_from_params()
+        try:
+            sim.time_stepping.main_loop()
+        finally:
+            params.time_stepping.USE_T_END = False
+            params.time_stepping.it_end = sim.time_stepping.it
+        # the last time step is shortened to end exactly at t_end
+        self.assertAlmostEqual(sim.time_stepping.t, t_end, places=14)
+
+    def _run_time_steps(self, type_time_scheme, nb_steps):
+        sim = self.sim
+        params = sim.params
+
+        sim.state.init_statephys_from(s=self.s_init.copy())
+        sim.state.statespect_from_statephys()
+
+        params.time_stepping.it_end = sim.time_stepping.it + nb_steps
+        params.time_stepping.type_time_scheme = type_time_scheme
+        sim.time_stepping.init_from_params()
+        sim.time_stepping.main_loop()
+        return sim.state.get_var("s_fft").copy()
+
+    def test_adams_bashforth(self):
+        s_fft_RK4 = self._run_time_steps("RK4", 6)
+        for type_time_scheme in ("AB2", "AB3", "AB3_phaseshift"):
+            s_fft = self._run_time_steps(type_time_scheme, 6)
+            assert np.allclose(s_fft, s_fft_RK4), (
+                type_time_scheme,
+                abs(s_fft - s_fft_RK4).max(),
+            )
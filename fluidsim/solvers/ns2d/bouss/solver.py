@@ -21,9 +21,10 @@ AF = Array[np.float64, "2d"]
 def tendencies_nonlin_ns2dbouss(
     ux: AF, uy: AF, px_rot: AF, py_rot: AF, px_b: AF, py_b: AF
 ):
-    Frot = -ux * px_rot - uy * py_rot + px_b
-    Fb = -ux * px_b - uy * py_b
-    return Frot, Fb
+    """Compute the nonlinear terms (written in ``px_rot`` and ``px_b``)."""
+    px_rot[:] = -ux * px_rot - uy * py_rot + px_b
+    px_b[:] = -ux * px_b - uy * py_b
+    return px_rot, px_b
 
 
 class InfoSolverNS2DBouss(InfoSolverNS2D):
@@ -106,7 +107,6 @@ class Simul(SimulNS2D):
         \mathbf{\nabla} b`."""
         oper = self.oper
         fft_as_arg = oper.fft_as_arg
-        ifft_as_arg = oper.ifft_as_arg
 
         if old is None:
             tendencies_fft = SetOfVariables(like=self.state.state_spect)
@@ -123,25 +123,40 @@ class Simul(SimulNS2D):
         else:
             rot_fft = state_spect.get_var("rot_fft")
             b_fft = state_spect.get_var("b_fft")
-            ux_fft, uy_fft = oper.vecfft_from_rotfft(rot_fft)
+            ux_fft = self.state.field_spect_tmp0
+            uy_fft = self.state.field_spect_tmp1
+            oper.vecfft_from_rotfft_outin(rot_fft, ux_fft, uy_fft)
             ux = self.state.field_tmp0
             uy = self.state.field_tmp1
-            ifft_as_arg(ux_fft, ux)
-            ifft_as_arg(uy_fft, uy)
+            oper.ifft_many(
+                self.state.fields_spect_tmp,
+                self.state.fields_tmp[0:2],
+                destroy=True,
+            )
 
-        px_rot_fft, py_rot_fft = oper.gradfft_from_fft(rot_fft)
-        px_b_fft, py_b_fft = oper.gradfft_from_fft(b_fft)
+        px_rot_fft = self.state.field_spect_tmp0
+        py_rot_fft = self.state.field_spect_tmp1
+        oper.gradfft_from_fft_outin(rot_fft, px_rot_fft, py_rot_fft)
 
         px_rot = self.state.field_tmp2
         py_rot = self.state.field_tmp3
 
+        oper.ifft_many(
+            self.state.fields_spect_tmp,
+            self.state.fields_tmp[2:4],
+            destroy=True,
+        )
+
+        px_b_fft = self.state.field_spect_tmp0
+        py_b_fft = self.state.field_spect_tmp1
+        oper.gradfft_from_fft_outin(b_fft, px_b_fft, py_b_fft)
+
         px_b = self.state.field_tmp4
         py_b = self.state.field_tmp5
 
-        ifft_as_arg(px_rot_fft, px_rot)
-        ifft_as_arg(py_rot_fft, py_rot)
-        ifft_as_arg(px_b_fft, px_b)
-        ifft_as_arg(py_b_fft, py_b)
+        oper.ifft_many(
+            self.state.fields_spect_tmp, self.state.fields_tmp[4:6]
+        )
 
         Frot, Fb = tendencies_nonlin_ns2dbouss(ux, uy, px_rot, py_rot, px_b, py_b)
 
@@ -163,7 +178,7 @@ class Simul(SimulNS2D):
         #     self.oper.sum_wavenumbers(abs(T_b))))
 
         if self.params.forcing.enable:
-            tendencies_fft += self.forcing.get_forcing()
+            self.forcing.add_to_tendencies(tendencies_fft)
 
         # CHECK ENERGY CONSERVATION
         # Nrot_fft = tendencies_fft.get_var('rot_fft')
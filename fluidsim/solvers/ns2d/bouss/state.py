@@ -38,12 +38,7 @@ class StateNS2DBouss(StateNS2D):
             }
         )
 
-    def __init__(self, sim, oper=None):
-
-        super().__init__(sim, oper)
-
-        self.field_tmp4 = np.empty_like(self.state_phys[0])
-        self.field_tmp5 = np.empty_like(self.state_phys[0])
+    _nb_fields_tmp = 6
 
     def compute(self, key, SAVE_IN_DICT=True, RAISE_ERROR=True):
         """Compute and return a variable"""
@@ -97,18 +92,14 @@ class StateNS2DBouss(StateNS2D):
     def statephys_from_statespect(self):
         """Compute `state_phys` from `statespect`."""
         rot_fft = self.state_spect.get_var("rot_fft")
-        b_fft = self.state_spect.get_var("b_fft")
-        ux_fft, uy_fft = self.oper.vecfft_from_rotfft(rot_fft)
+        ux_fft, uy_fft = self.fields_spect_tmp
+        self.oper.vecfft_from_rotfft_outin(rot_fft, ux_fft, uy_fft)
 
-        rot = self.state_phys.get_var("rot")
-        ux = self.state_phys.get_var("ux")
-        uy = self.state_phys.get_var("uy")
-        b = self.state_phys.get_var("b")
-
-        self.oper.ifft_as_arg(rot_fft, rot)
-        self.oper.ifft_as_arg(ux_fft, ux)
-        self.oper.ifft_as_arg(uy_fft, uy)
-        self.oper.ifft_as_arg(b_fft, b)
+        # state_phys contains ux, uy, rot and b (state_spect rot_fft and b_fft)
+        self.oper.ifft_many(self.state_spect, self.state_phys[2:])
+        self.oper.ifft_many(
+            self.fields_spect_tmp, self.state_phys[:2], destroy=True
+        )
 
     def statespect_from_statephys(self):
         """Compute `state_spect` from `state_phys`."""
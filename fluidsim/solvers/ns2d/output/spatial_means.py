@@ -37,31 +37,14 @@ class SpatialMeansNS2D(SpatialMeansBase):
 
         if self.sim.params.forcing.enable:
             deltat = self.sim.time_stepping.deltat
-            Frot_fft = self.sim.forcing.get_forcing().get_var("rot_fft")
-            Fx_fft, Fy_fft = self.vecfft_from_rotfft(Frot_fft)
-
-            rot_fft = self.sim.state.state_spect.get_var("rot_fft")
-            ux_fft, uy_fft = self.vecfft_from_rotfft(rot_fft)
-
-            PZ1_fft = np.real(rot_fft.conj() * Frot_fft)
-            PZ2_fft = abs(Frot_fft) ** 2
-
-            PZ1 = self.sum_wavenumbers(PZ1_fft)
-            PZ2 = deltat / 2 * self.sum_wavenumbers(PZ2_fft)
-
-            PK1_fft = (
-                np.real(
-                    ux_fft.conj() * Fx_fft
-                    + ux_fft * Fx_fft.conj()
-                    + uy_fft.conj() * Fy_fft
-                    + uy_fft * Fy_fft.conj()
-                )
-                / 2
+            forcing = self.sim.forcing
+            PZ1, PZ2 = forcing.compute_injection_rates("rot_fft")
+            PZ2 *= deltat / 2
+            # |u_fft|^2 = |rot_fft|^2 / K^2
+            PK1, PK2 = forcing.compute_injection_rates(
+                "rot_fft", self.oper.K2_not0
             )
-            PK2_fft = (abs(Fx_fft) ** 2 + abs(Fy_fft) ** 2) * deltat / 2
-
-            PK1 = self.sum_wavenumbers(PK1_fft)
-            PK2 = self.sum_wavenumbers(PK2_fft)
+            PK2 *= deltat / 2
 
         if mpi.rank == 0:
             epsK_tot = epsK + epsK_hypo
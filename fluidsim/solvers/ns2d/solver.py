@@ -39,6 +39,15 @@ def compute_Frot(ux: Af, uy: Af, px_rot: Af, py_rot: Af, beta: float = 0):
         return -ux * px_rot - uy * (py_rot + beta)
 
 
+@boost
+def compute_Frot_outin(
+    ux: Af, uy: Af, px_rot: Af, py_rot: Af, beta: float, Frot: Af
+):
+    """Compute the nonlinear term of the vorticity equation (written in
+    ``Frot``)."""
+    Frot[:] = -ux * px_rot - uy * (py_rot + beta)
+
+
 class InfoSolverNS2D(InfoSolverPseudoSpectral):
     """Contain the information on the solver ns2d.
 
@@ -146,7 +155,6 @@ class Simul(SimulBasePseudoSpectral):
         """
         # the operator and the fast Fourier transform
         oper = self.oper
-        ifft_as_arg = oper.ifft_as_arg
 
         # get or compute rot_fft, ux and uy
         if state_spect is None:
@@ -155,22 +163,34 @@ class Simul(SimulBasePseudoSpectral):
             uy = self.state.state_phys.get_var("uy")
         else:
             rot_fft = state_spect.get_var("rot_fft")
-            ux_fft, uy_fft = oper.vecfft_from_rotfft(rot_fft)
+            ux_fft = self.state.field_spect_tmp0
+            uy_fft = self.state.field_spect_tmp1
+            oper.vecfft_from_rotfft_outin(rot_fft, ux_fft, uy_fft)
             ux = self.state.field_tmp0
             uy = self.state.field_tmp1
-            ifft_as_arg(ux_fft, ux)
-            ifft_as_arg(uy_fft, uy)
+            oper.ifft_many(
+                self.state.fields_spect_tmp,
+                self.state.fields_tmp[0:2],
+                destroy=True,
+            )
 
         # "px" like $\partial_x$
-        px_rot_fft, py_rot_fft = oper.gradfft_from_fft(rot_fft)
+        px_rot_fft = self.state.field_spect_tmp0
+        py_rot_fft = self.state.field_spect_tmp1
+        oper.gradfft_from_fft_outin(rot_fft, px_rot_fft, py_rot_fft)
 
         px_rot = self.state.field_tmp2
         py_rot = self.state.field_tmp3
 
-        ifft_as_arg(px_rot_fft, px_rot)
-        ifft_as_arg(py_rot_fft, py_rot)
+        oper.ifft_many(
+            self.state.fields_spect_tmp,
+            self.state.fields_tmp[2:4],
+            destroy=True,
+        )
 
-        Frot = compute_Frot(ux, uy, px_rot, py_rot, self.params.beta)
+        # the result is written in the array px_rot
+        Frot = px_rot
+        compute_Frot_outin(ux, uy, px_rot, py_rot, self.params.beta, Frot)
 
         if old is None:
             tendencies_fft = SetOfVariables(like=self.state.state_spect)
@@ -189,7 +209,7 @@ class Simul(SimulBasePseudoSpectral):
         #                self.oper.sum_wavenumbers(abs(T_rot))))
 
         if self.params.forcing.enable:
-            tendencies_fft += self.forcing.get_forcing()
+            self.forcing.add_to_tendencies(tendencies_fft)
 
         return tendencies_fft
 
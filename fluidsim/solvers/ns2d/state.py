@@ -7,7 +7,6 @@
 
 """
 
-import numpy as np
 
 from fluidsim.base.state import StatePseudoSpectral
 
@@ -37,14 +36,20 @@ class StateNS2D(StatePseudoSpectral):
             }
         )
 
+    _nb_fields_tmp = 4
+
     def __init__(self, sim, oper=None):
 
         super().__init__(sim, oper)
 
-        self.field_tmp0 = np.empty_like(self.state_phys[0])
-        self.field_tmp1 = np.empty_like(self.state_phys[0])
-        self.field_tmp2 = np.empty_like(self.state_phys[0])
-        self.field_tmp3 = np.empty_like(self.state_phys[0])
+        # stacked arrays (if possible) so that several fields can be
+        # transformed at once (see ``oper.fft_many`` and ``oper.ifft_many``)
+        self.fields_tmp = self.oper.create_arrays_many(self._nb_fields_tmp)
+        for index, field in enumerate(self.fields_tmp):
+            setattr(self, f"field_tmp{index}", field)
+
+        self.fields_spect_tmp = self.oper.create_arrays_many(2, spectral=True)
+        self.field_spect_tmp0, self.field_spect_tmp1 = self.fields_spect_tmp
 
     def compute(self, key, SAVE_IN_DICT=True, RAISE_ERROR=True):
         """Compute and return a variable"""
@@ -92,15 +97,15 @@ class StateNS2D(StatePseudoSpectral):
     def statephys_from_statespect(self):
         """Compute `state_phys` from `statespect`."""
         rot_fft = self.state_spect.get_var("rot_fft")
-        ux_fft, uy_fft = self.oper.vecfft_from_rotfft(rot_fft)
+        ux_fft, uy_fft = self.fields_spect_tmp
+        self.oper.vecfft_from_rotfft_outin(rot_fft, ux_fft, uy_fft)
 
         rot = self.state_phys.get_var("rot")
-        ux = self.state_phys.get_var("ux")
-        uy = self.state_phys.get_var("uy")
-
         self.oper.ifft_as_arg(rot_fft, rot)
-        self.oper.ifft_as_arg(ux_fft, ux)
-        self.oper.ifft_as_arg(uy_fft, uy)
+        # ux and uy are the first variables of state_phys
+        self.oper.ifft_many(
+            self.fields_spect_tmp, self.state_phys[:2], destroy=True
+        )
 
     def statespect_from_statephys(self):
         """Compute `state_spect` from `state_phys`."""
@@ -265,12 +265,12 @@ class TestForcingOutput(TestSimulBase):
 
         assert kx_max == KX.max()
 
-        from fluidsim.solvers.ns2d.output.spatiotemporal_spectra import (
-            _sum_wavenumber2D,
+        from fluidsim.base.output.spatiotemporal_spectra import (
+            sum_wavenumber_vectorized,
         )
 
         def sum_wavenumber(field):
-            return _sum_wavenumber2D(field, KX, kx_max)
+            return sum_wavenumber_vectorized(field, KX, kx_max)
 
         tspectrum_mean = (
             spectra_omega["spectrum_ux"] + spectra_omega["spectrum_uy"]
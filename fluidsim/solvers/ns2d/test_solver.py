@@ -1,12 +1,16 @@
 import unittest
+from pathlib import Path
 
 import numpy as np
+import h5py
 import matplotlib.pyplot as plt
 
 import fluidsim as fls
 
 import fluiddyn.util.mpi as mpi
 
+from fluidsim.base.output.base import _appenders_open
+from fluidsim.util.output import IndexPhysFiles
 from fluidsim.util.testing import TestSimul, classproperty, skip_if_no_fluidfft
 
 
@@ -67,6 +71,186 @@ class TestSolverNS2DTendency(TestSimulBase):
         self.assertGreater(1e-15, abs(ratio))
 
 
+class TestCheckAllocations(TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.output.HAS_TO_SAVE = False
+        params.time_stepping.check_allocations.enable = True
+
+    def test_check_allocations(self):
+        time_stepping = self.sim.time_stepping
+        time_stepping.one_time_step()
+        self.assertGreater(time_stepping.nb_bytes_allocated, 0)
+
+        self.sim.params.time_stepping.check_allocations.max_nb_bytes = 0
+        with self.assertRaises(ValueError):
+            time_stepping.one_time_step()
+
+
+class TestAsyncSave(TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.time_stepping.t_end = 0.3
+        params.output.periods_save.phys_fields = 0.1
+        params.output.phys_fields.async_save = True
+        params.output.phys_fields.async_max_pending = 1
+
+    def test_async_save(self):
+        sim = self.sim
+        sim.time_stepping.start()
+        self.assertEqual(len(sim.output.phys_fields._async_saver.pending), 0)
+
+        set_of_phys_files = sim.output.phys_fields.set_of_phys_files
+        set_of_phys_files.update_times()
+        self.assertEqual(len(set_of_phys_files.times), 4)
+
+        if mpi.nb_proc > 1:
+            return
+
+        # sidecar index of the state files
+        entries = IndexPhysFiles(sim.output.path_run).get_entries()
+        self.assertEqual(len(entries), 4)
+        self.assertEqual(entries[-1]["it"], sim.time_stepping.it)
+        self.assertEqual(entries[-1]["shape"], [32, 32])
+
+        field_file, time = set_of_phys_files.get_field_to_plot(
+            idx_time=-1, key="rot"
+        )
+        self.assertEqual(time, sim.time_stepping.t)
+        self.assertTrue(np.allclose(field_file, sim.state.get_var("rot")))
+
+        # lazy access (memory map) and cache of the frames
+        lazy_field = set_of_phys_files.get_lazy_field(-1, "rot")
+        self.assertIsNotNone(lazy_field._memmap)
+        self.assertTrue(np.array_equal(lazy_field[2], field_file[2]))
+        field_cached, _ = set_of_phys_files.get_field_to_plot(
+            idx_time=-1, key="rot"
+        )
+        self.assertEqual(len(set_of_phys_files._cache_frames), 1)
+        self.assertTrue(np.array_equal(field_cached, field_file))
+
+
+class TestAppender(TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.time_stepping.USE_CFL = False
+        params.time_stepping.deltat0 = 0.05
+        params.output.periods_save.spectra = 0.05
+        params.output.appender.enable = True
+        params.output.appender.nb_saves_buffer = 3
+
+    def test_appender(self):
+        sim = self.sim
+        sim.time_stepping.start()
+        if mpi.rank > 0:
+            return
+
+        self.assertEqual(sim.output._appender._files, {})
+        self.assertNotIn(sim.output._appender, _appenders_open)
+        with h5py.File(sim.output.spectra.path_file1D, "r") as file:
+            times = file["times"][...]
+            self.assertEqual(len(times), sim.output.spectra.nb_saved_times)
+            self.assertEqual(file["spectrum1Dkx_E"].shape[0], len(times))
+        self.assertTrue(np.all(np.diff(times) > 0))
+        self.assertAlmostEqual(times[-1], sim.time_stepping.t)
+
+        sim.output.spectra.load2d_mean()
+
+
+class TestIncrements(TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.oper.ny = 16
+        params.output.periods_save.increments = 0.25
+        params.output.increments.axes = ["x", "y"]
+
+    def test_increments(self):
+        sim = self.sim
+        increments = sim.output.increments
+        sim.time_stepping.start()
+        increments.nbins = 20
+        dict_results = increments.compute()
+        if mpi.nb_proc > 1:
+            return
+
+        for key, axis, index_axis in (("ux", "x", 1), ("rot", "y", 0)):
+            var = sim.state.get_var(key)
+            key_dataset = key if axis == "x" else key + "_" + axis
+            separations = increments.separations[axis]
+            pdf = dict_results["pdf_delta_" + key_dataset].reshape(
+                [separations.size, 20]
+            )
+            struc_func = dict_results["struc_func_" + key_dataset]
+            struc_func_abs = dict_results["struc_func_abs_" + key_dataset]
+            for ir, r in enumerate(separations):
+                inc = np.roll(var, -r, axis=index_axis) - var
+                pdf_ref, bin_edges = np.histogram(inc, bins=20, density=True)
+                self.assertTrue(np.allclose(pdf[ir], pdf_ref))
+                self.assertAlmostEqual(
+                    dict_results["valmin_" + key_dataset][ir], bin_edges[0]
+                )
+                for iorder, order in enumerate(increments.orders):
+                    self.assertTrue(
+                        np.allclose(struc_func[ir, iorder], np.mean(inc**order))
+                    )
+                    self.assertTrue(
+                        np.allclose(
+                            struc_func_abs[ir, iorder],
+                            np.mean(abs(inc) ** order),
+                        )
+                    )
+
+        with h5py.File(increments.path_file, "r") as file:
+            self.assertIn("struc_func_rot_y", file)
+            self.assertIn("rys", file)
+        dict_saved = increments.load()
+        self.assertIn("struc_func_ux", dict_saved)
+
+
+class TestStateSpectFiles(TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.time_stepping.t_end = 0.2
+        params.output.periods_save.phys_fields = 0.1
+        params.output.phys_fields.file_type = "state_spect"
+
+    def test_state_spect_files(self):
+        sim = self.sim
+        sim.time_stepping.start()
+        path_run = sim.output.path_run
+
+        sim2 = fls.load_state_phys_file(path_run, modif_save_params=False)
+        self.assertEqual(sim2.time_stepping.t, sim.time_stepping.t)
+        self.assertEqual(sim2.time_stepping.it, sim.time_stepping.it)
+        self.assertTrue(
+            np.array_equal(sim2.state.state_spect, sim.state.state_spect)
+        )
+        self.assertTrue(
+            np.allclose(sim2.state.get_var("rot"), sim.state.get_var("rot"))
+        )
+
+        # the modes are loaded with their global indices (as for a file saved
+        # with another decomposition over the processes)
+        path_file = sorted(Path(path_run).glob("state_spect_*"))[-1]
+        with h5py.File(path_file, "r+") as file:
+            group = file["state_spect"]
+            indices = group["indices_kept"][...]
+            self.assertTrue(np.all(np.diff(indices) > 0))
+            permutation = np.random.permutation(indices.size)
+            for key in group.keys():
+                group[key][...] = group[key][...][permutation]
+
+        sim3 = fls.load_state_phys_file(path_run, modif_save_params=False)
+        self.assertTrue(
+            np.array_equal(sim3.state.state_spect, sim.state.state_spect)
+        )
+
+
 class TestForcingProportional(TestSimulBase):
     @classmethod
     def init_params(self):
@@ -79,6 +263,25 @@ class TestForcingProportional(TestSimulBase):
         self.sim.forcing.forcing_maker.verify_injection_rate()
         self.sim.forcing.forcing_maker.verify_injection_rate_coarse()
 
+        # the forcing is added only for the forced modes
+        forcing_fft = self.sim.forcing.get_forcing()
+        self.assertGreater(abs(forcing_fft).max(), 0)
+        frot_fft = forcing_fft.get_var("rot_fft")
+        rot_fft = self.sim.state.get_var("rot_fft")
+        sum_wavenumbers = self.sim.oper.sum_wavenumbers
+        P1, P2 = self.sim.forcing.compute_injection_rates("rot_fft")
+        self.assertTrue(
+            np.allclose(P1, sum_wavenumbers((rot_fft.conj() * frot_fft).real))
+        )
+        self.assertTrue(np.allclose(P2, sum_wavenumbers(abs(frot_fft) ** 2)))
+        tendencies_fft = self.sim.state.state_spect.copy()
+        self.sim.forcing.add_to_tendencies(tendencies_fft)
+        self.assertTrue(
+            np.allclose(
+                tendencies_fft, self.sim.state.state_spect + forcing_fft
+            )
+        )
+
 
 class TestForcing(TestSimulBase):
     @classmethod
@@ -113,6 +316,83 @@ class TestForcingConstantRateEnergy(TestSimulBase):
             )
 
 
+class TestForcingDistributed(TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.forcing.enable = True
+        params.forcing.type = "tcrandom"
+        params.forcing.random.distributed = True
+        params.forcing.forcing_rate = 3.333
+
+    def test_distributed(self):
+        sim = self.sim
+        oper = sim.oper
+        forcing_maker = sim.forcing.forcing_maker
+        sim.time_stepping.deltat = deltat = 0.01
+        forcing_maker.compute()
+
+        rot_fft = sim.state.get_var("rot_fft")
+        frot_fft = forcing_maker.forcing_fft.get_var("rot_fft")
+        injection = deltat / 2 * oper.sum_wavenumbers(
+            abs(frot_fft) ** 2
+        ) + oper.sum_wavenumbers((rot_fft.conj() * frot_fft).real)
+        self.assertTrue(np.allclose(injection, sim.params.forcing.forcing_rate))
+
+        # injection rates computed only from the forced modes
+        PZ1, PZ2 = sim.forcing.compute_injection_rates("rot_fft")
+        self.assertTrue(np.allclose(PZ1 + deltat / 2 * PZ2, injection))
+        PK1, PK2 = sim.forcing.compute_injection_rates("rot_fft", oper.K2_not0)
+        self.assertTrue(
+            np.allclose(
+                PK2,
+                oper.sum_wavenumbers(abs(frot_fft) ** 2 / oper.K2_not0),
+            )
+        )
+
+        tendencies_fft = sim.state.state_spect.copy()
+        sim.forcing.add_to_tendencies(tendencies_fft)
+        self.assertTrue(
+            np.allclose(
+                tendencies_fft,
+                sim.state.state_spect + forcing_maker.forcing_fft,
+            )
+        )
+
+        # the raw forcing is a coarse random field as in the sequential mode
+        seed = forcing_maker._seed0
+        f_fft = oper.create_arrayK(value=0)
+        np.put(
+            f_fft,
+            forcing_maker._ind_forcing_loc,
+            forcing_maker._compute_forcing_raw_distributed(seed),
+        )
+
+        shape_coarse = forcing_maker.shapeK_loc_coarse
+        oper_coarse = None
+        fc_fft = None
+        if mpi.rank == 0:
+            oper_coarse = forcing_maker.oper_coarse
+            numbers = np.random.Generator(np.random.Philox(key=seed)).random(
+                2 * np.prod(shape_coarse)
+            )
+            fc_fft = numbers[0::2] + 1j * numbers[1::2]
+            fc_fft = 2 * fc_fft.reshape(shape_coarse) - (1 + 1j)
+            fc_fft[shape_coarse[0] // 2] = 0.0
+            fc_fft[:, shape_coarse[1] - 1] = 0.0
+            fc_fft = oper_coarse.project_fft_on_realX(fc_fft)
+            fc_fft[forcing_maker.COND_NO_F] = 0.0
+
+        f_fft_ref = oper.create_arrayK(value=0)
+        oper.put_coarse_array_in_array_fft(
+            fc_fft, f_fft_ref, oper_coarse, shape_coarse
+        )
+        self.assertTrue(np.allclose(f_fft, f_fft_ref))
+        self.assertTrue(np.allclose(oper.project_fft_on_realX(f_fft), f_fft))
+
+        sim.time_stepping.start()
+
+
 class TestForcingOutput(TestSimulBase):
     @classmethod
     def init_params(self):
@@ -18,7 +18,7 @@ class TimeStepping(TimeSteppingPseudoSpectral):
         uy_fft = state_spect.get_var("uy_fft")
         self.sim.oper.projection_perp(ux_fft, uy_fft)
         self.sim.state.statephys_from_statespect()
-        if np.isnan(np.sum(state_spect[0])):
+        if np.isnan(np.sum(state_spect[0].ravel())):
             raise ValueError(f"nan at it = {self.it}, t = {self.t:.4f}")
 
 
@@ -136,6 +136,6 @@ class Simul(SimulBase):
         tendencies_fft.set_var("uy_fft", Fy_fft)
 
         if self.params.forcing.enable:
-            tendencies_fft += self.forcing.get_forcing()
+            self.forcing.add_to_tendencies(tendencies_fft)
 
         return tendencies_fft
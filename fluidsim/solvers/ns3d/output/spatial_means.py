@@ -44,31 +44,12 @@ class SpatialMeansNS3D(SpatialMeansBase):
 
         if self.sim.params.forcing.enable:
             deltat = self.sim.time_stepping.deltat
-            forcing_fft = self.sim.forcing.get_forcing()
-
-            fx_fft = forcing_fft.get_var("vx_fft")
-            fy_fft = forcing_fft.get_var("vy_fft")
-            fz_fft = forcing_fft.get_var("vz_fft")
-
-            vx_fft = self.sim.state.state_spect.get_var("vx_fft")
-            vy_fft = self.sim.state.state_spect.get_var("vy_fft")
-            vz_fft = self.sim.state.state_spect.get_var("vz_fft")
-
-            PK1_fft = np.ascontiguousarray(
-                np.real(
-                    vx_fft.conj() * fx_fft
-                    + vy_fft.conj() * fy_fft
-                    + vz_fft.conj() * fz_fft
-                )
-            )
-            PK2_fft = (
-                (abs(fx_fft) ** 2 + abs(fy_fft) ** 2 + abs(fz_fft) ** 2)
-                * deltat
-                / 2
-            )
-
-            PK1 = self.sum_wavenumbers(PK1_fft)
-            PK2 = self.sum_wavenumbers(PK2_fft)
+            PK1 = PK2 = 0.0
+            for key in ("vx_fft", "vy_fft", "vz_fft"):
+                P1, P2 = self.sim.forcing.compute_injection_rates(key)
+                PK1 += P1
+                PK2 += P2
+            PK2 *= deltat / 2
 
         if mpi.rank == 0:
 
@@ -16,8 +16,6 @@ import numpy as np
 
 from fluiddyn.util.mpi import rank
 
-from fluidfft.fft3d.operators import vector_product
-
 from fluidsim.base.setofvariables import SetOfVariables
 from fluidsim.operators.operators3d import dealiasing_variable
 
@@ -159,14 +157,15 @@ no_vz_kz0: bool (default False)
 
     def tendencies_nonlin(self, state_spect=None, old=None):
         oper = self.oper
-        ifft_as_arg = oper.ifft_as_arg
-        ifft_as_arg_destroy = oper.ifft_as_arg_destroy
-        fft_as_arg = oper.fft_as_arg
+        fields_tmp = self.state.fields_tmp
 
         if state_spect is None:
             spect_get_var = self.state.state_spect.get_var
         else:
             spect_get_var = state_spect.get_var
+            # the velocity transforms overlap with the computation of the
+            # vorticity (with params.oper.overlap_comm)
+            oper.ifft_many_start(state_spect[:3], fields_tmp[:3])
 
         vx_fft = spect_get_var("vx_fft")
         vy_fft = spect_get_var("vy_fft")
@@ -183,13 +182,10 @@ no_vz_kz0: bool (default False)
         if self.params.f is not None:
             self._modif_omegafft_with_f(omegax_fft, omegay_fft, omegaz_fft)
 
-        omegax = self.state.fields_tmp[3]
-        omegay = self.state.fields_tmp[4]
-        omegaz = self.state.fields_tmp[5]
-
-        ifft_as_arg_destroy(omegax_fft, omegax)
-        ifft_as_arg_destroy(omegay_fft, omegay)
-        ifft_as_arg_destroy(omegaz_fft, omegaz)
+        oper.ifft_many_start(
+            self.state.fields_spect_tmp, fields_tmp[3:], destroy=True
+        )
+        oper.wait_transforms()
 
         if state_spect is None:
             vx = self.state.state_phys.get_var("vx")
@@ -199,11 +195,6 @@ no_vz_kz0: bool (default False)
             vx = self.state.fields_tmp[0]
             vy = self.state.fields_tmp[1]
             vz = self.state.fields_tmp[2]
-            ifft_as_arg(vx_fft, vx)
-            ifft_as_arg(vy_fft, vy)
-            ifft_as_arg(vz_fft, vz)
-
-        fx, fy, fz = vector_product(vx, vy, vz, omegax, omegay, omegaz)
 
         if old is None:
             tendencies_fft = SetOfVariables(
@@ -216,9 +207,10 @@ no_vz_kz0: bool (default False)
         fy_fft = tendencies_fft.get_var("vy_fft")
         fz_fft = tendencies_fft.get_var("vz_fft")
 
-        fft_as_arg(fx, fx_fft)
-        fft_as_arg(fy, fy_fft)
-        fft_as_arg(fz, fz_fft)
+        # the arrays of the vorticity are used as temporary arrays
+        oper.vecfft_from_vector_product_outin(
+            (vx, vy, vz), fields_tmp[3:], tendencies_fft[:3]
+        )
 
         oper.project_perpk3d(fx_fft, fy_fft, fz_fft)
 
@@ -226,7 +218,7 @@ no_vz_kz0: bool (default False)
             dealiasing_variable(fz_fft, self.where_kz_0)
 
         if self.is_forcing_enabled:
-            tendencies_fft += self.forcing.get_forcing()
+            self.forcing.add_to_tendencies(tendencies_fft)
 
         self.oper.dealiasing(tendencies_fft)
         return tendencies_fft
@@ -38,13 +38,18 @@ class StateNS3D(StatePseudoSpectral):
 
         super().__init__(sim, oper)
 
-        self.fields_tmp = tuple(
-            np.empty_like(self.state_phys[0]) for n in range(6)
-        )
-
-        self.fields_spect_tmp = tuple(
-            np.empty_like(self.state_spect[0]) for n in range(3)
-        )
+        # stacked arrays (if possible) so that several fields can be
+        # transformed at once (see ``oper.fft_many`` and ``oper.ifft_many``)
+        self.fields_tmp = self.oper.create_arrays_many(6)
+        self.fields_spect_tmp = self.oper.create_arrays_many(3, spectral=True)
+
+    def statespect_from_statephys(self):
+        """Compute the spectral variables from the physical variables."""
+        self.oper.fft_many(self.state_phys, self.state_spect)
+
+    def statephys_from_statespect(self):
+        """Compute the physical variables from the spectral variables."""
+        self.oper.ifft_many(self.state_spect, self.state_phys)
 
     def compute(self, key, SAVE_IN_DICT=True, RAISE_ERROR=True):
         it = self.sim.time_stepping.it
@@ -62,34 +62,16 @@ class SpatialMeansNS3DStrat(SpatialMeansNS3D):
 
         if self.sim.params.forcing.enable:
             deltat = self.sim.time_stepping.deltat
-            forcing_fft = self.sim.forcing.get_forcing()
-
-            fx_fft = forcing_fft.get_var("vx_fft")
-            fy_fft = forcing_fft.get_var("vy_fft")
-            fz_fft = forcing_fft.get_var("vz_fft")
-            fb_fft = forcing_fft.get_var("b_fft")
-
-            get_var = self.sim.state.state_spect.get_var
-            vx_fft = get_var("vx_fft")
-            vy_fft = get_var("vy_fft")
-            vz_fft = get_var("vz_fft")
-            b_fft = get_var("b_fft")
-
-            PK1_fft = np.real(
-                vx_fft.conj() * fx_fft
-                + vy_fft.conj() * fy_fft
-                + vz_fft.conj() * fz_fft
-            )
-            PK2_fft = abs(fx_fft) ** 2 + abs(fy_fft) ** 2 + abs(fz_fft) ** 2
-
-            PK1 = self.sum_wavenumbers(np.ascontiguousarray(PK1_fft))
-            PK2 = self.sum_wavenumbers(PK2_fft) * deltat / 2
-
-            PA1_fft = np.real(b_fft.conj() * fb_fft)
-            PA2_fft = abs(fb_fft) ** 2
-
-            PA1 = self.sum_wavenumbers(np.ascontiguousarray(PA1_fft))
-            PA2 = self.sum_wavenumbers(PA2_fft) * deltat / 2
+            forcing = self.sim.forcing
+            PK1 = PK2 = 0.0
+            for key in ("vx_fft", "vy_fft", "vz_fft"):
+                P1, P2 = forcing.compute_injection_rates(key)
+                PK1 += P1
+                PK2 += P2
+            PK2 *= deltat / 2
+
+            PA1, PA2 = forcing.compute_injection_rates("b_fft")
+            PA2 *= deltat / 2
 
             PA1 *= self.one_over_N2
             PA2 *= self.one_over_N2
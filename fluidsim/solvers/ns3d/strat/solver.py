@@ -13,9 +13,8 @@
 
 """
 
-from transonic import boost
-
-from fluidfft.fft3d.operators import vector_product
+import numpy as np
+from transonic import boost, Array, Type
 
 from fluidsim.base.setofvariables import SetOfVariables
 from fluidsim.operators.operators3d import dealiasing_variable
@@ -23,7 +22,8 @@ from fluidsim.operators.operators3d import dealiasing_variable
 from ..solver import InfoSolverNS3D, Simul as SimulNS3D
 
 
-Ac = "complex128[:,:,:]"
+# fields in double or single precision (params.oper.precision)
+Ac = Array[Type(np.complex128, np.complex64), "3d"]
 
 
 @boost
@@ -137,34 +137,36 @@ class Simul(SimulNS3D):
 
     def tendencies_nonlin(self, state_spect=None, old=None):
         oper = self.oper
-        ifft_as_arg = oper.ifft_as_arg
-        ifft_as_arg_destroy = oper.ifft_as_arg_destroy
-        fft_as_arg = oper.fft_as_arg
+        fields_tmp = self.state.fields_tmp
 
         if state_spect is None:
             spect_get_var = self.state.state_spect.get_var
         else:
             spect_get_var = state_spect.get_var
+            # the velocity transforms overlap with the computation of the
+            # vorticity (with params.oper.overlap_comm)
+            oper.ifft_many_start(state_spect[:3], fields_tmp[:3])
 
         vx_fft = spect_get_var("vx_fft")
         vy_fft = spect_get_var("vy_fft")
         vz_fft = spect_get_var("vz_fft")
         b_fft = spect_get_var("b_fft")
 
-        omegax_fft, omegay_fft, omegaz_fft = oper.rotfft_from_vecfft(
-            vx_fft, vy_fft, vz_fft
+        omegax_fft = self.state.fields_spect_tmp[0]
+        omegay_fft = self.state.fields_spect_tmp[1]
+        omegaz_fft = self.state.fields_spect_tmp[2]
+
+        oper.rotfft_from_vecfft_outin(
+            vx_fft, vy_fft, vz_fft, omegax_fft, omegay_fft, omegaz_fft
         )
 
         if self.params.f is not None:
             self._modif_omegafft_with_f(omegax_fft, omegay_fft, omegaz_fft)
 
-        omegax = self.state.fields_tmp[3]
-        omegay = self.state.fields_tmp[4]
-        omegaz = self.state.fields_tmp[5]
-
-        ifft_as_arg_destroy(omegax_fft, omegax)
-        ifft_as_arg_destroy(omegay_fft, omegay)
-        ifft_as_arg_destroy(omegaz_fft, omegaz)
+        oper.ifft_many_start(
+            self.state.fields_spect_tmp, fields_tmp[3:], destroy=True
+        )
+        oper.wait_transforms()
 
         if state_spect is None:
             vx = self.state.state_phys.get_var("vx")
@@ -174,11 +176,6 @@ class Simul(SimulNS3D):
             vx = self.state.fields_tmp[0]
             vy = self.state.fields_tmp[1]
             vz = self.state.fields_tmp[2]
-            ifft_as_arg(vx_fft, vx)
-            ifft_as_arg(vy_fft, vy)
-            ifft_as_arg(vz_fft, vz)
-
-        fx, fy, fz = vector_product(vx, vy, vz, omegax, omegay, omegaz)
 
         if old is None:
             tendencies_fft = SetOfVariables(
@@ -191,9 +188,10 @@ class Simul(SimulNS3D):
         fy_fft = tendencies_fft.get_var("vy_fft")
         fz_fft = tendencies_fft.get_var("vz_fft")
 
-        fft_as_arg(fx, fx_fft)
-        fft_as_arg(fy, fy_fft)
-        fft_as_arg(fz, fz_fft)
+        # the arrays of the vorticity are used as temporary arrays
+        oper.vecfft_from_vector_product_outin(
+            (vx, vy, vz), fields_tmp[3:], tendencies_fft[:3]
+        )
 
         fz_fft += b_fft
 
@@ -203,19 +201,28 @@ class Simul(SimulNS3D):
             b = self.state.state_phys.get_var("b")
         else:
             b = self.state.fields_tmp[3]
-            ifft_as_arg(b_fft, b)
-
-        div_vb_fft = oper.div_vb_fft_from_vb(vx, vy, vz, b)
-        fb_fft = compute_fb_fft(div_vb_fft, self.params.N, vz_fft)
+            oper.ifft_as_arg(b_fft, b)
+
+        # the arrays of the vorticity are used as temporary arrays
+        fb_fft = tendencies_fft.get_var("b_fft")
+        oper.div_vb_fft_from_vb_outin(
+            vx,
+            vy,
+            vz,
+            b,
+            fb_fft,
+            self.state.fields_tmp[4],
+            omegax_fft,
+            omegay_fft,
+        )
+        compute_fb_fft(fb_fft, self.params.N, vz_fft)
 
         if self.no_vz_kz0:
             dealiasing_variable(fz_fft, self.where_kz_0)
             dealiasing_variable(fb_fft, self.where_kz_0)
 
-        tendencies_fft.set_var("b_fft", fb_fft)
-
         if self.is_forcing_enabled:
-            tendencies_fft += self.forcing.get_forcing()
+            self.forcing.add_to_tendencies(tendencies_fft)
 
         self.oper.dealiasing(tendencies_fft)
         return tendencies_fft
@@ -223,8 +230,6 @@ class Simul(SimulNS3D):
 
 if __name__ == "__main__":
 
-    import numpy as np
-
     import fluiddyn as fld
 
     params = Simul.create_default_params()
@@ -11,6 +11,8 @@ import fluidsim as fls
 
 from fluidsim.extend_simul import extend_simul_class
 
+from fluidsim.util.testing import MixinCheckTimeSchemesBuffers
+
 from ..test_solver import TestSimulBase as _Base, classproperty
 
 
@@ -61,6 +63,66 @@ class TestTendency(TestSimulBase):
         self.assertGreater(1e-15, abs(ratio))
 
 
+class TestTendencyOverlapComm(TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.oper.overlap_comm = True
+        params.output.HAS_TO_SAVE = False
+
+    def test_overlap_comm(self):
+        sim = self.sim
+        state_spect = sim.state.state_spect.copy()
+        tend = sim.tendencies_nonlin(state_spect=state_spect).copy()
+        sim.oper.overlap_comm = False
+        try:
+            tend_no_overlap = sim.tendencies_nonlin(state_spect=state_spect)
+        finally:
+            sim.oper.overlap_comm = True
+        np.testing.assert_allclose(tend, tend_no_overlap)
+
+
+class TestPrecisionFloat32(TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.oper.precision = "float32"
+        params.init_fields.type = "noise"
+        params.output.HAS_TO_SAVE = False
+
+    def test_float32(self):
+        sim = self.sim
+        self.assertEqual(sim.state.state_spect.dtype, np.complex64)
+
+        tend = sim.tendencies_nonlin(state_spect=sim.state.state_spect)
+        self.assertEqual(tend.dtype, np.complex64)
+
+        T_tot = np.zeros(sim.oper.shapeK_loc)
+        for axis in ("x", "y", "z"):
+            key = f"v{axis}_fft"
+            T_tot += np.real(tend.get_var(key).conj() * sim.state.get_var(key))
+        key = "b_fft"
+        T_tot += (
+            1.0
+            / sim.params.N ** 2
+            * np.real(tend.get_var(key).conj() * sim.state.get_var(key))
+        )
+        ratio = sim.oper.sum_wavenumbers(T_tot) / sim.oper.sum_wavenumbers(
+            abs(T_tot)
+        )
+        self.assertGreater(1e-5, abs(ratio))
+
+        sim.time_stepping.start()
+        self.assertEqual(sim.state.state_spect.dtype, np.complex64)
+
+
+class TestTimeSchemesBuffers(MixinCheckTimeSchemesBuffers, TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.output.HAS_TO_SAVE = False
+
+
 class TestOutput(TestSimulBase):
     @classproperty
     def Simul(cls):
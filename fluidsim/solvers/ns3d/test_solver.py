@@ -1,11 +1,13 @@
 import unittest
 import sys
 from pathlib import Path
+from tempfile import TemporaryDirectory
 from math import pi
 
 import pytest
 
 import numpy as np
+import h5py
 import matplotlib.pyplot as plt
 
 import fluidsim as fls
@@ -24,6 +26,36 @@ from fluidsim.base.output import run
 from fluidsim.util.testing import TestSimul, skip_if_no_fluidfft, classproperty
 
 
+def compute_spectrum_kzkhomega_loops(field, khs, kzs, KX, KZ, KH):
+    """Reference (loop-based) version of compute_spectrum_kzkhomega_bincount"""
+    deltakh = khs[1]
+    deltakz = kzs[1]
+    nkh = len(khs)
+    nkz = len(kzs)
+    nomega = field.shape[-1]
+    spectrum = np.zeros((nkz, nkh, nomega))
+
+    for index in np.ndindex(KX.shape):
+        values = field[index]
+        if KX[index] != 0.0:
+            values = 2 * values
+        kappa = KH[index]
+        ikh = int(kappa / deltakh)
+        ikz = min(int(round(abs(KZ[index]) / deltakz)), nkz - 1)
+        if ikh >= nkh - 1:
+            spectrum[ikz, nkh - 1] += values
+        else:
+            coef_share = (kappa - khs[ikh]) / deltakh
+            spectrum[ikz, ikh] += (1 - coef_share) * values
+            spectrum[ikz, ikh + 1] += coef_share * values
+
+    # get one-sided spectrum in the omega dimension
+    nomega = (nomega + 1) // 2
+    spectrum_onesided = spectrum[:, :, :nomega].copy()
+    spectrum_onesided[:, :, 1:] += spectrum[:, :, -1:-nomega:-1]
+    return spectrum_onesided / (deltakz * deltakh)
+
+
 @skip_if_no_fluidfft
 class TestSimulBase(TestSimul):
     @classproperty
@@ -88,6 +120,336 @@ class TestTendency(TestSimulBase):
         self.assertGreater(1e-15, abs(ratio))
 
 
+class TestCheckAllocations(TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.output.HAS_TO_SAVE = False
+        params.time_stepping.check_allocations.enable = True
+
+    def test_check_allocations(self):
+        sim = self.sim
+        time_stepping = sim.time_stepping
+        # the buffers are allocated during the first time step
+        time_stepping.one_time_step()
+        # measured even though one_time_step_computation is overridden
+        self.assertGreater(time_stepping.nb_bytes_allocated, 0)
+        # then no array as large as the state is allocated
+        max_nb_bytes = sim.state.state_spect.nbytes
+        sim.params.time_stepping.check_allocations.max_nb_bytes = max_nb_bytes
+        time_stepping.one_time_step()
+        self.assertLessEqual(time_stepping.nb_bytes_allocated, max_nb_bytes)
+
+        sim.params.time_stepping.check_allocations.max_nb_bytes = 0
+        if time_stepping.nb_bytes_allocated > 0:
+            with self.assertRaises(ValueError):
+                time_stepping.one_time_step()
+
+
+class TestPrecisionFloat32(TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.oper.precision = "float32"
+        params.output.HAS_TO_SAVE = False
+
+    def test_float32(self):
+        sim = self.sim
+        self.assertEqual(sim.state.state_phys.dtype, np.float32)
+        self.assertEqual(sim.state.state_spect.dtype, np.complex64)
+
+        tend = sim.tendencies_nonlin(state_spect=sim.state.state_spect)
+        self.assertEqual(tend.dtype, np.complex64)
+
+        T_tot = np.zeros(sim.oper.shapeK_loc)
+        for axis in ("x", "y", "z"):
+            key = f"v{axis}_fft"
+            T_tot += np.real(tend.get_var(key).conj() * sim.state.get_var(key))
+        ratio = sim.oper.sum_wavenumbers(T_tot) / sim.oper.sum_wavenumbers(
+            abs(T_tot)
+        )
+        self.assertGreater(1e-6, abs(ratio))
+
+        sim.time_stepping.start()
+        self.assertEqual(sim.state.state_spect.dtype, np.complex64)
+
+        sim.params.oper.precision = "float16"
+        with self.assertRaises(ValueError):
+            type(sim.oper)(sim.params)
+        sim.params.oper.precision = "float32"
+
+        # the compiled methods of fluidfft are only replaced in float32
+        for name in sim.oper._names_methods_float32:
+            self.assertIn(name, vars(sim.oper))
+        sim.params.oper.precision = "float64"
+        oper = type(sim.oper)(sim.params)
+        sim.params.oper.precision = "float32"
+        for name in sim.oper._names_methods_float32:
+            self.assertNotIn(name, vars(oper))
+
+
+class TestPerRankFiles(TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.output.periods_save.phys_fields = 0.2
+        params.output.phys_fields.per_rank_files = True
+
+    def test_per_rank_files(self):
+        sim = self.sim
+        sim.time_stepping.start()
+
+        path_run = Path(sim.output.path_run)
+        paths = sorted(path_run.glob("state_phys*"))
+        self.assertTrue(all(path.suffix == ".h5" for path in paths))
+        paths_rank = sorted((path_run / "per_rank_files").glob("*.h5"))
+        self.assertEqual(len(paths_rank), len(paths) * mpi.nb_proc)
+
+        sim2 = load_state_phys_file(path_run)
+        self.assertEqual(sim2.time_stepping.it, sim.time_stepping.it)
+        self.assertTrue(np.allclose(sim2.state.state_phys, sim.state.state_phys))
+
+
+class TestChunkedFiles(TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.output.periods_save.phys_fields = 0.2
+        params.output.phys_fields.compression = "gzip"
+        params.output.phys_fields.chunks = (4, 4, 4)
+
+    def test_chunked_files(self):
+        sim = self.sim
+        sim.time_stepping.start()
+        if mpi.rank > 0:
+            return
+
+        set_of_phys_files = sim.output.phys_fields.set_of_phys_files
+        set_of_phys_files.update_times()
+        path_file = set_of_phys_files.path_files[-1]
+        with h5py.File(path_file, "r") as file:
+            dset = file["state_phys/vx"]
+            self.assertEqual(dset.chunks, (4, 4, 4))
+            self.assertEqual(dset.compression, "gzip")
+
+        if mpi.nb_proc > 1:
+            return
+
+        vx = sim.state.get_var("vx")
+        for equation, cross_section in (
+            ("iz=1", vx[1]),
+            ("iy=2", vx[:, 2, :]),
+            ("ix=3", vx[..., 3]),
+        ):
+            field, time = set_of_phys_files.get_field_to_plot(
+                idx_time=-1, key="vx", equation=equation
+            )
+            self.assertTrue(np.array_equal(field, cross_section))
+
+
+class TestSpatioTemporalSeries(TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.time_stepping.USE_CFL = False
+        params.time_stepping.deltat0 = 0.02
+        params.output.periods_save.spatiotemporal_spectra = 0.02
+        params.output.spatiotemporal_spectra.file_max_size = 0.02
+        params.output.spatiotemporal_spectra.SAVE_AS_COMPLEX64 = False
+
+    def test_load_time_series(self):
+        sim = self.sim
+        sim.time_stepping.start()
+        if mpi.nb_proc > 1:
+            mpi.comm.barrier()
+
+        spatiotemporal_spectra = sim.output.spatiotemporal_spectra
+        series = spatiotemporal_spectra.load_time_series(tmin=0.03)
+        self.assertGreaterEqual(series["times"][0], 0.03)
+        self.assertEqual(series["vx_Fourier"].shape[-1], series["times"].size)
+        self.assertEqual(series["vx_Fourier"].shape[:3], series["K0_adim"].shape)
+
+        if mpi.nb_proc > 1:
+            return
+
+        path_file = spatiotemporal_spectra.load_time_series(
+            tmin=0.03,
+            path_file=Path(sim.output.path_run) / "series.h5",
+            max_mem_block=1e-3,
+        )
+        with h5py.File(path_file, "r") as file:
+            for key, value in series.items():
+                self.assertTrue(np.array_equal(file[key][...], value))
+
+        # Welch method with one segment and no window: periodogram
+        nb_times = series["times"].size
+        spectra = spatiotemporal_spectra.compute_spectra(tmin=0.03)
+        spectra_welch = spatiotemporal_spectra.compute_spectra(
+            tmin=0.03, nperseg=nb_times, noverlap=0, window="boxcar"
+        )
+        self.assertTrue(
+            np.allclose(spectra_welch["spectrum_vx"], spectra["spectrum_vx"])
+        )
+
+        nperseg = nb_times // 2
+        spectra_welch = spatiotemporal_spectra.compute_spectra(
+            tmin=0.03, nperseg=nperseg
+        )
+        self.assertEqual(spectra_welch["omegas"].size, nperseg)
+        paths_cache = list(spatiotemporal_spectra.path_dir.glob("welch_*"))
+        self.assertEqual(len(paths_cache), 2)
+        # one file per segment (and a file for the wavenumbers, ...)
+        from fluidsim.base.output.spatiotemporal_spectra import (
+            get_segments_welch,
+        )
+
+        path_cache = spatiotemporal_spectra._get_path_cache_welch(
+            "spectra", nperseg, nperseg // 2, "hann", None
+        )
+        self.assertEqual(
+            len(list(path_cache.glob("*.h5"))),
+            len(get_segments_welch(nb_times, nperseg)) + 1,
+        )
+        # from the cache
+        spectra_cached = spatiotemporal_spectra.compute_spectra(
+            tmin=0.03, nperseg=nperseg
+        )
+        self.assertTrue(
+            np.array_equal(
+                spectra_cached["spectrum_vx"], spectra_welch["spectrum_vx"]
+            )
+        )
+
+        # kzkhomega spectra: vectorized binning and cache
+        spectra_kzkhomega, _ = spatiotemporal_spectra.save_spectra_kzkhomega(
+            tmin=0.03
+        )
+        params_oper = self.params.oper
+        order = spectra["dims_order"]
+        KX = 2 * pi / params_oper.Lx * spectra[f"K{order[2]}_adim"]
+        KY = 2 * pi / params_oper.Ly * spectra[f"K{order[1]}_adim"]
+        KZ = 2 * pi / params_oper.Lz * spectra[f"K{order[0]}_adim"]
+        spectrum_loops = compute_spectrum_kzkhomega_loops(
+            spectra["spectrum_vx"],
+            spectra_kzkhomega["kh_spectra"],
+            spectra_kzkhomega["kz_spectra"],
+            KX,
+            KZ,
+            np.sqrt(KX ** 2 + KY ** 2),
+        )
+        self.assertTrue(
+            np.allclose(spectra_kzkhomega["spectrum_vx"], spectrum_loops)
+        )
+        # same times: the cache is used
+        cached, _ = spatiotemporal_spectra.save_spectra_kzkhomega(
+            tmin=0.031, save_urud=True
+        )
+        paths_cache = list(spatiotemporal_spectra.path_dir.glob("cache_*.h5"))
+        # spectra and spectra_urud (all modes and binned)
+        self.assertEqual(len(paths_cache), 4)
+        self.assertTrue(
+            np.array_equal(
+                cached["spectrum_vx"], spectra_kzkhomega["spectrum_vx"]
+            )
+        )
+        self.assertIn("spectrum_Khd", cached)
+        # no temporary file left by the atomic writes
+        self.assertEqual(
+            list(spatiotemporal_spectra.path_dir.glob("**/*.tmp")), []
+        )
+
+
+class TestSaveH5Atomic(unittest.TestCase):
+    def test_save_h5_atomic(self):
+        from fluidsim.base.output.spatiotemporal_spectra import save_h5_atomic
+
+        with TemporaryDirectory() as path_dir:
+            path = Path(path_dir) / "cache.h5"
+            save_h5_atomic(path, {"a": np.arange(4), "group": {"b": 1.0}})
+            with h5py.File(path, "r") as file:
+                self.assertTrue(np.array_equal(file["a"][...], np.arange(4)))
+                self.assertEqual(file["group/b"][()], 1.0)
+
+            # error during the writing: the previous file is not modified
+            with self.assertRaises(TypeError):
+                save_h5_atomic(path, {"a": np.arange(2), "c": object()})
+            with h5py.File(path, "r") as file:
+                self.assertEqual(file["a"].size, 4)
+            self.assertEqual(list(Path(path_dir).iterdir()), [path])
+
+
+class TestOnlineTemporalSpectra(TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.time_stepping.USE_CFL = False
+        params.time_stepping.deltat0 = 0.02
+        params.output.periods_save.temporal_spectra = 0.02
+        params.output.temporal_spectra.online.enable = True
+        params.output.temporal_spectra.online.nperseg = 4
+
+    def test_online_spectra(self):
+        sim = self.sim
+        sim.time_stepping.start()
+        if mpi.nb_proc > 1:
+            mpi.comm.barrier()
+
+        temporal_spectra = sim.output.temporal_spectra
+        # no raw time series
+        self.assertEqual(list(temporal_spectra.path_dir.glob("rank*.h5")), [])
+
+        spectra = temporal_spectra.load_spectra_online()
+        nb_samples = temporal_spectra._online_welch.nb_samples
+        self.assertEqual(spectra["nb_segments"], (nb_samples - 4) // 2 + 1)
+        self.assertEqual(spectra["omegas"].size, 3)
+        self.assertEqual(spectra["spectrum_K"].shape, (3,))
+        self.assertGreater(spectra["spectrum_K"].sum(), 0)
+
+
+@unittest.skipIf(mpi.nb_proc > 1, "The samples are replayed by one process")
+class TestOnlineVsFilesTemporalSpectra(TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.time_stepping.USE_CFL = False
+        params.time_stepping.deltat0 = 0.02
+        params.output.periods_save.temporal_spectra = 0.02
+        params.output.temporal_spectra.SAVE_AS_FLOAT32 = False
+
+    def test_online_vs_files(self):
+        sim = self.sim
+        sim.time_stepping.start()
+
+        temporal_spectra = sim.output.temporal_spectra
+        params_online = sim.params.output.temporal_spectra.online
+        params_online.nperseg = nperseg = 4
+        spectra = temporal_spectra.compute_spectra(
+            nperseg=nperseg,
+            noverlap=params_online.noverlap,
+            window=params_online.window,
+        )
+        self.assertEqual(spectra["omegas"].size, nperseg // 2 + 1)
+
+        # same probe samples given to the online computation
+        series = temporal_spectra.load_time_series()
+        data = [
+            np.concatenate(series[f"probes_{key}_loc"])
+            for key in temporal_spectra.keys_fields
+        ]
+        temporal_spectra._init_online_welch(params_online)
+        for it in range(series["times"].size):
+            temporal_spectra._online_welch.add_sample(
+                [data_key[:, it] for data_key in data]
+            )
+        temporal_spectra._write_online_spectra()
+        spectra_online = temporal_spectra.load_spectra_online()
+
+        self.assertTrue(np.allclose(spectra_online["omegas"], spectra["omegas"]))
+        for key in ("vx", "vz", "K"):
+            key = "spectrum_" + key
+            self.assertTrue(np.allclose(spectra_online[key], spectra[key]))
+
+
 class TestOutput(TestSimulBase):
     @classmethod
     def init_params(self):
@@ -262,12 +624,12 @@ class TestOutput(TestSimulBase):
 
         assert kx_max == KX.max()
 
-        from fluidsim.solvers.ns3d.output.spatiotemporal_spectra import (
-            _sum_wavenumber3D,
+        from fluidsim.base.output.spatiotemporal_spectra import (
+            sum_wavenumber_vectorized,
         )
 
         def sum_wavenumber(field):
-            return _sum_wavenumber3D(field, KX, kx_max)
+            return sum_wavenumber_vectorized(field, KX, kx_max)
 
         _ = spatiotemporal_spectra.save_spectra_kzkhomega(save_urud=True)
         spectra_kzkhomega = spatiotemporal_spectra.load_spectra_kzkhomega(
@@ -450,6 +812,105 @@ class TestForcingWatuCoriolis(TestSimulBase):
             assert np.allclose(np.mean(var ** 2), np.mean(var_big ** 2))
 
 
+class TestForcingCoarse(TestSimulBase):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.time_stepping.t_end = 0.05
+        params.forcing.enable = True
+        params.forcing.type = "tcrandom"
+        params.forcing.key_forced = "vx_fft"
+        params.forcing.forcing_rate = 3.333
+        params.output.periods_save.spatial_means = 0.01
+        return params
+
+    def test_coarse(self):
+        sim = self.sim
+        sim.time_stepping.start()
+
+        oper = sim.oper
+        deltat = sim.time_stepping.deltat
+        forcing_fft = sim.forcing.forcing_maker.forcing_fft
+        self.assertGreater(abs(forcing_fft).max(), 0)
+
+        # injection rates computed only from the forced modes
+        for key in ("vx_fft", "vy_fft", "vz_fft"):
+            f_fft = forcing_fft.get_var(key)
+            v_fft = sim.state.state_spect.get_var(key)
+            P1, P2 = sim.forcing.compute_injection_rates(key)
+            self.assertTrue(
+                np.allclose(
+                    P1,
+                    oper.sum_wavenumbers(
+                        np.ascontiguousarray((v_fft.conj() * f_fft).real)
+                    ),
+                )
+            )
+            self.assertTrue(
+                np.allclose(P2, oper.sum_wavenumbers(abs(f_fft) ** 2))
+            )
+
+        tendencies_fft = sim.state.state_spect.copy()
+        sim.forcing.add_to_tendencies(tendencies_fft)
+        self.assertTrue(
+            np.allclose(tendencies_fft, sim.state.state_spect + forcing_fft)
+        )
+
+        if mpi.rank == 0:
+            means = sim.output.spatial_means.load()
+            self.assertTrue(
+                np.allclose(means["PK_tot"], sim.params.forcing.forcing_rate)
+            )
+
+
+class TestForcingDistributed(TestForcingCoarse):
+    @classmethod
+    def init_params(self):
+        params = super().init_params()
+        params.forcing.random.distributed = True
+
+    def test_distributed(self):
+        sim = self.sim
+        oper = sim.oper
+        forcing_maker = sim.forcing.forcing_maker
+        key = forcing_maker.key_forced
+        sim.time_stepping.deltat = deltat = 0.01
+        forcing_maker.compute()
+
+        f_fft = forcing_maker.forcing_fft.get_var(key)
+        P1, P2 = sim.forcing.compute_injection_rates(key)
+        self.assertTrue(
+            np.allclose(P1 + deltat / 2 * P2, sim.params.forcing.forcing_rate)
+        )
+
+        # same normalization as in the dense (non-distributed) path for the
+        # same raw forcing (same seeds)
+        shape_coarse = forcing_maker.shapeK_loc_coarse
+        f_raw_fft = oper.create_arrayK(value=0)
+        np.put(
+            f_raw_fft,
+            forcing_maker._ind_forcing_loc,
+            forcing_maker.forcingc_raw_each_time(None),
+        )
+        fc_raw_fft = oper.coarse_seq_from_fft_loc(f_raw_fft, shape_coarse)
+        vc_fft = oper.coarse_seq_from_fft_loc(
+            sim.state.get_var(key), shape_coarse
+        )
+        oper_coarse = None
+        fc_fft = None
+        if mpi.rank == 0:
+            oper_coarse = forcing_maker.oper_coarse
+            fc_fft = forcing_maker.normalize_forcingc_2nd_degree_eq(
+                fc_raw_fft, vc_fft
+            )
+        f_fft_ref = oper.create_arrayK(value=0)
+        oper.put_coarse_array_in_array_fft(
+            fc_fft, f_fft_ref, oper_coarse, shape_coarse
+        )
+        self.assertTrue(np.allclose(f_fft, f_fft_ref))
+        self.assertTrue(np.allclose(oper.project_fft_on_realX(f_fft), f_fft))
+
+
 class TestForcingMilestone(TestSimulBase):
     @classmethod
     def init_params(self):
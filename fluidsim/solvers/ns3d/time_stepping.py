@@ -25,6 +25,6 @@ class TimeSteppingPseudoSpectralNS3D(TimeSteppingPseudoSpectral):
                 )
 
         self.sim.state.statephys_from_statespect()
-        # np.isnan(np.sum seems to be really fast
-        if np.isnan(np.sum(state_spect[0])):
+        # np.isnan(np.sum seems to be really fast (1d view: no copy)
+        if np.isnan(np.sum(state_spect[0].ravel())):
             raise ValueError(f"nan at it = {self.it}, t = {self.t:.4f}")
@@ -12,21 +12,71 @@ Provides:
 """
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 import h5py
 import matplotlib.pyplot as plt
 
-from transonic import jit
 from fluiddyn.util import mpi
 from fluiddyn.calcul.easypyfft import FFTW1DReal2Complex
 
 from fluidsim.base.output.base import SpecificOutput
 
 
-@jit
+def _get_index_tables_correl4(iomegas1, nb_omegas):
+    r"""Index tables used to compute the correlations 4
+
+    The pairs :math:`(\omega_3, \omega_4)` with :math:`\omega_4 \leq
+    \omega_3` are sorted by :math:`s = \omega_3 + \omega_4` (``bounds``
+    gives the slice of the pairs for each value of s). For each
+    :math:`\omega_1`, ``iomegas2`` and ``conj2`` give the index of
+    :math:`\omega_2 = s - \omega_1` folded in [0, nb_omegas[ and whether
+    the conjugate has to be taken.
+
+    """
+    iomegas3, iomegas4 = np.tril_indices(nb_omegas)
+    sums = iomegas3 + iomegas4
+    order = np.argsort(sums, kind="stable")
+    iomegas3 = iomegas3[order]
+    iomegas4 = iomegas4[order]
+    bounds = np.searchsorted(sums[order], np.arange(2 * nb_omegas))
+
+    iomegas2 = np.arange(2 * nb_omegas - 1) - iomegas1[:, np.newaxis]
+    conj2 = (iomegas2 < 0) | (iomegas2 >= nb_omegas)
+    iomegas2 = np.where(iomegas2 < 0, -iomegas2, iomegas2)
+    iomegas2 = np.where(
+        iomegas2 >= nb_omegas, 2 * nb_omegas - 1 - iomegas2, iomegas2
+    )
+    return iomegas3, iomegas4, bounds, iomegas2, conj2
+
+
+def _sum_over_chunks(func, nx, nb_xs_chunk, nb_threads):
+    """Sum the results of ``func(slice_x)`` over chunks of the spatial index"""
+    if not nb_xs_chunk:
+        nb_xs_chunk = max(nx, 1)
+    slices = [
+        slice(start, start + nb_xs_chunk) for start in range(0, nx, nb_xs_chunk)
+    ]
+    if nb_threads > 1 and len(slices) > 1:
+        # numpy releases the GIL in the products so that threads are useful
+        with ThreadPoolExecutor(max_workers=nb_threads) as executor:
+            results = list(executor.map(func, slices))
+    else:
+        results = [func(slice_x) for slice_x in slices]
+    result = results[0]
+    for result_chunk in results[1:]:
+        result += result_chunk
+    return result
+
+
 def compute_correl4_seq(
-    q_fftt: "complex128[][]", iomegas1: "int32[]", nb_omegas: int, nb_xs_seq: int
+    q_fftt,
+    iomegas1,
+    nb_omegas,
+    nb_xs_seq,
+    nb_xs_chunk=256,
+    nb_threads=1,
 ):
     r"""Compute the correlations 4.
 
@@ -48,55 +98,60 @@ def compute_correl4_seq(
     :math:`\omega_4 > 0`. Thus, this function produces an array
     :math:`C_4(\omega_1, \omega_3, \omega_4)`.
 
+    The sum over :math:`\mathbf{x}` is computed with matrix products: for
+    each value of :math:`s = \omega_3 + \omega_4`, the factor depending
+    on :math:`(\omega_1, s)` is multiplied by the matrix of the products
+    :math:`\tilde w(\omega_3)^* \tilde w(\omega_4)^*` (only for
+    :math:`\omega_4 \leq \omega_3`). The spatial index is split in chunks
+    of ``nb_xs_chunk`` points (to bound the memory) which can be computed
+    by ``nb_threads`` threads.
+
     """
+    iomegas1 = np.asarray(iomegas1)
+    (
+        iomegas3,
+        iomegas4,
+        bounds,
+        iomegas2,
+        conj2,
+    ) = _get_index_tables_correl4(iomegas1, nb_omegas)
+
+    q_fftt = np.ascontiguousarray(q_fftt.T)
     q_fftt_conj = np.conj(q_fftt)
 
-    nx = q_fftt.shape[0]
-    n0 = iomegas1.shape[0]
-
-    corr4 = np.zeros((len(iomegas1), nb_omegas, nb_omegas), dtype=np.complex128)
-
-    for i1 in range(n0):
-        io1 = iomegas1[i1]
-        # this loop could be parallelized (OMP)
-        for io3 in range(nb_omegas):
-            # we use the symmetry omega_3 <--> omega_4
-            for io4 in range(io3 + 1):
-                io2 = io3 + io4 - io1
-                if io2 < 0:
-                    io2 = -io2
-                    for ix in range(nx):
-                        corr4[i1, io3, io4] += (
-                            q_fftt[ix, io1]
-                            * q_fftt_conj[ix, io3]
-                            * q_fftt_conj[ix, io4]
-                            * q_fftt_conj[ix, io2]
-                        )
-                elif io2 >= nb_omegas:
-                    io2 = 2 * nb_omegas - 1 - io2
-                    for ix in range(nx):
-                        corr4[i1, io3, io4] += (
-                            q_fftt[ix, io1]
-                            * q_fftt_conj[ix, io3]
-                            * q_fftt_conj[ix, io4]
-                            * q_fftt_conj[ix, io2]
-                        )
-                else:
-                    for ix in range(nx):
-                        corr4[i1, io3, io4] += (
-                            q_fftt[ix, io1]
-                            * q_fftt_conj[ix, io3]
-                            * q_fftt_conj[ix, io4]
-                            * q_fftt[ix, io2]
-                        )
-                # symmetry omega_3 <--> omega_4:
-                corr4[i1, io4, io3] = corr4[i1, io3, io4]
+    def compute_chunk(slice_x):
+        q_chunk = q_fftt[:, slice_x]
+        q_chunk_conj = q_fftt_conj[:, slice_x]
+        # products w(omega_3)^* w(omega_4)^*, shape (nb_pairs, nx_chunk)
+        prod34 = q_chunk_conj[iomegas3] * q_chunk_conj[iomegas4]
+        # products w(omega_1) w(omega_2), shape (n0, 2*nb_omegas-1, nx_chunk)
+        prod12 = q_chunk[iomegas1, np.newaxis] * np.where(
+            conj2[..., np.newaxis], q_chunk_conj[iomegas2], q_chunk[iomegas2]
+        )
+        result = np.empty((iomegas1.size, iomegas3.size), dtype=np.complex128)
+        for index_sum in range(2 * nb_omegas - 1):
+            slice_pairs = slice(bounds[index_sum], bounds[index_sum + 1])
+            result[:, slice_pairs] = prod12[:, index_sum] @ prod34[slice_pairs].T
+        return result
+
+    result = _sum_over_chunks(
+        compute_chunk, q_fftt.shape[1], nb_xs_chunk, nb_threads
+    )
+
+    corr4 = np.empty((iomegas1.size, nb_omegas, nb_omegas), dtype=np.complex128)
+    corr4[:, iomegas3, iomegas4] = result
+    # symmetry omega_3 <--> omega_4:
+    corr4[:, iomegas4, iomegas3] = result
     return corr4
 
 
-@jit
 def compute_correl2_seq(
-    q_fftt: "complex128[][]", iomegas1: "int32[]", nb_omegas: int, nb_xs_seq: int
+    q_fftt,
+    iomegas1,
+    nb_omegas,
+    nb_xs_seq,
+    nb_xs_chunk=256,
+    nb_threads=1,
 ):
     r"""Compute the correlations 2.
 
@@ -110,23 +165,26 @@ def compute_correl2_seq(
     where :math:`\omega_1 = \omega_2`. Thus, this function
     produces an array :math:`C_2(\omega)`.
 
-    """
-    q_fftt_conj = np.conj(q_fftt)
-    nx = q_fftt.shape[0]
+    The sum over :math:`\mathbf{x}` is the matrix product :math:`Q^T
+    Q^*`, computed by chunks of the spatial index as for the correlations 4.
 
-    corr2 = np.zeros((nb_omegas, nb_omegas), dtype=np.complex128)
+    """
 
-    for io3 in range(nb_omegas):
-        for io4 in range(io3 + 1):
-            for ix in range(nx):
-                corr2[io3, io4] += q_fftt[ix, io3] * q_fftt_conj[ix, io4]
-            corr2[io4, io3] = np.conj(corr2[io3, io4])
+    def compute_chunk(slice_x):
+        q_chunk = q_fftt[slice_x]
+        return q_chunk.T @ np.conj(q_chunk)
 
-    return corr2
+    return _sum_over_chunks(
+        compute_chunk, q_fftt.shape[0], nb_xs_chunk, nb_threads
+    )
 
 
-def compute_correl4(q_fftt, iomegas1, nb_omegas, nb_xs_seq):
-    corr4 = compute_correl4_seq(q_fftt, iomegas1, nb_omegas, nb_xs_seq)
+def compute_correl4(
+    q_fftt, iomegas1, nb_omegas, nb_xs_seq, nb_xs_chunk=256, nb_threads=1
+):
+    corr4 = compute_correl4_seq(
+        q_fftt, iomegas1, nb_omegas, nb_xs_seq, nb_xs_chunk, nb_threads
+    )
     if mpi.nb_proc > 1:
         # reduce SUM for mean:
         corr4 = mpi.comm.reduce(corr4, op=mpi.MPI.SUM, root=0)
@@ -136,8 +194,12 @@ def compute_correl4(q_fftt, iomegas1, nb_omegas, nb_xs_seq):
         return corr4
 
 
-def compute_correl2(q_fftt, iomegas1, nb_omegas, nb_xs_seq):
-    corr2 = compute_correl2_seq(q_fftt, iomegas1, nb_omegas, nb_xs_seq)
+def compute_correl2(
+    q_fftt, iomegas1, nb_omegas, nb_xs_seq, nb_xs_chunk=256, nb_threads=1
+):
+    corr2 = compute_correl2_seq(
+        q_fftt, iomegas1, nb_omegas, nb_xs_seq, nb_xs_chunk, nb_threads
+    )
     if mpi.nb_proc > 1:
         # reduce SUM for mean:
         corr2 = mpi.comm.reduce(corr2, op=mpi.MPI.SUM, root=0)
@@ -167,6 +229,8 @@ class CorrelationsFreq(SpecificOutput):
                 "coef_decimate": 10,
                 "key_quantity": "w",
                 "iomegas1": [1],
+                "nb_xs_chunk": 256,
+                "nb_threads": 1,
             },
         )
 
@@ -184,6 +248,13 @@ class CorrelationsFreq(SpecificOutput):
         self.key_quantity = pcorrel_freq.key_quantity
         self.iomegas1 = np.array(pcorrel_freq.iomegas1, dtype=np.int32)
         self.it_last_run = pcorrel_freq.it_start
+        try:
+            self.nb_xs_chunk = pcorrel_freq.nb_xs_chunk
+            self.nb_threads = pcorrel_freq.nb_threads
+        except AttributeError:
+            # parameters of old simulations
+            self.nb_xs_chunk = 256
+            self.nb_threads = 1
         n0 = len(
             list(range(0, output.sim.oper.shapeX_loc[0], self.coef_decimate))
         )
@@ -293,12 +364,16 @@ class CorrelationsFreq(SpecificOutput):
                 self.nb_times_in_spatio_temp = 0
                 self.t_last_save = self.sim.time_stepping.t
                 spatio_fft = self.oper_fft1.fft(self.hamming * self.spatio_temp)
-                new_corr4 = compute_correl4(
-                    spatio_fft, self.iomegas1, self.nb_omegas, self.nb_xs_seq
-                )
-                new_corr2 = compute_correl2(
-                    spatio_fft, self.iomegas1, self.nb_omegas, self.nb_xs_seq
+                args = (
+                    spatio_fft,
+                    self.iomegas1,
+                    self.nb_omegas,
+                    self.nb_xs_seq,
+                    self.nb_xs_chunk,
+                    self.nb_threads,
                 )
+                new_corr4 = compute_correl4(*args)
+                new_corr2 = compute_correl2(*args)
 
                 if mpi.rank == 0:
                     self.corr4 = (1.0 / (self.nb_means_times + 1)) * (
@@ -198,7 +198,7 @@ class Simul(SimulBasePseudoSpectral):
         # print('ratio:', ratio)
 
         if self.params.forcing.enable:
-            tendencies_fft += self.forcing.get_forcing()
+            self.forcing.add_to_tendencies(tendencies_fft)
 
         return tendencies_fft
 
@@ -5,7 +5,12 @@ import numpy as np
 import fluiddyn.util.mpi as mpi
 
 
-from fluidsim.util.testing import TestSimul, skip_if_no_fluidfft, classproperty
+from fluidsim.util.testing import (
+    TestSimul,
+    skip_if_no_fluidfft,
+    classproperty,
+    MixinCheckTimeSchemesBuffers,
+)
 
 
 @skip_if_no_fluidfft
@@ -48,6 +53,10 @@ class TestSolverPlate2DTendency(TestSimulBase):
         self.assertGreater(2e-15, ratio)
 
 
+class TestTimeSchemesBuffers(MixinCheckTimeSchemesBuffers, TestSimulBase):
+    pass
+
+
 @unittest.skipIf(mpi.nb_proc > 1, "plot function works sequentially only")
 class TestSolverPlate2DInit(TestSimulBase):
     @classmethod
@@ -141,5 +150,45 @@ class TestSolverPlate2DOutput(TestSimulBase):
         sim.output.spectra.plot2d()
 
 
+class TestCorrelationsFreq(unittest.TestCase):
+    def test_compute_correl(self):
+        from fluidsim.solvers.plate2d.output.correlations_freq import (
+            compute_correl2_seq,
+            compute_correl4_seq,
+        )
+
+        nx, nb_omegas = 50, 7
+        rng = np.random.default_rng(0)
+        q_fftt = rng.standard_normal((nx, nb_omegas)) + 1j * rng.standard_normal(
+            (nx, nb_omegas)
+        )
+        q_fftt_conj = q_fftt.conj()
+        iomegas1 = np.array([1, 3], dtype=np.int32)
+
+        corr4 = np.zeros((len(iomegas1), nb_omegas, nb_omegas), dtype=complex)
+        for i1, io1 in enumerate(iomegas1):
+            for io3 in range(nb_omegas):
+                for io4 in range(nb_omegas):
+                    io2 = io3 + io4 - io1
+                    if io2 < 0:
+                        q2 = q_fftt_conj[:, -io2]
+                    elif io2 >= nb_omegas:
+                        q2 = q_fftt_conj[:, 2 * nb_omegas - 1 - io2]
+                    else:
+                        q2 = q_fftt[:, io2]
+                    corr4[i1, io3, io4] = np.sum(
+                        q_fftt[:, io1]
+                        * q_fftt_conj[:, io3]
+                        * q_fftt_conj[:, io4]
+                        * q2
+                    )
+        corr2 = q_fftt.T @ q_fftt_conj
+
+        for nb_xs_chunk, nb_threads in ((None, 1), (8, 1), (16, 2)):
+            args = (q_fftt, iomegas1, nb_omegas, nx, nb_xs_chunk, nb_threads)
+            self.assertTrue(np.allclose(compute_correl4_seq(*args), corr4))
+            self.assertTrue(np.allclose(compute_correl2_seq(*args), corr2))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -10,7 +10,7 @@
 import numpy as np
 
 from fluidsim.base.setofvariables import SetOfVariables
-from fluidsim.solvers.sw1l.solver import InfoSolverSW1L
+from fluidsim.solvers.sw1l.solver import InfoSolverSW1L, compute_fluxes_outin
 from fluidsim.solvers.sw1l.exactlin.solver import Simul as SimulSW1LExactLin
 
 
@@ -42,58 +42,57 @@ class Simul(SimulSW1LExactLin):
 
     def tendencies_nonlin(self, state_spect=None, old=None):
         oper = self.oper
-        fft2 = oper.fft2
-        ifft2 = oper.ifft2
+        state = self.state
 
         if state_spect is None:
-            state_phys = self.state.state_phys
-            state_spect = self.state.state_spect
+            state_phys = state.state_phys
+            state.compute_fields_spect_tmp()
         else:
-            state_phys = self.state.return_statephys_from_statespect(state_spect)
+            state_phys = state.state_phys_tmp
+            state.statephys_from_statespect(state_spect, state_phys)
 
         # compute the nonlinear terms for ux, uy and eta
         ux = state_phys.get_var("ux")
         uy = state_phys.get_var("uy")
         eta = state_phys.get_var("eta")
 
-        rot_fft = self.state.get_var("rot_fft")
-        ux_rot_fft, uy_rot_fft = oper.vecfft_from_rotfft(rot_fft)
-        ux_rot = ifft2(ux_rot_fft)
-        uy_rot = ifft2(uy_rot_fft)
+        fluxes = state.fluxes_tmp
+        fluxes_fft = state.fluxes_spect_tmp
+        Nx_fft, Ny_fft, Neta_fft, rot_fft = state.fields_spect_tmp
 
-        N1x_fft = fft2(ux_rot * ux)
-        N2x_fft = fft2(uy_rot * ux)
-        N1y_fft = fft2(ux_rot * uy)
-        N2y_fft = fft2(uy_rot * uy)
+        ux_rot, uy_rot = state.fields_tmp
+        oper.vecfft_from_rotfft_outin(rot_fft, *fluxes_fft)
+        oper.ifft_many(fluxes_fft, state.fields_tmp)
 
-        Nx_fft = -oper.divfft_from_vecfft(N1x_fft, N2x_fft)
-        Ny_fft = -oper.divfft_from_vecfft(N1y_fft, N2y_fft)
-
-        jx_fft = fft2(ux_rot * eta)
-        jy_fft = fft2(uy_rot * eta)
-        Neta_fft = -oper.divfft_from_vecfft(jx_fft, jy_fft)
+        for var, N_fft in ((ux, Nx_fft), (uy, Ny_fft), (eta, Neta_fft)):
+            compute_fluxes_outin(var, ux_rot, uy_rot, *fluxes)
+            oper.fft_many(fluxes, fluxes_fft)
+            oper.divfft_from_vecfft_outin(*fluxes_fft, N_fft)
+            N_fft *= -1
 
         # self.verify_tendencies(state_spect, state_phys, Nx_fft, Ny_fft, Neta_fft)
 
-        # compute the nonlinear terms for q, ap and am
-        (Nq_fft, Np_fft, Nm_fft) = oper.qapamfft_from_uxuyetafft(
-            Nx_fft, Ny_fft, Neta_fft
-        )
-
-        oper.dealiasing(Nq_fft, Np_fft, Nm_fft)
-
         if old is None:
             tendencies_fft = SetOfVariables(
                 like=self.state.state_spect, info="tendencies_nonlin"
             )
         else:
             tendencies_fft = old
-        tendencies_fft.set_var("q_fft", Nq_fft)
-        tendencies_fft.set_var("ap_fft", Np_fft)
-        tendencies_fft.set_var("am_fft", Nm_fft)
+
+        # compute the nonlinear terms for q, ap and am
+        oper.qapamfft_from_uxuyetafft_outin(
+            Nx_fft,
+            Ny_fft,
+            Neta_fft,
+            tendencies_fft.get_var("q_fft"),
+            tendencies_fft.get_var("ap_fft"),
+            tendencies_fft.get_var("am_fft"),
+        )
+
+        oper.dealiasing(tendencies_fft)
 
         if self.params.forcing.enable:
-            tendencies_fft += self.forcing.get_forcing()
+            self.forcing.add_to_tendencies(tendencies_fft)
 
         return tendencies_fft
 
@@ -11,7 +11,7 @@ Provides:
 
 """
 
-from fluidsim.base.setofvariables import SetOfVariables
+import numpy as np
 
 from fluidsim.solvers.sw1l.state import StateSW1L
 
@@ -41,6 +41,13 @@ class StateSW1LExactLin(StateSW1L):
             }
         )
 
+    def __init__(self, sim, oper=None):
+        super().__init__(sim, oper)
+        # ux, uy, eta and rot in spectral space
+        self.fields_spect_tmp = self.oper.create_arrays_many(4, spectral=True)
+        # rotational velocity in physical space (used by exactlin.modified)
+        self.fields_tmp = self.oper.create_arrays_many(2)
+
     def compute(self, key, SAVE_IN_DICT=True, RAISE_ERROR=True):
         it = self.sim.time_stepping.it
 
@@ -141,27 +148,9 @@ class StateSW1LExactLin(StateSW1L):
         self.state_spect.set_var("ap_fft", ap_fft)
         self.state_spect.set_var("am_fft", am_fft)
 
-    def statephys_from_statespect(self):
-        """Compute the state in physical space."""
-        ifft2 = self.oper.ifft2
-        q_fft = self.state_spect.get_var("q_fft")
-        ap_fft = self.state_spect.get_var("ap_fft")
-        am_fft = self.state_spect.get_var("am_fft")
-
-        (ux_fft, uy_fft, eta_fft) = self.oper.uxuyetafft_from_qapamfft(
-            q_fft, ap_fft, am_fft
-        )
-
-        rot_fft = q_fft + self.params.f * eta_fft
-
-        self.state_phys.set_var("ux", ifft2(ux_fft))
-        self.state_phys.set_var("uy", ifft2(uy_fft))
-        self.state_phys.set_var("eta", ifft2(eta_fft))
-        self.state_phys.set_var("rot", ifft2(rot_fft))
-
-    def return_statephys_from_statespect(self, state_spect=None):
-        """Return the state in physical space."""
-        ifft2 = self.oper.ifft2
+    def compute_fields_spect_tmp(self, state_spect=None):
+        """Compute ux, uy, eta and rot in spectral space (written in
+        ``self.fields_spect_tmp``)."""
         if state_spect is None:
             state_spect = self.state_spect
 
@@ -169,18 +158,22 @@ class StateSW1LExactLin(StateSW1L):
         ap_fft = state_spect.get_var("ap_fft")
         am_fft = state_spect.get_var("am_fft")
 
-        (ux_fft, uy_fft, eta_fft) = self.oper.uxuyetafft_from_qapamfft(
-            q_fft, ap_fft, am_fft
+        ux_fft, uy_fft, eta_fft, rot_fft = self.fields_spect_tmp
+        self.oper.uxuyetafft_from_qapamfft_outin(
+            q_fft, ap_fft, am_fft, ux_fft, uy_fft, eta_fft
         )
+        # rot_fft = q_fft + f * eta_fft
+        np.multiply(eta_fft, self.params.f, out=rot_fft)
+        rot_fft += q_fft
+        return self.fields_spect_tmp
 
-        rot_fft = q_fft + self.params.f * eta_fft
+    def statephys_from_statespect(self, state_spect=None, state_phys=None):
+        """Compute the state in physical space."""
+        if state_phys is None:
+            state_phys = self.state_phys
 
-        state_phys = SetOfVariables(like=self.state_phys)
-        state_phys.set_var("ux", ifft2(ux_fft))
-        state_phys.set_var("uy", ifft2(uy_fft))
-        state_phys.set_var("eta", ifft2(eta_fft))
-        state_phys.set_var("rot", ifft2(rot_fft))
-        return state_phys
+        fields_spect = self.compute_fields_spect_tmp(state_spect)
+        self.oper.ifft_many(fields_spect, state_phys)
 
     def init_from_uxuyetafft(self, ux_fft, uy_fft, eta_fft):
         (q_fft, ap_fft, am_fft) = self.oper.qapamfft_from_uxuyetafft(
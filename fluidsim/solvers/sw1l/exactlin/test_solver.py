@@ -3,8 +3,10 @@ import unittest
 import fluiddyn.util.mpi as mpi
 from fluidsim.util.testing import (
     TestSimulConserveOutput,
+    TestSimul,
     classproperty,
     skip_if_no_fluidfft,
+    MixinCheckAllocations,
 )
 
 
@@ -88,5 +90,20 @@ class TestSimulSW1LExactlin(TestSimulConserveOutput):
             self.assertAlmostZero(A_fft[0, 0], tolerance_warning=False)
 
 
+@skip_if_no_fluidfft
+class TestCheckAllocations(MixinCheckAllocations, TestSimul):
+    @classproperty
+    def Simul(cls):
+        from fluidsim.solvers.sw1l.exactlin.solver import Simul
+
+        return Simul
+
+    @classmethod
+    def init_params(cls):
+        params = super().init_params()
+        params.f = 1.0
+        params.init_fields.type = "noise"
+
+
 if __name__ == "__main__":
     unittest.main()
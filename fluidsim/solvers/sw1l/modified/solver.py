@@ -10,11 +10,42 @@ due to the rotational velocity.
 
 import numpy as np
 
+from transonic import jit, Array, Union
+from fluiddyn.util.compat import cached_property
+
 from fluidsim.base.setofvariables import SetOfVariables
 
 from fluidsim.solvers.sw1l.solver import InfoSolverSW1L
 from fluidsim.solvers.sw1l.solver import Simul as SimulSW1L
 
+A = Array[float, "2d"]
+# Coriolis parameter (array for the beta-plane)
+F = Union[float, A]
+
+
+@jit
+def compute_Fnl_outin(
+    ux_rot: A,
+    uy_rot: A,
+    ux: A,
+    uy: A,
+    f: F,
+    dxux: A,
+    dyux: A,
+    dxuy: A,
+    dyuy: A,
+):
+    """Compute the advection by the rotational velocity and the Coriolis
+    force (written in ``dxux`` and ``dxuy``)."""
+    dxux[:] = f * uy - ux_rot * dxux - uy_rot * dyux
+    dxuy[:] = -f * ux - ux_rot * dxuy - uy_rot * dyuy
+
+
+@jit
+def compute_advection_outin(ux: A, uy: A, dxvar: A, dyvar: A, adv: A):
+    """Compute the advection ``u . grad(var)`` (written in ``adv``)."""
+    adv[:] = ux * dxvar + uy * dyvar
+
 
 class InfoSolverSW1LModified(InfoSolverSW1L):
     """Information about the solver SW1L."""
@@ -42,77 +73,83 @@ class Simul(SimulSW1L):
 
     InfoSolver = InfoSolverSW1LModified
 
+    @cached_property
+    def _f_beta_plane(self):
+        """Coriolis parameter on the beta-plane"""
+        return self.params.f + self.params.beta * self.oper.YY
+
     def tendencies_nonlin(self, state_spect=None, old=None):
         oper = self.oper
-        fft2 = oper.fft2
-        ifft2 = oper.ifft2
+        state = self.state
 
         if state_spect is None:
-            state_phys = self.state.state_phys
-            state_spect = self.state.state_spect
+            state_phys = state.state_phys
+            state_spect = state.state_spect
         else:
-            state_phys = self.state.return_statephys_from_statespect(state_spect)
+            state_phys = state.state_phys_tmp
+            state.statephys_from_statespect(state_spect, state_phys)
 
         ux = state_phys.get_var("ux")
         uy = state_phys.get_var("uy")
-        # eta = state_phys.get_var('eta')
 
         ux_fft = state_spect.get_var("ux_fft")
         uy_fft = state_spect.get_var("uy_fft")
         eta_fft = state_spect.get_var("eta_fft")
 
-        # compute Fx_fft and Fy_fft
-        rot_fft = oper.rotfft_from_vecfft(ux_fft, uy_fft)
-        ux_rot_fft, uy_rot_fft = oper.vecfft_from_rotfft(rot_fft)
-        ux_rot = ifft2(ux_rot_fft)
-        uy_rot = ifft2(uy_rot_fft)
+        if old is None:
+            tendencies_fft = SetOfVariables(
+                like=self.state.state_spect, info="tendencies_nonlin"
+            )
+        else:
+            tendencies_fft = old
 
-        dxux_fft, dyux_fft = oper.gradfft_from_fft(ux_fft)
-        dxux = ifft2(dxux_fft)
-        dyux = ifft2(dyux_fft)
-        dxuy_fft, dyuy_fft = oper.gradfft_from_fft(uy_fft)
-        dxuy = ifft2(dxuy_fft)
-        dyuy = ifft2(dyuy_fft)
+        Fx_fft = tendencies_fft.get_var("ux_fft")
+        Fy_fft = tendencies_fft.get_var("uy_fft")
+        Feta_fft = tendencies_fft.get_var("eta_fft")
 
-        FNLx = -ux_rot * dxux - uy_rot * dyux
-        FNLy = -ux_rot * dxuy - uy_rot * dyuy
+        fluxes = state.fluxes_tmp
+        fluxes_fft = state.fluxes_spect_tmp
+        ux_rot, uy_rot, dxuy, dyuy = state.fields_tmp
+
+        # rotational velocity (rot_fft computed in Feta_fft)
+        oper.rotfft_from_vecfft_outin(ux_fft, uy_fft, Feta_fft)
+        oper.vecfft_from_rotfft_outin(Feta_fft, *fluxes_fft)
+        oper.ifft_many(fluxes_fft, (ux_rot, uy_rot))
+
+        # compute Fx_fft and Fy_fft
+        oper.gradfft_from_fft_outin(ux_fft, *fluxes_fft)
+        oper.ifft_many(fluxes_fft, fluxes)
+        oper.gradfft_from_fft_outin(uy_fft, *fluxes_fft)
+        oper.ifft_many(fluxes_fft, (dxuy, dyuy))
 
         if self.params.beta != 0:
-            f = self.params.f + self.params.beta * oper.YY
+            f = self._f_beta_plane
         else:
-            f = self.params.f
-
-        FCx = +f * uy
-        FCy = -f * ux
+            f = float(self.params.f)
 
-        Fgradx_fft, Fgrady_fft = oper.gradfft_from_fft(self.params.c2 * eta_fft)
+        compute_Fnl_outin(ux_rot, uy_rot, ux, uy, f, *fluxes, dxuy, dyuy)
+        oper.fft_as_arg(fluxes[0], Fx_fft)
+        oper.fft_as_arg(dxuy, Fy_fft)
 
-        Fx_fft = fft2(FCx + FNLx) - Fgradx_fft
-        Fy_fft = fft2(FCy + FNLy) - Fgrady_fft
+        # gradient of c2 * eta (c2 * eta_fft computed in Feta_fft)
+        np.multiply(eta_fft, self.params.c2, out=Feta_fft)
+        oper.gradfft_from_fft_outin(Feta_fft, *fluxes_fft)
+        Fx_fft -= fluxes_fft[0]
+        Fy_fft -= fluxes_fft[1]
 
         # compute Feta_fft
-        dxeta_fft, dyeta_fft = oper.gradfft_from_fft(eta_fft)
-        dxeta = ifft2(dxeta_fft)
-        dyeta = ifft2(dyeta_fft)
-
-        div_fft = oper.divfft_from_vecfft(ux_fft, uy_fft)
-        Feta_fft = -fft2(ux_rot * dxeta + uy_rot * dyeta) - div_fft
-
-        if old is None:
-            tendencies_fft = SetOfVariables(
-                like=self.state.state_spect, info="tendencies_nonlin"
-            )
-        else:
-            tendencies_fft = old
-
-        tendencies_fft.set_var("ux_fft", Fx_fft)
-        tendencies_fft.set_var("uy_fft", Fy_fft)
-        tendencies_fft.set_var("eta_fft", Feta_fft)
+        oper.gradfft_from_fft_outin(eta_fft, *fluxes_fft)
+        oper.ifft_many(fluxes_fft, fluxes)
+        compute_advection_outin(ux_rot, uy_rot, *fluxes, fluxes[0])
+        oper.fft_as_arg(fluxes[0], Feta_fft)
+        oper.divfft_from_vecfft_outin(ux_fft, uy_fft, fluxes_fft[0])
+        Feta_fft += fluxes_fft[0]
+        Feta_fft *= -1
 
         oper.dealiasing(tendencies_fft)
 
         if self.params.forcing.enable:
-            tendencies_fft += self.forcing.get_forcing()
+            self.forcing.add_to_tendencies(tendencies_fft)
 
         return tendencies_fft
 
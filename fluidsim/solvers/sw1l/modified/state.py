@@ -11,8 +11,6 @@ Provides:
 
 """
 
-from fluidsim.base.setofvariables import SetOfVariables
-
 from fluidsim.solvers.sw1l.state import StateSW1L
 
 from fluiddyn.util import mpi
@@ -40,6 +38,11 @@ class StateSW1LModified(StateSW1L):
             }
         )
 
+    def __init__(self, sim, oper=None):
+        super().__init__(sim, oper)
+        # rotational velocity and velocity gradients in physical space
+        self.fields_tmp = self.oper.create_arrays_many(4)
+
     def compute(self, key, SAVE_IN_DICT=True, RAISE_ERROR=True):
         it = self.sim.time_stepping.it
 
@@ -123,27 +126,12 @@ class StateSW1LModified(StateSW1L):
         state_phys.set_var("uy", uy)
         state_phys.set_var("eta", eta)
 
-    def statephys_from_statespect(self):
+    def statephys_from_statespect(self, state_spect=None, state_phys=None):
         """Compute the state in physical space."""
-        ifft2 = self.oper.ifft2
-        ux_fft = self.state_spect.get_var("ux_fft")
-        uy_fft = self.state_spect.get_var("uy_fft")
-        eta_fft = self.state_spect.get_var("eta_fft")
-        self.state_phys.set_var("ux", ifft2(ux_fft))
-        self.state_phys.set_var("uy", ifft2(uy_fft))
-        self.state_phys.set_var("eta", ifft2(eta_fft))
-
-    def return_statephys_from_statespect(self, state_spect=None):
-        """Return the state in physical space."""
-        ifft2 = self.oper.ifft2
         if state_spect is None:
             state_spect = self.state_spect
-        ux_fft = state_spect.get_var("ux_fft")
-        uy_fft = state_spect.get_var("uy_fft")
-        eta_fft = state_spect.get_var("eta_fft")
-        state_phys = SetOfVariables(like=self.state_phys)
-        state_phys.set_var("ux", ifft2(ux_fft))
-        state_phys.set_var("uy", ifft2(uy_fft))
-        state_phys.set_var("eta", ifft2(eta_fft))
-
-        return state_phys
+
+        if state_phys is None:
+            state_phys = self.state_phys
+
+        self.oper.ifft_many(state_spect, state_phys)
@@ -11,6 +11,11 @@ import numpy as np
 
 from fluidsim.base.setofvariables import SetOfVariables
 
+from fluidsim.solvers.sw1l.solver import (
+    compute_Frot_outin,
+    compute_pressure_outin,
+    compute_fluxes_outin,
+)
 from fluidsim.solvers.sw1l.exactlin.solver import InfoSolverSW1LExactLin
 from fluidsim.solvers.sw1l.exactlin.solver import Simul as SimulSW1LExactLin
 
@@ -45,63 +50,67 @@ class Simul(SimulSW1LExactLin):
 
     def tendencies_nonlin(self, state_spect=None, old=None):
         oper = self.oper
-        fft2 = oper.fft2
+        state = self.state
 
         if state_spect is None:
-            state_phys = self.state.state_phys
-            state_spect = self.state.state_spect
+            state_phys = state.state_phys
         else:
-            state_phys = self.state.return_statephys_from_statespect(state_spect)
+            state_phys = state.state_phys_tmp
+            state.statephys_from_statespect(state_spect, state_phys)
 
         ux = state_phys.get_var("ux")
         uy = state_phys.get_var("uy")
         eta = state_phys.get_var("eta")
 
-        # compute the nonlinear terms for ux, uy and eta
-        gradu2_x_fft, gradu2_y_fft = oper.gradfft_from_fft(
-            fft2(ux ** 2 + uy ** 2) / 2
-        )
+        fluxes = state.fluxes_tmp
+        fluxes_fft = state.fluxes_spect_tmp
+        Nx_fft, Ny_fft, Neta_fft, Nq_fft = state.fields_spect_tmp
 
-        Nx_fft = -gradu2_x_fft
-        Ny_fft = -gradu2_y_fft
+        # compute the nonlinear terms for ux, uy and eta
+        # gradient of the kinetic energy (pressure with c2 = 0)
+        compute_pressure_outin(0.0, eta, ux, uy, fluxes[0])
+        oper.fft_as_arg(fluxes[0], Neta_fft)
+        oper.gradfft_from_fft_outin(Neta_fft, Nx_fft, Ny_fft)
+        Nx_fft *= -1
+        Ny_fft *= -1
 
         if self.params.f > 0:
-            # not very efficient, but simple...
-            rot = self.state.get_var("rot")
-            N1x = +rot * uy
-            N1y = -rot * ux
-
-            Nx_fft += fft2(N1x)
-            Ny_fft += fft2(N1y)
-
-        jx_fft = fft2(eta * ux)
-        jy_fft = fft2(eta * uy)
-        Neta_fft = -oper.divfft_from_vecfft(jx_fft, jy_fft)
+            # q = 0 so that rot = f * eta
+            compute_Frot_outin(eta, ux, uy, 0.0, *fluxes)
+            oper.fft_many(fluxes, fluxes_fft)
+            for N_fft, flux_fft in zip((Nx_fft, Ny_fft), fluxes_fft):
+                flux_fft *= self.params.f
+                N_fft += flux_fft
+
+        compute_fluxes_outin(eta, ux, uy, *fluxes)
+        oper.fft_many(fluxes, fluxes_fft)
+        oper.divfft_from_vecfft_outin(*fluxes_fft, Neta_fft)
+        Neta_fft *= -1
 
         # self.verify_tendencies(state_spect, state_phys,
         #                        Nx_fft, Ny_fft, Neta_fft)
 
-        # compute the nonlinear terms for q, ap and am
-        (Nq_fft, Np_fft, Nm_fft) = self.oper.qapamfft_from_uxuyetafft(
-            Nx_fft, Ny_fft, Neta_fft
-        )
-
-        # Np_fft = self.oper.create_arrayK(value=0)
-        # Nm_fft = self.oper.create_arrayK(value=0)
-
-        oper.dealiasing(Np_fft, Nm_fft)
-
         if old is None:
             tendencies_fft = SetOfVariables(
                 like=self.state.state_spect, info="tendencies_nonlin"
             )
         else:
             tendencies_fft = old
-        tendencies_fft.set_var("ap_fft", Np_fft)
-        tendencies_fft.set_var("am_fft", Nm_fft)
+
+        # compute the nonlinear terms for q, ap and am (Nq_fft is not used)
+        oper.qapamfft_from_uxuyetafft_outin(
+            Nx_fft,
+            Ny_fft,
+            Neta_fft,
+            Nq_fft,
+            tendencies_fft.get_var("ap_fft"),
+            tendencies_fft.get_var("am_fft"),
+        )
+
+        oper.dealiasing(tendencies_fft)
 
         if self.params.forcing.enable:
-            tendencies_fft += self.forcing.get_forcing()
+            self.forcing.add_to_tendencies(tendencies_fft)
 
         return tendencies_fft
 
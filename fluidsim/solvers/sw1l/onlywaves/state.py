@@ -11,8 +11,6 @@ Provides:
 
 """
 
-from fluidsim.base.setofvariables import SetOfVariables
-
 from fluidsim.solvers.sw1l.state import StateSW1L
 
 from fluiddyn.util import mpi
@@ -41,6 +39,11 @@ class StateSW1LWaves(StateSW1L):
             }
         )
 
+    def __init__(self, sim, oper=None):
+        super().__init__(sim, oper)
+        # ux, uy, eta and q (= 0) in spectral space
+        self.fields_spect_tmp = self.oper.create_arrays_many(4, spectral=True)
+
     def compute(self, key, SAVE_IN_DICT=True, RAISE_ERROR=True):
         it = self.sim.time_stepping.it
         if key in self.vars_computed and it == self.it_computed[key]:
@@ -152,42 +155,23 @@ class StateSW1LWaves(StateSW1L):
         self.state_spect.set_var("ap_fft", ap_fft)
         self.state_spect.set_var("am_fft", am_fft)
 
-    def statephys_from_statespect(self):
+    def statephys_from_statespect(self, state_spect=None, state_phys=None):
         """Compute the state in physical space."""
-        ifft2 = self.oper.ifft2
-        q_fft = self.oper.create_arrayK(value=0)
-        ap_fft = self.state_spect.get_var("ap_fft")
-        am_fft = self.state_spect.get_var("am_fft")
-
-        (ux_fft, uy_fft, eta_fft) = self.oper.uxuyetafft_from_qapamfft(
-            q_fft, ap_fft, am_fft
-        )
-
-        self.state_phys.set_var("ux", ifft2(ux_fft))
-        self.state_phys.set_var("uy", ifft2(uy_fft))
-        self.state_phys.set_var("eta", ifft2(eta_fft))
-
-    def return_statephys_from_statespect(self, state_spect=None):
-        """Return the state in physical space."""
-        ifft2 = self.oper.ifft2
         if state_spect is None:
             state_spect = self.state_spect
 
-        q_fft = self.oper.create_arrayK(value=0)
+        if state_phys is None:
+            state_phys = self.state_phys
+
         ap_fft = state_spect.get_var("ap_fft")
         am_fft = state_spect.get_var("am_fft")
 
-        (ux_fft, uy_fft, eta_fft) = self.oper.uxuyetafft_from_qapamfft(
-            q_fft, ap_fft, am_fft
+        ux_fft, uy_fft, eta_fft, q_fft = self.fields_spect_tmp
+        q_fft.fill(0)
+        self.oper.uxuyetafft_from_qapamfft_outin(
+            q_fft, ap_fft, am_fft, ux_fft, uy_fft, eta_fft
         )
-
-        state_phys = SetOfVariables(like=self.state_phys)
-
-        state_phys.set_var("ux", ifft2(ux_fft))
-        state_phys.set_var("uy", ifft2(uy_fft))
-        state_phys.set_var("eta", ifft2(eta_fft))
-
-        return state_phys
+        self.oper.ifft_many((ux_fft, uy_fft, eta_fft), state_phys)
 
     def init_from_uxuyetafft(self, ux_fft, uy_fft, eta_fft):
 
@@ -4,8 +4,10 @@ import matplotlib.pyplot as plt
 import fluiddyn.util.mpi as mpi
 from fluidsim.util.testing import (
     TestSimulConserve,
+    TestSimul,
     skip_if_no_fluidfft,
     classproperty,
+    MixinCheckAllocations,
 )
 
 
@@ -82,5 +84,20 @@ class TestSimulSW1LWaves(TestSimulConserve):
             var_computed = self.sim.state.compute(key)
 
 
+@skip_if_no_fluidfft
+class TestCheckAllocations(MixinCheckAllocations, TestSimul):
+    @classproperty
+    def Simul(cls):
+        from fluidsim.solvers.sw1l.onlywaves.solver import Simul
+
+        return Simul
+
+    @classmethod
+    def init_params(cls):
+        params = super().init_params()
+        params.f = 1.0
+        params.init_fields.type = "noise"
+
+
 if __name__ == "__main__":
     unittest.main()
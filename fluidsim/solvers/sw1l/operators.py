@@ -39,15 +39,15 @@ def _qapamfft_from_uxuyetafft(
     f: float,
     c2: float,
     rank: int,
+    q_fft: AC,
+    ap_fft: AC,
+    am_fft: AC,
 ):
-    """Calculate normal modes from primitive variables."""
+    """Calculate normal modes from primitive variables (written in ``q_fft``,
+    ``ap_fft`` and ``am_fft``)."""
     freq_Corio = f
     f_over_c2 = freq_Corio / c2
 
-    q_fft = np.empty([n0, n1], dtype=np.complex128)
-    ap_fft = np.empty([n0, n1], dtype=np.complex128)
-    am_fft = np.empty([n0, n1], dtype=np.complex128)
-
     if freq_Corio != 0:
         for i0 in range(n0):
             for i1 in range(n1):
@@ -105,7 +105,49 @@ def _qapamfft_from_uxuyetafft(
                     ap_fft[i0, i1] = a_over2_fft + Deltaa_over2_fft
                     am_fft[i0, i1] = a_over2_fft - Deltaa_over2_fft
 
-    return q_fft, ap_fft, am_fft
+
+@jit
+def _uxuyetafft_from_qapamfft(
+    q_fft: AC,
+    ap_fft: AC,
+    am_fft: AC,
+    n0: int,
+    n1: int,
+    KX_over_K2: AF,
+    KY_over_K2: AF,
+    K2: AF,
+    Kappa2_not0: AF,
+    Kappa_over_ic: AC,
+    f: float,
+    c2: float,
+    rank: int,
+    ux_fft: AC,
+    uy_fft: AC,
+    eta_fft: AC,
+):
+    """Calculate primitive variables from normal modes (written in ``ux_fft``,
+    ``uy_fft`` and ``eta_fft``)."""
+    for i0 in range(n0):
+        for i1 in range(n1):
+            if i0 == 0 and i1 == 0 and rank == 0:
+                ux_fft[i0, i1] = 0.5 * (ap_fft[0, 0] + am_fft[0, 0])
+                uy_fft[i0, i1] = 0.5j * (am_fft[0, 0] - ap_fft[0, 0])
+                eta_fft[i0, i1] = 0.0
+            else:
+                a_fft = ap_fft[i0, i1] + am_fft[i0, i1]
+                div_fft = (ap_fft[i0, i1] - am_fft[i0, i1]) / Kappa_over_ic[
+                    i0, i1
+                ]
+                eta_a_fft = a_fft / Kappa2_not0[i0, i1]
+                ilq_fft = q_fft[i0, i1] / Kappa2_not0[i0, i1]
+                rot_fft = f * eta_a_fft + K2[i0, i1] * ilq_fft
+                eta_fft[i0, i1] = eta_a_fft - f * ilq_fft / c2
+                ux_fft[i0, i1] = 1j * (
+                    KY_over_K2[i0, i1] * rot_fft - KX_over_K2[i0, i1] * div_fft
+                )
+                uy_fft[i0, i1] = -1j * (
+                    KX_over_K2[i0, i1] * rot_fft + KY_over_K2[i0, i1] * div_fft
+                )
 
 
 @boost
@@ -126,6 +168,19 @@ class OperatorsPseudoSpectralSW1L(OperatorsPseudoSpectral2D):
 
     def qapamfft_from_uxuyetafft(self, ux_fft, uy_fft, eta_fft, params=None):
         """ux, uy, eta (fft) ---> q, ap, am (fft)"""
+        q_fft = self.create_arrayK()
+        ap_fft = self.create_arrayK()
+        am_fft = self.create_arrayK()
+        self.qapamfft_from_uxuyetafft_outin(
+            ux_fft, uy_fft, eta_fft, q_fft, ap_fft, am_fft, params
+        )
+        return q_fft, ap_fft, am_fft
+
+    def qapamfft_from_uxuyetafft_outin(
+        self, ux_fft, uy_fft, eta_fft, q_fft, ap_fft, am_fft, params=None
+    ):
+        """ux, uy, eta (fft) ---> q, ap, am (fft) (written in ``q_fft``,
+        ``ap_fft`` and ``am_fft``)"""
 
         if params is None:
             params = self.params
@@ -140,7 +195,7 @@ class OperatorsPseudoSpectralSW1L(OperatorsPseudoSpectral2D):
         f = float(params.f)
         c2 = float(params.c2)
 
-        return _qapamfft_from_uxuyetafft(
+        _qapamfft_from_uxuyetafft(
             ux_fft,
             uy_fft,
             eta_fft,
@@ -153,6 +208,9 @@ class OperatorsPseudoSpectralSW1L(OperatorsPseudoSpectral2D):
             f,
             c2,
             rank,
+            q_fft,
+            ap_fft,
+            am_fft,
         )
 
     def uxuyetafft_from_qapamfft(self, q_fft, ap_fft, am_fft):
@@ -172,6 +230,30 @@ class OperatorsPseudoSpectralSW1L(OperatorsPseudoSpectral2D):
             uy_fft[0, 0] = 0.5j * (am_fft[0, 0] - ap_fft[0, 0])
         return ux_fft, uy_fft, eta_fft
 
+    def uxuyetafft_from_qapamfft_outin(
+        self, q_fft, ap_fft, am_fft, ux_fft, uy_fft, eta_fft
+    ):
+        """q, ap, am (fft) ---> ux, uy, eta (fft) (written in ``ux_fft``,
+        ``uy_fft`` and ``eta_fft``)"""
+        _uxuyetafft_from_qapamfft(
+            q_fft,
+            ap_fft,
+            am_fft,
+            self.nK0_loc,
+            self.nK1_loc,
+            self.KX_over_K2,
+            self.KY_over_K2,
+            self.K2,
+            self.Kappa2_not0,
+            self.Kappa_over_ic,
+            float(self.params.f),
+            float(self.params.c2),
+            rank,
+            ux_fft,
+            uy_fft,
+            eta_fft,
+        )
+
     def vecfft_from_rotdivfft(self, rot_fft, div_fft):
         """Inverse of the Helmholtz decomposition."""
         # TODO: Pythranize
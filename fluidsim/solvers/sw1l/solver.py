@@ -43,11 +43,39 @@ def compute_Frot(rot: A, ux: A, uy: A, f: float):
     return F1x, F1y
 
 
+@jit
+def compute_Frot_outin(rot: A, ux: A, uy: A, f: float, F1x: A, F1y: A):
+    """Compute cross-product of absolute potential vorticity with velocity
+    (written in ``F1x`` and ``F1y``)."""
+    F1x[:] = (rot + f) * uy
+    F1y[:] = -(rot + f) * ux
+
+
 @jit
 def compute_pressure(c2: float, eta: A, ux: A, uy: A):
     return c2 * eta + 0.5 * (ux ** 2 + uy ** 2)
 
 
+@jit
+def compute_pressure_outin(c2: float, eta: A, ux: A, uy: A, pressure: A):
+    """Compute the pressure (written in ``pressure``)."""
+    pressure[:] = c2 * eta + 0.5 * (ux ** 2 + uy ** 2)
+
+
+@jit
+def compute_mass_fluxes_outin(eta: A, ux: A, uy: A, Jx: A, Jy: A):
+    """Compute the mass fluxes (written in ``Jx`` and ``Jy``)."""
+    Jx[:] = (eta + 1) * ux
+    Jy[:] = (eta + 1) * uy
+
+
+@jit
+def compute_fluxes_outin(var: A, ux: A, uy: A, Fx: A, Fy: A):
+    """Compute the fluxes ``var * u`` (written in ``Fx`` and ``Fy``)."""
+    Fx[:] = var * ux
+    Fy[:] = var * uy
+
+
 class InfoSolverSW1L(InfoSolverPseudoSpectral):
     """Information about the solver SW1L."""
 
@@ -209,7 +237,8 @@ class Simul(SimulBasePseudoSpectral):
         if state_spect is None:
             state_phys = self.state.state_phys
         else:
-            state_phys = self.state.return_statephys_from_statespect(state_spect)
+            state_phys = self.state.state_phys_tmp
+            self.state.statephys_from_statespect(state_spect, state_phys)
 
         ux = state_phys.get_var("ux")
         uy = state_phys.get_var("uy")
@@ -223,27 +252,36 @@ class Simul(SimulBasePseudoSpectral):
         else:
             tendencies_fft = old
 
-        F1x, F1y = compute_Frot(rot, ux, uy, self.params.f)
-        gradx_fft, grady_fft = oper.gradfft_from_fft(
-            oper.fft2(compute_pressure(self.params.c2, eta, ux, uy))
-        )
-        oper.dealiasing(gradx_fft, grady_fft)
-
         Fx_fft = tendencies_fft.get_var("ux_fft")
         Fy_fft = tendencies_fft.get_var("uy_fft")
         Feta_fft = tendencies_fft.get_var("eta_fft")
 
-        Fx_fft[:] = oper.fft2(F1x) - gradx_fft
-        Fy_fft[:] = oper.fft2(F1y) - grady_fft
+        # the arrays of the mass fluxes are also used as temporary arrays
+        fluxes = self.state.fluxes_tmp
+        fluxes_fft = self.state.fluxes_spect_tmp
+
+        compute_Frot_outin(rot, ux, uy, self.params.f, *fluxes)
+        oper.fft_many(fluxes, tendencies_fft[:2])
+
+        # the pressure is transformed in Feta_fft (computed afterwards)
+        pressure = fluxes[0]
+        compute_pressure_outin(self.params.c2, eta, ux, uy, pressure)
+        oper.fft_as_arg(pressure, Feta_fft)
+        gradx_fft, grady_fft = fluxes_fft
+        oper.gradfft_from_fft_outin(Feta_fft, gradx_fft, grady_fft)
+        oper.dealiasing(gradx_fft, grady_fft)
+        Fx_fft -= gradx_fft
+        Fy_fft -= grady_fft
 
-        Feta_fft[:] = -oper.divfft_from_vecfft(
-            oper.fft2((eta + 1) * ux), oper.fft2((eta + 1) * uy)
-        )
+        compute_mass_fluxes_outin(eta, ux, uy, *fluxes)
+        oper.fft_many(fluxes, fluxes_fft)
+        oper.divfft_from_vecfft_outin(*fluxes_fft, Feta_fft)
+        Feta_fft *= -1
 
         oper.dealiasing(tendencies_fft)
 
         if self.params.forcing.enable:
-            tendencies_fft += self.forcing.get_forcing()
+            self.forcing.add_to_tendencies(tendencies_fft)
 
         return tendencies_fft
 
@@ -41,6 +41,14 @@ class StateSW1L(StatePseudoSpectral):
             }
         )
 
+    def __init__(self, sim, oper=None):
+        super().__init__(sim, oper)
+        # used to compute the nonlinear terms without allocating a new state
+        self.state_phys_tmp = SetOfVariables(like=self.state_phys)
+        # mass fluxes (eta + 1) u in physical and spectral spaces
+        self.fluxes_tmp = self.oper.create_arrays_many(2)
+        self.fluxes_spect_tmp = self.oper.create_arrays_many(2, spectral=True)
+
     def compute(self, key, SAVE_IN_DICT=True, RAISE_ERROR=True):
         """Compute and return a variable."""
         it = self.sim.time_stepping.it
@@ -134,7 +142,6 @@ class StateSW1L(StatePseudoSpectral):
 
     def statephys_from_statespect(self, state_spect=None, state_phys=None):
         """Compute the state in physical space."""
-        ifft_as_arg = self.oper.ifft_as_arg
         if state_spect is None:
             state_spect = self.state_spect
 
@@ -143,18 +150,13 @@ class StateSW1L(StatePseudoSpectral):
 
         ux_fft = state_spect.get_var("ux_fft")
         uy_fft = state_spect.get_var("uy_fft")
-        eta_fft = state_spect.get_var("eta_fft")
-        rot_fft = self.oper.rotfft_from_vecfft(ux_fft, uy_fft)
-
-        ux = state_phys.get_var("ux")
-        uy = state_phys.get_var("uy")
-        eta = state_phys.get_var("eta")
-        rot = state_phys.get_var("rot")
-
-        ifft_as_arg(ux_fft, ux)
-        ifft_as_arg(uy_fft, uy)
-        ifft_as_arg(eta_fft, eta)
-        ifft_as_arg(rot_fft, rot)
+        # the array of a mass flux is used as temporary array
+        rot_fft = self.fluxes_spect_tmp[0]
+        self.oper.rotfft_from_vecfft_outin(ux_fft, uy_fft, rot_fft)
+
+        # ux, uy and eta are the first variables of state_phys
+        self.oper.ifft_many(state_spect, state_phys[:3])
+        self.oper.ifft_as_arg(rot_fft, state_phys.get_var("rot"))
 
     def return_statephys_from_statespect(self, state_spect=None):
         """Return the state in physical space as a new object separate from
@@ -6,8 +6,10 @@ from numpy.testing import assert_array_almost_equal
 import fluiddyn.util.mpi as mpi
 from fluidsim.util.testing import (
     TestSimulConserveOutput,
+    TestSimul,
     classproperty,
     skip_if_no_fluidfft,
+    MixinCheckAllocations,
 )
 
 
@@ -202,5 +204,20 @@ class TestSimulSW1L(TestSimulConserveOutput):
             var_computed = self.sim.state.compute(key)
 
 
+@skip_if_no_fluidfft
+class TestCheckAllocations(MixinCheckAllocations, TestSimul):
+    @classproperty
+    def Simul(cls):
+        from fluidsim.solvers.sw1l.solver import Simul
+
+        return Simul
+
+    @classmethod
+    def init_params(cls):
+        params = super().init_params()
+        params.f = 1.0
+        params.init_fields.type = "noise"
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,4 +1,10 @@
+import atexit
 import datetime
+import json
+import os
+import queue
+import threading
+from pathlib import Path
 
 import numpy as np
 import h5py
@@ -16,7 +22,123 @@ else:
     h5pack = h5netcdf
 
 
-def _create_variable(group, key, field):
+def _iter_slabs(field, slab_nbytes, nb_rows_multiple=1):
+    """Iterate over slices of the first axis of at most slab_nbytes bytes
+
+    The number of rows of the slabs is a multiple of ``nb_rows_multiple``
+    (for example the chunk size along the first axis, so that the chunks are
+    written only once).
+
+    """
+    if slab_nbytes is None or field.ndim == 0 or field.nbytes <= slab_nbytes:
+        yield (Ellipsis,)
+        return
+    nb_rows = max(1, slab_nbytes // (field.nbytes // field.shape[0]))
+    nb_rows = max(1, nb_rows // nb_rows_multiple) * nb_rows_multiple
+    for start in range(0, field.shape[0], nb_rows):
+        yield (slice(start, start + nb_rows),)
+
+
+def compute_chunks(shape, itemsize, nbytes_target=2 ** 20):
+    """Return a chunk shape with similar sizes along all axes
+
+    With such "cubic" chunks, a cross-section along any axis (for example
+    ``dset[..., ix]``) touches only the chunks containing the cross-section.
+    The chunks contain approximately ``nbytes_target`` bytes.
+
+    """
+    shape = tuple(int(n) for n in shape)
+    ndim = len(shape)
+    if ndim == 0:
+        return None
+    chunks = [None] * ndim
+    nb_items = max(1.0, nbytes_target / itemsize)
+    # the small dimensions are not chunked and the remaining budget is
+    # distributed over the other dimensions
+    indices = sorted(range(ndim), key=lambda index: shape[index])
+    for ii, index in enumerate(indices):
+        side = nb_items ** (1 / (ndim - ii))
+        if shape[index] <= side:
+            chunks[index] = max(1, shape[index])
+            nb_items /= chunks[index]
+        else:
+            for index_left in indices[ii:]:
+                chunks[index_left] = max(1, int(round(side)))
+            break
+    return tuple(chunks)
+
+
+def get_dataset_kwargs(shape, dtype, storage=None):
+    """Return the keyword arguments used to create a dataset
+
+    ``storage`` is a dictionary (or None) with the keys "chunks",
+    "compression", "compression_opts" and "shuffle" (see the documentation of
+    ``params.output.phys_fields``).
+
+    """
+    if not storage:
+        return {}
+    compression = storage.get("compression")
+    chunks = storage.get("chunks")
+    if chunks is None and compression is None:
+        return {}
+    if chunks is None or chunks == "auto":
+        chunks = compute_chunks(shape, np.dtype(dtype).itemsize)
+    else:
+        chunks = tuple(
+            max(1, min(int(chunk), int(n))) for chunk, n in zip(chunks, shape)
+        )
+    if chunks is None or 0 in shape:
+        return {}
+    kwargs = {"chunks": chunks}
+    if compression is not None:
+        kwargs["compression"] = compression
+        if storage.get("compression_opts") is not None:
+            kwargs["compression_opts"] = storage["compression_opts"]
+        kwargs["shuffle"] = bool(storage.get("shuffle", True))
+    return kwargs
+
+
+def round_mantissa(field, keepbits):
+    """Return a copy of a float array with mantissas rounded to keepbits bits
+
+    Lossy "bit-rounding" (round to nearest, ties to even): the trailing bits
+    of the mantissas are set to zero, which strongly improves the compression
+    ratio. The relative error is smaller than ``2 ** -(keepbits + 1)``.
+
+    """
+    field = np.asarray(field)
+    if field.dtype == np.float64:
+        dtype_uint, nb_bits_mantissa = np.uint64, 52
+    elif field.dtype == np.float32:
+        dtype_uint, nb_bits_mantissa = np.uint32, 23
+    else:
+        raise ValueError(f"Bit-rounding not supported for dtype {field.dtype}")
+    nb_bits_dropped = nb_bits_mantissa - int(keepbits)
+    if nb_bits_dropped <= 0:
+        return field.copy()
+    if nb_bits_dropped > nb_bits_mantissa:
+        raise ValueError("keepbits has to be positive")
+    bits = field.view(dtype_uint).copy()
+    shift = dtype_uint(nb_bits_dropped)
+    one = dtype_uint(1)
+    half_minus_one = dtype_uint((1 << (nb_bits_dropped - 1)) - 1)
+    mask = ~dtype_uint((1 << nb_bits_dropped) - 1)
+    bits += half_minus_one + ((bits >> shift) & one)
+    bits &= mask
+    return bits.view(field.dtype)
+
+
+def _create_variable(group, key, field, slab_nbytes=None, storage=None):
+    dataset_kwargs = get_dataset_kwargs(field.shape, field.dtype, storage)
+    keepbits = storage.get("keepbits") if storage else None
+    if keepbits is not None:
+        if slab_nbytes is None:
+            # to limit the memory used for the rounded copies
+            slab_nbytes = 2 ** 24
+        if field.ndim == 0:
+            keepbits = None
+
     if ext == "nc":
         if field.ndim == 0:
             dimensions = tuple()
@@ -27,7 +149,17 @@ def _create_variable(group, key, field):
         elif field.ndim == 3:
             dimensions = ("z", "y", "x")
         try:
-            group.create_variable(key, data=field, dimensions=dimensions)
+            if slab_nbytes is None:
+                group.create_variable(
+                    key, data=field, dimensions=dimensions, **dataset_kwargs
+                )
+                return
+            for name, size in zip(dimensions, field.shape):
+                if name not in group.dimensions:
+                    group.dimensions[name] = size
+            variable = group.create_variable(
+                key, dimensions=dimensions, dtype=field.dtype, **dataset_kwargs
+            )
         except AttributeError:
             raise ValueError(
                 "Error while creating a netCDF4 variable using group"
@@ -36,15 +168,211 @@ def _create_variable(group, key, field):
 
     else:
         try:
-            group.create_dataset(key, data=field)
+            if slab_nbytes is None:
+                group.create_dataset(key, data=field, **dataset_kwargs)
+                return
+            variable = group.create_dataset(
+                key, shape=field.shape, dtype=field.dtype, **dataset_kwargs
+            )
         except AttributeError:
             raise ValueError(
                 "Error while creating a HDF5 dataset using group"
                 f" of type {type(group)} for key {key}"
             )
 
+    # written by slabs so that the GIL is regularly released (useful when
+    # the file is written in a background thread)
+    try:
+        nb_rows_multiple = dataset_kwargs["chunks"][0]
+    except KeyError:
+        nb_rows_multiple = 1
+    for slab in _iter_slabs(field, slab_nbytes, nb_rows_multiple):
+        if keepbits is None:
+            variable[slab] = field[slab]
+        else:
+            variable[slab] = round_mantissa(field[slab], keepbits)
 
-def save_file(
+
+def iter_gathered_fields(state_phys, oper):
+    """Gather the physical fields in the process 0, one at a time (collective)
+
+    Yields the pairs ``(key, field_seq)``, with ``field_seq`` None for the
+    processes other than 0. Only one global field is gathered at each
+    iteration. In sequential, the arrays are views of ``state_phys``.
+
+    """
+    for k in state_phys.keys:
+        field = state_phys.get_var(k)
+        if mpi.nb_proc > 1:
+            field = oper.gather_Xspace(field)
+        yield k, field if mpi.rank == 0 else None
+
+
+def gather_fields(state_phys, oper):
+    """Gather the physical fields in the process 0
+
+    Returns a dictionary ``{key: field_seq}`` in the process 0 (None for the
+    other processes). In sequential, the arrays are views of ``state_phys``.
+
+    """
+    fields = dict(iter_gathered_fields(state_phys, oper))
+    if mpi.rank == 0:
+        return fields
+
+
+def _create_group_with_attrs(h5file, name_type_variables, time, it):
+    group_state_phys = h5file.create_group("state_phys")
+    group_state_phys.attrs["what"] = "obj state_phys for fluidsim"
+    group_state_phys.attrs["name_type_variables"] = name_type_variables
+    group_state_phys.attrs["time"] = time
+    group_state_phys.attrs["it"] = it
+    return group_state_phys
+
+
+def _save_attrs(h5file, sim_info, output_name_run, axes, particular_attr):
+    h5file.attrs["date saving"] = str(datetime.datetime.now()).encode()
+    h5file.attrs["name_solver"] = sim_info.solver.short_name
+    h5file.attrs["name_run"] = output_name_run
+    h5file.attrs["axes"] = np.array(axes, dtype="|S9")
+    if particular_attr is not None:
+        h5file.attrs["particular_attr"] = particular_attr
+
+    sim_info._save_as_hdf5(hdf5_parent=h5file)
+    gp_info = h5file["info_simul"]
+    gf_params = gp_info["params"]
+    gf_params.attrs["SAVE"] = 1
+    gf_params.attrs["NEW_DIR_RESULTS"] = 1
+
+
+def save_file_seq(
+    path_file,
+    fields,
+    name_type_variables,
+    sim_info,
+    output_name_run,
+    axes,
+    time,
+    it,
+    particular_attr=None,
+    slab_nbytes=None,
+    storage=None,
+):
+    """Save sequential physical fields in a file
+
+    ``fields`` is a dictionary or an iterable of pairs ``(key, field_seq)``
+    (see :func:`iter_gathered_fields`). This function is called only by one
+    process and does not use the operator, so that it can be called in a
+    background thread. ``storage`` (chunks, filters and bit-rounding) is
+    described in :func:`get_dataset_kwargs`.
+
+    """
+    if isinstance(fields, dict):
+        fields = fields.items()
+    with h5pack.File(str(path_file), "w") as h5file:
+        group_state_phys = _create_group_with_attrs(
+            h5file, name_type_variables, time, it
+        )
+        for k, field_seq in fields:
+            _create_variable(
+                group_state_phys, k, field_seq, slab_nbytes, storage
+            )
+        _save_attrs(h5file, sim_info, output_name_run, axes, particular_attr)
+
+
+name_dir_per_rank = "per_rank_files"
+
+
+def get_path_file_rank(path_file, rank):
+    """Return the path of the file of one process (per-rank layout)"""
+    path_file = Path(path_file)
+    return path_file.parent / name_dir_per_rank / (
+        f"{path_file.stem}_rank{rank:05d}.h5"
+    )
+
+
+def get_slices_loc(oper):
+    """Return the slices of the local physical fields in the global fields"""
+    return tuple(
+        slice(start, start + size)
+        for start, size in zip(oper.seq_indices_first_X, oper.shapeX_loc)
+    )
+
+
+def gather_slices_loc(oper):
+    """Gather the slices of all processes in the process 0 (collective)"""
+    slices_loc = get_slices_loc(oper)
+    if mpi.nb_proc == 1:
+        return [slices_loc]
+    return mpi.comm.gather(slices_loc, root=0)
+
+
+def _create_variable_h5py(group, key, field, storage=None):
+    keepbits = storage.get("keepbits") if storage else None
+    if keepbits is not None and field.ndim > 0:
+        field = round_mantissa(field, keepbits)
+    group.create_dataset(
+        key, data=field, **get_dataset_kwargs(field.shape, field.dtype, storage)
+    )
+
+
+def save_file_rank(path_file_rank, fields_loc, slices_loc, storage=None):
+    """Save the local physical fields of one process (per-rank layout)"""
+    path_file_rank = Path(path_file_rank)
+    path_file_rank.parent.mkdir(exist_ok=True)
+    with h5py.File(str(path_file_rank), "w") as h5file:
+        group_state_phys = h5file.create_group("state_phys")
+        group_state_phys.attrs["slices_start"] = [
+            slice_.start for slice_ in slices_loc
+        ]
+        for k, field_loc in fields_loc.items():
+            _create_variable_h5py(group_state_phys, k, field_loc, storage)
+
+
+def save_file_index(
+    path_file,
+    slices_ranks,
+    shapeX_seq,
+    dtypes,
+    name_type_variables,
+    sim_info,
+    output_name_run,
+    axes,
+    time,
+    it,
+    particular_attr=None,
+):
+    """Save the index file of the per-rank layout
+
+    The global fields are virtual datasets pointing towards the files of the
+    processes (with relative paths, so that the directory can be moved).
+
+    """
+    path_file = Path(path_file)
+    with h5py.File(str(path_file), "w") as h5file:
+        group_state_phys = _create_group_with_attrs(
+            h5file, name_type_variables, time, it
+        )
+        group_state_phys.attrs["per_rank_files"] = True
+        for k, dtype in dtypes.items():
+            layout = h5py.VirtualLayout(shape=tuple(shapeX_seq), dtype=dtype)
+            for rank, slices_loc in enumerate(slices_ranks):
+                shape_loc = tuple(
+                    slice_.stop - slice_.start for slice_ in slices_loc
+                )
+                if 0 in shape_loc:
+                    continue
+                path_file_rank = get_path_file_rank(path_file, rank)
+                source = h5py.VirtualSource(
+                    str(path_file_rank.relative_to(path_file.parent)),
+                    "state_phys/" + k,
+                    shape=shape_loc,
+                )
+                layout[slices_loc] = source
+            group_state_phys.create_virtual_dataset(k, layout)
+        _save_attrs(h5file, sim_info, output_name_run, axes, particular_attr)
+
+
+def save_file_per_rank(
     path_file,
     state_phys,
     sim_info,
@@ -53,71 +381,554 @@ def save_file(
     time,
     it,
     particular_attr=None,
+    storage=None,
 ):
-    def create_group_with_attrs(h5file):
-        group_state_phys = h5file.create_group("state_phys")
-        group_state_phys.attrs["what"] = "obj state_phys for fluidsim"
-        group_state_phys.attrs["name_type_variables"] = state_phys.info
-        group_state_phys.attrs["time"] = time
-        group_state_phys.attrs["it"] = it
-        return group_state_phys
+    """Save the physical fields without gathering them (collective)
 
-    if mpi.nb_proc == 1 or not cfg_h5py.mpi:
-        if mpi.rank == 0:
-            h5file = h5pack.File(str(path_file), "w")
-            group_state_phys = create_group_with_attrs(h5file)
+    Each process writes its part of the fields in its own file (in the
+    directory ``per_rank_files``) and the process 0 writes an index file
+    (``path_file``, hdf5 format) presenting the global fields.
+
+    """
+    slices_loc = get_slices_loc(oper)
+    fields_loc = {k: state_phys.get_var(k) for k in state_phys.keys}
+    save_file_rank(
+        get_path_file_rank(path_file, mpi.rank), fields_loc, slices_loc, storage
+    )
+    slices_ranks = gather_slices_loc(oper)
+    if mpi.rank == 0:
+        save_file_index(
+            path_file,
+            slices_ranks,
+            oper.shapeX_seq,
+            {k: field.dtype for k, field in fields_loc.items()},
+            state_phys.info,
+            sim_info,
+            output_name_run,
+            oper.axes,
+            time,
+            it,
+            particular_attr,
+        )
+    if mpi.nb_proc > 1:
+        mpi.comm.barrier()
+
+
+def get_where_kept(oper):
+    """Return the (local) boolean array of the modes kept by the truncation"""
+    return oper.where_dealiased == 0
+
+
+def get_indices_kept_seq(oper):
+    """Return the global flat indices of the local modes kept by the truncation
+
+    The indices correspond to a sequential array with the axes ordered as in
+    physical space (``(ky, kx)`` in 2D and ``(kz, ky, kx)`` in 3D), so that
+    they do not depend on the decomposition over the processes. They are in
+    the order of ``field_fft[get_where_kept(oper)]``.
+
+    """
+    where_kept = get_where_kept(oper)
+    try:
+        axes = oper._get_axes_coarse_K()
+    except (AttributeError, NotImplementedError):
+        # sequential operators without decomposition (for example in 1D)
+        return np.flatnonzero(where_kept)
+    iks_loc = np.nonzero(where_kept)
+    shape_seq = [None] * len(axes)
+    iks_seq = [None] * len(axes)
+    for axis_K, axis in enumerate(axes):
+        shape_seq[axis] = oper.shapeK_seq[axis_K]
+        iks_seq[axis] = iks_loc[axis_K] + oper.seq_indices_first_K[axis_K]
+    return np.ravel_multi_index(iks_seq, shape_seq)
+
+
+def gatherv_modes(modes_loc, counts):
+    """Gather 1d arrays in the process 0 with one ``Gatherv`` (collective)
+
+    ``counts`` (only used in the process 0) contains the sizes of the local
+    arrays. Returns the concatenated array in the process 0 (None for the
+    other processes).
+
+    """
+    modes_loc = np.ascontiguousarray(modes_loc)
+    if mpi.rank == 0:
+        modes = np.empty(sum(counts), dtype=modes_loc.dtype)
+        displs = np.concatenate(([0], np.cumsum(counts[:-1])))
+        recvbuf = [modes, counts, displs]
     else:
-        h5file = h5pack.File(str(path_file), "w", driver="mpio", comm=mpi.comm)
-        group_state_phys = create_group_with_attrs(h5file)
+        modes = recvbuf = None
+    mpi.comm.Gatherv(modes_loc, recvbuf, root=0)
+    return modes
 
-    if mpi.nb_proc == 1:
-        for k in state_phys.keys:
-            field_seq = state_phys.get_var(k)
-            _create_variable(group_state_phys, k, field_seq)
-    elif not cfg_h5py.mpi:
-        for k in state_phys.keys:
-            field_loc = state_phys.get_var(k)
-            field_seq = oper.gather_Xspace(field_loc)
-            if mpi.rank == 0:
-                _create_variable(group_state_phys, k, field_seq)
+
+def scatterv_modes(modes, counts, modes_loc):
+    """Scatter a 1d array of the process 0 with one ``Scatterv`` (collective)
+
+    ``modes`` and ``counts`` are only used in the process 0. The local parts
+    are written in the contiguous array ``modes_loc``.
+
+    """
+    if mpi.rank == 0:
+        displs = np.concatenate(([0], np.cumsum(counts[:-1])))
+        sendbuf = [
+            np.ascontiguousarray(modes, dtype=modes_loc.dtype),
+            counts,
+            displs,
+        ]
+    else:
+        sendbuf = None
+    mpi.comm.Scatterv(sendbuf, modes_loc, root=0)
+
+
+def iter_gathered_modes(state_spect, oper):
+    """Gather the kept modes in the process 0, one key at a time (collective)
+
+    Yields first the pair ``("indices_kept", indices)``, with the sorted
+    global flat indices (see :func:`get_indices_kept_seq`) of the kept modes,
+    and then the pairs ``(key, modes)``, with the modes in the order of
+    ``indices``. The yielded arrays are None for the processes other than 0.
+
+    """
+    where_kept = get_where_kept(oper)
+    indices_loc = get_indices_kept_seq(oper)
+    if mpi.nb_proc > 1:
+        counts = mpi.comm.gather(indices_loc.size, root=0)
+        indices = gatherv_modes(indices_loc, counts)
     else:
-        h5file.atomic = False
-        ndim = len(oper.shapeX_loc)
-        if ndim == 2:
-            xstart, ystart = oper.seq_indices_first_X
-        elif ndim == 3:
-            xstart, ystart, zstart = oper.seq_indices_first_X
+        counts = None
+        indices = indices_loc
+    if mpi.rank == 0:
+        order = np.argsort(indices, kind="stable")
+        yield "indices_kept", indices[order]
+    else:
+        yield "indices_kept", None
+
+    for k in state_spect.keys:
+        modes = state_spect.get_var(k)[where_kept]
+        if mpi.nb_proc > 1:
+            modes = gatherv_modes(modes, counts)
+        yield k, modes[order] if mpi.rank == 0 else None
+
+
+def save_state_spect_file(
+    path_file,
+    state_spect,
+    sim_info,
+    output_name_run,
+    oper,
+    time,
+    it,
+    dtype=None,
+    compression=None,
+    particular_attr=None,
+):
+    """Save the spectral state in a file (collective)
+
+    Only the modes kept by the truncation (``oper.where_dealiased == 0``) are
+    saved (as 1d arrays sorted by global index, stored in the dataset
+    ``indices_kept``), so that the file can be loaded with any number of
+    processes. With ``dtype=None``, the modes are saved with the dtype of the
+    state so that a restart is exact. Returns the number of saved modes in the
+    process 0.
+
+    """
+    modes = iter_gathered_modes(state_spect, oper)
+    if mpi.rank > 0:
+        for _ in modes:
+            pass
+        return
+
+    with h5py.File(str(path_file), "w") as h5file:
+        group_state_spect = h5file.create_group("state_spect")
+        group_state_spect.attrs["what"] = "obj state_spect for fluidsim"
+        group_state_spect.attrs["name_type_variables"] = state_spect.info
+        group_state_spect.attrs["time"] = time
+        group_state_spect.attrs["it"] = it
+        group_state_spect.attrs["truncation"] = "where_dealiased"
+        _, indices = next(modes)
+        group_state_spect.create_dataset(
+            "indices_kept", data=indices, compression=compression
+        )
+        for k, modes_k in modes:
+            if dtype is not None:
+                modes_k = modes_k.astype(dtype)
+            group_state_spect.create_dataset(
+                k, data=modes_k, compression=compression
+            )
+        _save_attrs(h5file, sim_info, output_name_run, oper.axes, particular_attr)
+
+    return indices.size
+
+
+def save_file(
+    path_file,
+    state_phys,
+    sim_info,
+    output_name_run,
+    oper,
+    time,
+    it,
+    particular_attr=None,
+    storage=None,
+):
+    if mpi.nb_proc == 1 or not cfg_h5py.mpi:
+        # the fields are gathered one at a time while they are written
+        fields = iter_gathered_fields(state_phys, oper)
+        if mpi.rank > 0:
+            for _ in fields:
+                pass
         else:
-            raise NotImplementedError
-        xend = xstart + oper.shapeX_loc[0]
-        yend = ystart + oper.shapeX_loc[1]
-        for k in state_phys.keys:
-            field_loc = state_phys.get_var(k)
-            dset = group_state_phys.create_dataset(
-                k, oper.shapeX_seq, dtype=field_loc.dtype
+            save_file_seq(
+                path_file,
+                fields,
+                state_phys.info,
+                sim_info,
+                output_name_run,
+                oper.axes,
+                time,
+                it,
+                particular_attr,
+                storage=storage,
             )
-            with dset.collective:
-                if field_loc.ndim == 2:
-                    dset[xstart:xend, ystart:yend] = field_loc
-                elif field_loc.ndim == 3:
-                    dset[xstart:xend, ystart:yend, :] = field_loc
-                else:
-                    raise NotImplementedError("Unsupported number of dimensions")
-        h5file.close()
-        if mpi.rank == 0:
-            h5file = h5pack.File(str(path_file), "r+")
+        return
+
+    # note: the filters (compression) require a recent parallel HDF5 library
+    h5file = h5pack.File(str(path_file), "w", driver="mpio", comm=mpi.comm)
+    group_state_phys = _create_group_with_attrs(
+        h5file, state_phys.info, time, it
+    )
+    h5file.atomic = False
+    ndim = len(oper.shapeX_loc)
+    if ndim == 2:
+        xstart, ystart = oper.seq_indices_first_X
+    elif ndim == 3:
+        xstart, ystart, zstart = oper.seq_indices_first_X
+    else:
+        raise NotImplementedError
+    xend = xstart + oper.shapeX_loc[0]
+    yend = ystart + oper.shapeX_loc[1]
+    keepbits = storage.get("keepbits") if storage else None
+    for k in state_phys.keys:
+        field_loc = state_phys.get_var(k)
+        if keepbits is not None:
+            field_loc = round_mantissa(field_loc, keepbits)
+        dset = group_state_phys.create_dataset(
+            k,
+            oper.shapeX_seq,
+            dtype=field_loc.dtype,
+            **get_dataset_kwargs(oper.shapeX_seq, field_loc.dtype, storage),
+        )
+        with dset.collective:
+            if field_loc.ndim == 2:
+                dset[xstart:xend, ystart:yend] = field_loc
+            elif field_loc.ndim == 3:
+                dset[xstart:xend, ystart:yend, :] = field_loc
+            else:
+                raise NotImplementedError("Unsupported number of dimensions")
+    h5file.close()
 
     if mpi.rank == 0:
-        h5file.attrs["date saving"] = str(datetime.datetime.now()).encode()
-        h5file.attrs["name_solver"] = sim_info.solver.short_name
-        h5file.attrs["name_run"] = output_name_run
-        h5file.attrs["axes"] = np.array(oper.axes, dtype="|S9")
-        if particular_attr is not None:
-            h5file.attrs["particular_attr"] = particular_attr
-
-        sim_info._save_as_hdf5(hdf5_parent=h5file)
-        gp_info = h5file["info_simul"]
-        gf_params = gp_info["params"]
-        gf_params.attrs["SAVE"] = 1
-        gf_params.attrs["NEW_DIR_RESULTS"] = 1
-        h5file.close()
+        with h5pack.File(str(path_file), "r+") as h5file:
+            _save_attrs(
+                h5file, sim_info, output_name_run, oper.axes, particular_attr
+            )
+
+
+class AsyncSaver:
+    """Call saving functions in a background thread
+
+    The arrays to be saved are copied in staging buffers so that the time
+    stepping can continue during the writing. At most ``max_pending`` saves
+    can be pending: :func:`copy_to_buffer` blocks when this limit is reached.
+
+    Parameters
+    ----------
+
+    max_pending : int
+
+      Maximum number of pending saves (and of staging buffers).
+
+    """
+
+    def __init__(self, max_pending=2):
+        if max_pending < 1:
+            raise ValueError("max_pending has to be larger than 0")
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._jobs = queue.Queue()
+        self._buffers_free = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._exception = None
+        # keys of the pending saves (for example paths of files)
+        self.pending = {}
+
+    def copy_to_buffer(self, arr):
+        """Reserve a slot and return a copy of ``arr`` in a staging buffer"""
+        self._raise_exception()
+        self._slots.acquire()
+        with self._lock:
+            try:
+                buffer = self._buffers_free.pop()
+            except IndexError:
+                buffer = None
+        try:
+            if (
+                buffer is None
+                or buffer.shape != arr.shape
+                or buffer.dtype != arr.dtype
+            ):
+                buffer = np.empty_like(arr)
+            buffer[...] = arr
+        except BaseException:
+            self._release_slot(buffer)
+            raise
+        return buffer
+
+    def submit(self, func, *args, buffer=None, key=None, value=None, **kwargs):
+        """Call ``func(*args, **kwargs)`` in the background thread
+
+        ``buffer`` has to be a buffer returned by :func:`copy_to_buffer` (it
+        is reused after the call). If ``buffer`` is None, a slot is reserved
+        (blocking if needed). ``key`` and ``value`` are stored in the
+        dictionary ``pending`` until the end of the call.
+
+        """
+        try:
+            self._raise_exception()
+        except Exception:
+            # the slot reserved by copy_to_buffer is not used
+            if buffer is not None:
+                self._release_slot(buffer)
+            raise
+        if buffer is None:
+            self._slots.acquire()
+        if key is not None:
+            self.pending[key] = value
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            atexit.register(self.wait)
+        self._jobs.put((func, args, kwargs, buffer, key))
+
+    def _run(self):
+        while True:
+            func, args, kwargs, buffer, key = self._jobs.get()
+            try:
+                func(*args, **kwargs)
+            except Exception as error:
+                self._exception = error
+            finally:
+                if key is not None:
+                    self.pending.pop(key, None)
+                self._release_slot(buffer)
+                self._jobs.task_done()
+
+    def _release_slot(self, buffer=None):
+        if buffer is not None:
+            with self._lock:
+                self._buffers_free.append(buffer)
+        self._slots.release()
+
+    def wait(self):
+        """Wait for the end of the pending saves"""
+        self._jobs.join()
+        self._raise_exception()
+
+    def _raise_exception(self):
+        if self._exception is not None:
+            exception = self._exception
+            self._exception = None
+            raise exception
+
+
+class IndexPhysFiles:
+    """Sidecar index of the state files of a directory
+
+    The index is a JSON lines file (``index_phys_files.jsonl``) containing one
+    entry per state file ("name", "time", "it", "shape", "keys" and "size").
+    It is appended by the process 0 of the simulation each time a file is
+    saved, so that the directory does not have to be globbed and the files do
+    not have to be opened to get the list of the files and their iterations.
+
+    The index is considered up to date if it is not older than the directory
+    (adding, removing or renaming a file modifies the directory). Otherwise,
+    the directory is listed (without opening the files) when reading. If the
+    index contains the same state files, its modification time is updated.
+    Before the first write, the index is completed (opening only the files
+    missing in the index).
+
+    Parameters
+    ----------
+
+    path_dir : str or Path
+
+      Directory of the simulation.
+
+    """
+
+    name_file = "index_phys_files.jsonl"
+    prefixes = ("state_phys", "state_spect")
+
+    def __init__(self, path_dir):
+        self.path_dir = Path(path_dir)
+        self.path_file = self.path_dir / self.name_file
+        # entries (dict name -> entry) loaded by load_for_writing
+        self.entries = None
+        self._lock = threading.Lock()
+
+    def is_up_to_date(self):
+        """True if the index exists and is not older than the directory"""
+        try:
+            mtime_index = self.path_file.stat().st_mtime
+        except FileNotFoundError:
+            return False
+        return mtime_index >= self.path_dir.stat().st_mtime
+
+    def _read(self):
+        entries = {}
+        try:
+            file = open(self.path_file)
+        except FileNotFoundError:
+            return entries
+        with file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # incomplete line (interrupted write)
+                    continue
+                entries[entry["name"]] = entry
+        return entries
+
+    def _list_names(self, prefixes=None):
+        if prefixes is None:
+            prefixes = self.prefixes
+        prefixes = tuple(prefix + "_t" for prefix in prefixes)
+        with os.scandir(self.path_dir) as entries_dir:
+            return [
+                entry.name
+                for entry in entries_dir
+                if entry.name.startswith(prefixes)
+                and entry.name.endswith((".h5", ".nc"))
+                and entry.is_file()
+            ]
+
+    def get_names(self, prefixes=None):
+        """Return the sorted names of the state files
+
+        Parameters
+        ----------
+
+        prefixes : sequence of str (optional)
+
+          Prefixes of the files (default ``("state_phys", "state_spect")``).
+
+        """
+        if not self.path_dir.is_dir():
+            return []
+        entries = self._read_if_complete()
+        if entries is None:
+            names = self._list_names(prefixes)
+        else:
+            if prefixes is None:
+                prefixes = self.prefixes
+            prefixes = tuple(prefix + "_t" for prefix in prefixes)
+            names = [name for name in entries if name.startswith(prefixes)]
+        return sorted(names)
+
+    def get_entries(self):
+        """Return the entries sorted by names (None if not up to date)"""
+        entries = self._read_if_complete()
+        if entries is None:
+            return None
+        return [entries[name] for name in sorted(entries)]
+
+    def _read_if_complete(self):
+        """Return the entries if the index contains all the state files"""
+        if self.is_up_to_date():
+            return self._read()
+        if not self.path_file.exists():
+            return None
+        # the directory has been modified: it is listed (without opening the
+        # files) to check that the index contains the same files
+        entries = self._read()
+        if set(self._list_names()) != set(entries):
+            return None
+        # only other files have been added or removed: mark the index as up
+        # to date (no change of its content)
+        try:
+            os.utime(self.path_file)
+        except OSError:
+            pass
+        return entries
+
+    @staticmethod
+    def _make_entry(path_file, time, it, shape, keys):
+        return {
+            "name": path_file.name,
+            "time": float(time),
+            "it": int(it),
+            "shape": [int(n) for n in shape],
+            "keys": [str(key) for key in keys],
+            "size": path_file.stat().st_size,
+        }
+
+    def _make_entry_from_file(self, path_file):
+        prefix = path_file.name.split("_t", 1)[0]
+        with h5py.File(str(path_file), "r") as file:
+            group = file[prefix]
+            keys = [key for key in group.keys() if key != "nb_modes_ranks"]
+            return self._make_entry(
+                path_file,
+                group.attrs["time"],
+                group.attrs["it"],
+                group[keys[0]].shape if keys else (),
+                keys,
+            )
+
+    def load_for_writing(self):
+        """Load the entries and complete the index if needed (process 0)"""
+        entries = self._read()
+        if not self.is_up_to_date():
+            names = self._list_names()
+            entries_new = {}
+            for name in names:
+                try:
+                    entries_new[name] = entries[name]
+                except KeyError:
+                    try:
+                        entry = self._make_entry_from_file(self.path_dir / name)
+                    except (OSError, KeyError):
+                        # unreadable file (for example still being written)
+                        continue
+                    entries_new[name] = entry
+            if entries_new != entries or not self.path_file.exists():
+                entries = entries_new
+                with open(self.path_file, "w") as file:
+                    for name in sorted(entries):
+                        file.write(json.dumps(entries[name]) + "\n")
+        self.entries = entries
+        return entries
+
+    def add(self, path_file, time, it, shape, keys):
+        """Add (append) the entry of a file which has just been saved"""
+        path_file = Path(path_file)
+        entry = self._make_entry(path_file, time, it, shape, keys)
+        with self._lock:
+            if self.entries is None:
+                self.load_for_writing()
+            self.entries[entry["name"]] = entry
+            with open(self.path_file, "a") as file:
+                file.write(json.dumps(entry) + "\n")
+
+    def call_and_add(self, func, path_file, *args, entry=None, **kwargs):
+        """Call ``func(path_file, *args, **kwargs)`` and add the file
+
+        ``entry`` is a dictionary with the keys "time", "it", "shape" and
+        "keys" (used for the saves in a background thread).
+
+        """
+        func(path_file, *args, **kwargs)
+        self.add(path_file, **entry)
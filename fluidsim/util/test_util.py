@@ -1,4 +1,6 @@
 from pathlib import Path
+from tempfile import TemporaryDirectory
+import os
 import unittest
 
 import numpy as np
@@ -16,6 +18,13 @@ from fluidsim.util.util import (
     modif_resolution_from_dir,
     modif_resolution_from_dir_memory_efficient,
 )
+from fluidsim.util.output import (
+    AsyncSaver,
+    IndexPhysFiles,
+    compute_chunks,
+    get_dataset_kwargs,
+    round_mantissa,
+)
 
 
 @unittest.skipIf(mpi.nb_proc > 1, "Modif resolution do not work with mpi")
@@ -62,3 +71,135 @@ class TestModifResol2d(TestModifResol3d):
         from fluidsim.solvers.ns2d.solver import Simul
 
         return Simul
+
+
+class TestAsyncSaver(unittest.TestCase):
+    def test_async_saver(self):
+        saver = AsyncSaver(max_pending=2)
+        results = []
+
+        arr = np.arange(10.0)
+        for value in range(3):
+            arr[:] = value
+            buffer = saver.copy_to_buffer(arr)
+            saver.submit(
+                lambda buffer: results.append(buffer.copy()),
+                buffer,
+                buffer=buffer,
+                key="key",
+                value=value,
+            )
+        saver.wait()
+        self.assertEqual(saver.pending, {})
+        for value, result in enumerate(results):
+            assert np.all(result == value)
+
+        def func():
+            raise ValueError
+
+        saver.submit(func)
+        with self.assertRaises(ValueError):
+            saver.wait()
+
+    def test_async_saver_exception(self):
+        saver = AsyncSaver(max_pending=1)
+
+        def func():
+            raise ValueError
+
+        saver.submit(func)
+        saver._jobs.join()
+        arr = np.arange(10.0)
+        # the worker error is raised before reserving the slot
+        with self.assertRaises(ValueError):
+            saver.copy_to_buffer(arr)
+
+        saver.submit(func)
+        buffer = saver.copy_to_buffer(arr)
+        saver._jobs.join()
+        with self.assertRaises(ValueError):
+            saver.submit(print, buffer=buffer)
+        # the slot reserved with the buffer is released
+        self.assertTrue(saver._slots.acquire(blocking=False))
+        saver._slots.release()
+
+        results = []
+        buffer = saver.copy_to_buffer(arr)
+        saver.submit(results.append, 0, buffer=buffer)
+        saver.wait()
+        self.assertEqual(results, [0])
+
+
+class TestStorage(unittest.TestCase):
+    def test_chunks(self):
+        self.assertEqual(compute_chunks((2048, 2048, 2048), 8), (51, 51, 51))
+        self.assertEqual(compute_chunks((4, 1024, 1024), 8), (4, 181, 181))
+        self.assertEqual(compute_chunks((8, 8), 8), (8, 8))
+        self.assertEqual(get_dataset_kwargs((8, 8), "f8"), {})
+        kwargs = get_dataset_kwargs(
+            (8, 8), "f8", {"compression": "gzip", "chunks": (4, 16)}
+        )
+        self.assertEqual(kwargs["chunks"], (4, 8))
+        self.assertTrue(kwargs["shuffle"])
+
+    def test_round_mantissa(self):
+        for dtype in ("f4", "f8"):
+            arr = np.random.randn(1000).astype(dtype)
+            rounded = round_mantissa(arr, 10)
+            self.assertEqual(rounded.dtype, arr.dtype)
+            self.assertTrue(np.all(abs(rounded - arr) <= 2 ** -11 * abs(arr)))
+            self.assertFalse(np.array_equal(rounded, arr))
+            # rounding is idempotent
+            self.assertTrue(np.array_equal(round_mantissa(rounded, 10), rounded))
+        with self.assertRaises(ValueError):
+            round_mantissa(np.arange(4), 10)
+
+
+class TestIndexPhysFiles(unittest.TestCase):
+    def test_index(self):
+        with TemporaryDirectory() as path_dir:
+            path_dir = Path(path_dir)
+            index = IndexPhysFiles(path_dir)
+
+            def create_file(time, it):
+                path_file = path_dir / f"state_phys_t{time:07.3f}.nc"
+                with h5py.File(path_file, "w") as file:
+                    group = file.create_group("state_phys")
+                    group.attrs["time"] = time
+                    group.attrs["it"] = it
+                    group.create_dataset("ux", data=np.zeros((4, 4)))
+                return path_file
+
+            # files saved without index (for example by an old version)
+            create_file(0.0, 0)
+            self.assertFalse(index.is_up_to_date())
+            self.assertEqual(index.get_names(), ["state_phys_t000.000.nc"])
+
+            entries = index.load_for_writing()
+            self.assertEqual(entries["state_phys_t000.000.nc"]["it"], 0)
+            path_file = create_file(1.0, 10)
+            index.add(path_file, 1.0, 10, (4, 4), ["ux"])
+            self.assertTrue(index.is_up_to_date())
+            entries = index.get_entries()
+            self.assertEqual([entry["it"] for entry in entries], [0, 10])
+            self.assertEqual(entries[1]["shape"], [4, 4])
+            self.assertEqual(entries[1]["keys"], ["ux"])
+            self.assertEqual(entries[1]["size"], path_file.stat().st_size)
+
+            # the modification time of the directory can have a low resolution
+            mtime_index = index.path_file.stat().st_mtime
+            mtime_dir = (mtime_index + 1, mtime_index + 1)
+
+            # other file: the index is still usable
+            (path_dir / "other.txt").touch()
+            os.utime(path_dir, mtime_dir)
+            self.assertEqual(len(index.get_entries()), 2)
+
+            # removed file: the index is not up to date
+            os.remove(path_file)
+            os.utime(path_dir, mtime_dir)
+            self.assertIsNone(index.get_entries())
+            self.assertEqual(index.get_names(), ["state_phys_t000.000.nc"])
+            entries = index.load_for_writing()
+            self.assertEqual(list(entries), ["state_phys_t000.000.nc"])
+            self.assertEqual(IndexPhysFiles(path_dir)._read(), entries)
@@ -167,6 +167,129 @@ class TestSimulConserveOutput(TestSimulConserve):
         plt.close("all")
 
 
+class MixinCheckAllocations:
+    """A mixin to check that the time steps do not allocate large arrays.
+
+    After the first time step (which allocates the buffers of the time
+    scheme), a time step should not allocate more than a few fields (see
+    ``params.time_stepping.check_allocations``). When the kernels are not
+    compiled, their numpy expressions allocate temporary fields, hence the
+    (loose) bound ``nb_fields_allocated_max``.
+
+    """
+
+    nb_fields_allocated_max = 6
+
+    @classmethod
+    def init_params(cls):
+        params = super().init_params()
+        if params is None:
+            params = cls.params
+        params.output.HAS_TO_SAVE = False
+        params.forcing.enable = False
+        params.oper.nx = params.oper.ny = 32
+        params.time_stepping.check_allocations.enable = True
+        return params
+
+    def test_check_allocations(self):
+        sim = self.sim
+        time_stepping = sim.time_stepping
+        params = sim.params.time_stepping.check_allocations
+        # the buffers are allocated during the first time step
+        time_stepping.one_time_step()
+        self.assertGreater(time_stepping.nb_bytes_allocated, 0)
+        max_nb_bytes = (
+            self.nb_fields_allocated_max * sim.state.state_spect[0].nbytes
+        )
+        params.max_nb_bytes = max_nb_bytes
+        try:
+            time_stepping.one_time_step()
+        finally:
+            params.max_nb_bytes = None
+        self.assertLessEqual(time_stepping.nb_bytes_allocated, max_nb_bytes)
+
+
+class MixinCheckTimeSchemesBuffers:
+    """A mixin to compare the time schemes with a non-aliased call of
+    ``tendencies_nonlin``.
+
+    The time schemes give preallocated buffers to ``sim.tendencies_nonlin``
+    (argument ``old``). The results have to be the same as when the tendencies
+    are computed in new arrays, which is not the case if a buffer is also the
+    input of ``tendencies_nonlin``.
+
+    """
+
+    time_schemes = (
+        "Euler_phaseshift",
+        "Euler_phaseshift_random",
+        "RK2_phaseshift",
+        "RK2_phaseshift_random",
+        "RK2_phaseshift_exact",
+        "AB2_phaseshift",
+        "RK3_adaptive",
+        "RK4_adaptive",
+    )
+
+    def _compute_one_time_step(self, type_time_scheme, non_aliased):
+        sim = self.sim
+        time_stepping = sim.time_stepping
+        params = sim.params.time_stepping
+
+        params.type_time_scheme = type_time_scheme
+        time_stepping._init_time_scheme()
+        # the phase-shifted schemes are computed one time step out of two
+        time_stepping.it = 1
+        if type_time_scheme.endswith("_random"):
+            phaseshifts = self._phaseshifts_random
+            time_stepping._get_phaseshift_random = lambda: phaseshifts
+
+        tendencies_nonlin = sim.tendencies_nonlin
+        if non_aliased:
+            sim.tendencies_nonlin = lambda state_spect=None, old=None: (
+                tendencies_nonlin(state_spect)
+            )
+        try:
+            time_stepping._time_step_RK()
+        finally:
+            if non_aliased:
+                del sim.tendencies_nonlin
+            if type_time_scheme.endswith("_random"):
+                del time_stepping._get_phaseshift_random
+        return sim.state.state_spect.copy()
+
+    def test_time_schemes_buffers(self):
+        sim = self.sim
+        time_stepping = sim.time_stepping
+        params = sim.params.time_stepping
+        type_time_scheme_init = params.type_time_scheme
+        state_spect_init = sim.state.state_spect.copy()
+        deltat_init = time_stepping.deltat
+        self._phaseshifts_random = tuple(
+            np.exp(1j * phase) for phase in sim.oper.get_phases_random()
+        )
+        try:
+            for type_time_scheme in self.time_schemes:
+                results = []
+                for non_aliased in (False, True):
+                    sim.state.state_spect[:] = state_spect_init
+                    time_stepping.deltat = deltat_init
+                    results.append(
+                        self._compute_one_time_step(
+                            type_time_scheme, non_aliased
+                        )
+                    )
+                self.assertTrue(
+                    np.allclose(*results, rtol=1e-12, atol=0),
+                    msg=type_time_scheme,
+                )
+        finally:
+            sim.state.state_spect[:] = state_spect_init
+            time_stepping.deltat = deltat_init
+            params.type_time_scheme = type_time_scheme_init
+            time_stepping._init_time_scheme()
+
+
 class TimeLoggingTestResult(unittest.TextTestResult):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
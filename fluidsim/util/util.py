@@ -53,7 +53,7 @@ from fluidsim.base.params import (
 from fluidsim.base.solvers.info_base import create_info_simul
 from fluidsim.extend_simul import _extend_simul_class_from_path
 
-from .output import save_file
+from .output import save_file, IndexPhysFiles
 
 available_solvers = partial(
     loader.available_solvers, entrypoint_grp="fluidsim.solvers"
@@ -140,7 +140,7 @@ class ModulesSolvers(dict):
             self[key] = import_module_solver_from_key(key)
 
 
-def name_file_from_time_approx(path_dir, t_approx=None):
+def name_file_from_time_approx(path_dir, t_approx=None, prefixes=None):
     """Return the file name whose time is the closest to the given time.
 
     Parameters
@@ -154,6 +154,13 @@ def name_file_from_time_approx(path_dir, t_approx=None):
 
       Approximate time of the file to be loaded.
 
+    prefixes : sequence of str (optional)
+
+      Prefixes of the state files (default ``("state_phys",)``).
+
+    The names of the files are taken from the index of the directory (see
+    :class:`fluidsim.util.output.IndexPhysFiles`) if it is up to date.
+
     .. todo::
 
         Can be elegantly implemented using regex as done in
@@ -163,28 +170,32 @@ def name_file_from_time_approx(path_dir, t_approx=None):
     if not isinstance(path_dir, Path):
         path_dir = Path(path_dir)
 
-    path_files = sorted(path_dir.glob("state_phys_t*"))
+    if prefixes is None:
+        prefixes = ("state_phys",)
+
+    path_files = [
+        path_dir / name for name in IndexPhysFiles(path_dir).get_names(prefixes)
+    ]
 
     nb_files = len(path_files)
     if nb_files == 0 and mpi.rank == 0:
         raise ValueError("No state file in the dir\n" + str(path_dir))
 
-    if t_approx is None:
-        # should be the last one but not 100% sure
-        return path_files[-1].name
-
-    name_files = [path.name for path in path_files]
-    if "state_phys_t=" in name_files[0]:
-        ind_start_time = len("state_phys_t=")
-    else:
-        ind_start_time = len("state_phys_t")
-
     times = _np.empty([nb_files])
-    for ii, name in enumerate(name_files):
+    for ii, path in enumerate(path_files):
+        name = path.name
+        ind_start_time = name.index("_t") + 2
+        if name[ind_start_time] == "=":
+            ind_start_time += 1
         tmp = ".".join(name[ind_start_time:].split(".")[:2])
         if "_" in tmp:
             tmp = tmp[: tmp.index("_")]
         times[ii] = float(tmp)
+
+    if t_approx is None:
+        # should be the last one but not 100% sure
+        return path_files[times.argmax()].name
+
     if t_approx == "last":
         t_approx = times.max()
     i_file = abs(times - t_approx).argmin()
@@ -373,7 +384,9 @@ def load_for_restart(name_dir=None, t_approx="last", merge_missing_params=False)
     Simul = solver.Simul
 
     # choose the file with the time closer to t_approx
-    name_file = name_file_from_time_approx(path_dir, t_approx)
+    name_file = name_file_from_time_approx(
+        path_dir, t_approx, prefixes=("state_phys", "state_spect")
+    )
     path_file = os.path.join(path_dir, name_file)
 
     Simul = _extend_simul_class_from_path(Simul, path_file)
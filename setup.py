@@ -134,8 +134,6 @@ def transonize():
         "fluidsim/solvers/ns3d/forcing.py",
         "fluidsim/util/mini_oper_modif_resol.py",
         "fluidsim/base/output/spatiotemporal_spectra.py",
-        "fluidsim/solvers/ns3d/output/spatiotemporal_spectra.py",
-        "fluidsim/solvers/ns2d/output/spatiotemporal_spectra.py",
     ]
     make_backend_files([here / path for path in paths], backend=TRANSONIC_BACKEND)
 